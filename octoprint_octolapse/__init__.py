@@ -39,8 +39,10 @@ from octoprint.server import admin_permission
 from octoprint.server.util.flask import restricted_access
 from octoprint_octolapse.render import RenderingCallbackArgs
 import octoprint_octolapse.camera as camera
+import octoprint_octolapse.mjpeg_stream as mjpeg_stream
 import octoprint_octolapse.utility as utility
 import octoprint_octolapse.render as render
+import octoprint_octolapse.snapshot as snapshot
 from octoprint_octolapse.gcode_parser import Commands
 from octoprint_octolapse.settings import OctolapseSettings, Printer, Stabilization, Camera, Rendering, Snapshot, \
     DebugProfile
@@ -54,6 +56,7 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
                       octoprint.plugin.AssetPlugin,
                       octoprint.plugin.TemplatePlugin,
                       octoprint.plugin.StartupPlugin,
+                      octoprint.plugin.ShutdownPlugin,
                       octoprint.plugin.EventHandlerPlugin,
                       octoprint.plugin.BlueprintPlugin):
     TIMEOUT_DELAY = 1000
@@ -76,26 +79,28 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
     @octoprint.plugin.BlueprintPlugin.route("/snapshot/<filename>", methods=["GET"])
     def snapshot_request(self, filename):
         """Public access function to get the latest snapshot image"""
-        if filename == 'latest-snapshot.jpeg':
-            # get the latest snapshot image
-            mime_type = 'image/jpeg'
-            filename = utility.get_latest_snapshot_download_path(
-                self.get_plugin_data_folder())
-            if not os.path.isfile(filename):
-                # we haven't captured any images, return the built in png.
-                mime_type = 'image/png'
-                filename = utility.get_no_snapshot_image_download_path(
-                    self._basefolder)
-        elif filename == 'latest_snapshot_thumbnail_300px.jpeg':
-            # get the latest snapshot image
-            mime_type = 'image/jpeg'
-            filename = utility.get_latest_snapshot_thumbnail_download_path(
-                self.get_plugin_data_folder())
-            if not os.path.isfile(filename):
-                # we haven't captured any images, return the built in png.
-                mime_type = 'image/png'
-                filename = utility.get_no_snapshot_image_download_path(
-                    self._basefolder)
+        if filename == 'latest-snapshot.jpeg' or filename == 'latest_snapshot_thumbnail_300px.jpeg':
+            # get the latest snapshot image from memory, or tell the browser its copy is still current
+            is_thumbnail = filename == 'latest_snapshot_thumbnail_300px.jpeg'
+            if is_thumbnail:
+                path = utility.get_latest_snapshot_thumbnail_download_path(self.get_plugin_data_folder())
+            else:
+                path = utility.get_latest_snapshot_download_path(self.get_plugin_data_folder())
+            etag, image = snapshot.latest_snapshot_cache.get_image(is_thumbnail, path)
+            if image is not None:
+                if flask.request.if_none_match.contains(etag):
+                    response = flask.make_response("", 304)
+                else:
+                    response = flask.make_response(image)
+                    response.mimetype = 'image/jpeg'
+                response.set_etag(etag)
+                # the browser may keep the image, but must check the etag before using it again
+                response.headers["Cache-Control"] = "no-cache"
+                return response
+            # we haven't captured any images, return the built in png.
+            mime_type = 'image/png'
+            filename = utility.get_no_snapshot_image_download_path(
+                self._basefolder)
         else:
             # we don't recognize the snapshot type
             mime_type = 'image/png'
@@ -110,6 +115,15 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
     def download_settings_request(self):
         return self.get_download_file_response(self.get_settings_file_path(), "Settings.json")
 
+    @octoprint.plugin.BlueprintPlugin.route("/loadDiagnostics", methods=["POST"])
+    @restricted_access
+    @admin_permission.require(403)
+    def load_diagnostics_request(self):
+        data = {'success': True}
+        if self.Timelapse is not None:
+            data.update(self.Timelapse.get_diagnostics())
+        return json.dumps(data), 200, {'ContentType': 'application/json'}
+
     @octoprint.plugin.BlueprintPlugin.route("/stopTimelapse", methods=["POST"])
     @restricted_access
     @admin_permission.require(403)
@@ -118,6 +132,31 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
         self.Timelapse.stop_snapshots()
         return json.dumps({'success': True}), 200, {'ContentType': 'application/json'}
 
+    @octoprint.plugin.BlueprintPlugin.route("/loadRenderJobs", methods=["POST"])
+    def load_render_jobs_request(self):
+        render_jobs = [] if self.Timelapse is None else self.Timelapse.get_render_jobs()
+        data = {'success': True, 'render_jobs': render_jobs}
+        return json.dumps(data), 200, {'ContentType': 'application/json'}
+
+    @octoprint.plugin.BlueprintPlugin.route("/moveRenderJob", methods=["POST"])
+    @restricted_access
+    @admin_permission.require(403)
+    def move_render_job_request(self):
+        request_values = flask.request.get_json()
+        if self.Timelapse is None or not self.Timelapse.move_render_job(
+                request_values["job_id"], int(request_values["index"])):
+            return json.dumps({'error': "The render job is not queued."}), 404, {'ContentType': 'application/json'}
+        return json.dumps({'success': True}), 200, {'ContentType': 'application/json'}
+
+    @octoprint.plugin.BlueprintPlugin.route("/cancelRenderJob", methods=["POST"])
+    @restricted_access
+    @admin_permission.require(403)
+    def cancel_render_job_request(self):
+        request_values = flask.request.get_json()
+        if self.Timelapse is None or not self.Timelapse.cancel_render_job(request_values["job_id"]):
+            return json.dumps({'error': "The render job was not found."}), 404, {'ContentType': 'application/json'}
+        return json.dumps({'success': True}), 200, {'ContentType': 'application/json'}
+
     @octoprint.plugin.BlueprintPlugin.route("/saveMainSettings", methods=["POST"])
     @restricted_access
     @admin_permission.require(403)
@@ -126,6 +165,8 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
         self.Settings.is_octolapse_enabled = request_values["is_octolapse_enabled"]
         self.Settings.auto_reload_latest_snapshot = request_values["auto_reload_latest_snapshot"]
         self.Settings.auto_reload_frames = request_values["auto_reload_frames"]
+        self.Settings.thumbnail_width = int(request_values["thumbnail_width"])
+        self.Settings.thumbnail_quality = int(request_values["thumbnail_quality"])
         self.Settings.show_navbar_icon = request_values["show_navbar_icon"]
         self.Settings.show_navbar_when_not_printing = request_values["show_navbar_when_not_printing"]
         self.Settings.show_position_state_changes = request_values["show_position_state_changes"]
@@ -133,7 +174,24 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
         self.Settings.show_extruder_state_changes = request_values["show_extruder_state_changes"]
         self.Settings.show_trigger_state_changes = request_values["show_trigger_state_changes"]
         self.Settings.show_real_snapshot_time = request_values["show_real_snapshot_time"]
-
+        self.Settings.snapshot_worker_count = int(request_values["snapshot_worker_count"])
+        self.Settings.snapshot_queue_size = int(request_values["snapshot_queue_size"])
+        self.Settings.post_processing_worker_count = int(request_values["post_processing_worker_count"])
+        self.Settings.post_processing_queue_size = int(request_values["post_processing_queue_size"])
+        self.Settings.use_snapshot_container = request_values["use_snapshot_container"]
+        self.Settings.render_worker_count = int(request_values["render_worker_count"])
+        self.Settings.render_segment_count = int(request_values["render_segment_count"])
+        self.Settings.render_nice_level = int(request_values["render_nice_level"])
+        self.Settings.render_io_class = request_values["render_io_class"]
+        self.Settings.render_cpu_affinity = request_values["render_cpu_affinity"]
+        self.Settings.render_memory_limit = int(request_values["render_memory_limit"])
+        self.Settings.render_time_limit = int(request_values["render_time_limit"])
+        self.Settings.pause_rendering_while_printing = request_values["pause_rendering_while_printing"]
+        self.Settings.callback_worker_count = int(request_values["callback_worker_count"])
+        self.Settings.state_message_interval = float(request_values["state_message_interval"])
+        if self.Timelapse is not None:
+            self.Timelapse.configure_rendering(
+                self.Settings.render_worker_count, self.Settings.pause_rendering_while_printing)
 
         # save the updated settings to a file.
         self.save_settings()
@@ -240,6 +298,10 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
                 200,
                 {'ContentType': 'application/json'}
             )
+        if profile_type == "Camera":
+            # release any keep-alive connections and streams held for the removed camera
+            mjpeg_stream.grabber_pool.remove(guid)
+            camera.session_pool.remove(guid)
         # save the updated settings to a file.
         self.save_settings()
         self.send_settings_changed_message(client_id)
@@ -266,6 +328,9 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
         client_id = request_values["client_id"]
         try:
             self.load_settings(force_defaults=True)
+            # every camera profile has been replaced, so drop the existing streams and sessions
+            mjpeg_stream.grabber_pool.close()
+            camera.session_pool.close()
             data = {'success': True}
             data.update(self.Settings.to_dict())
             self.send_settings_changed_message(client_id)
@@ -503,6 +568,8 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
             is_rendering = False
             timelapse_state = TimelapseState.Idle
             is_waiting_to_render = False
+            render_jobs = []
+            is_rendering_paused = False
             profiles_dict = self.Settings.get_profiles_dict()
             debug_dict = profiles_dict["debug_profiles"]
             if self.Timelapse is not None:
@@ -518,6 +585,8 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
                 profiles_dict["current_debug_profile_guid"] = self.Settings.current_debug_profile_guid
                 profiles_dict["debug_profiles"] = debug_dict
                 is_rendering = self.Timelapse.get_is_rendering()
+                render_jobs = self.Timelapse.get_render_jobs()
+                is_rendering_paused = self.Timelapse.is_rendering_paused()
                 is_taking_snapshot = TimelapseState.TakingSnapshot == self.Timelapse.State
                 timelapse_state = self.Timelapse.State
                 is_waiting_to_render = (not is_rendering) and self.Timelapse.State == TimelapseState.WaitingToRender
@@ -528,7 +597,10 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
                     'is_taking_snapshot': is_taking_snapshot,
                     'is_rendering': is_rendering,
                     'waiting_to_render': is_waiting_to_render,
+                    'render_jobs': render_jobs,
+                    'is_rendering_paused': is_rendering_paused,
                     'state': timelapse_state,
+                    'snapshot_version': snapshot.latest_snapshot_cache.Version,
                     'profiles': profiles_dict
                     }
         except Exception as e:
@@ -560,7 +632,10 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
             on_state_changed=self.on_timelapse_state_changed,
             on_timelapse_start=self.on_timelapse_start,
             on_snapshot_position_error=self.on_snapshot_position_error,
-            on_position_error=self.on_position_error
+            on_position_error=self.on_position_error,
+            on_render_queue_changed=self.on_render_queue_changed,
+            on_render_progress=self.on_render_progress,
+            on_latest_snapshot_changed=self.on_latest_snapshot_changed
         )
 
     def on_after_startup(self):
@@ -570,6 +645,8 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
             # create our timelapse object
 
             self.create_timelapse_object()
+            # render any timelapses that were still queued when OctoPrint stopped
+            self.Timelapse.resume_rendering()
             self.Settings.current_debug_profile().log_info("Octolapse - loaded and active.")
         except Exception as e:
             if self.Settings is not None:
@@ -578,6 +655,23 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
                 self._logger.critical(utility.exception_to_string(e))
             raise
 
+    # Shutdown Mixin Handler
+
+    def on_shutdown(self):
+        try:
+            # stop the state publisher, and kill ffmpeg rather than leaving it running or paused.  The queued renders
+            # start over after a restart.
+            if self.Timelapse is not None:
+                self.Timelapse.shutdown()
+            # close every camera stream and connection so that no sockets are left open after OctoPrint exits
+            mjpeg_stream.grabber_pool.close()
+            camera.session_pool.close()
+        except Exception as e:
+            if self.Settings is not None:
+                self.Settings.current_debug_profile().log_exception(e)
+            else:
+                self._logger.critical(utility.exception_to_string(e))
+
     # Event Mixin Handler
 
     def on_event(self, event, payload):
@@ -591,6 +685,8 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
                 "Printer event received:{0}.".format(event))
 
             if event == Events.PRINT_STARTED:
+                # renders are paused even when octolapse is disabled
+                self.Timelapse.set_is_printing(True)
                 # warn and cancel print if not printing locally
                 if not self.Settings.is_octolapse_enabled:
                     return
@@ -632,6 +728,8 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
                 self.on_print_canceled()
             elif event == Events.PRINT_DONE:
                 self.on_print_completed()
+            if event in [Events.PRINT_FAILED, Events.PRINT_CANCELLED, Events.PRINT_DONE, Events.DISCONNECTED]:
+                self.Timelapse.set_is_printing(False)
         except Exception as e:
             if self.Settings is not None:
                 self.Settings.current_debug_profile().log_exception(e)
@@ -926,6 +1024,11 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
         data.update(state_data)
         self._plugin_manager.send_plugin_message(self._identifier, data)
 
+    def on_latest_snapshot_changed(self, snapshot_version):
+        """Called once the latest snapshot image and thumbnail can be served with the new version."""
+        data = {"type": "latest-snapshot-changed", "snapshot_version": snapshot_version}
+        self._plugin_manager.send_plugin_message(self._identifier, data)
+
     def on_apply_camera_settings_success(self, *args, **kwargs):
         setting_value = args[0]
         setting_name = args[1]
@@ -1055,6 +1158,16 @@ class OctolapsePlugin(octoprint.plugin.SettingsPlugin,
         # send a message to the client
         self.send_render_start_message(message)
 
+    def on_render_queue_changed(self, *args, **kwargs):
+        """Called when a render job is queued, started, moved, cancelled or finished."""
+        data = {"type": "render-queue-changed", "Status": self.get_status_dict()}
+        self._plugin_manager.send_plugin_message(self._identifier, data)
+
+    def on_render_progress(self, job_id, progress):
+        """Called at most once a second while ffmpeg renders a timelapse, with a RenderProgress dict."""
+        data = {"type": "render-progress", "job_id": job_id, "progress": progress}
+        self._plugin_manager.send_plugin_message(self._identifier, data)
+
     def on_render_end(self, *args, **kwargs):
         """Called after all rendering and synchronization attemps are complete."""
         payload = args[0]
@@ -29,24 +29,77 @@ import uuid
 # file called 'LICENSE', which is part of this source code package.
 import requests
 # Todo:  Do we need to add this to setup.py?
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import SSLError
 
 
+class CameraSessionPool(object):
+    # One requests session per camera profile, so that snapshots and camera setting changes reuse keep-alive
+    # connections instead of making a new TCP (and TLS) connection for every request.  A profile's session is
+    # rebuilt whenever its address, credentials or ssl settings change.
+    def __init__(self, max_connections_per_camera=4):
+        self.MaxConnectionsPerCamera = max_connections_per_camera
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def get(self, camera_profile, url, timeout_seconds=None, stream=False):
+        if timeout_seconds is None:
+            timeout_seconds = camera_profile.timeout_ms / 1000.0
+        return self.get_session(camera_profile).get(url, timeout=float(timeout_seconds), stream=stream)
+
+    def get_session(self, camera_profile):
+        connection_settings = (
+            camera_profile.address,
+            camera_profile.username,
+            camera_profile.password,
+            camera_profile.ignore_ssl_error
+        )
+        with self._lock:
+            if camera_profile.guid in self._sessions:
+                session_settings, session = self._sessions[camera_profile.guid]
+                if session_settings == connection_settings:
+                    return session
+                session.close()
+            session = self._create_session(camera_profile)
+            self._sessions[camera_profile.guid] = (connection_settings, session)
+            return session
+
+    def remove(self, guid):
+        with self._lock:
+            if guid in self._sessions:
+                self._sessions.pop(guid)[1].close()
+
+    def close(self):
+        with self._lock:
+            for session_settings, session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    def _create_session(self, camera_profile):
+        session = requests.Session()
+        session.verify = not camera_profile.ignore_ssl_error
+        if len(camera_profile.username) > 0:
+            session.auth = HTTPBasicAuth(camera_profile.username, camera_profile.password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.MaxConnectionsPerCamera)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
+# shared by every snapshot, camera test and camera setting request
+session_pool = CameraSessionPool()
+
+
 def format_request_template(camera_address, template, value):
     return template.format(camera_address=camera_address, value=value)
 
 
-def test_camera(camera_profile, timeout_seconds=2):
+def test_camera(camera_profile, timeout_seconds=None):
     url = format_request_template(
         camera_profile.address, camera_profile.snapshot_request_template, "")
     try:
-        if len(camera_profile.username) > 0:
-            r = requests.get(url, auth=HTTPBasicAuth(camera_profile.username, camera_profile.password),
-                             verify=not camera_profile.ignore_ssl_error, timeout=float(timeout_seconds))
-        else:
-            r = requests.get(
-                url, verify=not camera_profile.ignore_ssl_error, timeout=float(timeout_seconds))
+        r = session_pool.get(camera_profile, url, timeout_seconds)
         if r.status_code == requests.codes.ok:
             if 'content-length' in r.headers and r.headers["content-length"] == 0:
                 fail_reason = "Camera Test failed - The request contained no data"
@@ -67,7 +120,7 @@ def test_camera(camera_profile, timeout_seconds=2):
 
 
 class CameraControl(object):
-    def __init__(self, camera, on_success=None, on_fail=None, on_complete=None, timeout_seconds=10):
+    def __init__(self, camera, on_success=None, on_fail=None, on_complete=None, timeout_seconds=None):
         self.Camera = camera
         self.TimeoutSeconds = timeout_seconds
         self.OnSuccess = on_success
@@ -187,7 +240,6 @@ class CameraControl(object):
                 'name': 'focus'
             })
 
-        # TODO:  Move the static timeout value to settings
         for request in camera_settings_requests:
             CameraSettingJob(
                 self.Camera, request,
@@ -202,12 +254,9 @@ class CameraSettingJob(object):
     # camera_job_lock = threading.RLock()
 
     def __init__(self, camera, camera_settings_request, timeout, on_success=None, on_fail=None, on_complete=None):
-        camera = camera
+        self.Camera = camera
         self.Request = camera_settings_request
         self.Address = camera.address
-        self.Username = camera.username
-        self.Password = camera.password
-        self.IgnoreSslError = camera.ignore_ssl_error
         self.TimeoutSeconds = timeout
         self._on_success = on_success
         self._on_fail = on_fail
@@ -231,12 +280,7 @@ class CameraSettingJob(object):
         setting_name = self.Request['name']
         url = format_request_template(self.Address, template, value)
         try:
-            if len(self.Username) > 0:
-                r = requests.get(url, auth=HTTPBasicAuth(self.Username, self.Password),
-                                 verify=not self.IgnoreSslError, timeout=float(self.TimeoutSeconds))
-            else:
-                r = requests.get(url, verify=not self.IgnoreSslError,
-                                 timeout=float(self.TimeoutSeconds))
+            r = session_pool.get(self.Camera, url, self.TimeoutSeconds)
 
             if r.status_code == requests.codes.ok:
                 success = True
@@ -85,8 +85,9 @@ class Extruder(object):
 
     def __init__(self, octolapse_settings):
         self.Settings = octolapse_settings
-        self.PrinterRetractionLength = self.Settings.current_printer().retract_length
-        self.PrinterTolerance = self.Settings.current_printer().printer_position_confirmation_tolerance
+        self.ResolvedProfiles = self.Settings.resolved_profiles()
+        self.PrinterRetractionLength = self.ResolvedProfiles.Printer.retract_length
+        self.PrinterTolerance = self.ResolvedProfiles.Printer.printer_position_confirmation_tolerance
         self.StateHistory = deque(maxlen=5)
         self.reset()
         self.add_state(ExtruderState())
@@ -189,8 +190,8 @@ class Extruder(object):
 
         # if we don't have any history, we want to retract
         if state is None:
-            self.Settings.current_debug_profile().log_error("extruder.py - A 'length_to_retract' was requested, "
-                                                            "but the extruder haa no state history!")
+            self.ResolvedProfiles.Debug.log_error("extruder.py - A 'length_to_retract' was requested, "
+                                                  "but the extruder haa no state history!")
             return self.PrinterRetractionLength
 
         retract_length = self.PrinterRetractionLength - state.RetractionLength
@@ -200,14 +201,14 @@ class Extruder(object):
 
         if retract_length < 0:
             # This means we are beyond fully retracted, return 0
-            self.Settings.current_debug_profile().log_warning("extruder.py - A 'length_to_retract' was requested, "
-                                                              "but the extruder is beyond the configured retraction "
-                                                              "length.")
+            self.ResolvedProfiles.Debug.log_warning("extruder.py - A 'length_to_retract' was requested, "
+                                                    "but the extruder is beyond the configured retraction "
+                                                    "length.")
             retract_length = 0
         elif retract_length > self.PrinterRetractionLength:
-            self.Settings.current_debug_profile().log_error("extruder.py - A 'length_to_retract' was requested, "
-                                                            "but was found to be greater than the retraction "
-                                                            "length.")
+            self.ResolvedProfiles.Debug.log_error("extruder.py - A 'length_to_retract' was requested, "
+                                                  "but was found to be greater than the retraction "
+                                                  "length.")
             # for some reason we are over the retraction length.  Return 0
             retract_length = self.PrinterRetractionLength
 
@@ -224,6 +225,10 @@ class Extruder(object):
         if e_relative is None:
             return
 
+        # only resolve the profiles again if the settings have changed
+        if self.ResolvedProfiles.SettingsVersion != self.Settings.settings_version:
+            self.ResolvedProfiles = self.Settings.resolved_profiles()
+
         e = float(e_relative)
         if e is None or abs(e) < utility.FLOAT_MATH_EQUALITY_RANGE:
             e = 0.0
@@ -286,14 +291,13 @@ class Extruder(object):
             state.HasChanged = True
         else:
             state.HasChanged = False
-        if state.HasChanged:
-            message = (
+        if state.HasChanged and self.ResolvedProfiles.LogExtruderChange:
+            self.ResolvedProfiles.Debug.log_extruder_change(
                 "Extruder Changed: E:{0}, Retraction:{1} IsExtruding:{2}-{3}, "
                 "IsExtrudingStart:{4}-{5}, IsPrimed:{6}-{7}, IsRetractingStart:{8}-{9}, "
                 "IsRetracting:{10}-{11}, IsPartiallyRetracted:{12}-{13}, "
                 "IsRetracted:{14}-{15}, IsDetractingStart:{16}-{17}, "
-                "IsDetracting:{18}-{19}, IsDetracted:{20}-{21}"
-            ).format(
+                "IsDetracting:{18}-{19}, IsDetracted:{20}-{21}",
                 state.E,
                 state.RetractionLength,
                 state_previous.IsExtruding,
@@ -318,8 +322,6 @@ class Extruder(object):
                 state.IsDetracted
             )
 
-            self.Settings.current_debug_profile().log_extruder_change(message)
-
     @staticmethod
     def _extruder_state_triggered(option, state):
         if option is None:
@@ -398,7 +400,7 @@ class Extruder(object):
                 or (options.are_all_triggers_ignored()))):
             ret_value = True
 
-        if ret_value:
+        if ret_value and self.ResolvedProfiles.LogExtruderTriggered:
             message = (
                 "Triggered E:{0}, Retraction:{1} IsExtruding:{2}-{3}, "
                 "IsExtrudingStart:{4}-{5}, IsPrimed:{6}-{7}, "
@@ -421,7 +423,7 @@ class Extruder(object):
                 detracted_triggered,
                 ret_value
             )
-            self.Settings.current_debug_profile().log_extruder_triggered(message)
+            self.ResolvedProfiles.Debug.log_extruder_triggered(message)
 
         return ret_value
 
@@ -0,0 +1,160 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+
+import octoprint_octolapse.utility as utility
+
+try:
+    from os import scandir
+except ImportError:
+    # python 2 has no os.scandir, but the scandir package is its backport
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+class FrameIndex(object):
+    # The snapshots of a print, ordered by snapshot number, found by reading the capture directory once.
+    def __init__(self, directory, file_name_template):
+        self.Directory = directory
+        self.FileNameTemplate = file_name_template
+        # (snapshot number, full path) of every frame, in snapshot number order
+        self.Frames = []
+        # snapshot numbers that are missing before the last frame
+        self.Gaps = []
+        # file names that were skipped because another file has the same snapshot number
+        self.Duplicates = []
+
+    def get_frame_count(self):
+        return len(self.Frames)
+
+    def get_paths(self):
+        return [path for snapshot_number, path in self.Frames]
+
+    def is_sequential(self):
+        """Returns True if the frames are numbered from 0 without gaps, so that ffmpeg can find them with the file
+        name template."""
+        return len(self.Gaps) == 0
+
+    def get_gap_ranges(self):
+        """Returns the missing snapshot numbers as (first, last) ranges."""
+        ranges = []
+        for snapshot_number in self.Gaps:
+            if len(ranges) > 0 and ranges[-1][1] == snapshot_number - 1:
+                ranges[-1] = (ranges[-1][0], snapshot_number)
+            else:
+                ranges.append((snapshot_number, snapshot_number))
+        return ranges
+
+    def get_segments(self, segment_count):
+        """Splits the frames into segment_count (first, last) ranges of nearly equal length, where last is
+        exclusive."""
+        segment_count = max(1, min(segment_count, len(self.Frames)))
+        return [
+            (len(self.Frames) * segment // segment_count, len(self.Frames) * (segment + 1) // segment_count)
+            for segment in range(segment_count)
+        ]
+
+    def write_concat_list(self, path, fps, first=0, last=None, pre_roll_frames=0, post_roll_frames=0):
+        """Writes the frames from first up to last to an ffmpeg concat demuxer script, each shown for 1/fps
+        seconds.  The pre and post roll are added by showing the first and last frames for longer, which works with
+        every version of ffmpeg."""
+        frames = self.Frames[first:last]
+        with open(path, 'w') as concat_file:
+            concat_file.write("ffconcat version 1.0\n")
+            for frame, (snapshot_number, frame_path) in enumerate(frames):
+                frame_count = 1
+                if frame == 0:
+                    frame_count += pre_roll_frames
+                if frame == len(frames) - 1:
+                    frame_count += post_roll_frames
+                concat_file.write("file '{0}'\nduration {1:.6f}\n".format(
+                    _escape_concat_path(frame_path), float(frame_count) / fps))
+            if len(frames) > 0:
+                # the duration of the last file is ignored unless it is listed again
+                concat_file.write("file '{0}'\n".format(_escape_concat_path(frames[-1][1])))
+
+
+def create_frame_index(directory, file_name_template):
+    """Creates a FrameIndex from the files in directory whose names match file_name_template, which contains
+    utility.SnapshotNumberFormat in place of the snapshot number."""
+    frame_index = FrameIndex(directory, file_name_template)
+    prefix, suffix = file_name_template.split(utility.SnapshotNumberFormat, 1)
+    frames = {}
+    for file_name in _list_file_names(directory):
+        snapshot_number = parse_snapshot_number(file_name, prefix, suffix)
+        if snapshot_number is None:
+            continue
+        if snapshot_number in frames:
+            # keep the file with the name the snapshot was saved with
+            if file_name == file_name_template % snapshot_number:
+                frame_index.Duplicates.append(frames[snapshot_number])
+                frames[snapshot_number] = file_name
+            else:
+                frame_index.Duplicates.append(file_name)
+        else:
+            frames[snapshot_number] = file_name
+
+    # snapshot numbers start at 0, so anything missing before the first frame is a gap too
+    expected_snapshot_number = 0
+    for snapshot_number in sorted(frames.keys()):
+        frame_index.Gaps.extend(range(expected_snapshot_number, snapshot_number))
+        frame_index.Frames.append((snapshot_number, os.path.join(directory, frames[snapshot_number])))
+        expected_snapshot_number = snapshot_number + 1
+    frame_index.Duplicates.sort()
+    return frame_index
+
+
+def write_file_list(path, file_paths):
+    """Writes an ffmpeg concat demuxer script that joins whole files, for example video segments."""
+    with open(path, 'w') as concat_file:
+        concat_file.write("ffconcat version 1.0\n")
+        for file_path in file_paths:
+            concat_file.write("file '{0}'\n".format(_escape_concat_path(file_path)))
+
+
+def parse_snapshot_number(file_name, prefix, suffix):
+    """Returns the snapshot number in file_name, or None if it isn't a snapshot file name."""
+    if len(file_name) <= len(prefix) + len(suffix) or not file_name.startswith(prefix) or \
+            not file_name.endswith(suffix):
+        return None
+    number = file_name[len(prefix):len(file_name) - len(suffix)]
+    if not number.isdigit():
+        return None
+    return int(number)
+
+
+def _list_file_names(directory):
+    if not os.path.isdir(directory):
+        return []
+    if scandir is None:
+        return os.listdir(directory)
+    # scandir gets the file type from the directory listing on most platforms, so no file needs to be checked
+    return [entry.name for entry in scandir(directory) if entry.is_file()]
+
+
+def _escape_concat_path(path):
+    # paths are single quoted in the script, so a single quote has to be closed, escaped and reopened
+    return path.replace("'", "'\\''")
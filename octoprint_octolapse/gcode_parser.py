@@ -21,10 +21,17 @@
 # following email address: FormerLurker@pm.me
 ##################################################################################
 import operator
+import re
+import threading
+from collections import OrderedDict
 from six import string_types
 
 
 class CommandParameter(object):
+    # A well formed float followed by anything else that could be part of the value.  The second group is
+    # only non-empty when the value contains embedded whitespace or is malformed.
+    FloatRegex = re.compile(r"\s*([-+]?[0-9]*\.?[0-9]*)\s*([-+.0-9\s]*)")
+
     def __init__(self, name, parse_function, order):
         self.Name = name
         self.ParseFunction = parse_function
@@ -34,7 +41,7 @@ class CommandParameter(object):
     def parse_float_positive(parameter_string):
         value, parameters = CommandParameter.parse_float(parameter_string)
         if value is None:
-            return None
+            return None, parameters
         elif value < 0:
             raise ValueError("The parameter value is negative, which is not allowed.")
 
@@ -43,37 +50,18 @@ class CommandParameter(object):
     @staticmethod
     def parse_float(parameter_string):
         assert (isinstance(parameter_string, string_types))
-        parameter_string = parameter_string.lstrip()
-
-        index = 0
-        sign_seen = False
-        period_seen = False
-
-        float_string = ""
-        for index in range(0, len(parameter_string)):
-            _c = parameter_string[index]
-            if _c.isspace():
-                continue
-            if _c in ["+", "-"]:
-                if not sign_seen:
-                    sign_seen = True
-                    float_string += _c
-                else:
-                    raise ValueError("Could not parse float from parameter string, saw multiple signs.")
-            elif "0" <= _c <= "9":
-                float_string += _c
-            elif _c == ".":
-                if not period_seen:
-                    float_string += _c
-                    period_seen = True
-                else:
-                    raise ValueError("Could not parse float from parameter string, saw multiple decimal points.")
-            else:
-                break
-        if len(parameter_string) > index:
-            parameter_string = parameter_string[index:]
-        else:
-            parameter_string = ""
+        match = CommandParameter.FloatRegex.match(parameter_string)
+        float_string, remaining_float_string = match.groups()
+        parameter_string = parameter_string[match.end():]
+
+        if remaining_float_string:
+            # whitespace is allowed anywhere in the value
+            float_string = "".join((float_string + remaining_float_string).split())
+            if (
+                float_string.count("+") + float_string.count("-") > 1
+                or float_string.count(".") > 1
+            ):
+                raise ValueError(CommandParameter._get_float_error(float_string))
 
         value = None
         if len(float_string) > 0:
@@ -81,6 +69,22 @@ class CommandParameter(object):
 
         return value, parameter_string
 
+    @staticmethod
+    def _get_float_error(float_string):
+        # report whichever problem occurs first in the string
+        sign_seen = False
+        period_seen = False
+        for _c in float_string:
+            if _c in "+-":
+                if sign_seen:
+                    return "Could not parse float from parameter string, saw multiple signs."
+                sign_seen = True
+            elif _c == ".":
+                if period_seen:
+                    return "Could not parse float from parameter string, saw multiple decimal points."
+                period_seen = True
+        return "Could not parse float from parameter string."
+
 
 class Command(object):
 
@@ -90,32 +94,40 @@ class Command(object):
         self.DisplayTemplate = display_template
         self.Parameters = parameters
         self.TextOnlyParameter = text_only_parameter
+        self.ParameterRegex = Command.compile_parameter_regex(parameters)
+        # parameter parse functions keyed by both the upper and lower case parameter word
+        self.ParameterParsers = {}
+        if parameters:
+            for name, parameter in parameters.items():
+                self.ParameterParsers[name.upper()] = (name.upper(), parameter.ParseFunction)
+                self.ParameterParsers[name.lower()] = (name.upper(), parameter.ParseFunction)
+
+    @staticmethod
+    def compile_parameter_regex(parameters):
+        # Each match is one of our parameter words followed by everything up to the next letter.  Letters
+        # we don't know about (and their values) are skipped by the search, just like the old parser did.
+        if not parameters:
+            return None
+        return re.compile(
+            "([{0}])([^A-Za-z]*)".format("".join(sorted(parameters.keys()))), re.IGNORECASE
+        )
 
     def parse_parameters(self, parameters_string):
         parameters = {}
-        parameter = None
-        parameter_cmd = None
-        index = 0
-        for index in range(0, len(parameters_string)):
-            _c = parameters_string[index].upper()
-            if _c.isspace():
-                continue
-            elif _c in self.Parameters:
-                parameter = _c
-                parameter_cmd = self.Parameters[parameter].ParseFunction
-
-                break
-
-        if parameter is not None and len(parameters_string) > 0:
-            parameters_string = parameters_string[index + 1:]
-            if parameter_cmd is not None:
-                parameter_value, parameters_string = parameter_cmd(parameters_string)
-                parameters[parameter] = parameter_value
-                additional_parameters = self.parse_parameters(parameters_string)
-                if any(filter(parameters.has_key, additional_parameters.keys())):
-                    raise ValueError("A parameter value was repeated, cannot parse gcode.")
-                parameters.update(additional_parameters)
-
+        if self.ParameterRegex is None:
+            return parameters
+
+        has_repeated_parameter = False
+        parsers = self.ParameterParsers
+        for word, value_string in self.ParameterRegex.findall(parameters_string):
+            parameter, parse_function = parsers[word]
+            if parameter in parameters:
+                has_repeated_parameter = True
+            parameters[parameter] = parse_function(value_string)[0]
+
+        # value errors take precedence over repeated parameters, so raise this only after every value is parsed
+        if has_repeated_parameter:
+            raise ValueError("A parameter value was repeated, cannot parse gcode.")
         return parameters
 
     def to_string(self):
@@ -130,6 +142,67 @@ class Command(object):
         return command_string
 
 
+# A bounded LRU cache of parse results keyed on the raw gcode string.  Parameter dictionaries are copied on the
+# way in and out so that callers (alter_for_test_mode, for example) can modify them freely.  Only lines that could be
+# cached count as misses, they are counted when they are added.
+class ParsedCommandCache(object):
+    DefaultMaxSize = 1000
+
+    def __init__(self, max_size=DefaultMaxSize):
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.MaxSize = max_size
+        self.Hits = 0
+        self.Misses = 0
+        self.Evictions = 0
+
+    def get(self, gcode):
+        with self._lock:
+            result = self._cache.pop(gcode, None)
+            if result is None:
+                return None
+            # re-insert to mark as most recently used
+            self._cache[gcode] = result
+            self.Hits += 1
+        return result[0], dict(result[1])
+
+    def add(self, gcode, cmd, parameters):
+        if self.MaxSize < 1:
+            return
+        with self._lock:
+            self.Misses += 1
+            self._cache[gcode] = (cmd, dict(parameters))
+            while len(self._cache) > self.MaxSize:
+                self._cache.popitem(last=False)
+                self.Evictions += 1
+
+    def resize(self, max_size):
+        with self._lock:
+            self.MaxSize = max_size
+            while len(self._cache) > max(max_size, 0):
+                self._cache.popitem(last=False)
+                self.Evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.Hits = 0
+            self.Misses = 0
+            self.Evictions = 0
+
+    def get_statistics(self):
+        with self._lock:
+            lookups = self.Hits + self.Misses
+            return {
+                'size': len(self._cache),
+                'max_size': self.MaxSize,
+                'hits': self.Hits,
+                'misses': self.Misses,
+                'evictions': self.Evictions,
+                'hit_ratio': float(self.Hits) / lookups if lookups > 0 else 0.0
+            }
+
+
 class Commands(object):
     G0 = Command(
         "G0",
@@ -371,140 +444,130 @@ class Commands(object):
         }
 
     GcodeWords = {"G", "M"}
-    SuppressedSavedCommands = [M105.Command, M400.Command]
-    SuppressedSnapshotGcodeCommands = [M105.Command]
-    CommandsRequireMetric = [G0.Command, G1.Command, G28.Command, G92.Command]
-    TestModeSuppressExtrusionCommands = G0.Command, G1.Command
-    TestModeSuppressCommands = [
+    SuppressedSavedCommands = {M105.Command, M400.Command}
+    SuppressedSnapshotGcodeCommands = {M105.Command}
+    CommandsRequireMetric = {G0.Command, G1.Command, G28.Command, G92.Command}
+    TestModeSuppressExtrusionCommands = {G0.Command, G1.Command}
+    TestModeSuppressCommands = {
         M104.Command, M140.Command, M141.Command,
         M109.Command, M190.Command, M191.Command,
         M116.Command, M106.Command
-    ]
+    }
+
+    # (...) style comments, which can appear anywhere in the line
+    InlineCommentRegex = re.compile(r"\([^)]*\)")
+    # an optional N line number followed by the command word and its address
+    CommandWordRegex = re.compile(r"(?:[Nn][0-9\s]*)?([GgMm])([0-9.\s]*)")
+
+    # The command word at the start of a simple line, for example M73 in "M73 P12 R34".  Leading zeros are
+    # dropped from the address.  Anything more complicated (comments, line numbers, periods or whitespace
+    # within the address) will not match and falls through to the full parse.
+    LeadingWordRegex = re.compile(r"\s*([A-Za-z])0*([0-9]+)(?=\s*(?:[A-Za-z;]|$))")
+
+    # the number of times each untracked command word was skipped by parse
+    SkippedCommandCounts = {}
+
+    @staticmethod
+    def get_skipped_command_counts():
+        return dict(Commands.SkippedCommandCounts)
+
+    @staticmethod
+    def reset_skipped_command_counts():
+        Commands.SkippedCommandCounts = {}
+
+    # parse results for lines we track, keyed on the raw gcode
+    ParseCache = ParsedCommandCache()
 
     @staticmethod
     def parse(gcode):
+        # Lines that start with a command we don't track are never cached, so reject them before the cache lookup.
+        match = Commands.LeadingWordRegex.match(gcode)
+        if Commands.ParseCache.MaxSize < 1 or (match is not None and not Commands._is_tracked(match)):
+            return Commands._parse_gcode(gcode, match)
+
+        result = Commands.ParseCache.get(gcode)
+        if result is not None:
+            return result
+
+        cmd, parameters = Commands._parse_gcode(gcode, match)
+        # Only cache lines we track.  Everything else is rejected quickly anyway, and caching it would hide
+        # it from the skipped command counts.
+        if parameters is not None and not isinstance(parameters, string_types):
+            Commands.ParseCache.add(gcode, cmd, parameters)
+        return cmd, parameters
+
+    @staticmethod
+    def _is_tracked(match):
+        # A leading N word is a line number, so the command can only be found by the full parse.
+        command_letter = match.group(1).upper()
+        return command_letter == "N" or command_letter + match.group(2) in Commands.CommandsDictionary
+
+    @staticmethod
+    def _parse_gcode(gcode, match):
+        # reject any commands we don't track before doing any real work
+        if match is not None:
+            command_letter = match.group(1).upper()
+            if command_letter != "N":
+                command_to_search = command_letter + match.group(2)
+                cmd = Commands.CommandsDictionary.get(command_to_search, None)
+                if cmd is None:
+                    skipped_counts = Commands.SkippedCommandCounts
+                    skipped_counts[command_to_search] = skipped_counts.get(command_to_search, 0) + 1
+                    if command_letter in Commands.GcodeWords:
+                        return command_to_search, None
+                    return None, None
+
+                # without inline comments the rest of the line (up to any ; comment) is the parameter string
+                if "(" not in gcode:
+                    parameters = gcode[match.end():].partition(";")[0]
+                    if cmd.TextOnlyParameter:
+                        return command_to_search, parameters.strip()
+                    return command_to_search, cmd.parse_parameters(parameters)
+
         # strip off any trailing comments
-        ix = gcode.find(";")
-        if ix > -1:
-            if ix <= len(gcode) - 1:
-                gcode = gcode[0:ix]
-            else:
-                return None, None
+        gcode = gcode.partition(";")[0]
 
         # remove any comments from ('s
-        start_comment_index = None
-        end_comment_index = None
-
-        index = 0
-        while index < len(gcode):
-            if end_comment_index is not None:
-                # we have a comment to remove.
-                if start_comment_index == 0:
-                    if len(gcode) == end_comment_index + 1:
-                        gcode = ""
-                        index = 0
-                    else:
-                        gcode = gcode[end_comment_index + 1:]
-                        index = 0
-
-                elif end_comment_index + 1 == len(gcode):
-                    gcode = gcode[0:start_comment_index]
-                    index = start_comment_index + 1
-                else:
-                    gcode = gcode[0:start_comment_index] + gcode[end_comment_index + 1:]
-                    index = start_comment_index
-
-                start_comment_index = None
-                end_comment_index = None
-
-            for index in range(index, len(gcode)):
-                c = gcode[index]
-                if start_comment_index is None and c == "(":
-                    start_comment_index = index
-                elif start_comment_index is not None and c == ")":
-                    end_comment_index = index
-                    break
-
-            if start_comment_index is None or end_comment_index is None:
-                break
+        if "(" in gcode:
+            gcode = Commands.InlineCommentRegex.sub("", gcode)
 
         # strip whitespace
         gcode = gcode.strip()
 
-        # ignore blank lines
-        if len(gcode) < 1:
-            return None, None
-
-        # ignore any lines that start with a %
-        if gcode[0] == "%":
-            return None, None
-
-        # make sure our string is greater than 2 characters
+        # ignore blank lines and make sure our string is at least 2 characters
         if len(gcode) < 2:
             return None, None
 
-        # extract any line numbers
-        if gcode[0] == "N":
-            _n_temp = ""
-            # extract any integers and ignore whitespace
-            for index in range(0, len(gcode) - 1):
-                _c = gcode[index].upper()
-
-                if _c.isspace():
-                    continue
-                if "0" <= _c <= "9":
-                    _n_temp += _c
-                else:
-                    break
-
-            # remove the line number from the command string and strip off whitespace from the front
-            gcode = gcode[index:].lstrip()
-
-        # Now we should be left with the command and any parameters
-        # Make sure our command is a valid one
-        if len(gcode) < 2:
+        # skip any line number and extract the command word.  Lines that start with a % or with anything
+        # other than a G or M word will not match.
+        match = Commands.CommandWordRegex.match(gcode)
+        if match is None:
             return None, None
 
-        # get the command letter
-        command_letter = gcode[0].upper()
-        if command_letter not in Commands.GcodeWords:
-            return None, None
+        # build the command address, ignoring whitespace
+        command_address = match.group(2)
+        if not command_address.isdigit():
+            command_address = "".join(command_address.split())
 
-        # search for decimals or periods to build the command address
-        command_address = ""
-        has_seen_period = False
-        for index in range(1, len(gcode)):
-            c = gcode[index]
-            if c.isspace():
-                continue
-            elif "0" <= c <= "9":
-                command_address += c
-            elif c == ".":
-                if not has_seen_period:
-                    # if the command add
-                    command_address = str(int(command_address))
-                    command_address += c
-                    has_seen_period = True
-                else:
-                    raise ValueError("Cannot parse the gcode address, multiple periods seen.")
-            else:
-                break
-        # If we've not seen any periods, strip any leading 0s from the gcode
-        if not has_seen_period:
+        period_index = command_address.find(".")
+        if period_index == -1:
+            # If we've not seen any periods, strip any leading 0s from the gcode
             command_address = str(int(command_address))
+        else:
+            # strip any leading 0s from the integer portion of the address
+            integer_address = str(int(command_address[0:period_index]))
+            if command_address.find(".", period_index + 1) != -1:
+                raise ValueError("Cannot parse the gcode address, multiple periods seen.")
+            command_address = integer_address + command_address[period_index:]
 
         # make sure the command is in the dictionary
-        command_to_search = command_letter + command_address
-        if command_to_search not in Commands.CommandsDictionary.keys():
+        command_to_search = match.group(1).upper() + command_address
+        cmd = Commands.CommandsDictionary.get(command_to_search, None)
+        if cmd is None:
             return command_to_search, None
 
-        cmd = Commands.CommandsDictionary[command_to_search]
-
         # get the parameter string
-        if len(gcode) > index:
-            parameters = gcode[index:]
-        else:
-            parameters = ""
+        parameters = gcode[match.end():]
 
         if not cmd.TextOnlyParameter:
             parameters = cmd.parse_parameters(parameters)
@@ -0,0 +1,313 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+
+import os
+import struct
+import subprocess
+from distutils.spawn import find_executable
+from io import BytesIO
+
+from PIL import Image
+
+# the exif orientation tag that makes a viewer display the stored image with the transpose applied
+EXIF_ORIENTATIONS = {
+    'flip_left_right': 2,
+    'rotate_180': 3,
+    'flip_top_bottom': 4,
+    'transpose': 5,
+    'rotate_270': 6,
+    'rotate_90': 8
+}
+
+# jpegtran rotates clockwise, PIL rotates counter clockwise
+JPEGTRAN_ARGUMENTS = {
+    'flip_left_right': ['-flip', 'horizontal'],
+    'flip_top_bottom': ['-flip', 'vertical'],
+    'rotate_90': ['-rotate', '270'],
+    'rotate_180': ['-rotate', '180'],
+    'rotate_270': ['-rotate', '90'],
+    'transpose': ['-transpose']
+}
+
+PIL_TRANSPOSE_METHODS = {
+    'flip_left_right': Image.FLIP_LEFT_RIGHT,
+    'flip_top_bottom': Image.FLIP_TOP_BOTTOM,
+    'rotate_90': Image.ROTATE_90,
+    'rotate_180': Image.ROTATE_180,
+    'rotate_270': Image.ROTATE_270,
+    'transpose': Image.TRANSPOSE
+}
+
+# transposes that swap the width and height of the image
+AXIS_SWAPPING_TRANSPOSES = ['rotate_90', 'rotate_270', 'transpose']
+
+# How each transpose method was applied, in the order they are tried.  Lossless uses jpegtran to rearrange the DCT
+# blocks, exif only tags the image and leaves the rotation to the viewer and to the render step, and reencode
+# decodes and re-encodes the image with PIL.
+TRANSPOSE_METHOD_LOSSLESS = 'lossless'
+TRANSPOSE_METHOD_EXIF = 'exif'
+TRANSPOSE_METHOD_REENCODE = 'reencode'
+
+_EXIF_HEADER = b"Exif\x00\x00"
+_ORIENTATION_TAG = 0x0112
+
+_jpegtran_path = None
+_jpegtran_searched = False
+# The (width, height, transpose) of the images that jpegtran couldn't transpose perfectly, usually because the size
+# isn't a multiple of the jpeg block size.  Every snapshot of a timelapse has the same size, so later snapshots go
+# straight to the fallback instead of running jpegtran again.
+_jpegtran_failures = set()
+
+
+def get_jpegtran_path():
+    global _jpegtran_path, _jpegtran_searched
+    if not _jpegtran_searched:
+        _jpegtran_path = find_executable("jpegtran")
+        _jpegtran_searched = True
+    return _jpegtran_path
+
+
+def transpose_snapshot(path, transpose, method=TRANSPOSE_METHOD_LOSSLESS):
+    # Transposes the jpeg at path in place.  Falls back to re-encoding when the requested method can't be used, for
+    # example when jpegtran isn't installed, or when the image size isn't a multiple of the jpeg block size.
+    # Returns the method that was actually used, or None if there is nothing to do.
+    if transpose not in PIL_TRANSPOSE_METHODS:
+        return None
+    if method == TRANSPOSE_METHOD_EXIF and set_exif_orientation(path, EXIF_ORIENTATIONS[transpose]):
+        return TRANSPOSE_METHOD_EXIF
+    if method == TRANSPOSE_METHOD_LOSSLESS and transpose_jpegtran(path, transpose):
+        return TRANSPOSE_METHOD_LOSSLESS
+    transpose_pil(path, transpose)
+    return TRANSPOSE_METHOD_REENCODE
+
+
+def transpose_snapshot_data(data, transpose, method=TRANSPOSE_METHOD_LOSSLESS):
+    # The same as transpose_snapshot, for a snapshot that is held in memory.  Returns the transposed data and the
+    # method that was actually used.
+    if transpose not in PIL_TRANSPOSE_METHODS:
+        return data, None
+    if method == TRANSPOSE_METHOD_EXIF:
+        tagged_data = set_jpeg_orientation(data, EXIF_ORIENTATIONS[transpose])
+        if tagged_data is not None:
+            return tagged_data, TRANSPOSE_METHOD_EXIF
+    if method == TRANSPOSE_METHOD_LOSSLESS:
+        transposed_data = transpose_jpegtran_data(data, transpose)
+        if transposed_data is not None:
+            return transposed_data, TRANSPOSE_METHOD_LOSSLESS
+    im = Image.open(BytesIO(data))
+    im = im.transpose(PIL_TRANSPOSE_METHODS[transpose])
+    transposed_data = BytesIO()
+    im.save(transposed_data, "JPEG")
+    return transposed_data.getvalue(), TRANSPOSE_METHOD_REENCODE
+
+
+def transpose_jpegtran_data(data, transpose, jpegtran_path=None):
+    # jpegtran reads the image from stdin and writes the result to stdout.  Returns None if it can't be used.
+    if jpegtran_path is None:
+        jpegtran_path = get_jpegtran_path()
+    if jpegtran_path is None:
+        return None
+    failure_key = _get_jpegtran_failure_key(data, transpose)
+    if failure_key in _jpegtran_failures:
+        return None
+    args = [jpegtran_path, '-copy', 'all', '-perfect'] + JPEGTRAN_ARGUMENTS[transpose]
+    process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    transposed_data, error = process.communicate(data)
+    if process.returncode != 0:
+        _add_jpegtran_failure(failure_key)
+        return None
+    return transposed_data
+
+
+def transpose_pil(path, transpose):
+    im = Image.open(path)
+    im = im.transpose(PIL_TRANSPOSE_METHODS[transpose])
+    im.save(path)
+
+
+def transpose_jpegtran(path, transpose, jpegtran_path=None):
+    if jpegtran_path is None:
+        jpegtran_path = get_jpegtran_path()
+    if jpegtran_path is None:
+        return False
+    # the frame header comes after the exif segment, which is at most 64k
+    with open(path, 'rb') as jpeg_file:
+        failure_key = _get_jpegtran_failure_key(jpeg_file.read(131072), transpose)
+    if failure_key in _jpegtran_failures:
+        return False
+    transposed_path = path + ".transposed"
+    # -perfect fails instead of dropping the partial blocks at the right and bottom edges
+    args = [jpegtran_path, '-copy', 'all', '-perfect'] + JPEGTRAN_ARGUMENTS[transpose] + [
+        '-outfile', transposed_path, path]
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process.communicate()
+    if process.returncode != 0:
+        _add_jpegtran_failure(failure_key)
+        if os.path.exists(transposed_path):
+            os.remove(transposed_path)
+        return False
+    if os.path.exists(path):
+        # windows won't rename over an existing file
+        os.remove(path)
+    os.rename(transposed_path, path)
+    return True
+
+
+def _get_jpegtran_failure_key(data, transpose):
+    size = get_jpeg_size(data)
+    if size is None:
+        return None
+    return size[0], size[1], transpose
+
+
+def _add_jpegtran_failure(failure_key):
+    # an image without a frame header can't be recognized next time, so jpegtran is simply tried again
+    if failure_key is not None:
+        _jpegtran_failures.add(failure_key)
+
+
+def get_jpeg_size(data):
+    # Returns the (width, height) from the frame header of the jpeg data, or None if there is no frame header before
+    # the image data.
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    position = 2
+    while True:
+        marker, length = _read_segment_header(data, position)
+        # the image data starts at the start of scan marker, so the frame header must come before it
+        if marker is None or marker == 0xda:
+            return None
+        # every start of frame marker except the huffman table, arithmetic coding and jpeg extension markers
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            if position + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[position + 5:position + 9])
+            return width, height
+        position += 2 + length
+
+
+def set_exif_orientation(path, orientation):
+    with open(path, 'rb') as jpeg_file:
+        data = jpeg_file.read()
+    data = set_jpeg_orientation(data, orientation)
+    if data is None:
+        return False
+    with open(path, 'wb') as jpeg_file:
+        jpeg_file.write(data)
+    return True
+
+
+def get_exif_orientation(path):
+    # Returns the exif orientation of the jpeg at path, or 1 (normal) if it has none.  Only the headers are read.
+    with open(path, 'rb') as jpeg_file:
+        return get_jpeg_orientation(jpeg_file.read(65536))
+
+
+def get_jpeg_orientation(data):
+    # Returns the exif orientation of the jpeg data, or 1 (normal) if it has none.
+    segment = _find_exif_segment(data)
+    if segment is None:
+        return 1
+    entry, byte_order = _find_orientation_entry(data, segment[0], segment[1])
+    if entry is None:
+        return 1
+    return struct.unpack(byte_order + "H", data[entry + 8:entry + 10])[0]
+
+
+def set_jpeg_orientation(data, orientation):
+    # Returns a copy of the jpeg data with the exif orientation set, or None if the data can't be tagged.  An existing
+    # orientation tag is replaced, and an exif segment is added to jpegs without one (most webcam snapshots).
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    segment = _find_exif_segment(data)
+    if segment is not None:
+        entry, byte_order = _find_orientation_entry(data, segment[0], segment[1])
+        if entry is None:
+            # the tag would have to be added to an existing exif directory, re-encode instead
+            return None
+        return data[:entry + 8] + struct.pack(byte_order + "H", orientation) + data[entry + 10:]
+
+    # put the new exif segment right after the JFIF header, if there is one
+    position = 2
+    marker, length = _read_segment_header(data, position)
+    if marker == 0xe0:
+        position += 2 + length
+    return data[:position] + _create_exif_segment(orientation) + data[position:]
+
+
+def _create_exif_segment(orientation):
+    # a big endian tiff header with a single directory holding the orientation tag
+    tiff = (
+        b"MM\x00\x2a" + struct.pack(">I", 8) +
+        struct.pack(">H", 1) + struct.pack(">HHIHH", _ORIENTATION_TAG, 3, 1, orientation, 0) +
+        struct.pack(">I", 0)
+    )
+    payload = _EXIF_HEADER + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def _read_segment_header(data, position):
+    if position + 4 > len(data):
+        return None, 0
+    prefix, marker, length = struct.unpack(">BBH", data[position:position + 4])
+    if prefix != 0xff:
+        return None, 0
+    return marker, length
+
+
+def _find_exif_segment(data):
+    # Returns the (start, end) of the tiff data in the exif segment, or None.  Only the application segments before
+    # the image data are searched.
+    position = 2
+    while True:
+        marker, length = _read_segment_header(data, position)
+        if marker is None or not (0xe0 <= marker <= 0xef or marker == 0xfe):
+            return None
+        start = position + 4
+        if marker == 0xe1 and data[start:start + len(_EXIF_HEADER)] == _EXIF_HEADER:
+            return start + len(_EXIF_HEADER), position + 2 + length
+        position += 2 + length
+
+
+def _find_orientation_entry(data, tiff_start, tiff_end):
+    # Returns the position of the orientation entry in the first image directory and the tiff byte order.
+    byte_order_mark = data[tiff_start:tiff_start + 2]
+    if byte_order_mark == b"II":
+        byte_order = "<"
+    elif byte_order_mark == b"MM":
+        byte_order = ">"
+    else:
+        return None, None
+    directory = tiff_start + struct.unpack(byte_order + "I", data[tiff_start + 4:tiff_start + 8])[0]
+    if directory + 2 > tiff_end:
+        return None, byte_order
+    entry_count = struct.unpack(byte_order + "H", data[directory:directory + 2])[0]
+    for index in range(entry_count):
+        entry = directory + 2 + index * 12
+        if entry + 12 > tiff_end:
+            break
+        tag, tag_type = struct.unpack(byte_order + "HH", data[entry:entry + 4])
+        if tag == _ORIENTATION_TAG and tag_type == 3:
+            return entry, byte_order
+    return None, byte_order
@@ -0,0 +1,285 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+
+import threading
+import time
+from collections import deque
+
+import requests
+
+import octoprint_octolapse.camera as camera
+
+
+class MjpegFrameParser(object):
+    # Incrementally splits a multipart/x-mixed-replace body (what mjpg-streamer and most webcam servers send for
+    # ?action=stream) into jpeg frames.  Parts with a Content-Length header are sliced directly, anything else is
+    # read up to the next boundary.
+    def __init__(self, content_type=None):
+        self.Boundary = MjpegFrameParser.get_boundary(content_type)
+        self._buffer = bytearray()
+        self._content_length = None
+
+    @staticmethod
+    def get_boundary(content_type):
+        if content_type is None:
+            return None
+        for parameter in content_type.split(";")[1:]:
+            key, separator, value = parameter.strip().partition("=")
+            if separator and key.strip().lower() == "boundary":
+                value = value.strip().strip('"')
+                # some servers include the leading dashes in the header, most do not
+                if not value.startswith("--"):
+                    value = "--" + value
+                return value.encode("ascii")
+        return None
+
+    def feed(self, data):
+        # returns a list of every frame completed by the data
+        self._buffer.extend(data)
+        frames = []
+        while True:
+            if self._content_length is None:
+                if not self._read_part_headers():
+                    break
+            if self._content_length >= 0:
+                if len(self._buffer) < self._content_length:
+                    break
+                frame = bytes(self._buffer[:self._content_length])
+                del self._buffer[:self._content_length]
+            else:
+                end = self._buffer.find(self.Boundary)
+                if end < 0:
+                    break
+                frame = bytes(self._buffer[:end]).rstrip(b"\r\n")
+                del self._buffer[:end]
+            self._content_length = None
+            if frame.startswith(b"\xff\xd8"):
+                frames.append(frame)
+        return frames
+
+    def _read_part_headers(self):
+        if self.Boundary is None:
+            # no content type was supplied, take the boundary from the first delimiter line
+            start = self._buffer.find(b"--")
+            if start < 0:
+                del self._buffer[:-1]
+                return False
+            line_end = self._buffer.find(b"\r\n", start)
+            if line_end < 0:
+                return False
+            self.Boundary = bytes(self._buffer[start:line_end]).strip()
+        start = self._buffer.find(self.Boundary)
+        if start < 0:
+            # keep enough of the tail to find a boundary that is split across chunks
+            del self._buffer[:max(0, len(self._buffer) - len(self.Boundary))]
+            return False
+        del self._buffer[:start]
+        header_end = self._buffer.find(b"\r\n\r\n")
+        if header_end < 0:
+            return False
+        headers = bytes(self._buffer[len(self.Boundary):header_end])
+        del self._buffer[:header_end + 4]
+        self._content_length = -1
+        for header in headers.split(b"\r\n"):
+            key, separator, value = header.partition(b":")
+            if separator and key.strip().lower() == b"content-length":
+                try:
+                    self._content_length = int(value.strip())
+                except ValueError:
+                    pass
+        return True
+
+
+class MjpegStreamGrabber(object):
+    # Keeps one MJPEG stream connection open for a camera and stores the most recent frames, each tagged with the
+    # time it was received.  A snapshot becomes a lookup of the first frame received after the printer parked
+    # instead of a new http request.
+    def __init__(self, camera_profile, url, buffer_size=10, reconnect_delay_seconds=1.0, on_error=None):
+        self.Camera = camera_profile
+        self.Url = url
+        self.ReconnectDelaySeconds = reconnect_delay_seconds
+        self.OnErrorCallback = on_error
+        self._frames = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._response = None
+        self.FramesReceived = 0
+        self.Connections = 0
+        self.LastFrameTime = None
+        self.LastError = None
+        # only the first error after a frame is received is reported so that a missing camera doesn't flood the log
+        self._error_reported = False
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._receive_frames, name="OctolapseMjpegStream")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._condition:
+            self._stop_event.set()
+            thread = self._thread
+            self._thread = None
+            response = self._response
+            self._condition.notify_all()
+        if response is not None:
+            # unblocks a read that is waiting on the camera
+            response.close()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def is_running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def get_frame_after(self, timestamp, timeout_seconds):
+        # Returns (receive_time, frame) for the first buffered frame received at or after the timestamp, waiting
+        # up to timeout_seconds for one to arrive.  Returns None on timeout or if the grabber is stopped.
+        end_time = time.time() + timeout_seconds
+        with self._condition:
+            while True:
+                for receive_time, frame in self._frames:
+                    if receive_time >= timestamp:
+                        return receive_time, frame
+                remaining = end_time - time.time()
+                if remaining <= 0 or self._stop_event.is_set():
+                    return None
+                self._condition.wait(remaining)
+
+    def get_latest_frame(self):
+        with self._condition:
+            if len(self._frames) == 0:
+                return None
+            return self._frames[-1]
+
+    def get_statistics(self):
+        with self._condition:
+            return {
+                "url": self.Url,
+                "running": self.is_running(),
+                "connections": self.Connections,
+                "frames_received": self.FramesReceived,
+                "buffered_frames": len(self._frames),
+                "last_frame_time": self.LastFrameTime,
+                "last_error": None if self.LastError is None else str(self.LastError)
+            }
+
+    def _receive_frames(self):
+        while not self._stop_event.is_set():
+            try:
+                response = camera.session_pool.get(self.Camera, self.Url, stream=True)
+                with self._condition:
+                    self._response = response
+                    self.Connections += 1
+                if self._stop_event.is_set():
+                    break
+                if response.status_code != requests.codes.ok:
+                    raise IOError(
+                        "The MJPEG stream at {0} returned status code {1}.".format(self.Url, response.status_code)
+                    )
+                parser = MjpegFrameParser(response.headers.get("content-type"))
+                for chunk in response.iter_content(4096):
+                    if self._stop_event.is_set():
+                        break
+                    frames = parser.feed(chunk)
+                    if frames:
+                        self._add_frames(frames)
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    self.LastError = e
+                    if not self._error_reported and self.OnErrorCallback is not None:
+                        self._error_reported = True
+                        self.OnErrorCallback(e)
+            finally:
+                with self._condition:
+                    response = self._response
+                    self._response = None
+                if response is not None:
+                    response.close()
+            # the camera went away or closed the stream, try again shortly
+            self._stop_event.wait(self.ReconnectDelaySeconds)
+
+    def _add_frames(self, frames):
+        receive_time = time.time()
+        with self._condition:
+            for frame in frames:
+                self._frames.append((receive_time, frame))
+            self.FramesReceived += len(frames)
+            self.LastFrameTime = receive_time
+            self._error_reported = False
+            self._condition.notify_all()
+
+
+class MjpegGrabberPool(object):
+    # One running grabber per camera profile, restarted when the stream address or connection settings change.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._grabbers = {}
+
+    def get_grabber(self, camera_profile, on_error=None):
+        url = camera.format_request_template(
+            camera_profile.address, camera_profile.stream_request_template, "")
+        connection_settings = (
+            url,
+            camera_profile.username,
+            camera_profile.password,
+            camera_profile.ignore_ssl_error
+        )
+        with self._lock:
+            if camera_profile.guid in self._grabbers:
+                grabber_settings, grabber = self._grabbers[camera_profile.guid]
+                if grabber_settings == connection_settings:
+                    grabber.OnErrorCallback = on_error
+                    grabber.Camera = camera_profile
+                    grabber.start()
+                    return grabber
+                grabber.stop()
+            grabber = MjpegStreamGrabber(camera_profile, url, on_error=on_error)
+            self._grabbers[camera_profile.guid] = (connection_settings, grabber)
+            grabber.start()
+            return grabber
+
+    def remove(self, guid):
+        with self._lock:
+            if guid in self._grabbers:
+                self._grabbers.pop(guid)[1].stop()
+
+    def close(self):
+        with self._lock:
+            for grabber_settings, grabber in self._grabbers.values():
+                grabber.stop()
+            self._grabbers = {}
+
+    def get_statistics(self):
+        with self._lock:
+            return [grabber.get_statistics() for grabber_settings, grabber in self._grabbers.values()]
+
+
+# shared by every timelapse that captures snapshots from a camera stream
+grabber_pool = MjpegGrabberPool()
@@ -57,66 +57,118 @@ def get_formatted_coordinate(coord):
 
 
 class Pos(object):
+    __slots__ = (
+        "OctoprintPrinterProfile", "GCode", "Command", "Parameters",
+        "F", "X", "XOffset", "XHomed", "Y", "YOffset", "YHomed", "Z", "ZOffset", "ZHomed", "E", "EOffset",
+        "IsRelative", "IsExtruderRelative", "IsMetric",
+        "LastExtrusionHeight", "Layer", "Height", "IsPrimed", "IsInPosition", "InPathPosition", "IsTravelOnly",
+        "IsLayerChange", "IsHeightChange", "IsZHop", "HasPositionChanged", "HasStateChanged",
+        "HasReceivedHomeCommand", "HasPositionError", "PositionError"
+    )
+
     def __init__(self, printer, octoprint_printer_profile, pos=None):
+        if pos is not None:
+            Pos.copy(pos, self)
+            self.OctoprintPrinterProfile = octoprint_printer_profile
+            return
+
         self.OctoprintPrinterProfile = octoprint_printer_profile
-        self.GCode = None if pos is None else pos.GCode
-        self.Command = None if pos is None else pos.Command
-        self.Parameters = None if pos is None else pos.Parameters
+        self.GCode = None
+        self.Command = None
+        self.Parameters = None
         # F
-        self.F = None if pos is None else pos.F
+        self.F = None
         # X
-        self.X = None if pos is None else pos.X
-        self.XOffset = 0 if pos is None else pos.XOffset
-        self.XHomed = False if pos is None else pos.XHomed
+        self.X = None
+        self.XOffset = 0
+        self.XHomed = False
         # Y
-        self.Y = None if pos is None else pos.Y
-        self.YOffset = 0 if pos is None else pos.YOffset
-        self.YHomed = False if pos is None else pos.YHomed
+        self.Y = None
+        self.YOffset = 0
+        self.YHomed = False
         # Z
-        self.Z = None if pos is None else pos.Z
-        self.ZOffset = 0 if pos is None else pos.ZOffset
-        self.ZHomed = False if pos is None else pos.ZHomed
+        self.Z = None
+        self.ZOffset = 0
+        self.ZHomed = False
         # E
-        self.E = 0 if pos is None else pos.E
-        self.EOffset = 0 if pos is None else pos.EOffset
+        self.E = 0
+        self.EOffset = 0
 
-        if pos is not None:
-            self.IsRelative = pos.IsRelative
-            self.IsExtruderRelative = pos.IsExtruderRelative
-            self.IsMetric = pos.IsMetric
+        if printer.e_axis_default_mode in ['absolute', 'relative']:
+            self.IsExtruderRelative = True if printer.e_axis_default_mode == 'relative' else False
         else:
-            if printer.e_axis_default_mode in ['absolute', 'relative']:
-                self.IsExtruderRelative = True if printer.e_axis_default_mode == 'relative' else False
-            else:
-                self.IsExtruderRelative = None
-            if printer.xyz_axes_default_mode in ['absolute', 'relative']:
-                self.IsRelative = True if printer.xyz_axes_default_mode == 'relative' else False
-            else:
-                self.IsRelative = None
-            if printer.units_default in ['inches', 'millimeters']:
-                self.IsMetric = True if printer.units_default == 'millimeters' else False
-            else:
-                self.IsMetric = None
+            self.IsExtruderRelative = None
+        if printer.xyz_axes_default_mode in ['absolute', 'relative']:
+            self.IsRelative = True if printer.xyz_axes_default_mode == 'relative' else False
+        else:
+            self.IsRelative = None
+        if printer.units_default in ['inches', 'millimeters']:
+            self.IsMetric = True if printer.units_default == 'millimeters' else False
+        else:
+            self.IsMetric = None
 
-        self.LastExtrusionHeight = None if pos is None else pos.LastExtrusionHeight
+        self.LastExtrusionHeight = None
         # Layer and Height Tracking
-        self.Layer = 0 if pos is None else pos.Layer
-        self.Height = 0 if pos is None else pos.Height
-        self.IsPrimed = False if pos is None else pos.IsPrimed
-        self.IsInPosition = False if pos is None else pos.IsInPosition
-        self.InPathPosition = False if pos is None else pos.InPathPosition
-        self.IsTravelOnly = False if pos is None else pos.IsTravelOnly
+        self.Layer = 0
+        self.Height = 0
+        self.IsPrimed = False
+        self.IsInPosition = False
+        self.InPathPosition = False
+        self.IsTravelOnly = False
 
         # State Flags
-        self.IsLayerChange = False if pos is None else pos.IsLayerChange
-        self.IsHeightChange = False if pos is None else pos.IsHeightChange
-        self.IsZHop = False if pos is None else pos.IsZHop
-        self.HasPositionChanged = False if pos is None else pos.HasPositionChanged
-        self.HasStateChanged = False if pos is None else pos.HasStateChanged
-        self.HasReceivedHomeCommand = False if pos is None else pos.HasStateChanged
+        self.IsLayerChange = False
+        self.IsHeightChange = False
+        self.IsZHop = False
+        self.HasPositionChanged = False
+        self.HasStateChanged = False
+        self.HasReceivedHomeCommand = False
         # Error Flags
-        self.HasPositionError = False if pos is None else pos.HasPositionError
-        self.PositionError = None if pos is None else pos.PositionError
+        self.HasPositionError = False
+        self.PositionError = None
+
+    def clone(self):
+        # much cheaper than the copy constructor, since we don't need to go through __init__
+        pos = Pos.__new__(Pos)
+        Pos.copy(self, pos)
+        return pos
+
+    @staticmethod
+    def copy(source, target):
+        target.OctoprintPrinterProfile = source.OctoprintPrinterProfile
+        target.GCode = source.GCode
+        target.Command = source.Command
+        target.Parameters = source.Parameters
+        target.F = source.F
+        target.X = source.X
+        target.XOffset = source.XOffset
+        target.XHomed = source.XHomed
+        target.Y = source.Y
+        target.YOffset = source.YOffset
+        target.YHomed = source.YHomed
+        target.Z = source.Z
+        target.ZOffset = source.ZOffset
+        target.ZHomed = source.ZHomed
+        target.E = source.E
+        target.EOffset = source.EOffset
+        target.IsRelative = source.IsRelative
+        target.IsExtruderRelative = source.IsExtruderRelative
+        target.IsMetric = source.IsMetric
+        target.LastExtrusionHeight = source.LastExtrusionHeight
+        target.Layer = source.Layer
+        target.Height = source.Height
+        target.IsPrimed = source.IsPrimed
+        target.IsInPosition = source.IsInPosition
+        target.InPathPosition = source.InPathPosition
+        target.IsTravelOnly = source.IsTravelOnly
+        target.IsLayerChange = source.IsLayerChange
+        target.IsHeightChange = source.IsHeightChange
+        target.IsZHop = source.IsZHop
+        target.HasPositionChanged = source.HasPositionChanged
+        target.HasStateChanged = source.HasStateChanged
+        target.HasReceivedHomeCommand = source.HasReceivedHomeCommand
+        target.HasPositionError = source.HasPositionError
+        target.PositionError = source.PositionError
 
     def reset_state(self):
         self.IsLayerChange = False
@@ -354,8 +406,9 @@ class Position(object):
     def __init__(self, octolapse_settings, octoprint_printer_profile,
                  g90_influences_extruder):
         self.Settings = octolapse_settings
-        self.Printer = Printer(self.Settings.current_printer())
-        self.Snapshot = Snapshot(self.Settings.current_snapshot())
+        self.ResolvedProfiles = self.Settings.resolved_profiles()
+        self.Printer = Printer(self.ResolvedProfiles.Printer)
+        self.Snapshot = Snapshot(self.ResolvedProfiles.Snapshot)
         self.OctoprintPrinterProfile = octoprint_printer_profile
         self.Origin = {
             "X": self.Printer.origin_x,
@@ -381,7 +434,7 @@ class Position(object):
         if self.Printer.z_hop is None:
             self.Printer.z_hop = 0
 
-        self.LocationDetectionCommands = []
+        self.LocationDetectionCommands = set()
         self.create_location_detection_commands()
 
     def create_location_detection_commands(self):
@@ -389,15 +442,13 @@ class Position(object):
         if self.Printer.auto_position_detection_commands is not None:
             trimmed_commands = self.Printer.auto_position_detection_commands.strip()
             if len(trimmed_commands) > 0:
-                self.LocationDetectionCommands = [
+                self.LocationDetectionCommands = set(
                     x.strip().upper()
                     for x in
                     self.Printer.auto_position_detection_commands.split(',')
-                ]
-        if "G28" not in self.LocationDetectionCommands:
-            self.LocationDetectionCommands.append("G28")
-        if "G29" not in self.LocationDetectionCommands:
-            self.LocationDetectionCommands.append("G29")
+                )
+        self.LocationDetectionCommands.add("G28")
+        self.LocationDetectionCommands.add("G29")
 
     def reset(self):
         # todo: This reset function doesn't seem to reset everything.
@@ -465,13 +516,13 @@ class Position(object):
 
         if amount_to_lift < 0:
             # the current lift is negative
-            self.Settings.current_debug_profile().log_warning("position.py - A 'distance_to_zlift' was requested, "
-                                                              "but the current lift is already above the z_hop height.")
+            self.ResolvedProfiles.Debug.log_warning("position.py - A 'distance_to_zlift' was requested, "
+                                                    "but the current lift is already above the z_hop height.")
             return 0
         elif amount_to_lift > self.Printer.z_hop:
             # For some reason we're lower than we expected
-            self.Settings.current_debug_profile().log_warning("position.py - A 'distance_to_zlift' was requested, "
-                                                              "but was found to be more than the z_hop height.")
+            self.ResolvedProfiles.Debug.log_warning("position.py - A 'distance_to_zlift' was requested, "
+                                                    "but was found to be more than the z_hop height.")
             return self.Printer.z_hop
         else:
             # we are in-between 0 and z_hop, calculate lift
@@ -646,16 +697,16 @@ class Position(object):
         return None
 
     def update(self, gcode, cmd, parameters):
-        # a new position
-        pos = None
-        previous_pos = None
-        num_positions = len(self.Positions)
-        if num_positions > 0:
-            pos = Pos(self.Printer, self.OctoprintPrinterProfile, self.Positions[0])
-            previous_pos = Pos(self.Printer, self.OctoprintPrinterProfile, self.Positions[0])
-        if pos is None:
+        # only resolve the profiles again if the settings have changed
+        if self.ResolvedProfiles.SettingsVersion != self.Settings.settings_version:
+            self.ResolvedProfiles = self.Settings.resolved_profiles()
+
+        # a new position.  The previous position is never modified here, so there is no need to copy it.
+        if len(self.Positions) > 0:
+            previous_pos = self.Positions[0]
+            pos = previous_pos.clone()
+        else:
             pos = Pos(self.Printer, self.OctoprintPrinterProfile)
-        if previous_pos is None:
             previous_pos = Pos(self.Printer, self.OctoprintPrinterProfile)
 
         # reset the current position state (copied from the previous position,
@@ -668,269 +719,15 @@ class Position(object):
         pos.GCode = gcode
 
         # apply the cmd to the position tracker
-        # TODO: this should NOT be an else/if structure anymore..  Simplify
         if cmd is not None:
-
             if cmd in Commands.CommandsRequireMetric and not pos.IsMetric:
                 pos.HasPositionError = True
                 pos.PositionError = "Units are not metric.  Unable to continue print."
-            elif cmd in ["G0", "G1"]:
-                # Movement
-
-                self.Settings.current_debug_profile().log_position_command_received("Received {0}".format(cmd))
-
-                x = parameters["X"] if "X" in parameters else None
-                y = parameters["Y"] if "Y" in parameters else None
-                z = parameters["Z"] if "Z" in parameters else None
-                e = parameters["E"] if "E" in parameters else None
-                f = parameters["F"] if "F" in parameters else None
-
-                # If we're moving on the X/Y plane only, mark this position as travel only
-                pos.IsTravelOnly = e is None and (
-                    x is not None or y is not None or z is not None
-                )
-
-                if x is not None or y is not None or z is not None or f is not None:
-                    if pos.IsRelative is not None:
-                        if pos.HasPositionError and not pos.IsRelative:
-                            pos.HasPositionError = False
-                            pos.PositionError = ""
-                        pos.update_position(self.BoundingBox, x, y, z, e=None, f=f)
-                    else:
-                        self.Settings.current_debug_profile().log_position_command_received(
-                            "Position - Unable to update the X/Y/Z axis position, the axis mode ("
-                            "relative/absolute) has not been explicitly set via G90/G91. "
-                        )
-                if e is not None:
-                    if pos.IsExtruderRelative is not None:
-                        if pos.HasPositionError and not pos.IsExtruderRelative:
-                            pos.HasPositionError = False
-                            pos.PositionError = ""
-                        pos.update_position(
-                            self.BoundingBox,
-                            x=None,
-                            y=None,
-                            z=None,
-                            e=e,
-                            f=None)
-                    else:
-                        self.Settings.current_debug_profile().log_error(
-                            "Position - Unable to update the extruder position, the extruder mode ("
-                            "relative/absolute) has been selected (absolute/relative). "
-                        )
-                message = "Position Change - {0} - {1} Move From(X:{2},Y:{3},Z:{4},E:{5}) - To(X:{6},Y:{7},Z:{8}," \
-                          "E:{9}) "
-                if previous_pos is None:
-                    message = message.format(
-                        gcode, "Relative"
-                        if pos.IsRelative else "Absolute", "None", "None",
-                        "None", "None", pos.X, pos.Y, pos.Z, pos.E)
-                else:
-                    message = message.format(
-                        gcode, "Relative"
-                        if pos.IsRelative else "Absolute", previous_pos.X,
-                        previous_pos.Y, previous_pos.Z, previous_pos.E, pos.X,
-                        pos.Y, pos.Z, pos.E)
-                self.Settings.current_debug_profile().log_position_change(
-                    message)
-            elif cmd == "G20":
-                # change units to inches
-                if pos.IsMetric is None or pos.IsMetric:
-                    self.Settings.current_debug_profile(
-                    ).log_position_command_received(
-                        "Received G20 - Switching units to inches."
-                    )
-                    pos.IsMetric = False
-                else:
-                    self.Settings.current_debug_profile(
-                    ).log_position_command_received(
-                        "Received G20 - Already in inches."
-                    )
-            elif cmd == "G21":
-                # change units to millimeters
-                if pos.IsMetric is None or not pos.IsMetric:
-                    self.Settings.current_debug_profile(
-                    ).log_position_command_received(
-                        "Received G21 - Switching units to millimeters."
-                    )
-                    pos.IsMetric = True
-                else:
-                    self.Settings.current_debug_profile(
-                    ).log_position_command_received(
-                        "Received G21 - Already in millimeters."
-                    )
-            elif cmd == "G28":
-                # Home
-
-                pos.HasReceivedHomeCommand = True
-                x = parameters["X"] if "X" in parameters else None
-                y = parameters["Y"] if "Y" in parameters else None
-                z = parameters["Z"] if "Z" in parameters else None
-                # ignore the W parameter, it's used in Prusa firmware to indicate a home without mesh bed leveling
-                #w = parameters["W"] if "W" in parameters else None
-
-                x_homed = False
-                y_homed = False
-                z_homed = False
-                if x is not None:
-                    x_homed = True
-                if y is not None:
-                    y_homed = True
-                if z is not None:
-                    z_homed = True
-
-                # if there are no x,y or z parameters, we're homing all axes
-                if x is None and y is None and z is None:
-                    x_homed = True
-                    y_homed = True
-                    z_homed = True
-
-                home_strings = []
-                if x_homed:
-                    pos.XHomed = True
-                    pos.X = self.Origin[
-                        "X"] if not self.Printer.auto_detect_position else None
-                    if pos.X is None:
-                        home_strings.append("Homing X to Unknown Origin.")
-                    else:
-                        home_strings.append("Homing X to {0}.".format(
-                            get_formatted_coordinate(pos.X)))
-                if y_homed:
-                    pos.YHomed = True
-                    pos.Y = self.Origin[
-                        "Y"] if not self.Printer.auto_detect_position else None
-                    if pos.Y is None:
-                        home_strings.append("Homing Y to Unknown Origin.")
-                    else:
-                        home_strings.append("Homing Y to {0}.".format(
-                            get_formatted_coordinate(pos.Y)))
-                if z_homed:
-                    pos.ZHomed = True
-                    pos.Z = self.Origin[
-                        "Z"] if not self.Printer.auto_detect_position else None
-                    if pos.Z is None:
-                        home_strings.append("Homing Z to Unknown Origin.")
-                    else:
-                        home_strings.append("Homing Z to {0}.".format(
-                            get_formatted_coordinate(pos.Z)))
-
-                self.Settings.current_debug_profile().log_position_command_received(
-                    "Received G28 - ".format(" ".join(home_strings)))
-                pos.HasPositionError = False
-                pos.PositionError = None
-                # we must do this in case we have more than one home command
-                previous_pos = Pos(self.Printer, self.OctoprintPrinterProfile, pos)
-            elif cmd == "G90":
-                # change x,y,z to absolute
-                if pos.IsRelative is None or pos.IsRelative:
-                    self.Settings.current_debug_profile(
-                    ).log_position_command_received(
-                        "Received G90 - Switching to absolute x,y,z coordinates."
-                    )
-                    pos.IsRelative = False
-                else:
-                    self.Settings.current_debug_profile(
-                    ).log_position_command_received(
-                        "Received G90 - Already using absolute x,y,z coordinates."
-                    )
-
-                # for some firmwares we need to switch the extruder to
-                # absolute
-                # coordinates
-                # as well
-                if self.G90InfluencesExtruder:
-                    if pos.IsExtruderRelative is None or pos.IsExtruderRelative:
-                        self.Settings.current_debug_profile(
-                        ).log_position_command_received(
-                            "Received G90 - Switching to absolute extruder coordinates"
-                        )
-                        pos.IsExtruderRelative = False
-                    else:
-                        self.Settings.current_debug_profile(
-                        ).log_position_command_received(
-                            "Received G90 - Already using absolute extruder coordinates"
-                        )
-            elif cmd == "G91":
-                # change x,y,z to relative
-                if pos.IsRelative is None or not pos.IsRelative:
-                    self.Settings.current_debug_profile().log_position_command_received(
-                        "Received G91 - Switching to relative x,y,z coordinates")
-                    pos.IsRelative = True
-                else:
-                    self.Settings.current_debug_profile(
-                    ).log_position_command_received(
-                        "Received G91 - Already using relative x,y,z coordinates"
-                    )
-
-                # for some firmwares we need to switch the extruder to
-                # absolute
-                # coordinates
-                # as well
-                if self.G90InfluencesExtruder:
-                    if pos.IsExtruderRelative is None or not pos.IsExtruderRelative:
-                        self.Settings.current_debug_profile().log_position_command_received(
-                            "Received G91 - Switching to relative extruder coordinates"
-                        )
-                        pos.IsExtruderRelative = True
-                    else:
-                        self.Settings.current_debug_profile().log_position_command_received(
-                            "Received G91 - Already using relative extruder coordinates"
-                        )
-            elif cmd == "M83":
-                # Extruder - Set Relative
-                if pos.IsExtruderRelative is None or not pos.IsExtruderRelative:
-                    self.Settings.current_debug_profile().log_position_command_received(
-                        "Received M83 - Switching Extruder to Relative Coordinates"
-                    )
-                    pos.IsExtruderRelative = True
-            elif cmd == "M82":
-                # Extruder - Set Absolute
-                if pos.IsExtruderRelative is None or pos.IsExtruderRelative:
-                    self.Settings.current_debug_profile().log_position_command_received(
-                        "Received M82 - Switching Extruder to Absolute Coordinates"
-                    )
-                    pos.IsExtruderRelative = False
-            elif cmd == "G92":
-                # Set Position (offset)
-
-                x = parameters["X"] if "X" in parameters else None
-                y = parameters["Y"] if "Y" in parameters else None
-                z = parameters["Z"] if "Z" in parameters else None
-                e = parameters["E"] if "E" in parameters else None
-                if x is None and y is None and z is None and e is None:
-                    pos.XOffset = pos.X
-                    pos.YOffset = pos.Y
-                    pos.ZOffset = pos.Z
-                    pos.EOffset = pos.E
-                # set the offsets if they are provided
-                if x is not None:
-                    if pos.X is not None and pos.XHomed:
-                            pos.XOffset = pos.X - utility.get_float(x, 0)
-                    else:
-                        pos.X = utility.get_float(x, 0)
-
-                if y is not None:
-                    if pos.Y is not None and pos.YHomed:
-                            pos.YOffset = pos.Y - utility.get_float(y, 0)
-                    else:
-                        pos.Y = utility.get_float(y, 0)
-
-                if z is not None:
-                    if pos.Z is not None and pos.ZHomed:
-                            pos.ZOffset = pos.Z - utility.get_float(z, 0)
-                    else:
-                        pos.Z = utility.get_float(z, 0)
-
-                if e is not None:
-                    if pos.E is not None:
-                        pos.EOffset = pos.E - utility.get_float(e, 0)
-                    else:
-                        pos.E = utility.get_float(e, 0)
-
-                self.Settings.current_debug_profile().log_position_command_received(
-                    "Received G92 - Set Position.  Command:{0}, XOffset:{1}, " +
-                    "YOffset:{2}, ZOffset:{3}, EOffset:{4}".format(
-                        gcode, pos.XOffset, pos.YOffset, pos.ZOffset, pos.EOffset))
+            else:
+                handler = Position.CommandHandlers.get(cmd, None)
+                if handler is not None:
+                    # a handler may return a new previous position to use when detecting changes
+                    previous_pos = handler(self, pos, previous_pos, gcode, cmd, parameters) or previous_pos
 
         ########################################
         # Update the extruder monitor.
@@ -984,10 +781,8 @@ class Position(object):
                     if pos.Height is None or utility.round_to(pos.Z, self.PrinterTolerance) > previous_pos.Height:
                         pos.Height = utility.round_to(
                             pos.Z, self.PrinterTolerance)
-                        self.Settings.current_debug_profile(
-                        ).log_position_height_change(
-                            "Position - Reached New Height:{0}.".format(
-                                pos.Height))
+                        self.ResolvedProfiles.Debug.log_position_height_change(
+                            "Position - Reached New Height:{0}.", pos.Height)
 
                     # calculate layer change
                     if (utility.round_to(
@@ -995,9 +790,8 @@ class Position(object):
                             or pos.Layer == 0):
                         pos.IsLayerChange = True
                         pos.Layer += 1
-                        self.Settings.current_debug_profile(
-                        ).log_position_layer_change(
-                            "Position - Layer:{0}.".format(pos.Layer))
+                        self.ResolvedProfiles.Debug.log_position_layer_change(
+                            "Position - Layer:{0}.", pos.Layer)
                     else:
                         pos.IsLayerChange = False
 
@@ -1016,12 +810,274 @@ class Position(object):
                 if is_lifted or self.Printer.z_hop == 0:
                     pos.IsZHop = True
 
-            if pos.IsZHop and self.Printer.z_hop > 0:
-                self.Settings.current_debug_profile().log_position_zhop(
-                    "Position - Zhop:{0}".format(self.Printer.z_hop))
+            if pos.IsZHop and self.Printer.z_hop > 0 and self.ResolvedProfiles.LogPositionZhop:
+                self.ResolvedProfiles.Debug.log_position_zhop(
+                    "Position - Zhop:{0}", self.Printer.z_hop)
 
         self.Positions.appendleft(pos)
 
+    def _process_g0_g1(self, pos, previous_pos, gcode, cmd, parameters):
+        # Movement
+        if self.ResolvedProfiles.LogPositionCommandReceived:
+            self.ResolvedProfiles.Debug.log_position_command_received("Received {0}", cmd)
+
+        x = parameters["X"] if "X" in parameters else None
+        y = parameters["Y"] if "Y" in parameters else None
+        z = parameters["Z"] if "Z" in parameters else None
+        e = parameters["E"] if "E" in parameters else None
+        f = parameters["F"] if "F" in parameters else None
+
+        # If we're moving on the X/Y plane only, mark this position as travel only
+        pos.IsTravelOnly = e is None and (
+            x is not None or y is not None or z is not None
+        )
+
+        if x is not None or y is not None or z is not None or f is not None:
+            if pos.IsRelative is not None:
+                if pos.HasPositionError and not pos.IsRelative:
+                    pos.HasPositionError = False
+                    pos.PositionError = ""
+                pos.update_position(self.BoundingBox, x, y, z, e=None, f=f)
+            else:
+                self.ResolvedProfiles.Debug.log_position_command_received(
+                    "Position - Unable to update the X/Y/Z axis position, the axis mode ("
+                    "relative/absolute) has not been explicitly set via G90/G91. "
+                )
+        if e is not None:
+            if pos.IsExtruderRelative is not None:
+                if pos.HasPositionError and not pos.IsExtruderRelative:
+                    pos.HasPositionError = False
+                    pos.PositionError = ""
+                pos.update_position(
+                    self.BoundingBox,
+                    x=None,
+                    y=None,
+                    z=None,
+                    e=e,
+                    f=None)
+            else:
+                self.ResolvedProfiles.Debug.log_error(
+                    "Position - Unable to update the extruder position, the extruder mode ("
+                    "relative/absolute) has been selected (absolute/relative). "
+                )
+        if self.ResolvedProfiles.LogPositionChange:
+            self.ResolvedProfiles.Debug.log_position_change(
+                "Position Change - {0} - {1} Move From(X:{2},Y:{3},Z:{4},E:{5}) - To(X:{6},Y:{7},Z:{8},E:{9}) ",
+                gcode, "Relative" if pos.IsRelative else "Absolute",
+                previous_pos.X, previous_pos.Y, previous_pos.Z, previous_pos.E,
+                pos.X, pos.Y, pos.Z, pos.E
+            )
+
+    def _process_g20(self, pos, previous_pos, gcode, cmd, parameters):
+        # change units to inches
+        if pos.IsMetric is None or pos.IsMetric:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G20 - Switching units to inches."
+            )
+            pos.IsMetric = False
+        else:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G20 - Already in inches."
+            )
+
+    def _process_g21(self, pos, previous_pos, gcode, cmd, parameters):
+        # change units to millimeters
+        if pos.IsMetric is None or not pos.IsMetric:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G21 - Switching units to millimeters."
+            )
+            pos.IsMetric = True
+        else:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G21 - Already in millimeters."
+            )
+
+    def _process_g28(self, pos, previous_pos, gcode, cmd, parameters):
+        # Home
+
+        pos.HasReceivedHomeCommand = True
+        x = parameters["X"] if "X" in parameters else None
+        y = parameters["Y"] if "Y" in parameters else None
+        z = parameters["Z"] if "Z" in parameters else None
+        # ignore the W parameter, it's used in Prusa firmware to indicate a home without mesh bed leveling
+        #w = parameters["W"] if "W" in parameters else None
+
+        x_homed = False
+        y_homed = False
+        z_homed = False
+        if x is not None:
+            x_homed = True
+        if y is not None:
+            y_homed = True
+        if z is not None:
+            z_homed = True
+
+        # if there are no x,y or z parameters, we're homing all axes
+        if x is None and y is None and z is None:
+            x_homed = True
+            y_homed = True
+            z_homed = True
+
+        home_strings = []
+        if x_homed:
+            pos.XHomed = True
+            pos.X = self.Origin[
+                "X"] if not self.Printer.auto_detect_position else None
+            if pos.X is None:
+                home_strings.append("Homing X to Unknown Origin.")
+            else:
+                home_strings.append("Homing X to {0}.".format(
+                    get_formatted_coordinate(pos.X)))
+        if y_homed:
+            pos.YHomed = True
+            pos.Y = self.Origin[
+                "Y"] if not self.Printer.auto_detect_position else None
+            if pos.Y is None:
+                home_strings.append("Homing Y to Unknown Origin.")
+            else:
+                home_strings.append("Homing Y to {0}.".format(
+                    get_formatted_coordinate(pos.Y)))
+        if z_homed:
+            pos.ZHomed = True
+            pos.Z = self.Origin[
+                "Z"] if not self.Printer.auto_detect_position else None
+            if pos.Z is None:
+                home_strings.append("Homing Z to Unknown Origin.")
+            else:
+                home_strings.append("Homing Z to {0}.".format(
+                    get_formatted_coordinate(pos.Z)))
+
+        self.ResolvedProfiles.Debug.log_position_command_received(
+            "Received G28 - {0}", " ".join(home_strings))
+        pos.HasPositionError = False
+        pos.PositionError = None
+        # we must do this in case we have more than one home command
+        return pos.clone()
+
+    def _process_g90(self, pos, previous_pos, gcode, cmd, parameters):
+        # change x,y,z to absolute
+        if pos.IsRelative is None or pos.IsRelative:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G90 - Switching to absolute x,y,z coordinates."
+            )
+            pos.IsRelative = False
+        else:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G90 - Already using absolute x,y,z coordinates."
+            )
+
+        # for some firmwares we need to switch the extruder to
+        # absolute
+        # coordinates
+        # as well
+        if self.G90InfluencesExtruder:
+            if pos.IsExtruderRelative is None or pos.IsExtruderRelative:
+                self.ResolvedProfiles.Debug.log_position_command_received(
+                    "Received G90 - Switching to absolute extruder coordinates"
+                )
+                pos.IsExtruderRelative = False
+            else:
+                self.ResolvedProfiles.Debug.log_position_command_received(
+                    "Received G90 - Already using absolute extruder coordinates"
+                )
+
+    def _process_g91(self, pos, previous_pos, gcode, cmd, parameters):
+        # change x,y,z to relative
+        if pos.IsRelative is None or not pos.IsRelative:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G91 - Switching to relative x,y,z coordinates")
+            pos.IsRelative = True
+        else:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received G91 - Already using relative x,y,z coordinates"
+            )
+
+        # for some firmwares we need to switch the extruder to
+        # absolute
+        # coordinates
+        # as well
+        if self.G90InfluencesExtruder:
+            if pos.IsExtruderRelative is None or not pos.IsExtruderRelative:
+                self.ResolvedProfiles.Debug.log_position_command_received(
+                    "Received G91 - Switching to relative extruder coordinates"
+                )
+                pos.IsExtruderRelative = True
+            else:
+                self.ResolvedProfiles.Debug.log_position_command_received(
+                    "Received G91 - Already using relative extruder coordinates"
+                )
+
+    def _process_m83(self, pos, previous_pos, gcode, cmd, parameters):
+        # Extruder - Set Relative
+        if pos.IsExtruderRelative is None or not pos.IsExtruderRelative:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received M83 - Switching Extruder to Relative Coordinates"
+            )
+            pos.IsExtruderRelative = True
+
+    def _process_m82(self, pos, previous_pos, gcode, cmd, parameters):
+        # Extruder - Set Absolute
+        if pos.IsExtruderRelative is None or pos.IsExtruderRelative:
+            self.ResolvedProfiles.Debug.log_position_command_received(
+                "Received M82 - Switching Extruder to Absolute Coordinates"
+            )
+            pos.IsExtruderRelative = False
+
+    def _process_g92(self, pos, previous_pos, gcode, cmd, parameters):
+        # Set Position (offset)
+
+        x = parameters["X"] if "X" in parameters else None
+        y = parameters["Y"] if "Y" in parameters else None
+        z = parameters["Z"] if "Z" in parameters else None
+        e = parameters["E"] if "E" in parameters else None
+        if x is None and y is None and z is None and e is None:
+            pos.XOffset = pos.X
+            pos.YOffset = pos.Y
+            pos.ZOffset = pos.Z
+            pos.EOffset = pos.E
+        # set the offsets if they are provided
+        if x is not None:
+            if pos.X is not None and pos.XHomed:
+                    pos.XOffset = pos.X - utility.get_float(x, 0)
+            else:
+                pos.X = utility.get_float(x, 0)
+
+        if y is not None:
+            if pos.Y is not None and pos.YHomed:
+                    pos.YOffset = pos.Y - utility.get_float(y, 0)
+            else:
+                pos.Y = utility.get_float(y, 0)
+
+        if z is not None:
+            if pos.Z is not None and pos.ZHomed:
+                    pos.ZOffset = pos.Z - utility.get_float(z, 0)
+            else:
+                pos.Z = utility.get_float(z, 0)
+
+        if e is not None:
+            if pos.E is not None:
+                pos.EOffset = pos.E - utility.get_float(e, 0)
+            else:
+                pos.E = utility.get_float(e, 0)
+
+        self.ResolvedProfiles.Debug.log_position_command_received(
+            "Received G92 - Set Position.  Command:{0}, XOffset:{1}, YOffset:{2}, ZOffset:{3}, EOffset:{4}",
+            gcode, pos.XOffset, pos.YOffset, pos.ZOffset, pos.EOffset)
+
+    # the handler used by update for each command we track, keyed by command
+    CommandHandlers = {
+        "G0": _process_g0_g1,
+        "G1": _process_g0_g1,
+        "G20": _process_g20,
+        "G21": _process_g21,
+        "G28": _process_g28,
+        "G90": _process_g90,
+        "G91": _process_g91,
+        "M82": _process_m82,
+        "M83": _process_m83,
+        "G92": _process_g92
+    }
+
     def has_homed_position(self, index=0):
         if len(self.Positions) <= index:
             return None
@@ -0,0 +1,133 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+
+import threading
+import time
+
+
+class StatePublisher(object):
+    # Publishes the latest state from one long lived thread.  Callers only mark the state as dirty, which is cheap
+    # enough to do for every gcode line, and the publisher builds and sends a single message at most once per
+    # interval, so any number of changes within the interval are coalesced.
+    def __init__(self, name, get_message, on_publish, interval_seconds=1.0, on_error=None):
+        self.Name = name
+        self.IntervalSeconds = interval_seconds
+        self.GetMessageCallback = get_message
+        self.OnPublishCallback = on_publish
+        self.OnErrorCallback = on_error
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._dirty_time = None
+        # Each thread gets its own stop event, so a thread that is still publishing when stop gives up waiting for it
+        # can never be restarted by the next call to start.
+        self._stopping = None
+        self._thread = None
+        # diagnostics
+        self.PublishCount = 0
+        self.LastPublishTime = None
+        self.LastLatency = None
+        self.MaxLatency = None
+        self._total_latency = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(target=self._publish_changes, args=[self._stopping], name=self.Name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        with self._lock:
+            thread = self._thread
+            stopping = self._stopping
+            self._thread = None
+            self._stopping = None
+        if thread is None:
+            return
+        stopping.set()
+        # wake the publisher up so that it sees the stop request
+        self._dirty.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self._dirty.clear()
+
+    def mark_dirty(self):
+        if not self._dirty.is_set():
+            self._dirty_time = time.time()
+            self._dirty.set()
+
+    def reset_statistics(self):
+        with self._lock:
+            self.PublishCount = 0
+            self.LastPublishTime = None
+            self.LastLatency = None
+            self.MaxLatency = None
+            self._total_latency = 0.0
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                "name": self.Name,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "interval_seconds": self.IntervalSeconds,
+                "published": self.PublishCount,
+                "last_latency": self.LastLatency,
+                "max_latency": self.MaxLatency,
+                "average_latency": (
+                    self._total_latency / self.PublishCount if self.PublishCount > 0 else None
+                )
+            }
+
+    def _publish_changes(self, stopping):
+        # stopping is checked before waiting too, since another thread may already have cleared the dirty flag
+        while not stopping.is_set():
+            self._dirty.wait()
+            if stopping.is_set():
+                return
+            # don't publish more than once per interval
+            if self.LastPublishTime is not None:
+                delay_seconds = self.IntervalSeconds - (time.time() - self.LastPublishTime)
+                if delay_seconds > 0 and stopping.wait(delay_seconds):
+                    return
+            # clear the flag before building the message so that any change made from here on is published next time
+            self._dirty.clear()
+            dirty_time = self._dirty_time
+            try:
+                message = self.GetMessageCallback()
+                if message is not None:
+                    self.OnPublishCallback(message)
+                    publish_time = time.time()
+                    with self._lock:
+                        self.LastPublishTime = publish_time
+                        self.PublishCount += 1
+                        if dirty_time is not None:
+                            self.LastLatency = publish_time - dirty_time
+                            self._total_latency += self.LastLatency
+                            if self.MaxLatency is None or self.LastLatency > self.MaxLatency:
+                                self.MaxLatency = self.LastLatency
+            except Exception as e:
+                if self.OnErrorCallback is not None:
+                    self.OnErrorCallback(e)
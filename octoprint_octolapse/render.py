@@ -23,18 +23,60 @@
 
 import logging
 import os
+import shlex
 import shutil
+import subprocess
 import sys
 import threading
 import time
 import math
+from tempfile import NamedTemporaryFile, TemporaryFile, mkdtemp
 # sarge was added to the additional requirements for the plugin
 import uuid
 
 import sarge
 
+import octoprint_octolapse.frame_index as frame_index
+import octoprint_octolapse.image_transpose as image_transpose
+import octoprint_octolapse.snapshot_container as snapshot_container
 import octoprint_octolapse.utility as utility
+from octoprint_octolapse.render_process import RenderProcess, RenderProcessOptions
+from octoprint_octolapse.render_progress import CombinedRenderProgress, RenderProgress
 from octoprint_octolapse.settings import Rendering
+from octoprint_octolapse.snapshot_container import SnapshotSequence
+
+# the filters each ffmpeg supports, by ffmpeg path, so that ffmpeg is only asked once
+_ffmpeg_filters = {}
+_ffmpeg_filters_lock = threading.Lock()
+
+
+def get_ffmpeg_filters(ffmpeg_path):
+    """Returns the names of the filters that ffmpeg supports, or an empty set if ffmpeg can't be run."""
+    with _ffmpeg_filters_lock:
+        if ffmpeg_path not in _ffmpeg_filters:
+            _ffmpeg_filters[ffmpeg_path] = _read_ffmpeg_filters(ffmpeg_path)
+        return _ffmpeg_filters[ffmpeg_path]
+
+
+def _read_ffmpeg_filters(ffmpeg_path):
+    ffmpeg = ffmpeg_path.strip()
+    if sys.platform == "win32" and not (ffmpeg.startswith('"') and ffmpeg.endswith('"')):
+        ffmpeg = "\"{0}\"".format(ffmpeg)
+    try:
+        with open(os.devnull, 'r+b') as devnull:
+            process = subprocess.Popen(
+                shlex.split(ffmpeg) + ["-hide_banner", "-filters"], stdin=devnull, stdout=subprocess.PIPE,
+                stderr=devnull)
+            output = process.communicate()[0]
+    except (IOError, OSError):
+        return frozenset()
+    # each filter is listed as its flags, its name, then its inputs and outputs, for example " T.. tpad V->V ..."
+    filters = set()
+    for line in output.decode('utf-8', 'replace').splitlines():
+        words = line.split()
+        if len(words) > 2 and "->" in words[2]:
+            filters.add(words[1])
+    return frozenset(filters)
 
 
 def is_rendering_template_valid(template, options, data_directory):
@@ -73,48 +115,47 @@ class Render(object):
     @staticmethod
     def create_render_job(
         settings,
-        snapshot,
-        rendering,
+        job_info,
         data_directory,
-        octoprint_timelapse_folder,
-        ffmpeg_path,
         thread_count,
-        render_task_queue,
-        job_id,
-        print_name,
-        print_start_time,
-        print_end_time,
-        print_state,
-        time_added,
         on_render_start,
-        on_complete
+        on_complete,
+        streaming_render=None,
+        on_render_progress=None
     ):
+        """Creates a TimelapseRenderJob from a render_scheduler.RenderJobInfo."""
         # Get the capture file and directory info
         snapshot_directory = utility.get_snapshot_temp_directory(data_directory)
         snapshot_file_name_template = utility.get_snapshot_filename(
-            print_name, print_start_time, utility.SnapshotNumberFormat)
-        output_tokens = Render._get_output_tokens(data_directory, print_state, print_name, print_start_time,
-                                                  print_end_time)
-
-        job = TimelapseRenderJob(
-            job_id,
-            rendering,
+            job_info.PrintName, job_info.PrintStartTime, utility.SnapshotNumberFormat)
+        # the snapshots are in this file instead if the snapshot container was enabled when they were captured
+        snapshot_container_path = "{0}{1}".format(
+            snapshot_directory, utility.get_snapshot_container_filename(job_info.PrintName, job_info.PrintStartTime))
+        output_tokens = Render._get_output_tokens(data_directory, job_info.PrintState, job_info.PrintName,
+                                                  job_info.PrintStartTime, job_info.PrintEndTime)
+
+        return TimelapseRenderJob(
+            job_info.JobId,
+            job_info.Rendering,
             settings.current_debug_profile(),
-            print_name,
+            job_info.PrintName,
             snapshot_directory,
             snapshot_file_name_template,
             output_tokens,
-            octoprint_timelapse_folder,
-            ffmpeg_path,
+            job_info.OctoprintTimelapseFolder,
+            job_info.FfMpegPath,
             thread_count,
-            render_task_queue,
-            time_added,
+            job_info.SecondsAddedToPrint,
             on_render_start,
             on_complete,
-            snapshot.cleanup_after_render_complete,
-            snapshot.cleanup_after_render_complete
+            job_info.CleanAfterSuccess,
+            job_info.CleanAfterFail,
+            capture_container=snapshot_container_path,
+            streaming_render=streaming_render,
+            process_options=RenderProcessOptions.from_settings(settings),
+            on_progress=on_render_progress,
+            segment_count=settings.render_segment_count
         )
-        return job.process
 
     @staticmethod
     def _get_output_tokens(data_directory, print_state, print_name, print_start_time, print_end_time):
@@ -136,9 +177,9 @@ class Render(object):
 
 
 class TimelapseRenderJob(object):
-    render_job_lock = threading.RLock()
-
     # , capture_glob="{prefix}*.jpg", capture_format="{prefix}%d.jpg", output_format="{prefix}{postfix}.mpg",
+    # a timelapse is only split into segments that have at least this many frames
+    MinFramesPerSegment = 250
 
     def __init__(
         self,
@@ -152,18 +193,33 @@ class TimelapseRenderJob(object):
         octoprint_timelapse_folder,
         ffmpeg_path,
         threads,
-        rendering_task_queue,
         time_added,
         on_render_start,
         on_complete,
         clean_after_success,
-        clean_after_fail
+        clean_after_fail,
+        capture_container=None,
+        streaming_render=None,
+        process_options=None,
+        on_progress=None,
+        segment_count=1
     ):
         self._rendering = Rendering(rendering)
         self._debug = debug
         self._printFileName = print_filename
         self._capture_dir = capture_dir
         self._capture_file_template = capture_template
+        self._capture_container = capture_container
+        self._use_container = False
+        # the snapshots found in the capture directory, and the ffmpeg concat script listing them if they have gaps
+        self._frame_index = None
+        self._frame_list_path = None
+        # the pre and post roll are added by ffmpeg, by repeating the first and last frames
+        self._pre_roll_frames = 0
+        self._post_roll_frames = 0
+        # the timelapse may already have been rendered during the print
+        self._streaming_render = streaming_render
+        self._is_streamed = False
         self._output_tokens = output_tokens
         self._octoprintTimelapseFolder = octoprint_timelapse_folder
         self._fps = None
@@ -171,14 +227,25 @@ class TimelapseRenderJob(object):
         self._secondsAddedToPrint = time_added
         self._threads = threads
         self._ffmpeg = ffmpeg_path
-        self._rendering_task_queue = rendering_task_queue
+        # the running ffmpeg processes, so that the job can be cancelled or paused
+        self._process_options = process_options
+        self._processes = []
+        # long timelapses are split into up to this many segments, which are rendered at the same time
+        self._segment_count = segment_count
+        self._cancelled = False
+        # stopped for a shutdown, the job will be rendered again after OctoPrint restarts
+        self._stopped = False
+        self._paused = False
         ###########
         # callbacks
         ###########
         self._render_start_callback = on_render_start
         self._on_complete_callback = on_complete
+        self._on_progress_callback = on_progress
+        # how long ffmpeg took, and how many frames it rendered
+        self._render_seconds = 0
+        self._frames_rendered = 0
 
-        self._thread = None
         self.cleanAfterSuccess = clean_after_success
         self.cleanAfterFail = clean_after_fail
         self._synchronize = False
@@ -196,21 +263,46 @@ class TimelapseRenderJob(object):
         self.error_message = ""
 
     def process(self):
-        """Processes the job."""
-        # do our file operations first, this seems to crash rendering if we do it inside the thread.  Of course.
+        """Processes the job on the calling thread.  The render scheduler decides how many jobs run at once."""
         self._input = os.path.join(self._capture_dir,
                                    self._capture_file_template)
 
         self._synchronize = (
             self._rendering.sync_with_timelapse and self._rendering.output_format in ["mp4"])
-        self._thread = threading.Thread(target=self._render,
-                                        name=self._job_id)
-        self._thread.daemon = True
-        self._thread.start()
+        self._render()
+
+    def cancel(self):
+        """Stops the job, killing ffmpeg if it is running."""
+        self._cancelled = True
+        for process in list(self._processes):
+            process.kill()
+
+    def stop(self):
+        """Cancels the job because OctoPrint is shutting down.  The partial timelapse is removed like it is for any
+        cancelled job, but the snapshots are kept so that the job can be rendered again."""
+        self._stopped = True
+        self.cancel()
+
+    def pause(self):
+        """Pauses ffmpeg, now or when it starts, until resume() is called."""
+        self._paused = True
+        for process in list(self._processes):
+            process.pause()
+
+    def resume(self):
+        self._paused = False
+        for process in list(self._processes):
+            process.resume()
 
     def _pre_render(self):
 
         try:
+            self._use_container = (
+                self._capture_container is not None and os.path.isfile(self._capture_container))
+            if self._use_container:
+                self._input = self._capture_container
+            if self._streaming_render is not None:
+                self._is_streamed = self._streaming_render.finish()
             self._count_images()
             if self._imageCount == 0:
                 self._debug.log_render_fail(
@@ -229,9 +321,20 @@ class TimelapseRenderJob(object):
                     "as well as the number of snapshots captured."
                 )
                 return False
-            # apply pre and post roll
-            self._apply_pre_post_roll(
-                self._capture_dir, self._capture_file_template, self._fps, self._imageCount)
+            if self._is_streamed and self._streaming_render.FrameCount != self._imageCount:
+                self._debug.log_render_fail(
+                    "The timelapse rendered during the print has {0} frames instead of {1}, rendering it again.".format(
+                        self._streaming_render.FrameCount, self._imageCount))
+                self._streaming_render.cancel()
+                self._is_streamed = False
+            # The pre and post roll are added while rendering, nothing in the capture directory is rewritten.
+            # Snapshot files get them from the concat script, the container from the ffmpeg filter chain.
+            self._pre_roll_frames = int(self._rendering.pre_roll_seconds * self._fps)
+            self._post_roll_frames = int(self._rendering.post_roll_seconds * self._fps)
+            if not self._use_container and not self._is_streamed and (
+                not self._frame_index.is_sequential() or self._pre_roll_frames > 0 or self._post_roll_frames > 0
+            ):
+                self._create_frame_list()
 
             # set the outputs - output directory, output filename, output extension
             self._set_outputs()
@@ -273,64 +376,49 @@ class TimelapseRenderJob(object):
 
     def _count_images(self):
         """get the number of frames"""
-
-        # we need to start with index 0, apparently.  Before I thought it was 1!
-        image_index = 0
-        while True:
-            image_path = "{0}{1}".format(
-                self._capture_dir, self._capture_file_template) % image_index
-
-            if os.path.isfile(image_path):
-                image_index += 1
-            else:
-                break
-        # since we're starting at 0 and incrementing after a file is found, the index here will be our count.
-        self._debug.log_render_start("Found {0} images.".format(image_index))
-        self._imageCount = image_index
+        if self._use_container:
+            # the container's index holds the frame count, so no file needs to be checked
+            image_count = snapshot_container.get_frame_count(self._capture_container)
+        else:
+            # read the capture directory once rather than checking each snapshot number until one is missing
+            capture_path = "{0}{1}".format(self._capture_dir, self._capture_file_template)
+            self._frame_index = frame_index.create_frame_index(
+                os.path.dirname(capture_path), os.path.basename(capture_path))
+            image_count = self._frame_index.get_frame_count()
+            if len(self._frame_index.Gaps) > 0:
+                self._debug.log_warning(
+                    "Snapshots {0} are missing, the remaining frames will be rendered in order.".format(
+                        ", ".join(
+                            "{0}".format(first) if first == last else "{0}-{1}".format(first, last)
+                            for first, last in self._frame_index.get_gap_ranges())))
+            if len(self._frame_index.Duplicates) > 0:
+                self._debug.log_warning(
+                    "Skipping snapshots with a duplicate snapshot number: {0}".format(
+                        ", ".join(self._frame_index.Duplicates)))
+        self._debug.log_render_start("Found {0} images.".format(image_count))
+        self._imageCount = image_count
         # add the snapshot count to the output tokens
         self._output_tokens["SNAPSHOTCOUNT"] = "{0}".format(self._imageCount)
 
-    def _apply_pre_post_roll(self, snapshot_directory, snapshot_filename_template, fps, image_count):
+    def _create_frame_list(self):
+        # ffmpeg stops reading numbered images at the first missing number, so give it every frame in a concat script,
+        # which also shows the first and last frames for the length of the pre and post roll
+        with NamedTemporaryFile(prefix="octolapse_frames_", suffix=".txt", delete=False) as frame_list_file:
+            self._frame_list_path = frame_list_file.name
+        self._frame_index.write_concat_list(
+            self._frame_list_path, self._fps, pre_roll_frames=self._pre_roll_frames,
+            post_roll_frames=self._post_roll_frames)
+        self._input = self._frame_list_path
+        self._debug.log_render_start("Rendering the frames listed in {0}.".format(self._frame_list_path))
+
+    def _remove_frame_list(self):
+        if self._frame_list_path is None:
+            return
         try:
-            # start with pre-roll, since it will require a bunch of renaming
-            pre_roll_frames = int(self._rendering.pre_roll_seconds * fps)
-            if pre_roll_frames > 0:
-
-                # create a variable to hold the new path of the first image
-                first_image_path = ""
-                # rename all of the current files. The snapshot number should be
-                # incremented by the number of pre-roll frames. Start with the last
-                # image and work backwards to avoid overwriting files we've already moved
-                for image_number in range(image_count - 1, -1, -1):
-                    current_image_path = "{0}{1}".format(
-                        snapshot_directory, snapshot_filename_template) % image_number
-                    new_image_path = "{0}{1}".format(
-                        snapshot_directory, snapshot_filename_template) % (image_number + pre_roll_frames)
-                    if image_number == 0:
-                        first_image_path = new_image_path
-                    shutil.move(current_image_path, new_image_path)
-                # get the path of the first image
-                # copy the first frame as many times as we need
-                for image_index in range(pre_roll_frames):
-                    # imageNumber = imageIndex + 1  I don't think we need this, because we're starting with 0
-                    new_image_path = "{0}{1}".format(
-                        snapshot_directory, snapshot_filename_template) % image_index
-                    shutil.copy(first_image_path, new_image_path)
-            # finish with post roll since it's pretty easy
-            post_roll_frames = int(self._rendering.post_roll_seconds * fps)
-            if post_roll_frames > 0:
-                last_frame_index = image_count + pre_roll_frames - 1
-                last_image_path = "{0}{1}".format(
-                    snapshot_directory, snapshot_filename_template) % last_frame_index
-                for image_index in range(post_roll_frames):
-                    image_number = image_index + image_count + pre_roll_frames
-                    new_image_path = "{0}{1}".format(
-                        snapshot_directory, snapshot_filename_template) % image_number
-                    shutil.copy(last_image_path, new_image_path)
-            return True
-        except Exception as e:
+            os.remove(self._frame_list_path)
+        except (IOError, OSError) as e:
             self._debug.log_exception(e)
-        return False
+        self._frame_list_path = None
 
     def _set_outputs(self):
         self._output_directory = "{0}{1}{2}{3}".format(
@@ -393,7 +481,10 @@ class TimelapseRenderJob(object):
             self._secondsAddedToPrint,
             self.has_error,
             self.error_type,
-            self.error_message
+            self.error_message,
+            render_seconds=self._render_seconds,
+            frames_rendered=self._frames_rendered,
+            threads=self._threads
         )
 
     def _on_start(self):
@@ -468,62 +559,130 @@ class TimelapseRenderJob(object):
                     self.error_type = "create-render-path"
                     self.has_error = True
 
-            if not self.has_error:
-                if not os.path.exists(self._input % 0):
+            if not self.has_error and not self._use_container:
+                if not os.path.isfile(self._frame_index.Frames[0][1]):
                     self.error_message = 'Cannot create a movie, no frames captured.'
                     self.error_type = "no_frames_captured"
                     self.has_error = True
 
-            if not self.has_error:
+            if not self.has_error and self._cancelled:
+                self._set_cancelled_error()
+                if self._is_streamed and os.path.isfile(self._streaming_render.OutputPath):
+                    os.remove(self._streaming_render.OutputPath)
+
+            if not self.has_error and self._is_streamed:
+                self._debug.log_render_start(
+                    "The timelapse was rendered during the print, moving {0} to {1}.".format(
+                        self._streaming_render.OutputPath, self._rendering_output_file_path))
+                try:
+                    shutil.move(self._streaming_render.OutputPath, self._rendering_output_file_path)
+                except Exception as e:
+                    self._debug.log_exception(e)
+                    self.error_message = (
+                        "Could not move the timelapse that was rendered during the print. "
+                        "Please check plugin_octolapse.log for details."
+                    )
+                    self.error_type = "rendering-exception"
+                    self.has_error = True
+            elif not self.has_error:
                 watermark = None
                 if self._rendering.watermark:
-                    watermark = os.path.join(os.path.dirname(
-                        __file__), "static", "img", "watermark.png")
-                    if sys.platform == "win32":
-                        # Because ffmpeg hiccups on windows' drive letters and backslashes we have to give the watermark
-                        # path a special treatment. Yeah, I couldn't believe it either...
-                        watermark = watermark.replace(
-                            "\\", "/").replace(":", "\\\\:")
+                    watermark = self._get_watermark_path()
 
                 vcodec = self._get_vcodec_from_extension(self._rendering.output_format)
 
-                # prepare ffmpeg command
-                command_str = self._create_ffmpeg_command_string(
-                    self._ffmpeg,
-                    self._fps,
-                    self._rendering.bitrate,
-                    self._threads,
-                    self._input,
-                    self._rendering_output_file_path,
-                    self._rendering.output_format,
+                # snapshots transposed with an exif orientation tag are rotated here.  Every frame comes from the
+                # same camera profile, so the first frame's orientation applies to all of them.
+                input_format = None
+                if self._frame_list_path is not None:
+                    input_format = "concat"
+                    orientation = image_transpose.get_exif_orientation(self._frame_index.Frames[0][1])
+                elif self._use_container:
+                    input_format = "mjpeg"
+                    orientation = image_transpose.get_jpeg_orientation(
+                        snapshot_container.read_frame(self._capture_container, 0))
+                else:
+                    orientation = image_transpose.get_exif_orientation(self._frame_index.Frames[0][1])
+
+                # the options shared by every ffmpeg command, so that segments are encoded the same way
+                command_kwargs = dict(
                     h_flip=self._rendering.flip_h,
                     v_flip=self._rendering.flip_v,
                     rotate=self._rendering.rotate_90,
                     watermark=watermark,
-                    v_codec=vcodec
+                    v_codec=vcodec,
+                    orientation=orientation,
+                    progress_url="pipe:1"
                 )
-                self._debug.log_render_start(
-                    "Running ffmpeg with command string: {0}".format(command_str))
-
-                with self.render_job_lock:
-                    try:
-                        p = sarge.run(
-                            command_str, stdout=sarge.Capture(), stderr=sarge.Capture())
-                        if p.returncode != 0:
-                            return_code = p.returncode
-                            stderr_text = p.stderr.text
-                            self.error_message = "Could not render movie, got return code %r: %s" % (
-                                return_code, stderr_text)
-                            self.error_type = "return-code"
-                            self.has_error = True
-                    except Exception as e:
-                        self._debug.log_exception(e)
+                # ffmpeg's errors go to a file so that a full pipe can never block it
+                output_file = TemporaryFile()
+                segment_directory = None
+                try:
+                    segment_count = self._get_segment_count()
+                    if segment_count > 1:
+                        segment_directory = mkdtemp(prefix="octolapse_segments_", dir=self._capture_dir)
+                        processes, progress, segment_paths = self._create_segment_processes(
+                            segment_count, segment_directory, command_kwargs, output_file)
+                    else:
+                        command_kwargs.update(self._get_roll_filter_kwargs())
+                        command_str = self._create_ffmpeg_command_string(
+                            self._ffmpeg,
+                            self._fps,
+                            self._rendering.bitrate,
+                            self._threads,
+                            self._input,
+                            self._rendering_output_file_path,
+                            self._rendering.output_format,
+                            input_format=input_format,
+                            **command_kwargs
+                        )
+                        self._debug.log_render_start(
+                            "Running ffmpeg with command string: {0}".format(command_str))
+                        # the progress is written to stdout
+                        process = RenderProcess(
+                            command_str, self._process_options, output_file=output_file, stdout=subprocess.PIPE)
+                        progress = RenderProgress(
+                            float(self._imageCount + self._pre_roll_frames + self._post_roll_frames) / self._fps,
+                            on_progress=self._on_progress, get_running_seconds=process.get_running_seconds
+                        )
+                        processes = [(process, progress)]
+                    return_code = self._run_processes(processes)
+                    self._record_throughput(progress)
+                    if return_code == 0 and segment_count > 1 and not self._cancelled:
+                        return_code = self._join_segments(segment_paths, segment_directory, output_file)
+                    if self._cancelled:
+                        self._set_cancelled_error()
+                        if os.path.isfile(self._rendering_output_file_path):
+                            os.remove(self._rendering_output_file_path)
+                    elif any(process.TimedOut for process, process_progress in processes):
                         self.error_message = (
-                            "Could not render movie due to unknown error. "
-                            "Please check plugin_octolapse.log for details."
+                            "Rendering took longer than the {0} minute limit and was stopped.".format(
+                                self._process_options.TimeLimitMinutes)
                         )
-                        self.error_type = "rendering-exception"
+                        self.error_type = "timeout"
                         self.has_error = True
+                        if os.path.isfile(self._rendering_output_file_path):
+                            os.remove(self._rendering_output_file_path)
+                    elif return_code != 0:
+                        output_file.seek(0)
+                        stderr_text = output_file.read()
+                        self.error_message = "Could not render movie, got return code %r: %s" % (
+                            return_code, stderr_text)
+                        self.error_type = "return-code"
+                        self.has_error = True
+                except Exception as e:
+                    self._debug.log_exception(e)
+                    self.error_message = (
+                        "Could not render movie due to unknown error. "
+                        "Please check plugin_octolapse.log for details."
+                    )
+                    self.error_type = "rendering-exception"
+                    self.has_error = True
+                finally:
+                    self._processes = []
+                    output_file.close()
+                    if segment_directory is not None:
+                        shutil.rmtree(segment_directory, ignore_errors=True)
 
             if not self.has_error:
                 if self._synchronize:
@@ -561,11 +720,150 @@ class TimelapseRenderJob(object):
             )
             self.has_error = True
             self.error_type = "unexpected-exception"
+        self._remove_frame_list()
+        self._clean_snapshots()
 
-        self._rendering_task_queue.get()
-        self._rendering_task_queue.task_done()
         self._on_complete()
 
+    def _run_processes(self, processes):
+        """Starts the (RenderProcess, RenderProgress) pairs at the same time and waits for all of them.  Each progress
+        is read on its own thread, so that the time limit still applies if ffmpeg stops writing it.  Returns the
+        first non zero return code, or 0."""
+        progress_threads = []
+        for process, progress in processes:
+            # add the process before checking the flags, so that pause() and cancel() can't be missed
+            self._processes.append(process)
+            if self._paused:
+                process.pause()
+            process.start()
+            if progress is not None:
+                progress_thread = threading.Thread(
+                    target=progress.read, args=[process.stdout], name="{0}_progress".format(self._job_id))
+                progress_thread.daemon = True
+                progress_thread.start()
+                progress_threads.append(progress_thread)
+        if self._cancelled:
+            for process, progress in processes:
+                process.kill()
+        return_codes = [process.wait() for process, progress in processes]
+        for progress_thread in progress_threads:
+            progress_thread.join(5)
+        return next((return_code for return_code in return_codes if return_code != 0), 0)
+
+    def _get_roll_filter_kwargs(self):
+        """Returns the pre and post roll options for the ffmpeg filter chain, which only the container needs."""
+        if not self._use_container or (self._pre_roll_frames == 0 and self._post_roll_frames == 0):
+            return {}
+        return dict(
+            pre_roll_frames=self._pre_roll_frames,
+            post_roll_frames=self._post_roll_frames,
+            use_tpad="tpad" in get_ffmpeg_filters(self._ffmpeg),
+            frame_count=self._imageCount
+        )
+
+    def _get_segment_count(self):
+        """Returns the number of segments to render at once, 1 if the timelapse isn't long enough to split."""
+        if self._segment_count < 2 or self._use_container:
+            # ffmpeg can only read the container from the start
+            return 1
+        return max(1, min(self._segment_count, self._imageCount // self.MinFramesPerSegment))
+
+    def _create_segment_processes(self, segment_count, segment_directory, command_kwargs, output_file):
+        """Creates an ffmpeg process for each segment of the frames.  Every segment is encoded with the same options,
+        only the first gets the pre roll and only the last gets the post roll.  Returns the (RenderProcess,
+        RenderProgress) pairs, the progress of all of them, and the paths of the segment videos in order."""
+        segments = self._frame_index.get_segments(segment_count)
+        # the cpus are shared by the segments
+        threads = max(1, self._threads // len(segments))
+        processes = []
+        segment_paths = []
+        progress = CombinedRenderProgress(
+            float(self._imageCount + self._pre_roll_frames + self._post_roll_frames) / self._fps,
+            on_progress=self._on_progress
+        )
+        for segment_number, (first, last) in enumerate(segments):
+            pre_roll_frames = self._pre_roll_frames if segment_number == 0 else 0
+            post_roll_frames = self._post_roll_frames if segment_number == len(segments) - 1 else 0
+            frame_list_path = os.path.join(segment_directory, "segment{0}.txt".format(segment_number))
+            self._frame_index.write_concat_list(
+                frame_list_path, self._fps, first, last, pre_roll_frames=pre_roll_frames,
+                post_roll_frames=post_roll_frames)
+            segment_path = os.path.join(
+                segment_directory, "segment{0}.{1}".format(segment_number, self._rendering.output_format))
+            command_str = self._create_ffmpeg_command_string(
+                self._ffmpeg,
+                self._fps,
+                self._rendering.bitrate,
+                threads,
+                frame_list_path,
+                segment_path,
+                self._rendering.output_format,
+                input_format="concat",
+                **command_kwargs
+            )
+            self._debug.log_render_start(
+                "Running ffmpeg for segment {0} of {1}, frames {2} to {3}, with command string: {4}".format(
+                    segment_number + 1, len(segments), first, last - 1, command_str))
+            process = RenderProcess(command_str, self._process_options, output_file=output_file, stdout=subprocess.PIPE)
+            segment_progress = progress.add_segment(
+                float(last - first + pre_roll_frames + post_roll_frames) / self._fps,
+                get_running_seconds=process.get_running_seconds)
+            processes.append((process, segment_progress))
+            segment_paths.append(segment_path)
+        return processes, progress, segment_paths
+
+    def _join_segments(self, segment_paths, segment_directory, output_file):
+        """Joins the segment videos into the output without encoding them again.  Returns ffmpeg's return code."""
+        segment_list_path = os.path.join(segment_directory, "segments.txt")
+        frame_index.write_file_list(segment_list_path, segment_paths)
+        command_str = self._create_concat_command_string(
+            self._ffmpeg, segment_list_path, self._rendering_output_file_path, self._rendering.output_format)
+        self._debug.log_render_start("Joining the segments with command string: {0}".format(command_str))
+        return self._run_processes([(RenderProcess(command_str, self._process_options, output_file=output_file), None)])
+
+    def _on_progress(self, progress):
+        self._notify_callback(self._on_progress_callback, self._job_id, progress)
+
+    def _record_throughput(self, progress):
+        self._render_seconds = progress.get_elapsed_seconds()
+        self._frames_rendered = progress.Frame
+        self._debug.log_render_complete(
+            "ffmpeg rendered {0} frames in {1:.1f} seconds with {2} threads, {3:.1f} frames per second.".format(
+                self._frames_rendered, self._render_seconds, self._threads, progress.get_frames_per_second()))
+
+    def _set_cancelled_error(self):
+        self.error_message = "The rendering was cancelled."
+        self.error_type = "cancelled"
+        self.has_error = True
+
+    def _clean_snapshots(self):
+        if self._stopped:
+            return
+        if (self.has_error and not self.cleanAfterFail) or (not self.has_error and not self.cleanAfterSuccess):
+            return
+        # only remove this print's snapshots, other jobs in the render queue still need theirs
+        snapshot_directory = os.path.dirname("{0}{1}".format(self._capture_dir, self._capture_file_template))
+        if os.path.normpath(snapshot_directory) == os.path.normpath(self._capture_dir):
+            return
+        if not os.path.isdir(snapshot_directory):
+            return
+        self._debug.log_snapshot_clean("Cleaning snapshots from: {0}".format(snapshot_directory))
+        try:
+            shutil.rmtree(snapshot_directory)
+        except (IOError, OSError) as e:
+            self._debug.log_exception(e)
+
+    @staticmethod
+    def _get_watermark_path():
+        watermark = os.path.join(os.path.dirname(
+            __file__), "static", "img", "watermark.png")
+        if sys.platform == "win32":
+            # Because ffmpeg hiccups on windows' drive letters and backslashes we have to give the watermark
+            # path a special treatment. Yeah, I couldn't believe it either...
+            watermark = watermark.replace(
+                "\\", "/").replace(":", "\\\\:")
+        return watermark
+
     @staticmethod
     def _get_vcodec_from_extension(extension):
         default_codec = "mpeg2video"
@@ -579,13 +877,25 @@ class TimelapseRenderJob(object):
         else:
             return default_codec
 
+    @staticmethod
+    def _create_concat_command_string(ffmpeg, segment_list_file, output_file, output_format):
+        """Create the ffmpeg command string that joins the videos listed in segment_list_file by copying their
+        streams."""
+        ffmpeg = ffmpeg.strip()
+        if sys.platform == "win32" and not (ffmpeg.startswith('"') and ffmpeg.endswith('"')):
+            ffmpeg = "\"{0}\"".format(ffmpeg)
+        return " ".join([
+            ffmpeg, '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', '"{}"'.format(segment_list_file),
+            '-c', 'copy', '-y', '-f', str(output_format), '"{}"'.format(output_file)])
+
     @classmethod
     def _create_ffmpeg_command_string(
         cls, ffmpeg, fps, bitrate, threads,
         input_file, output_file, output_format='vob',
         h_flip=False, v_flip=False,
         rotate=False, watermark=None, pix_fmt="yuv420p",
-        v_codec="mpeg2video"
+        v_codec="mpeg2video", orientation=1, input_format=None, pre_roll_frames=0, post_roll_frames=0,
+        progress_url=None, use_tpad=True, frame_count=None
     ):
         """
         Create ffmpeg command string based on input parameters.
@@ -601,6 +911,13 @@ class TimelapseRenderJob(object):
             rotate (bool): Perform 90° CCW rotation on input material.
             watermark (str): Path to watermark to apply to lower left corner.
             pix_fmt (str): Pixel format to use for output. Default of yuv420p should usually fit the bill.
+            orientation (int): The exif orientation of the input material.
+            input_format (str): The ffmpeg format of the input, when it can't be detected from the file name.
+            pre_roll_frames (int): Number of times to repeat the first frame at the start of the output.
+            post_roll_frames (int): Number of times to repeat the last frame at the end of the output.
+            progress_url (str): Where ffmpeg writes its progress, for example pipe:1 for stdout.
+            use_tpad (bool): Add the pre and post roll with the tpad filter, which ffmpeg 4.2 and later have.
+            frame_count (int): The number of input frames, needed for the post roll without tpad.
         Returns:
             (str): Prepared command string to render `input` to `output` using ffmpeg.
         """
@@ -612,17 +929,36 @@ class TimelapseRenderJob(object):
 
         if sys.platform == "win32" and not (ffmpeg.startswith('"') and ffmpeg.endswith('"')):
             ffmpeg = "\"{0}\"".format(ffmpeg)
-        command = [
-            ffmpeg, '-framerate', str(fps), '-loglevel', 'error', '-i', '"{}"'.format(
-                input_file), '-vcodec', v_codec,
+        command = [ffmpeg]
+        if input_format != "concat":
+            # the frame durations are written to the concat script instead
+            command.extend(['-framerate', str(fps)])
+        command.extend(['-loglevel', 'error'])
+        if progress_url is not None:
+            command.extend(['-progress', progress_url])
+        if orientation != 1:
+            # the orientation is applied by the filter chain, don't let newer versions of ffmpeg apply it again
+            command.append('-noautorotate')
+        if input_format is not None:
+            command.extend(['-f', input_format])
+        if input_format == "concat":
+            # the script lists the snapshots by their absolute paths
+            command.extend(['-safe', '0'])
+        command.extend([
+            '-i', '"{}"'.format(input_file), '-vcodec', v_codec,
             '-threads', str(threads), '-r', "25", '-y', '-b', str(bitrate),
-            '-f', str(output_format)]
+            '-f', str(output_format)])
 
         filter_string = cls._create_filter_string(hflip=h_flip,
                                                   vflip=v_flip,
                                                   rotate=rotate,
                                                   watermark=watermark,
-                                                  pix_fmt=pix_fmt)
+                                                  pix_fmt=pix_fmt,
+                                                  orientation=orientation,
+                                                  pre_roll_frames=pre_roll_frames,
+                                                  post_roll_frames=post_roll_frames,
+                                                  use_tpad=use_tpad,
+                                                  frame_count=frame_count)
 
         if filter_string is not None:
             logger.debug(
@@ -635,8 +971,22 @@ class TimelapseRenderJob(object):
 
         return " ".join(command)
 
+    # the ffmpeg filters that display an image with each exif orientation
+    ORIENTATION_FILTERS = {
+        2: ['hflip'],
+        3: ['hflip', 'vflip'],
+        4: ['vflip'],
+        5: ['transpose=0'],
+        6: ['transpose=1'],
+        7: ['transpose=3'],
+        8: ['transpose=2']
+    }
+
     @classmethod
-    def _create_filter_string(cls, hflip=False, vflip=False, rotate=False, watermark=None, pix_fmt="yuv420p"):
+    def _create_filter_string(
+        cls, hflip=False, vflip=False, rotate=False, watermark=None, pix_fmt="yuv420p", orientation=1,
+        pre_roll_frames=0, post_roll_frames=0, use_tpad=True, frame_count=None
+    ):
         """
         Creates an ffmpeg filter string based on input parameters.
         Arguments:
@@ -645,6 +995,11 @@ class TimelapseRenderJob(object):
             rotate (bool): Perform 90° CCW rotation on input material.
             watermark (str): Path to watermark to apply to lower left corner.
             pix_fmt (str): Pixel format to use, defaults to "yuv420p" which should usually fit the bill
+            orientation (int): The exif orientation of the input material, applied before any other filter.
+            pre_roll_frames (int): Number of times to repeat the first frame at the start of the output.
+            post_roll_frames (int): Number of times to repeat the last frame at the end of the output.
+            use_tpad (bool): Add the pre and post roll with the tpad filter, else with the loop filter.
+            frame_count (int): The number of input frames, needed for the post roll without tpad.
         Returns:
             (str or None): filter string or None if no filters are required
         """
@@ -654,6 +1009,28 @@ class TimelapseRenderJob(object):
         # apply pixel format
         filters = ["format={}".format(pix_fmt)]
 
+        # add the pre and post roll by cloning the first and last frames, so the snapshots never have to be copied
+        if use_tpad:
+            pad_options = []
+            if pre_roll_frames > 0:
+                pad_options.append("start={}:start_mode=clone".format(pre_roll_frames))
+            if post_roll_frames > 0:
+                pad_options.append("stop={}:stop_mode=clone".format(post_roll_frames))
+            if len(pad_options) > 0:
+                filters.append("tpad={}".format(":".join(pad_options)))
+        else:
+            # Versions of ffmpeg before 4.2 have no tpad filter.  loop repeats a frame by its number, so the post roll
+            # is added before the pre roll changes the frame numbers.
+            if post_roll_frames > 0:
+                if frame_count is None:
+                    raise ValueError("The frame count is needed to add the post roll without the tpad filter.")
+                filters.append("loop=loop={}:size=1:start={}".format(post_roll_frames, frame_count - 1))
+            if pre_roll_frames > 0:
+                filters.append("loop=loop={}:size=1:start=0".format(pre_roll_frames))
+
+        # apply the exif orientation of the snapshots
+        filters.extend(cls.ORIENTATION_FILTERS.get(orientation, []))
+
         # flip video if configured
         if hflip:
             filters.append('hflip')
@@ -688,6 +1065,130 @@ class TimelapseRenderJob(object):
             callback(*args, **kwargs)
 
 
+class StreamingRender(SnapshotSequence):
+    # Renders the timelapse while the print is running.  ffmpeg is started when the first snapshot arrives, and each
+    # post processed snapshot is piped to it right away, so when the print ends ffmpeg only has to add the post roll.
+    # The snapshots are still saved as usual, so the timelapse can be rendered after the print if this fails.
+    def __init__(self, rendering, debug, ffmpeg_path, threads, output_path, process_options=None):
+        super(StreamingRender, self).__init__()
+        self._rendering = Rendering(rendering)
+        self._debug = debug
+        self._ffmpeg = ffmpeg_path
+        self._threads = threads
+        self._process_options = process_options
+        self.OutputPath = output_path
+        self._process = None
+        self._stderr = None
+        self.FrameCount = 0
+        self.HasError = False
+
+    @staticmethod
+    def can_render(rendering, ffmpeg_path):
+        # The frame rate of a fixed length timelapse, and so the length of the pre and post roll, depends on the final
+        # number of snapshots.  Those are rendered after the print.  Without the tpad filter the post roll needs the
+        # final number of snapshots too.
+        return (
+            rendering.render_during_print and rendering.fps_calculation_type == 'static' and
+            ffmpeg_path is not None and rendering.bitrate is not None and
+            (rendering.post_roll_seconds <= 0 or "tpad" in get_ffmpeg_filters(ffmpeg_path))
+        )
+
+    def finish(self):
+        """Waits for ffmpeg to finish the video.  Returns True if the whole timelapse was rendered."""
+        with self._lock:
+            if self._process is None or self.HasError or len(self._pending) > 0:
+                self._stop()
+                return False
+            try:
+                self._process.stdin.close()
+            except (IOError, OSError) as e:
+                self._debug.log_exception(e)
+            return_code = self._process.wait()
+            if return_code != 0:
+                self._stderr.seek(0)
+                self._debug.log_render_fail(
+                    "Rendering during the print failed with return code {0}: {1}".format(
+                        return_code, self._stderr.read()))
+                self._stop()
+                return False
+            self._stderr.close()
+            self._process = None
+            self._debug.log_render_complete(
+                "Finished the timelapse that was rendered during the print, {0} frames.".format(self.FrameCount))
+            return True
+
+    def cancel(self):
+        with self._lock:
+            self._stop()
+
+    def _write_frame(self, image):
+        if self.HasError:
+            return
+        try:
+            if self._process is None:
+                self._start(image)
+            self._process.stdin.write(image)
+            self.FrameCount += 1
+        except (IOError, OSError) as e:
+            # most likely ffmpeg has exited, the timelapse will be rendered after the print instead
+            self._debug.log_exception(e)
+            self._stop()
+
+    def _start(self, first_image):
+        output_directory = os.path.dirname(self.OutputPath)
+        if not os.path.isdir(output_directory):
+            os.makedirs(output_directory)
+        watermark = None
+        if self._rendering.watermark:
+            watermark = TimelapseRenderJob._get_watermark_path()
+        pre_roll_frames = int(self._rendering.pre_roll_seconds * self._rendering.fps)
+        post_roll_frames = int(self._rendering.post_roll_seconds * self._rendering.fps)
+        command_str = TimelapseRenderJob._create_ffmpeg_command_string(
+            self._ffmpeg,
+            self._rendering.fps,
+            self._rendering.bitrate,
+            self._threads,
+            "-",
+            self.OutputPath,
+            self._rendering.output_format,
+            h_flip=self._rendering.flip_h,
+            v_flip=self._rendering.flip_v,
+            rotate=self._rendering.rotate_90,
+            watermark=watermark,
+            v_codec=TimelapseRenderJob._get_vcodec_from_extension(self._rendering.output_format),
+            orientation=image_transpose.get_jpeg_orientation(first_image),
+            input_format="mjpeg",
+            pre_roll_frames=pre_roll_frames,
+            post_roll_frames=post_roll_frames,
+            use_tpad=pre_roll_frames + post_roll_frames == 0 or "tpad" in get_ffmpeg_filters(self._ffmpeg)
+        )
+        self._debug.log_render_start(
+            "Rendering during the print, running ffmpeg with command string: {0}".format(command_str))
+        # ffmpeg only writes errors, but they go to a file so that a full pipe can never block it
+        self._stderr = TemporaryFile()
+        # ffmpeg runs for the whole print, so it is never paused or stopped by the time limit
+        self._process = RenderProcess(
+            command_str, self._process_options, stdin=subprocess.PIPE, output_file=self._stderr,
+            use_time_limit=False)
+        self._process.start()
+
+    def _stop(self):
+        self.HasError = True
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except (IOError, OSError):
+                pass
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+        if self._stderr is not None:
+            self._stderr.close()
+            self._stderr = None
+        if os.path.isfile(self.OutputPath):
+            os.remove(self.OutputPath)
+
+
 class RenderingCallbackArgs(object):
     def __init__(
         self,
@@ -704,7 +1205,10 @@ class RenderingCallbackArgs(object):
         seconds_added_to_print,
         has_error,
         error_type,
-        error_message
+        error_message,
+        render_seconds=0,
+        frames_rendered=0,
+        threads=0
     ):
         self.Reason = reason
         self.ReturnCode = return_code
@@ -720,6 +1224,15 @@ class RenderingCallbackArgs(object):
         self.HasError = has_error
         self.ErrorType = error_type
         self.ErrorMessage = error_message
+        # the time ffmpeg took to render the output frames, 0 if ffmpeg didn't run
+        self.RenderSeconds = render_seconds
+        self.FramesRendered = frames_rendered
+        self.Threads = threads
+
+    def get_frames_per_second(self):
+        if self.RenderSeconds <= 0:
+            return 0.0
+        return float(self.FramesRendered) / self.RenderSeconds
 
     def get_rendering_filename(self):
         return "{0}.{1}".format(self.RenderingFilename, self.RenderingExtension)
@@ -0,0 +1,211 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from distutils.spawn import find_executable
+
+IoClassNormal = "normal"
+IoClassBestEffort = "best-effort"
+IoClassIdle = "idle"
+IoClasses = [IoClassNormal, IoClassBestEffort, IoClassIdle]
+
+# windows has no nice levels, only priority classes
+BELOW_NORMAL_PRIORITY_CLASS = 0x00004000
+
+
+def parse_cpu_affinity(cpu_affinity):
+    """Returns the sorted cpu numbers in a list like '1,2' or '1-3'.  Returns an empty list for any cpu.  Raises
+    ValueError if the list is invalid."""
+    cpus = set()
+    for cpu_range in (cpu_affinity or "").split(","):
+        cpu_range = cpu_range.strip()
+        if len(cpu_range) == 0:
+            continue
+        if "-" in cpu_range:
+            first_cpu, last_cpu = [int(cpu) for cpu in cpu_range.split("-", 1)]
+        else:
+            first_cpu = last_cpu = int(cpu_range)
+        if first_cpu < 0 or last_cpu < first_cpu:
+            raise ValueError("Invalid cpu range: {0}".format(cpu_range))
+        cpus.update(range(first_cpu, last_cpu + 1))
+    return sorted(cpus)
+
+
+class RenderProcessOptions(object):
+    # How much of the host a render may use.  The defaults leave ffmpeg unrestricted.
+    def __init__(self, nice_level=0, io_class=IoClassNormal, cpu_affinity="", memory_limit_mb=0, time_limit_minutes=0):
+        self.NiceLevel = nice_level
+        self.IoClass = io_class
+        self.CpuAffinity = cpu_affinity
+        self.MemoryLimitMb = memory_limit_mb
+        self.TimeLimitMinutes = time_limit_minutes
+
+    @staticmethod
+    def from_settings(settings):
+        return RenderProcessOptions(
+            nice_level=settings.render_nice_level,
+            io_class=settings.render_io_class,
+            cpu_affinity=settings.render_cpu_affinity,
+            memory_limit_mb=settings.render_memory_limit,
+            time_limit_minutes=settings.render_time_limit
+        )
+
+
+class RenderProcess(object):
+    # Runs ffmpeg so that it can't starve OctoPrint's serial thread.  On posix ffmpeg is started with a lower priority,
+    # an idle io class, on some of the cpus and with limited memory, depending on the options, and it can be paused
+    # with SIGSTOP.  nice, ionice, taskset and prlimit are used when they are installed.  Each of them execs the next
+    # command, so the process id is ffmpeg's.  On windows only the priority is lowered.
+    PollIntervalSeconds = 0.25
+
+    def __init__(self, command_str, options=None, stdin=None, output_file=None, use_time_limit=True, stdout=None):
+        self._options = options if options is not None else RenderProcessOptions()
+        # the command string is quoted for a posix shell, split it the same way on every platform
+        self.Args = self._get_wrapper_args() + shlex.split(command_str)
+        self._stdin = stdin
+        self._output_file = output_file
+        # ffmpeg's output goes to output_file unless stdout is given
+        self._stdout = stdout if stdout is not None else output_file
+        self._use_time_limit = use_time_limit
+        self._lock = threading.RLock()
+        self._process = None
+        self._start_time = None
+        self._pause_time = None
+        self._paused_seconds = 0
+        self.IsPaused = False
+        self.TimedOut = False
+
+    @property
+    def stdin(self):
+        return self._process.stdin
+
+    @property
+    def stdout(self):
+        return self._process.stdout
+
+    @staticmethod
+    def can_pause():
+        return hasattr(signal, "SIGSTOP")
+
+    def start(self):
+        with self._lock:
+            kwargs = {}
+            if sys.platform == "win32" and self._options.NiceLevel > 0:
+                kwargs["creationflags"] = BELOW_NORMAL_PRIORITY_CLASS
+            self._process = subprocess.Popen(
+                self.Args, stdin=self._stdin, stdout=self._stdout, stderr=self._output_file, **kwargs)
+            self._start_time = time.time()
+            if self.IsPaused:
+                # paused before it started
+                self._pause_time = self._start_time
+                os.kill(self._process.pid, signal.SIGSTOP)
+
+    def poll(self):
+        return self._process.poll()
+
+    def wait(self):
+        """Waits for ffmpeg to exit and returns its return code.  ffmpeg is killed if it runs for longer than the time
+        limit, not counting the time it was paused."""
+        time_limit_seconds = self._options.TimeLimitMinutes * 60 if self._use_time_limit else 0
+        if time_limit_seconds <= 0:
+            return self._process.wait()
+        while True:
+            return_code = self._process.poll()
+            if return_code is not None:
+                return return_code
+            if self.get_running_seconds() > time_limit_seconds:
+                self.TimedOut = True
+                self.kill()
+                return self._process.wait()
+            time.sleep(self.PollIntervalSeconds)
+
+    def get_running_seconds(self):
+        with self._lock:
+            if self._start_time is None:
+                return 0
+            end_time = self._pause_time if self.IsPaused else time.time()
+            return end_time - self._start_time - self._paused_seconds
+
+    def pause(self):
+        """Stops ffmpeg until resume() is called.  Returns False if ffmpeg can't be paused on this platform."""
+        if not self.can_pause():
+            return False
+        with self._lock:
+            if self.IsPaused:
+                return True
+            self.IsPaused = True
+            self._pause_time = time.time()
+            if self._process is not None and self._process.poll() is None:
+                os.kill(self._process.pid, signal.SIGSTOP)
+            return True
+
+    def resume(self):
+        with self._lock:
+            if not self.IsPaused:
+                return
+            self.IsPaused = False
+            if self._start_time is not None:
+                self._paused_seconds += time.time() - self._pause_time
+            self._pause_time = None
+            if self._process is not None and self._process.poll() is None:
+                os.kill(self._process.pid, signal.SIGCONT)
+
+    def kill(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.kill()
+
+    def _get_wrapper_args(self):
+        if sys.platform == "win32":
+            return []
+        args = []
+        if self._options.NiceLevel > 0:
+            nice_path = find_executable("nice")
+            if nice_path is not None:
+                args += [nice_path, "-n", str(self._options.NiceLevel)]
+        if self._options.IoClass in [IoClassBestEffort, IoClassIdle]:
+            ionice_path = find_executable("ionice")
+            if ionice_path is not None:
+                if self._options.IoClass == IoClassIdle:
+                    args += [ionice_path, "-c", "3"]
+                else:
+                    args += [ionice_path, "-c", "2", "-n", "7"]
+        try:
+            cpus = parse_cpu_affinity(self._options.CpuAffinity)
+        except ValueError:
+            # ffmpeg may use any cpu rather than failing the render
+            cpus = []
+        if len(cpus) > 0:
+            taskset_path = find_executable("taskset")
+            if taskset_path is not None:
+                args += [taskset_path, "-c", ",".join(str(cpu) for cpu in cpus)]
+        if self._options.MemoryLimitMb > 0:
+            prlimit_path = find_executable("prlimit")
+            if prlimit_path is not None:
+                args += [prlimit_path, "--as={0}".format(int(self._options.MemoryLimitMb * 1024 * 1024)), "--"]
+        return args
@@ -0,0 +1,211 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import csv
+import os
+import sys
+import threading
+import time
+
+RenderStatisticsColumns = [
+    "time", "job_id", "file_name", "has_error", "error_type", "cpu_count", "threads", "frames_rendered",
+    "render_seconds", "frames_per_second"
+]
+
+
+def parse_ffmpeg_time(value):
+    """Converts an ffmpeg time like 00:01:02.500000 to seconds.  Returns None if the time isn't available."""
+    try:
+        sign = 1
+        if value.startswith("-"):
+            sign = -1
+            value = value[1:]
+        hours, minutes, seconds = value.split(":")
+        return sign * (int(hours) * 3600 + int(minutes) * 60 + float(seconds))
+    except ValueError:
+        return None
+
+
+def append_render_statistics(path, statistics):
+    """Appends a row with the RenderStatisticsColumns in the statistics dict to a csv file, so that the render
+    throughput of each job can be compared later.  The header is written when the file is created."""
+    write_header = not os.path.isfile(path)
+    if sys.version_info[0] < 3:
+        statistics_file = open(path, 'ab')
+    else:
+        statistics_file = open(path, 'a', newline='')
+    with statistics_file:
+        writer = csv.DictWriter(statistics_file, RenderStatisticsColumns)
+        if write_header:
+            writer.writeheader()
+        writer.writerow(statistics)
+
+
+class RenderProgress(object):
+    # Parses the key=value lines that ffmpeg writes with -progress.  Each block of values ends with a progress line,
+    # after which on_progress is called with to_dict(), at most once per interval, and always for the last block.
+    # The percent complete and the time remaining are based on the length of the output video, because the output
+    # frame rate can differ from the input frame rate.  get_running_seconds returns how long ffmpeg has been running,
+    # so that the time it was paused can be left out.  By default it is the time since the progress was created.
+    def __init__(self, total_seconds, on_progress=None, interval_seconds=1.0, get_running_seconds=None):
+        self.TotalSeconds = total_seconds
+        self.Frame = 0
+        self.Fps = 0.0
+        self.OutTimeSeconds = 0.0
+        self.Speed = None
+        self.IsFinished = False
+        self._start_time = time.time()
+        self._get_running_seconds = get_running_seconds
+        # the running time when ffmpeg finished
+        self._elapsed_seconds = None
+        self._on_progress = on_progress
+        self._interval_seconds = interval_seconds
+        self._last_notification_time = None
+
+    def read(self, stream):
+        """Parses the progress from the stream until ffmpeg closes it."""
+        for line in iter(stream.readline, b''):
+            self.parse_line(line)
+        self._stop_clock()
+
+    def parse_line(self, line):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        key, separator, value = line.strip().partition("=")
+        if len(separator) == 0:
+            return
+        value = value.strip()
+        try:
+            if key == "frame":
+                self.Frame = int(value)
+            elif key == "fps":
+                self.Fps = float(value)
+            elif key == "out_time":
+                out_time_seconds = parse_ffmpeg_time(value)
+                if out_time_seconds is not None:
+                    self.OutTimeSeconds = max(0.0, out_time_seconds)
+            elif key == "speed":
+                self.Speed = float(value.rstrip("x"))
+        except ValueError:
+            # ffmpeg writes N/A until a value is known
+            pass
+        if key == "progress":
+            if value == "end":
+                self.IsFinished = True
+                self._stop_clock()
+            self._notify()
+
+    def get_elapsed_seconds(self):
+        if self._elapsed_seconds is not None:
+            return self._elapsed_seconds
+        if self._get_running_seconds is not None:
+            return max(0.0, self._get_running_seconds())
+        return max(0.0, time.time() - self._start_time)
+
+    def get_frames_per_second(self):
+        """Returns the number of frames rendered per second so far."""
+        elapsed_seconds = self.get_elapsed_seconds()
+        if elapsed_seconds <= 0:
+            return 0.0
+        return float(self.Frame) / elapsed_seconds
+
+    def get_percent_complete(self):
+        if self.IsFinished:
+            return 100.0
+        if self.TotalSeconds <= 0:
+            return 0.0
+        return min(100.0, 100.0 * self.OutTimeSeconds / self.TotalSeconds)
+
+    def get_seconds_remaining(self):
+        """Returns the estimated time until the render finishes, or None until it can be estimated."""
+        if self.IsFinished:
+            return 0.0
+        elapsed_seconds = self.get_elapsed_seconds()
+        if self.TotalSeconds <= 0 or self.OutTimeSeconds <= 0 or elapsed_seconds <= 0:
+            return None
+        video_seconds_per_second = self.OutTimeSeconds / elapsed_seconds
+        return max(0.0, self.TotalSeconds - self.OutTimeSeconds) / video_seconds_per_second
+
+    def to_dict(self):
+        return {
+            'frame': self.Frame,
+            'fps': self.Fps,
+            'out_time_seconds': self.OutTimeSeconds,
+            'total_seconds': self.TotalSeconds,
+            'speed': self.Speed,
+            'percent_complete': self.get_percent_complete(),
+            'elapsed_seconds': self.get_elapsed_seconds(),
+            'seconds_remaining': self.get_seconds_remaining(),
+            'frames_per_second': self.get_frames_per_second(),
+            'is_finished': self.IsFinished
+        }
+
+    def _stop_clock(self):
+        if self._elapsed_seconds is None:
+            self._elapsed_seconds = self.get_elapsed_seconds()
+
+    def _notify(self):
+        if self._on_progress is None:
+            return
+        now = time.time()
+        if (
+            not self.IsFinished and self._last_notification_time is not None and
+            now - self._last_notification_time < self._interval_seconds
+        ):
+            return
+        self._last_notification_time = now
+        self._on_progress(self.to_dict())
+
+
+class CombinedRenderProgress(RenderProgress):
+    # The progress of a render that is split into segments rendered at the same time.  Each segment has its own
+    # RenderProgress, and their frames, frame rates, output times and speeds are added up.  Unless
+    # get_running_seconds is given, the render has been running as long as its longest running segment, so the time
+    # the segments were paused is left out.
+    def __init__(self, total_seconds, on_progress=None, interval_seconds=1.0, get_running_seconds=None):
+        super(CombinedRenderProgress, self).__init__(
+            total_seconds, on_progress=on_progress, interval_seconds=interval_seconds,
+            get_running_seconds=get_running_seconds or self._get_segment_running_seconds)
+        self.Segments = []
+        self._lock = threading.Lock()
+
+    def add_segment(self, total_seconds, get_running_seconds=None):
+        segment = RenderProgress(
+            total_seconds, on_progress=self._on_segment_progress, interval_seconds=0,
+            get_running_seconds=get_running_seconds)
+        self.Segments.append(segment)
+        return segment
+
+    def _get_segment_running_seconds(self):
+        return max([segment.get_elapsed_seconds() for segment in self.Segments] or [0.0])
+
+    def _on_segment_progress(self, segment_progress):
+        with self._lock:
+            self.Frame = sum(segment.Frame for segment in self.Segments)
+            self.Fps = sum(segment.Fps for segment in self.Segments)
+            self.OutTimeSeconds = sum(segment.OutTimeSeconds for segment in self.Segments)
+            speeds = [segment.Speed for segment in self.Segments if segment.Speed is not None]
+            self.Speed = sum(speeds) if len(speeds) > 0 else None
+            if all(segment.IsFinished for segment in self.Segments):
+                self.IsFinished = True
+                self._stop_clock()
+            self._notify()
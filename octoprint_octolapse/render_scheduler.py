@@ -0,0 +1,331 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from io import open as i_open
+
+from octoprint_octolapse.snapshot_writer import SnapshotWriter
+
+
+def get_cpu_count():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+class RenderJobInfo(object):
+    # Everything needed to render the timelapse of a finished print.  It is saved with the render queue, so that the
+    # timelapse can still be rendered after OctoPrint restarts.
+    def __init__(self, job_info=None):
+        self.JobId = "TimelapseRenderJob_{0}".format(uuid.uuid4())
+        self.PrintName = ""
+        self.PrintStartTime = 0
+        self.PrintEndTime = 0
+        self.PrintState = "UNKNOWN"
+        self.SecondsAddedToPrint = 0
+        # the rendering profile, as a dict
+        self.Rendering = {}
+        self.FfMpegPath = None
+        self.OctoprintTimelapseFolder = ""
+        self.CleanAfterSuccess = False
+        self.CleanAfterFail = False
+        # jobs with a higher priority are queued ahead of jobs with a lower priority
+        self.Priority = 0
+        self.TimeQueued = time.time()
+        # the running job, its progress, and the render started during the print.  None of these are saved.
+        self.IsRendering = False
+        # set if the job is cancelled while it is rendering, including before the running job is created
+        self.CancelRequested = False
+        self.Job = None
+        self.Progress = None
+        self.StreamingRender = None
+        if job_info is not None:
+            self.update(job_info)
+
+    def update(self, changes):
+        if "job_id" in changes:
+            self.JobId = changes["job_id"]
+        if "print_name" in changes:
+            self.PrintName = changes["print_name"]
+        if "print_start_time" in changes:
+            self.PrintStartTime = changes["print_start_time"]
+        if "print_end_time" in changes:
+            self.PrintEndTime = changes["print_end_time"]
+        if "print_state" in changes:
+            self.PrintState = changes["print_state"]
+        if "seconds_added_to_print" in changes:
+            self.SecondsAddedToPrint = changes["seconds_added_to_print"]
+        if "rendering" in changes:
+            self.Rendering = changes["rendering"]
+        if "ffmpeg_path" in changes:
+            self.FfMpegPath = changes["ffmpeg_path"]
+        if "octoprint_timelapse_folder" in changes:
+            self.OctoprintTimelapseFolder = changes["octoprint_timelapse_folder"]
+        if "clean_after_success" in changes:
+            self.CleanAfterSuccess = changes["clean_after_success"]
+        if "clean_after_fail" in changes:
+            self.CleanAfterFail = changes["clean_after_fail"]
+        if "priority" in changes:
+            self.Priority = changes["priority"]
+        if "time_queued" in changes:
+            self.TimeQueued = changes["time_queued"]
+
+    def to_dict(self):
+        return {
+            'job_id': self.JobId,
+            'print_name': self.PrintName,
+            'print_start_time': self.PrintStartTime,
+            'print_end_time': self.PrintEndTime,
+            'print_state': self.PrintState,
+            'seconds_added_to_print': self.SecondsAddedToPrint,
+            'rendering': self.Rendering,
+            'ffmpeg_path': self.FfMpegPath,
+            'octoprint_timelapse_folder': self.OctoprintTimelapseFolder,
+            'clean_after_success': self.CleanAfterSuccess,
+            'clean_after_fail': self.CleanAfterFail,
+            'priority': self.Priority,
+            'time_queued': self.TimeQueued,
+            'is_rendering': self.IsRendering,
+            'progress': self.Progress
+        }
+
+
+class RenderScheduler(object):
+    # Renders up to WorkerCount timelapses at a time, starting the queued jobs in order.  The queue is saved to
+    # QueuePath every time it changes, and load() queues the saved jobs again, including those that were rendering.
+    # While paused, the rendering jobs are paused and no queued jobs are started.  Once stopped, no more jobs start.
+    def __init__(self, queue_path, worker_count, create_job, on_change=None, on_error=None):
+        self.QueuePath = queue_path
+        self.WorkerCount = max(1, worker_count)
+        # create_job(job_info, thread_count, streaming_render) returns an object with process(), cancel(), stop(),
+        # pause() and resume()
+        self._create_job = create_job
+        self._on_change = on_change
+        self._on_error = on_error
+        self._lock = threading.RLock()
+        # the rendering jobs followed by the queued jobs, in the order they will start
+        self._jobs = []
+        self._writer = SnapshotWriter()
+        self._render_threads = []
+        self.IsPaused = False
+        self.IsStopped = False
+
+    def configure(self, worker_count):
+        with self._lock:
+            self.WorkerCount = max(1, worker_count)
+            self._start_jobs()
+
+    def get_thread_count(self):
+        """Returns the number of ffmpeg threads for each job, so that the jobs rendering together share the cpus."""
+        return max(1, get_cpu_count() // self.WorkerCount)
+
+    def load(self):
+        """Queues the jobs that were saved when OctoPrint stopped.  Jobs that were rendering start over."""
+        if not os.path.isfile(self.QueuePath):
+            return
+        try:
+            with i_open(self.QueuePath, 'rb') as queue_file:
+                saved_jobs = json.loads(queue_file.read().decode('utf-8'))
+        except (IOError, OSError, ValueError) as e:
+            self._notify_error(e)
+            return
+        with self._lock:
+            for saved_job in saved_jobs:
+                job_info = RenderJobInfo(saved_job)
+                if self._find(job_info.JobId) is None:
+                    self._jobs.append(job_info)
+            self._save()
+            self._start_jobs()
+        self._notify_change()
+
+    def add(self, job_info, streaming_render=None):
+        with self._lock:
+            job_info.StreamingRender = streaming_render
+            index = len(self._jobs)
+            for job_index, queued_job_info in enumerate(self._jobs):
+                if not queued_job_info.IsRendering and queued_job_info.Priority < job_info.Priority:
+                    index = job_index
+                    break
+            self._jobs.insert(index, job_info)
+            self._save()
+            self._start_jobs()
+        self._notify_change()
+
+    def move(self, job_id, index):
+        """Moves a queued job to index within the queue.  Returns False if the job isn't queued."""
+        with self._lock:
+            job_info = self._find(job_id)
+            if job_info is None or job_info.IsRendering:
+                return False
+            self._jobs.remove(job_info)
+            # jobs that are rendering stay at the front
+            first_queued_index = len([rendering_job for rendering_job in self._jobs if rendering_job.IsRendering])
+            index = min(max(index, first_queued_index), len(self._jobs))
+            self._jobs.insert(index, job_info)
+            self._save()
+        self._notify_change()
+        return True
+
+    def cancel(self, job_id):
+        """Removes a queued job, or stops a job that is rendering.  Returns False if the job wasn't found."""
+        with self._lock:
+            job_info = self._find(job_id)
+            if job_info is None:
+                return False
+            if job_info.IsRendering:
+                # the job is removed once it stops
+                job_info.CancelRequested = True
+                if job_info.Job is not None:
+                    job_info.Job.cancel()
+                return True
+            self._jobs.remove(job_info)
+            if job_info.StreamingRender is not None:
+                job_info.StreamingRender.cancel()
+            self._save()
+        self._notify_change()
+        return True
+
+    def pause(self):
+        with self._lock:
+            if self.IsPaused:
+                return
+            self.IsPaused = True
+            for job_info in self._jobs:
+                if job_info.Job is not None:
+                    job_info.Job.pause()
+        self._notify_change()
+
+    def resume(self):
+        with self._lock:
+            if not self.IsPaused:
+                return
+            self.IsPaused = False
+            for job_info in self._jobs:
+                if job_info.Job is not None:
+                    job_info.Job.resume()
+            self._start_jobs()
+        self._notify_change()
+
+    def stop(self, timeout=None):
+        """Stops the rendering jobs because OctoPrint is shutting down, and waits up to timeout seconds for them to
+        exit.  The jobs stay in the saved queue, so they are rendered again after a restart.  A paused ffmpeg would
+        otherwise stay stopped, and a running one would keep writing the timelapse that the restarted job renders
+        again.  Returns False if the timeout expired first."""
+        with self._lock:
+            self.IsStopped = True
+            for job_info in self._jobs:
+                if job_info.Job is not None:
+                    job_info.Job.stop()
+            render_threads = list(self._render_threads)
+        end_time = None if timeout is None else time.time() + timeout
+        for render_thread in render_threads:
+            render_thread.join(None if end_time is None else max(0, end_time - time.time()))
+        return not any(render_thread.is_alive() for render_thread in render_threads)
+
+    def set_progress(self, job_id, progress):
+        """Records the latest progress of a rendering job, a RenderProgress dict."""
+        with self._lock:
+            job_info = self._find(job_id)
+            if job_info is not None:
+                job_info.Progress = progress
+
+    def is_rendering(self):
+        with self._lock:
+            return any(job_info.IsRendering for job_info in self._jobs)
+
+    def to_list(self):
+        with self._lock:
+            return [job_info.to_dict() for job_info in self._jobs]
+
+    def _find(self, job_id):
+        for job_info in self._jobs:
+            if job_info.JobId == job_id:
+                return job_info
+        return None
+
+    def _start_jobs(self):
+        if self.IsPaused or self.IsStopped:
+            return
+        self._render_threads = [
+            render_thread for render_thread in self._render_threads if render_thread.is_alive()]
+        rendering_count = len([job_info for job_info in self._jobs if job_info.IsRendering])
+        for job_info in self._jobs:
+            if rendering_count >= self.WorkerCount:
+                break
+            if job_info.IsRendering:
+                continue
+            job_info.IsRendering = True
+            rendering_count += 1
+            render_thread = threading.Thread(
+                target=self._render, args=[job_info, self.get_thread_count()], name=job_info.JobId)
+            render_thread.daemon = True
+            render_thread.start()
+            self._render_threads.append(render_thread)
+
+    def _render(self, job_info, thread_count):
+        try:
+            job = self._create_job(job_info, thread_count, job_info.StreamingRender)
+            with self._lock:
+                job_info.Job = job
+                if self.IsStopped:
+                    return
+                if job_info.CancelRequested:
+                    # cancelled while the job was being created, it stops as soon as it starts
+                    job.cancel()
+                if self.IsPaused:
+                    job.pause()
+            job.process()
+        except Exception as e:
+            self._notify_error(e)
+        with self._lock:
+            if self.IsStopped:
+                # the job is still in the saved queue
+                return
+            self._jobs.remove(job_info)
+            self._save()
+            self._start_jobs()
+        self._notify_change()
+
+    def _save(self):
+        try:
+            saved_jobs = json.dumps([job_info.to_dict() for job_info in self._jobs])
+            self._writer.write(self.QueuePath, [saved_jobs.encode('utf-8')])
+        except (IOError, OSError) as e:
+            self._notify_error(e)
+
+    def _notify_change(self):
+        if self._on_change is not None:
+            try:
+                self._on_change()
+            except Exception as e:
+                self._notify_error(e)
+
+    def _notify_error(self, e):
+        if self._on_error is not None:
+            self._on_error(e)
@@ -878,6 +878,7 @@ class Rendering(object):
         self.min_fps = 2.0
         self.output_format = 'mp4'
         self.sync_with_timelapse = True
+        self.render_during_print = False
         self.bitrate = "8000K"
         self.flip_h = False
         self.flip_v = False
@@ -899,6 +900,7 @@ class Rendering(object):
                 self.min_fps = rendering.min_fps
                 self.output_format = rendering.output_format
                 self.sync_with_timelapse = rendering.sync_with_timelapse
+                self.render_during_print = rendering.render_during_print
                 self.bitrate = rendering.bitrate
                 self.flip_h = rendering.flip_h
                 self.flip_v = rendering.flip_v
@@ -938,6 +940,9 @@ class Rendering(object):
         if "sync_with_timelapse" in changes.keys():
             self.sync_with_timelapse = utility.get_bool(
                 changes["sync_with_timelapse"], self.sync_with_timelapse)
+        if "render_during_print" in changes.keys():
+            self.render_during_print = utility.get_bool(
+                changes["render_during_print"], self.render_during_print)
         if "bitrate" in changes.keys():
             self.bitrate = utility.get_bitrate(changes["bitrate"], self.bitrate)
         if "flip_h" in changes.keys():
@@ -974,6 +979,7 @@ class Rendering(object):
             'min_fps': self.min_fps,
             'output_format': self.output_format,
             'sync_with_timelapse': self.sync_with_timelapse,
+            'render_during_print': self.render_during_print,
             'bitrate': self.bitrate,
             'flip_h': self.flip_h,
             'flip_v': self.flip_v,
@@ -992,10 +998,14 @@ class Camera(object):
         self.name = name
         self.description = ""
         self.delay = 125
+        self.timeout_ms = 5000
         self.apply_settings_before_print = False
         self.address = "http://127.0.0.1/webcam/"
         self.snapshot_request_template = "{camera_address}?action=snapshot"
+        self.use_mjpeg_stream = False
+        self.stream_request_template = "{camera_address}?action=stream"
         self.snapshot_transpose = ""
+        self.snapshot_transpose_method = "lossless"
         self.ignore_ssl_error = False
         self.username = ""
         self.password = ""
@@ -1065,14 +1075,26 @@ class Camera(object):
         if "delay" in changes.keys():
             self.delay = utility.get_int(
                 changes["delay"], self.delay)
+        if "timeout_ms" in changes.keys():
+            self.timeout_ms = utility.get_int(
+                changes["timeout_ms"], self.timeout_ms)
         if "address" in changes.keys():
             self.address = utility.get_string(changes["address"], self.address)
         if "snapshot_request_template" in changes.keys():
             self.snapshot_request_template = utility.get_string(
                 changes["snapshot_request_template"], self.snapshot_request_template)
+        if "use_mjpeg_stream" in changes.keys():
+            self.use_mjpeg_stream = utility.get_bool(
+                changes["use_mjpeg_stream"], self.use_mjpeg_stream)
+        if "stream_request_template" in changes.keys():
+            self.stream_request_template = utility.get_string(
+                changes["stream_request_template"], self.stream_request_template)
         if "snapshot_transpose" in changes.keys():
             self.snapshot_transpose = utility.get_string(
                 changes["snapshot_transpose"], self.snapshot_transpose)
+        if "snapshot_transpose_method" in changes.keys():
+            self.snapshot_transpose_method = utility.get_string(
+                changes["snapshot_transpose_method"], self.snapshot_transpose_method)
         if "apply_settings_before_print" in changes.keys():
             self.apply_settings_before_print = utility.get_bool(
                 changes["apply_settings_before_print"], self.apply_settings_before_print)
@@ -1212,9 +1234,13 @@ class Camera(object):
             'name': self.name,
             'description': self.description,
             'delay': self.delay,
+            'timeout_ms': self.timeout_ms,
             'address': self.address,
             'snapshot_request_template': self.snapshot_request_template,
+            'use_mjpeg_stream': self.use_mjpeg_stream,
+            'stream_request_template': self.stream_request_template,
             'snapshot_transpose': self.snapshot_transpose,
+            'snapshot_transpose_method': self.snapshot_transpose_method,
             'apply_settings_before_print': self.apply_settings_before_print,
             'ignore_ssl_error': self.ignore_ssl_error,
             'password': self.password,
@@ -1330,6 +1356,8 @@ class DebugProfile(object):
         self.gcode_sent_all = False
         self.gcode_queuing_all = False
         self.gcode_received_all = False
+        self.gcode_parse_cache_statistics = False
+        self.gcode_parse_cache_size = 1000
 
         if debug_profile is not None:
             self.update(debug_profile)
@@ -1446,6 +1474,12 @@ class DebugProfile(object):
         if "gcode_received_all" in changes.keys():
             self.gcode_received_all = utility.get_bool(
                 changes["gcode_received_all"], self.gcode_received_all)
+        if "gcode_parse_cache_statistics" in changes.keys():
+            self.gcode_parse_cache_statistics = utility.get_bool(
+                changes["gcode_parse_cache_statistics"], self.gcode_parse_cache_statistics)
+        if "gcode_parse_cache_size" in changes.keys():
+            self.gcode_parse_cache_size = utility.get_int(
+                changes["gcode_parse_cache_size"], self.gcode_parse_cache_size)
 
     def to_dict(self):
         return {
@@ -1486,7 +1520,9 @@ class DebugProfile(object):
             'camera_settings_apply': self.camera_settings_apply,
             'gcode_sent_all': self.gcode_sent_all,
             'gcode_queuing_all': self.gcode_queuing_all,
-            'gcode_received_all': self.gcode_received_all
+            'gcode_received_all': self.gcode_received_all,
+            'gcode_parse_cache_statistics': self.gcode_parse_cache_statistics,
+            'gcode_parse_cache_size': self.gcode_parse_cache_size
         }
 
     def log_console(self, level_name, message, force=False):
@@ -1494,13 +1530,25 @@ class DebugProfile(object):
             print(DebugProfile.ConsoleFormatString.format(asctime=str(
                 datetime.now()), levelname=level_name, message=message))
 
-    def log_info(self, message):
+    @staticmethod
+    def format_message(message, args, kwargs):
+        # Messages may be deferred so that they are only built when they will actually be logged.  A deferred
+        # message is either a callable returning the message, or a format template with args and/or kwargs.
+        if callable(message):
+            return message()
+        if args or kwargs:
+            return message.format(*args, **kwargs)
+        return message
+
+    def log_info(self, message, *args, **kwargs):
         if self.enabled:
+            message = DebugProfile.format_message(message, args, kwargs)
             DebugProfile.Logging_Executor.submit(self.Logger.info, message)
             self.log_console('info', message)
 
-    def log_warning(self, message):
+    def log_warning(self, message, *args, **kwargs):
         if self.enabled:
+            message = DebugProfile.format_message(message, args, kwargs)
             DebugProfile.Logging_Executor.submit(self.Logger.warning, message)
             self.log_console('warn', message)
 
@@ -1509,141 +1557,177 @@ class DebugProfile(object):
         DebugProfile.Logging_Executor.submit(self.Logger.error, message)
         self.log_console('error', message)
 
-    def log_error(self, message):
+    def log_error(self, message, *args, **kwargs):
+        message = DebugProfile.format_message(message, args, kwargs)
         DebugProfile.Logging_Executor.submit(self.Logger.error, message)
         self.log_console('error', message)
 
-    def log_position_change(self, message):
+    def log_position_change(self, message, *args, **kwargs):
         if self.position_change:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_position_command_received(self, message):
+    def log_position_command_received(self, message, *args, **kwargs):
         if self.position_command_received:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_extruder_change(self, message):
+    def log_extruder_change(self, message, *args, **kwargs):
         if self.extruder_change:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_extruder_triggered(self, message):
+    def log_extruder_triggered(self, message, *args, **kwargs):
         if self.extruder_triggered:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_trigger_create(self, message):
+    def log_trigger_create(self, message, *args, **kwargs):
         if self.trigger_create:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_trigger_wait_state(self, message):
+    def log_trigger_wait_state(self, message, *args, **kwargs):
         if self.trigger_wait_state:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_triggering(self, message):
+    def log_triggering(self, message, *args, **kwargs):
         if self.trigger_triggering:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_triggering_state(self, message):
+    def log_triggering_state(self, message, *args, **kwargs):
         if self.trigger_triggering_state:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_trigger_height_change(self, message):
+    def log_trigger_height_change(self, message, *args, **kwargs):
         if self.trigger_height_change:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_position_layer_change(self, message):
+    def log_position_layer_change(self, message, *args, **kwargs):
         if self.position_change:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_position_height_change(self, message):
+    def log_position_height_change(self, message, *args, **kwargs):
         if self.position_change:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_position_zhop(self, message):
+    def log_position_zhop(self, message, *args, **kwargs):
         if self.trigger_zhop:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_timer_trigger_unpaused(self, message):
+    def log_timer_trigger_unpaused(self, message, *args, **kwargs):
         if self.trigger_time_unpaused:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_trigger_time_remaining(self, message):
+    def log_trigger_time_remaining(self, message, *args, **kwargs):
         if self.trigger_time_remaining:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_gcode(self, message):
+    def log_snapshot_gcode(self, message, *args, **kwargs):
         if self.snapshot_gcode:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_gcode_end_command(self, message):
+    def log_snapshot_gcode_end_command(self, message, *args, **kwargs):
         if self.snapshot_gcode_endcommand:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_position(self, message):
+    def log_snapshot_position(self, message, *args, **kwargs):
         if self.snapshot_position:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_return_position(self, message):
+    def log_snapshot_return_position(self, message, *args, **kwargs):
         if self.snapshot_position_return:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_resume_position(self, message):
+    def log_snapshot_resume_position(self, message, *args, **kwargs):
         if self.snapshot_position_resume_print:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_save(self, message):
+    def log_snapshot_save(self, message, *args, **kwargs):
         if self.snapshot_save:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_download(self, message):
+    def log_snapshot_download(self, message, *args, **kwargs):
         if self.snapshot_download:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_render_start(self, message):
+    def log_render_start(self, message, *args, **kwargs):
         if self.render_start:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_render_complete(self, message):
+    def log_render_complete(self, message, *args, **kwargs):
         if self.render_complete:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_render_fail(self, message):
+    def log_render_fail(self, message, *args, **kwargs):
         if self.render_fail:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_render_sync(self, message):
+    def log_render_sync(self, message, *args, **kwargs):
         if self.render_sync:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_snapshot_clean(self, message):
+    def log_snapshot_clean(self, message, *args, **kwargs):
         if self.snapshot_clean:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_settings_save(self, message):
+    def log_settings_save(self, message, *args, **kwargs):
         if self.settings_save:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_settings_load(self, message):
+    def log_settings_load(self, message, *args, **kwargs):
         if self.settings_load:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_print_state_change(self, message):
+    def log_print_state_change(self, message, *args, **kwargs):
         if self.print_state_changed:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_camera_settings_apply(self, message):
+    def log_camera_settings_apply(self, message, *args, **kwargs):
         if self.camera_settings_apply:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_gcode_sent(self, message):
+    def log_gcode_sent(self, message, *args, **kwargs):
         if self.gcode_sent_all:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_gcode_queuing(self, message):
+    def log_gcode_queuing(self, message, *args, **kwargs):
         if self.gcode_queuing_all:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
 
-    def log_gcode_received(self, message):
+    def log_gcode_received(self, message, *args, **kwargs):
         if self.gcode_received_all:
-            self.log_info(message)
+            self.log_info(message, *args, **kwargs)
+
+    def log_gcode_parse_cache_statistics(self, message, *args, **kwargs):
+        if self.gcode_parse_cache_statistics:
+            self.log_info(message, *args, **kwargs)
+
+
+class ResolvedProfiles(object):
+    # The active profiles resolved once, along with flags for the debug categories that are enabled.  Objects on the
+    # gcode hot path hold one of these instead of calling OctolapseSettings.current_xxx() for every line, and only
+    # fetch a new one when the settings version changes.
+    def __init__(self, settings):
+        self.SettingsVersion = settings.settings_version
+        self.Debug = settings.current_debug_profile()
+        self.Printer = settings.current_printer()
+        self.Snapshot = settings.current_snapshot()
+        self.Camera = settings.current_camera()
+
+        debug = self.Debug
+        self.IsTestMode = debug.is_test_mode
+        self.LogPositionChange = debug.enabled and debug.position_change
+        self.LogPositionCommandReceived = debug.enabled and debug.position_command_received
+        self.LogPositionZhop = debug.enabled and debug.trigger_zhop
+        self.LogExtruderChange = debug.enabled and debug.extruder_change
+        self.LogExtruderTriggered = debug.enabled and debug.extruder_triggered
+        self.LogTriggerWaitState = debug.enabled and debug.trigger_wait_state
+        self.LogTriggering = debug.enabled and debug.trigger_triggering
+        self.LogTriggeringState = debug.enabled and debug.trigger_triggering_state
+        self.LogTriggerHeightChange = debug.enabled and debug.trigger_height_change
+        self.LogTriggerTimeRemaining = debug.enabled and debug.trigger_time_remaining
+        self.LogGcodeSent = debug.enabled and debug.gcode_sent_all
+        self.LogGcodeQueuing = debug.enabled and debug.gcode_queuing_all
+        self.LogGcodeReceived = debug.enabled and debug.gcode_received_all
+
+    def is_current(self, settings):
+        return self.SettingsVersion == settings.settings_version
 
 
 class OctolapseSettings(object):
@@ -1680,6 +1764,10 @@ class OctolapseSettings(object):
         self.DefaultDebugProfile = DebugProfile(
             log_file_path=log_file_path, name="Default Debug", guid="08ad284a-76cc-4854-b8a0-f2658b784dd7")
         self.LogFilePath = log_file_path
+        # Incremented after the profiles or the current profile selections change.  Anything resolved while a change
+        # is being applied is resolved again afterward.
+        self.settings_version = 0
+        self._resolved_profiles = None
 
         self.version = plugin_version
         self.show_navbar_icon = True
@@ -1687,12 +1775,29 @@ class OctolapseSettings(object):
         self.is_octolapse_enabled = True
         self.auto_reload_latest_snapshot = True
         self.auto_reload_frames = 5
+        self.thumbnail_width = 300
+        self.thumbnail_quality = 75
         self.show_position_state_changes = False
         self.show_position_changes = False
         self.show_extruder_state_changes = False
         self.show_trigger_state_changes = False
         self.current_printer_profile_guid = None
         self.show_real_snapshot_time = False
+        self.snapshot_worker_count = 1
+        self.snapshot_queue_size = 5
+        self.post_processing_worker_count = 1
+        self.post_processing_queue_size = 20
+        self.use_snapshot_container = False
+        self.render_worker_count = 1
+        self.render_segment_count = 1
+        self.render_nice_level = 10
+        self.render_io_class = "idle"
+        self.render_cpu_affinity = ""
+        self.render_memory_limit = 0
+        self.render_time_limit = 0
+        self.pause_rendering_while_printing = True
+        self.callback_worker_count = 1
+        self.state_message_interval = 1.0
         self.printers = {}
 
         stabilization = self.DefaultStabilization
@@ -1758,8 +1863,19 @@ class OctolapseSettings(object):
             self.current_debug_profile_guid = debug_profile.guid
         return self.debug_profiles[self.current_debug_profile_guid]
 
+    def resolved_profiles(self):
+        if self._resolved_profiles is None or not self._resolved_profiles.is_current(self):
+            self._resolved_profiles = ResolvedProfiles(self)
+        return self._resolved_profiles
+
     def update(self, changes):
+        try:
+            self._update(changes)
+        finally:
+            # even a partial update must be resolved again
+            self.settings_version += 1
 
+    def _update(self, changes):
         if has_key(changes, "is_octolapse_enabled"):
             self.is_octolapse_enabled = bool(
                 get_value(changes, "is_octolapse_enabled", self.is_octolapse_enabled))
@@ -1769,6 +1885,12 @@ class OctolapseSettings(object):
         if has_key(changes, "auto_reload_frames"):
             self.auto_reload_frames = int(
                 get_value(changes, "auto_reload_frames", self.auto_reload_frames))
+        if has_key(changes, "thumbnail_width"):
+            self.thumbnail_width = int(
+                get_value(changes, "thumbnail_width", self.thumbnail_width))
+        if has_key(changes, "thumbnail_quality"):
+            self.thumbnail_quality = int(
+                get_value(changes, "thumbnail_quality", self.thumbnail_quality))
         if has_key(changes, "show_navbar_icon"):
             self.show_navbar_icon = bool(
                 get_value(changes, "show_navbar_icon", self.show_navbar_icon))
@@ -1809,6 +1931,49 @@ class OctolapseSettings(object):
         if has_key(changes, "show_real_snapshot_time"):
             self.show_real_snapshot_time = bool(
                 get_value(changes, "show_real_snapshot_time", self.show_real_snapshot_time))
+        if has_key(changes, "snapshot_worker_count"):
+            self.snapshot_worker_count = int(
+                get_value(changes, "snapshot_worker_count", self.snapshot_worker_count))
+        if has_key(changes, "snapshot_queue_size"):
+            self.snapshot_queue_size = int(
+                get_value(changes, "snapshot_queue_size", self.snapshot_queue_size))
+        if has_key(changes, "post_processing_worker_count"):
+            self.post_processing_worker_count = int(
+                get_value(changes, "post_processing_worker_count", self.post_processing_worker_count))
+        if has_key(changes, "post_processing_queue_size"):
+            self.post_processing_queue_size = int(
+                get_value(changes, "post_processing_queue_size", self.post_processing_queue_size))
+        if has_key(changes, "use_snapshot_container"):
+            self.use_snapshot_container = bool(get_value(
+                changes, "use_snapshot_container", self.use_snapshot_container))
+        if has_key(changes, "render_worker_count"):
+            self.render_worker_count = int(
+                get_value(changes, "render_worker_count", self.render_worker_count))
+        if has_key(changes, "render_segment_count"):
+            self.render_segment_count = int(
+                get_value(changes, "render_segment_count", self.render_segment_count))
+        if has_key(changes, "render_nice_level"):
+            self.render_nice_level = int(
+                get_value(changes, "render_nice_level", self.render_nice_level))
+        if has_key(changes, "render_io_class"):
+            self.render_io_class = get_value(changes, "render_io_class", self.render_io_class)
+        if has_key(changes, "render_cpu_affinity"):
+            self.render_cpu_affinity = get_value(changes, "render_cpu_affinity", self.render_cpu_affinity)
+        if has_key(changes, "render_memory_limit"):
+            self.render_memory_limit = int(
+                get_value(changes, "render_memory_limit", self.render_memory_limit))
+        if has_key(changes, "render_time_limit"):
+            self.render_time_limit = int(
+                get_value(changes, "render_time_limit", self.render_time_limit))
+        if has_key(changes, "pause_rendering_while_printing"):
+            self.pause_rendering_while_printing = bool(get_value(
+                changes, "pause_rendering_while_printing", self.pause_rendering_while_printing))
+        if has_key(changes, "callback_worker_count"):
+            self.callback_worker_count = int(
+                get_value(changes, "callback_worker_count", self.callback_worker_count))
+        if has_key(changes, "state_message_interval"):
+            self.state_message_interval = float(
+                get_value(changes, "state_message_interval", self.state_message_interval))
 
         if has_key(changes, "printers"):
             self.printers = {}
@@ -1949,6 +2114,12 @@ class OctolapseSettings(object):
             "auto_reload_frames": utility.get_int(
                 self.auto_reload_frames, defaults.auto_reload_frames
             ),
+            "thumbnail_width": utility.get_int(
+                self.thumbnail_width, defaults.thumbnail_width
+            ),
+            "thumbnail_quality": utility.get_int(
+                self.thumbnail_quality, defaults.thumbnail_quality
+            ),
             "show_navbar_icon": utility.get_bool(
                 self.show_navbar_icon, defaults.show_navbar_icon
             ),
@@ -1970,6 +2141,51 @@ class OctolapseSettings(object):
             "show_real_snapshot_time": utility.get_bool(
                 self.show_real_snapshot_time, defaults.show_real_snapshot_time
             ),
+            "snapshot_worker_count": utility.get_int(
+                self.snapshot_worker_count, defaults.snapshot_worker_count
+            ),
+            "snapshot_queue_size": utility.get_int(
+                self.snapshot_queue_size, defaults.snapshot_queue_size
+            ),
+            "post_processing_worker_count": utility.get_int(
+                self.post_processing_worker_count, defaults.post_processing_worker_count
+            ),
+            "post_processing_queue_size": utility.get_int(
+                self.post_processing_queue_size, defaults.post_processing_queue_size
+            ),
+            "use_snapshot_container": utility.get_bool(
+                self.use_snapshot_container, defaults.use_snapshot_container
+            ),
+            "render_worker_count": utility.get_int(
+                self.render_worker_count, defaults.render_worker_count
+            ),
+            "render_segment_count": utility.get_int(
+                self.render_segment_count, defaults.render_segment_count
+            ),
+            "render_nice_level": utility.get_int(
+                self.render_nice_level, defaults.render_nice_level
+            ),
+            "render_io_class": utility.get_string(
+                self.render_io_class, defaults.render_io_class
+            ),
+            "render_cpu_affinity": utility.get_string(
+                self.render_cpu_affinity, defaults.render_cpu_affinity
+            ),
+            "render_memory_limit": utility.get_int(
+                self.render_memory_limit, defaults.render_memory_limit
+            ),
+            "render_time_limit": utility.get_int(
+                self.render_time_limit, defaults.render_time_limit
+            ),
+            "pause_rendering_while_printing": utility.get_bool(
+                self.pause_rendering_while_printing, defaults.pause_rendering_while_printing
+            ),
+            "callback_worker_count": utility.get_int(
+                self.callback_worker_count, defaults.callback_worker_count
+            ),
+            "state_message_interval": utility.get_float(
+                self.state_message_interval, defaults.state_message_interval
+            ),
             "platform": sys.platform,
             'e_axis_default_mode_options': [
                 dict(value='require-explicit', name='Require Explicit M82/M83'),
@@ -2050,6 +2266,11 @@ class OctolapseSettings(object):
                 dict(value='rotate_270', name='Rotate 270 Degrees'),
                 dict(value='transpose', name='Transpose')
             ],
+            'snapshot_transpose_method_options': [
+                dict(value='lossless', name='Lossless (jpegtran)'),
+                dict(value='exif', name='EXIF Orientation Tag'),
+                dict(value='reencode', name='Decode and Re-encode')
+            ],
             'current_printer_profile_guid': utility.get_string(
                 self.current_printer_profile_guid, defaults.current_printer_profile_guid
             ),
@@ -2108,13 +2329,30 @@ class OctolapseSettings(object):
             'version': self.version,
             'auto_reload_latest_snapshot': self.auto_reload_latest_snapshot,
             'auto_reload_frames': int(self.auto_reload_frames),
+            'thumbnail_width': int(self.thumbnail_width),
+            'thumbnail_quality': int(self.thumbnail_quality),
             'show_navbar_icon': self.show_navbar_icon,
             'show_navbar_when_not_printing': self.show_navbar_when_not_printing,
             'show_position_state_changes': self.show_position_state_changes,
             'show_position_changes': self.show_position_changes,
             'show_extruder_state_changes': self.show_extruder_state_changes,
             'show_trigger_state_changes': self.show_trigger_state_changes,
-            'show_real_snapshot_time': self.show_real_snapshot_time
+            'show_real_snapshot_time': self.show_real_snapshot_time,
+            'snapshot_worker_count': int(self.snapshot_worker_count),
+            'snapshot_queue_size': int(self.snapshot_queue_size),
+            'post_processing_worker_count': int(self.post_processing_worker_count),
+            'post_processing_queue_size': int(self.post_processing_queue_size),
+            'use_snapshot_container': self.use_snapshot_container,
+            'render_worker_count': int(self.render_worker_count),
+            'render_segment_count': int(self.render_segment_count),
+            'render_nice_level': int(self.render_nice_level),
+            'render_io_class': self.render_io_class,
+            'render_cpu_affinity': self.render_cpu_affinity,
+            'render_memory_limit': int(self.render_memory_limit),
+            'render_time_limit': int(self.render_time_limit),
+            'pause_rendering_while_printing': self.pause_rendering_while_printing,
+            'callback_worker_count': int(self.callback_worker_count),
+            'state_message_interval': float(self.state_message_interval)
         }
 
     # Add/Update/Remove/set current profile
@@ -2150,10 +2388,10 @@ class OctolapseSettings(object):
             raise ValueError('An unknown profile type ' +
                              str(profile_type) + ' was received.')
 
+        self.settings_version += 1
         return new_profile
 
     def remove_profile(self, profile_type, guid):
-
         if profile_type == "Printer":
             if self.current_printer_profile_guid == guid:
                 return False
@@ -2182,10 +2420,10 @@ class OctolapseSettings(object):
             raise ValueError('An unknown profile type ' +
                              str(profile_type) + ' was received.')
 
+        self.settings_version += 1
         return True
 
     def set_current_profile(self, profile_type, guid):
-
         if profile_type == "Printer":
             self.current_printer_profile_guid = guid
         elif profile_type == "Stabilization":
@@ -2201,6 +2439,7 @@ class OctolapseSettings(object):
         else:
             raise ValueError('An unknown profile type ' +
                              str(profile_type) + ' was received.')
+        self.settings_version += 1
 
 
 def has_key(obj, key):
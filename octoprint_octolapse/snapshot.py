@@ -24,22 +24,29 @@
 import shutil
 import threading
 import os
-from io import open as i_open
+import uuid
+from io import open as i_open, BytesIO
 from PIL import ImageFile, Image
-from time import sleep
+from time import sleep, time
 
 import requests
 from PIL import Image
 # PIL is in fact in setup.py.
-from requests.auth import HTTPBasicAuth
 
 import octoprint_octolapse.camera as camera
+import octoprint_octolapse.image_transpose as image_transpose
+import octoprint_octolapse.mjpeg_stream as mjpeg_stream
+import octoprint_octolapse.snapshot_container as snapshot_container
+from octoprint_octolapse.snapshot_writer import SnapshotWriter
 from octoprint_octolapse.settings import *
 
 
 class CaptureSnapshot(object):
 
-    def __init__(self, settings, data_directory, print_start_time, print_end_time=None):
+    def __init__(
+            self, settings, data_directory, print_start_time, print_end_time=None, post_processing_pool=None,
+            streaming_render=None, on_latest_snapshot_changed=None
+    ):
         self.Settings = settings
         self.Printer = self.Settings.current_printer()
         self.Snapshot = self.Settings.current_snapshot()
@@ -47,25 +54,82 @@ class CaptureSnapshot(object):
         self.PrintStartTime = print_start_time
         self.PrintEndTime = print_end_time
         self.DataDirectory = data_directory
-        self.SnapshotTimeout = 5
+        self.SnapshotTimeout = self.Camera.timeout_ms / 1000.0
+        self.PostProcessingPool = post_processing_pool
+        self.Statistics = SnapshotStatistics()
+        self.LatestSnapshot = LatestSnapshot(on_changed=on_latest_snapshot_changed)
+        self.Writer = SnapshotWriter()
+        # every snapshot of the timelapse is appended to this container when it is enabled
+        self.UseContainer = self.Settings.use_snapshot_container
+        self.Container = None
+        # each post processed snapshot is also sent here when the timelapse is rendered during the print
+        self.StreamingRender = streaming_render
+        self.StreamGrabber = None
+        if self.Camera.use_mjpeg_stream:
+            # start receiving frames now so that the stream is running before the first snapshot is needed
+            self.StreamGrabber = mjpeg_stream.grabber_pool.get_grabber(
+                self.Camera, on_error=self.Settings.current_debug_profile().log_exception
+            )
+
+    def get_capture_timeout(self):
+        # the longest a capture may take: the camera delay, then the request or the wait for a stream frame
+        return self.Camera.delay / 1000.0 + self.SnapshotTimeout
+
+    def stop_stream(self):
+        if self.StreamGrabber is not None:
+            mjpeg_stream.grabber_pool.remove(self.Camera.guid)
+            self.StreamGrabber = None
+
+    def close_container(self):
+        if self.Container is not None:
+            self.Container.close()
+
+    def _get_container(self, printer_file_name):
+        if self.Container is None:
+            self.Container = snapshot_container.SnapshotContainer(
+                "{0}{1}".format(
+                    utility.get_snapshot_temp_directory(self.DataDirectory),
+                    utility.get_snapshot_container_filename(printer_file_name, self.PrintStartTime)
+                )
+            )
+        return self.Container
 
-    def create_snapshot_job(self, printer_file_name, snapshot_number, snapshot_guid, task_queue, on_complete, on_success, on_fail):
+    def create_snapshot_job(self, printer_file_name, snapshot_number, snapshot_guid, on_complete, on_success, on_fail):
         info = SnapshotInfo(printer_file_name, self.PrintStartTime)
-        # set the file name.  It will be a guid + the file extension
-        info.FileName = "{0}.{1}".format(snapshot_guid, "jpg")
         info.DirectoryName = utility.get_snapshot_temp_directory(
             self.DataDirectory)
+        container = None
+        if self.UseContainer:
+            container = self._get_container(printer_file_name)
+        if self.StreamGrabber is not None:
+            new_snapshot_job = StreamSnapshotJob(
+                self.Settings, self.DataDirectory, snapshot_number, info, self.StreamGrabber,
+                snapshot_guid, self.Camera.delay, self.SnapshotTimeout, on_complete=on_complete,
+                on_success=on_success, on_fail=on_fail, post_processing_pool=self.PostProcessingPool,
+                statistics=self.Statistics, latest_snapshot=self.LatestSnapshot, writer=self.Writer,
+                container=container, streaming_render=self.StreamingRender
+            )
+            return new_snapshot_job.process
+
         url = camera.format_request_template(
             self.Camera.address, self.Camera.snapshot_request_template, "")
-        # TODO:  TURN THE SNAPSHOT REQUIRE TIMEOUT INTO A SETTING
         new_snapshot_job = SnapshotJob(
             self.Settings, self.DataDirectory, snapshot_number, info, url,
-            snapshot_guid, task_queue, self.Camera.delay, self.SnapshotTimeout, on_complete=on_complete,
-            on_success=on_success, on_fail=on_fail
+            snapshot_guid, self.Camera.delay, self.SnapshotTimeout, on_complete=on_complete,
+            on_success=on_success, on_fail=on_fail, post_processing_pool=self.PostProcessingPool,
+            statistics=self.Statistics, latest_snapshot=self.LatestSnapshot, writer=self.Writer,
+            container=container, streaming_render=self.StreamingRender
         )
 
         return new_snapshot_job.process
 
+    def skip_snapshot(self, printer_file_name, snapshot_number):
+        # Gives up the number of a snapshot job that never ran, so that the later frames aren't held waiting for it.
+        if self.UseContainer:
+            self._get_container(printer_file_name).append(snapshot_number, None)
+        if self.StreamingRender is not None:
+            self.StreamingRender.append(snapshot_number, None)
+
     def clean_snapshots(self, snapshot_directory):
 
         # get snapshot directory
@@ -122,23 +186,27 @@ class CaptureSnapshot(object):
 
 
 class SnapshotJob(object):
-    snapshot_job_lock = threading.RLock()
 
     def __init__(
             self, settings, data_directory, snapshot_number,
-            snapshot_info, url, snapshot_guid, task_queue,
-            delay_ms, timeout_seconds, on_complete, on_success, on_fail
+            snapshot_info, url, snapshot_guid,
+            delay_ms, timeout_seconds, on_complete, on_success, on_fail,
+            post_processing_pool=None, statistics=None, latest_snapshot=None, writer=None,
+            container=None, streaming_render=None
     ):
 
         self.DelaySeconds = delay_ms / 1000.0
         camera_settings = settings.current_camera()
+        self.Camera = camera_settings
         self.SnapshotNumber = snapshot_number
         self.DataDirectory = data_directory
         self.Address = camera_settings.address
-        self.Username = camera_settings.username
-        self.Password = camera_settings.password
-        self.IgnoreSslError = camera_settings.ignore_ssl_error
         self.SnapshotTranspose = camera_settings.snapshot_transpose
+        self.SnapshotTransposeMethod = camera_settings.snapshot_transpose_method
+        self.ThumbnailWidth = settings.thumbnail_width
+        self.ThumbnailQuality = settings.thumbnail_quality
+        # the method that was actually used, which may be a fallback
+        self.AppliedTransposeMethod = None
         self.Settings = settings
         self.SnapshotInfo = snapshot_info
         self.Url = url
@@ -147,7 +215,16 @@ class SnapshotJob(object):
         self.OnCompleteCallback = on_complete
         self.OnSuccessCallback = on_success
         self.OnFailCallback = on_fail
-        self.task_queue = task_queue
+        # Post processing runs on this pool when it is supplied, else it runs right after the capture.
+        self.PostProcessingPool = post_processing_pool
+        self.Statistics = statistics if statistics is not None else SnapshotStatistics()
+        self.LatestSnapshot = latest_snapshot if latest_snapshot is not None else LatestSnapshot()
+        self.Writer = writer if writer is not None else SnapshotWriter()
+        # When a container is supplied the image is kept in memory until post processing appends it to the
+        # container, else it is written to its own file.
+        self.Container = container
+        self.Image = None
+        self.StreamingRender = streaming_render
         self.HasError = False
         self.ErrorMessage = ""
         self.ErrorType = ""
@@ -162,6 +239,7 @@ class SnapshotJob(object):
         self.OnCompleteCallback()
 
     def process(self):
+        # The capture stage.  The timelapse waits for this part only, so it does nothing but download the image.
         if self.DelaySeconds == 0:
             self.Settings.current_debug_profile().log_snapshot_download(
                 "Starting Snapshot Download Job Immediately.")
@@ -169,197 +247,366 @@ class SnapshotJob(object):
             self.Settings.current_debug_profile().log_snapshot_download(
                 "Starting Snapshot Download Job in {0} seconds.".format(self.DelaySeconds))
             sleep(self.DelaySeconds)
-        with self.snapshot_job_lock:
 
-            self.HasError = False
-            self.ErrorMessage = "unknown"
-            snapshot_directory = "{0:s}{1:s}".format(
-                self.SnapshotInfo.DirectoryName, self.SnapshotInfo.FileName)
-            r = None
+        capture_start_time = time()
+        self.HasError = False
+        self.ErrorMessage = "unknown"
+        # The snapshot number is reserved for this job, so the image is written straight to its final sequential
+        # file name, or kept for the container.  A failed capture leaves nothing behind and gives up its number.
+        self._download_snapshot(self._get_snapshot_location())
+        self.Statistics.add("capture", time() - capture_start_time)
+
+        # go ahead and report success or fail for the timelapse routine
+        if self.HasError:
+            self._skip_snapshot()
+            self.on_fail()
+            self.on_complete()
+            return
+        self.on_success()
+
+        # Hand the image to the post processing stage so that the next snapshot can be captured right away.
+        if self.PostProcessingPool is None:
+            self.post_process(time())
+        else:
+            self.PostProcessingPool.submit(self.post_process, [time()])
+
+    def post_process(self, queued_time):
+        # The post processing stage: transpose, then update the latest snapshot and thumbnail.
+        post_processing_start_time = time()
+        self.Statistics.add("post_processing_wait", post_processing_start_time - queued_time)
+
+        # transpose image if this is enabled.
+        if not self.HasError:
             try:
-                if len(self.Username) > 0:
-                    message = (
-                        "Snapshot Download - Authenticating and "
-                        "downloading from {0:s} to {1:s}."
-                    ).format(self.Url, snapshot_directory)
-                    self.Settings.current_debug_profile().log_snapshot_download(message)
-                    r = requests.get(
-                        self.Url,
-                        auth=HTTPBasicAuth(self.Username, self.Password),
-                        verify=not self.IgnoreSslError,
-                        timeout=float(self.TimeoutSeconds)
-                    )
-                else:
-                    self.Settings.current_debug_profile().log_snapshot_download(
-                        "Snapshot - downloading from {0:s} to {1:s}.".format(self.Url, snapshot_directory))
-                    r = requests.get(
-                        self.Url, verify=not self.IgnoreSslError,
-                        timeout=float(self.TimeoutSeconds)
-                    )
+                if self.SnapshotTranspose is not None and self.SnapshotTranspose != "":
+                    transpose_start_time = time()
+                    if self.Container is None:
+                        self.AppliedTransposeMethod = image_transpose.transpose_snapshot(
+                            self.SnapshotInfo.get_full_path(self.SnapshotNumber), self.SnapshotTranspose,
+                            self.SnapshotTransposeMethod)
+                    else:
+                        self.Image, self.AppliedTransposeMethod = image_transpose.transpose_snapshot_data(
+                            self.Image, self.SnapshotTranspose, self.SnapshotTransposeMethod)
+                    self.Statistics.add("transpose", time() - transpose_start_time)
+            except (IOError, OSError) as e:
+                # If we can't create the thumbnail, just log
+                self.Settings.current_debug_profile().log_exception(e)
+                self.ErrorMessage = (
+                    "Snapshot transpose - An unexpected IOException occurred.  "
+                    "Check the log file (plugin_octolapse.log) for details."
+                )
+                self.HasError = True
+
+        if self.Container is not None:
+            # The frame is added even if it couldn't be transposed, just like a snapshot file would be kept.
+            try:
+                self.Container.append(self.SnapshotNumber, self.Image)
+            except Exception as e:
+                self.Settings.current_debug_profile().log_exception(e)
+                self.ErrorMessage = (
+                    "Snapshot Container - An unexpected exception occurred.  "
+                    "Check the log file (plugin_octolapse.log) for details."
+                )
+                self.HasError = True
+
+        if self.StreamingRender is not None:
+            self._add_to_streaming_render()
+
+        # create a thumbnail and save the current snapshot as the most recent snapshot image
+        if not self.HasError:
+
+            try:
+                self.LatestSnapshot.update(self.SnapshotNumber, self._save_latest_snapshot)
             except Exception as e:
                 # If we can't create the thumbnail, just log
                 self.Settings.current_debug_profile().log_exception(e)
                 self.ErrorMessage = (
-                    "Snapshot Download - An unexpected exception occurred.  "
+                    "Create latest snapshot and thumbnail - An unexpected exception occurred.  "
                     "Check the log file (plugin_octolapse.log) for details."
                 )
                 self.HasError = True
 
-            if not self.HasError:
-                if r.status_code == requests.codes.ok:
-                    try:
-                        # make the directory
-                        path = os.path.dirname(snapshot_directory)
-                        if not os.path.exists(path):
-                            os.makedirs(path)
-                        # try to download the file.
-                    except Exception as e:
-                        # If we can't create the thumbnail, just log
-                        self.Settings.current_debug_profile().log_exception(e)
-                        self.ErrorMessage = (
-                            "Snapshot Download - An unexpected exception occurred.  "
-                            "Check the log file (plugin_octolapse.log) for details."
-                        )
-                        self.HasError = True
-                else:
-                    self.ErrorMessage = "Snapshot Download - failed with status code:{0}".format(
-                        r.status_code)
-                    self.HasError = True
-
-            if not self.HasError:
-                try:
-                    with i_open(snapshot_directory, 'wb') as snapshot_file:
-                        for chunk in r.iter_content(1024):
-                            if chunk:
-                                snapshot_file.write(chunk)
-                        self.Settings.current_debug_profile().log_snapshot_save(
-                            "Snapshot - Snapshot saved to disk at {0}".format(snapshot_directory))
-                except Exception as e:
-                    # If we can't create the thumbnail, just log
-                    self.Settings.current_debug_profile().log_exception(e)
-                    self.ErrorMessage = (
-                        "Snapshot Download - An unexpected exception occurred.  "
-                        "Check the log file (plugin_octolapse.log) for details."
-                    )
-                    self.HasError = True
-
-            # go ahead and report success or fail for the timelapse routine
-            if not self.HasError:
-                self.on_success()
-            else:
-                self.on_fail()
-
-            # transpose image if this is enabled.
-            if not self.HasError:
-                try:
-                    transpose_method = None
-                    if self.SnapshotTranspose is not None and self.SnapshotTranspose != "":
-                        if self.SnapshotTranspose == 'flip_left_right':
-                            transpose_method = Image.FLIP_LEFT_RIGHT
-                        elif self.SnapshotTranspose == 'flip_top_bottom':
-                            transpose_method = Image.FLIP_TOP_BOTTOM
-                        elif self.SnapshotTranspose == 'rotate_90':
-                            transpose_method = Image.ROTATE_90
-                        elif self.SnapshotTranspose == 'rotate_180':
-                            transpose_method = Image.ROTATE_180
-                        elif self.SnapshotTranspose == 'rotate_270':
-                            transpose_method = Image.ROTATE_270
-                        elif self.SnapshotTranspose == 'transpose':
-                            transpose_method = Image.TRANSPOSE
-
-                        if transpose_method is not None:
-                            im = Image.open(snapshot_directory)
-                            im = im.transpose(transpose_method)
-                            im.save(snapshot_directory)
-                except IOError as e:
-                    # If we can't create the thumbnail, just log
-                    self.Settings.current_debug_profile().log_exception(e)
-                    self.ErrorMessage = (
-                        "Snapshot transpose - An unexpected IOException occurred.  "
-                        "Check the log file (plugin_octolapse.log) for details."
-                    )
-                    self.HasError = True
-
-            if not self.HasError:
-                # this call renames the snapshot so that it is
-                # sequential (prob could just sort by create date
-                # instead, todo). returns true on success.
-                self.HasError = not self._move_rename_snapshot_sequential()
-
-            # create a thumbnail and save the current snapshot as the most recent snapshot image
-            if not self.HasError:
-
-                try:
-                    # without this I get errors during load (happens in resize, where the image is actually loaded)
-                    ImageFile.LOAD_TRUNCATED_IMAGES = True
-                    #######################################
-
-                    # create a copy to be used for the full sized latest snapshot image.
-                    latest_snapshot_path = utility.get_latest_snapshot_download_path(
-                        self.DataDirectory
-                    )
-                    shutil.copy(self.SnapshotInfo.get_full_path(
-                        self.SnapshotNumber), latest_snapshot_path)
-                    # create a thumbnail of the image
-
-                    basewidth = 300
-                    img = Image.open(latest_snapshot_path)
-                    wpercent = (basewidth / float(img.size[0]))
-                    hsize = int((float(img.size[1]) * float(wpercent)))
-                    img = img.resize((basewidth, hsize), Image.ANTIALIAS)
-                    img.save(utility.get_latest_snapshot_thumbnail_download_path(
-                        self.DataDirectory), "JPEG")
-                except Exception as e:
-                    # If we can't create the thumbnail, just log
-                    self.Settings.current_debug_profile().log_exception(e)
-                    self.ErrorMessage = (
-                        "Create latest snapshot and thumbnail - An unexpected exception occurred.  "
-                        "Check the log file (plugin_octolapse.log) for details."
-                    )
-                    self.HasError = True
+        self.Statistics.add("post_processing", time() - post_processing_start_time)
+        self.on_complete()
+        self.Settings.current_debug_profile().log_snapshot_download("Snapshot Download Job completed.")
+
+    def _save_latest_snapshot(self):
+        # without this I get errors during load (happens in resize, where the image is actually loaded)
+        ImageFile.LOAD_TRUNCATED_IMAGES = True
+        #######################################
+
+        # Link the full sized latest snapshot image to the snapshot rather than copying it.  Keep the bytes so that
+        # the snapshot route can serve them from memory.
+        latest_snapshot_path = utility.get_latest_snapshot_download_path(self.DataDirectory)
+        if self.Container is None:
+            thumbnail_source = self.SnapshotInfo.get_full_path(self.SnapshotNumber)
+            with i_open(thumbnail_source, 'rb') as snapshot_file:
+                image = snapshot_file.read()
+            self.Writer.link(thumbnail_source, latest_snapshot_path)
+        else:
+            # there is no file to link to
+            image = self.Image
+            self.Writer.write(latest_snapshot_path, [image])
+            thumbnail_source = BytesIO(image)
+        # create a thumbnail of the image
+        thumbnail_start_time = time()
+        # snapshots that were only tagged with an exif orientation are transposed here, after the resize
+        transpose = None
+        if self.AppliedTransposeMethod == image_transpose.TRANSPOSE_METHOD_EXIF:
+            transpose = self.SnapshotTranspose
+        thumbnail = create_thumbnail(
+            thumbnail_source,
+            utility.get_latest_snapshot_thumbnail_download_path(self.DataDirectory),
+            self.ThumbnailWidth,
+            self.ThumbnailQuality,
+            transpose
+        )
+        self.Statistics.add("thumbnail", time() - thumbnail_start_time)
+        return image, thumbnail
 
-            self.on_complete()
+    def _skip_snapshot(self):
+        # The container and the render hold every later frame until each earlier snapshot number has been added.
+        try:
+            if self.Container is not None:
+                self.Container.append(self.SnapshotNumber, None)
+            if self.StreamingRender is not None:
+                self.StreamingRender.append(self.SnapshotNumber, None)
+        except Exception as e:
+            self.Settings.current_debug_profile().log_exception(e)
+
+    def _add_to_streaming_render(self):
+        # Like the container, the render needs every snapshot number, even if the image can't be read.  If anything
+        # goes wrong the timelapse is rendered after the print instead.
+        image = self.Image
+        try:
+            if self.Container is None:
+                with i_open(self.SnapshotInfo.get_full_path(self.SnapshotNumber), 'rb') as snapshot_file:
+                    image = snapshot_file.read()
+        except (IOError, OSError) as e:
+            self.Settings.current_debug_profile().log_exception(e)
+            image = None
+        try:
+            self.StreamingRender.append(self.SnapshotNumber, image)
+        except Exception as e:
+            self.Settings.current_debug_profile().log_exception(e)
+
+    def _get_snapshot_location(self):
+        if self.Container is None:
+            return self.SnapshotInfo.get_full_path(self.SnapshotNumber)
+        return self.Container.Path
+
+    def _save_snapshot(self, chunks):
+        if self.Container is None:
+            self.Writer.write(self.SnapshotInfo.get_full_path(self.SnapshotNumber), chunks)
+        else:
+            self.Image = b"".join(chunks)
+
+    def _download_snapshot(self, snapshot_path):
+        r = None
+        try:
             self.Settings.current_debug_profile().log_snapshot_download(
-                "Starting Snapshot Download Job completed, signaling task queue.")
-            self.task_queue.get()
-            self.task_queue.task_done()
-
-
-    def _move_rename_snapshot_sequential(self):
-        # get the save path
-        # get the current file name
-        new_snapshot_name = self.SnapshotInfo.get_full_path(self.SnapshotNumber)
-        self.Settings.current_debug_profile().log_snapshot_save(
-            "Renaming snapshot {0} to {1}".format(self.SnapshotInfo.get_temp_full_path(), new_snapshot_name))
-        # create the output directory if it does not exist
+                "Snapshot - downloading from {0:s} to {1:s}.".format(self.Url, snapshot_path))
+            r = camera.session_pool.get(self.Camera, self.Url, self.TimeoutSeconds, stream=True)
+        except Exception as e:
+            # If we can't create the thumbnail, just log
+            self.Settings.current_debug_profile().log_exception(e)
+            self.ErrorMessage = (
+                "Snapshot Download - An unexpected exception occurred.  "
+                "Check the log file (plugin_octolapse.log) for details."
+            )
+            self.HasError = True
+            return
+
         try:
-            temp_snapshot_path = os.path.dirname(new_snapshot_name)
-            latest_snapshot_path = utility.get_snapshot_directory(
-                self.DataDirectory)
-            if not os.path.exists(temp_snapshot_path):
-                os.makedirs(temp_snapshot_path)
-            if not os.path.exists(latest_snapshot_path):
-                os.makedirs(latest_snapshot_path)
-            # rename the current file
-            shutil.move(self.SnapshotInfo.get_temp_full_path(), new_snapshot_name)
-            self.SnapshotSuccess = True
-            return True
+            if r.status_code != requests.codes.ok:
+                self.ErrorMessage = "Snapshot Download - failed with status code:{0}".format(
+                    r.status_code)
+                self.HasError = True
+                return
+            # the response body is streamed directly into the snapshot file
+            self._save_snapshot(r.iter_content(65536))
+            self.Settings.current_debug_profile().log_snapshot_save(
+                "Snapshot - Snapshot saved to disk at {0}".format(snapshot_path))
         except Exception as e:
+            # If we can't create the thumbnail, just log
             self.Settings.current_debug_profile().log_exception(e)
+            self.ErrorMessage = (
+                "Snapshot Download - An unexpected exception occurred.  "
+                "Check the log file (plugin_octolapse.log) for details."
+            )
+            self.HasError = True
+        finally:
+            # return the connection to the camera's session
+            r.close()
 
-        return False
+
+class StreamSnapshotJob(SnapshotJob):
+    # Takes the snapshot from a running MJPEG stream.  The job is created as soon as the printer has parked, so the
+    # snapshot is the first frame received at least the camera delay after that, and no sleep or request is needed.
+    def __init__(
+            self, settings, data_directory, snapshot_number,
+            snapshot_info, stream_grabber, snapshot_guid,
+            delay_ms, timeout_seconds, on_complete, on_success, on_fail,
+            post_processing_pool=None, statistics=None, latest_snapshot=None, writer=None,
+            container=None, streaming_render=None
+    ):
+        super(StreamSnapshotJob, self).__init__(
+            settings, data_directory, snapshot_number, snapshot_info, stream_grabber.Url, snapshot_guid,
+            0, timeout_seconds, on_complete, on_success, on_fail,
+            post_processing_pool=post_processing_pool, statistics=statistics, latest_snapshot=latest_snapshot,
+            writer=writer, container=container, streaming_render=streaming_render
+        )
+        self.StreamGrabber = stream_grabber
+        self.ParkTime = time()
+        self.FrameAfterTime = self.ParkTime + delay_ms / 1000.0
+
+    def _download_snapshot(self, snapshot_path):
+        received = self.StreamGrabber.get_frame_after(
+            self.FrameAfterTime, max(0, self.FrameAfterTime - time()) + self.TimeoutSeconds)
+        if received is None:
+            self.ErrorMessage = "Snapshot Stream - No frame was received from {0} within {1} seconds.".format(
+                self.Url, self.TimeoutSeconds)
+            self.HasError = True
+            return
+        receive_time, frame = received
+        self.Settings.current_debug_profile().log_snapshot_download(
+            "Snapshot - took a frame received {0:.3f} seconds after the printer parked from {1}.".format(
+                receive_time - self.ParkTime, self.Url))
+        try:
+            self._save_snapshot([frame])
+            self.Settings.current_debug_profile().log_snapshot_save(
+                "Snapshot - Snapshot saved to disk at {0}".format(snapshot_path))
+        except Exception as e:
+            self.Settings.current_debug_profile().log_exception(e)
+            self.ErrorMessage = (
+                "Snapshot Stream - An unexpected exception occurred.  "
+                "Check the log file (plugin_octolapse.log) for details."
+            )
+            self.HasError = True
+
+
+def create_thumbnail(source_path, thumbnail_path, width, quality, transpose=None):
+    img = Image.open(source_path)
+    source_width, source_height = img.size
+    swap_axes = transpose in image_transpose.AXIS_SWAPPING_TRANSPOSES
+    if swap_axes:
+        source_width, source_height = source_height, source_width
+    height = max(1, int(round(source_height * width / float(source_width))))
+    size = (height, width) if swap_axes else (width, height)
+    # Ask the jpeg decoder for the smallest 1/2, 1/4 or 1/8 scale that is still at least the thumbnail size, so
+    # that a large frame is never fully decoded.  This must happen before the image is loaded.
+    img.draft(None, size)
+    img = img.resize(size, Image.ANTIALIAS)
+    if transpose is not None and transpose in image_transpose.PIL_TRANSPOSE_METHODS:
+        img = img.transpose(image_transpose.PIL_TRANSPOSE_METHODS[transpose])
+    thumbnail = BytesIO()
+    img.save(thumbnail, "JPEG", quality=quality)
+    with i_open(thumbnail_path, 'wb') as thumbnail_file:
+        thumbnail_file.write(thumbnail.getvalue())
+    return thumbnail.getvalue()
+
+
+class SnapshotStatistics(object):
+    # Timing for each snapshot stage, shared by every job of a timelapse.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def add(self, stage, seconds):
+        with self._lock:
+            if stage not in self._stages:
+                self._stages[stage] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            statistics = self._stages[stage]
+            statistics["count"] += 1
+            statistics["total"] += seconds
+            statistics["max"] = max(statistics["max"], seconds)
+            statistics["last"] = seconds
+
+    def get_statistics(self):
+        with self._lock:
+            return dict(
+                (stage, {
+                    "count": statistics["count"],
+                    "average": statistics["total"] / statistics["count"],
+                    "max": statistics["max"],
+                    "last": statistics["last"]
+                })
+                for stage, statistics in self._stages.items()
+            )
+
+
+class LatestSnapshot(object):
+    # Snapshots may finish post processing out of order, so only let a newer snapshot replace the latest snapshot
+    # image and thumbnail.  on_changed is called with the new cache version once the cache holds the new images, so
+    # that a browser never asks for a version before it can be served.
+    def __init__(self, cache=None, on_changed=None):
+        self._lock = threading.Lock()
+        self.SnapshotNumber = -1
+        self.Cache = cache if cache is not None else latest_snapshot_cache
+        self.OnChangedCallback = on_changed
+
+    def update(self, snapshot_number, save_latest_snapshot):
+        with self._lock:
+            if snapshot_number < self.SnapshotNumber:
+                return False
+            images = save_latest_snapshot()
+            self.SnapshotNumber = snapshot_number
+            if images is not None:
+                version = self.Cache.set_images(*images)
+                if self.OnChangedCallback is not None:
+                    self.OnChangedCallback(version)
+            return True
+
+
+class LatestSnapshotCache(object):
+    # Holds the bytes of the newest snapshot image and thumbnail so that every browser polling the snapshot route
+    # can be answered from memory, or with a 304 if it already has the current version.
+    def __init__(self):
+        self._lock = threading.Lock()
+        # The etag includes a token that is unique to this process so that a version number from before a restart
+        # is never mistaken for the current image.
+        self._token = uuid.uuid4().hex[:12]
+        self.Version = 0
+        self._image = None
+        self._thumbnail = None
+
+    def set_images(self, image, thumbnail):
+        with self._lock:
+            self.Version += 1
+            self._image = image
+            self._thumbnail = thumbnail
+            return self.Version
+
+    def get_etag(self):
+        return "{0}-{1}".format(self._token, self.Version)
+
+    def get_image(self, thumbnail, path=None):
+        """Returns (etag, image bytes) for the latest image or thumbnail.  If nothing has been cached since startup,
+        the image is loaded from path when it exists.  Returns (None, None) when there is no image."""
+        with self._lock:
+            image = self._thumbnail if thumbnail else self._image
+            if image is None and path is not None and os.path.isfile(path):
+                with i_open(path, 'rb') as image_file:
+                    image = image_file.read()
+                if thumbnail:
+                    self._thumbnail = image
+                else:
+                    self._image = image
+            if image is None:
+                return None, None
+            return self.get_etag(), image
+
+
+# shared by every timelapse so that the snapshot route always has the most recent image
+latest_snapshot_cache = LatestSnapshotCache()
 
 
 class SnapshotInfo(object):
     def __init__(self, printer_file_name, print_start_time):
         self._printerFileName = printer_file_name
         self._printStartTime = print_start_time
-        self.FileName = ""
         self.DirectoryName = ""
 
-    def get_temp_full_path(self):
-        return "{0}{1}{2}".format(self.DirectoryName, os.sep, self.FileName)
-
     def get_full_path(self, snapshot_number):
         return "{0}{1}".format(
             self.DirectoryName,
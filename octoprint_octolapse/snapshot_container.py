@@ -0,0 +1,150 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+
+
+import os
+import struct
+import threading
+from io import open as i_open
+
+# each index record is the offset and length of one frame within the container
+INDEX_RECORD = struct.Struct("<QI")
+
+
+class SnapshotSequence(object):
+    # Hands images to _write_frame in snapshot number order.  Post processing can finish out of order, so an image
+    # that arrives early is held until every earlier snapshot number has been added.
+    def __init__(self):
+        self._lock = threading.Lock()
+        # frames that finished post processing before an earlier frame, by snapshot number
+        self._pending = {}
+        self._next_snapshot_number = 0
+
+    def append(self, snapshot_number, image):
+        """Adds the image for snapshot_number.  Pass None as the image to give up a snapshot number without adding
+        a frame.  Returns the number of frames written."""
+        with self._lock:
+            if snapshot_number < self._next_snapshot_number or snapshot_number in self._pending:
+                raise ValueError("Snapshot number {0} was already added.".format(snapshot_number))
+            self._pending[snapshot_number] = image
+            frames_written = 0
+            while self._next_snapshot_number in self._pending:
+                image = self._pending.pop(self._next_snapshot_number)
+                self._next_snapshot_number += 1
+                if image is not None:
+                    self._write_frame(image)
+                    frames_written += 1
+            return frames_written
+
+    def _write_frame(self, image):
+        raise NotImplementedError()
+
+
+class SnapshotContainer(SnapshotSequence):
+    # Stores every snapshot of a timelapse in one file of concatenated jpegs (a raw MJPEG stream that ffmpeg can read
+    # directly), plus a small index of the offset and length of each frame.  Long prints otherwise leave tens of
+    # thousands of loose files that must each be probed, renamed and deleted.
+    def __init__(self, path):
+        super(SnapshotContainer, self).__init__()
+        self.Path = path
+        self.IndexPath = get_index_path(path)
+        self._data_file = None
+        self._index_file = None
+        self._size = 0
+        self._frame_count = 0
+
+    def get_frame_count(self):
+        with self._lock:
+            if self._index_file is not None:
+                return self._frame_count
+        return get_frame_count(self.Path)
+
+    def close(self):
+        with self._lock:
+            for container_file in (self._data_file, self._index_file):
+                if container_file is not None:
+                    container_file.close()
+            self._data_file = None
+            self._index_file = None
+
+    def _open(self):
+        if not os.path.isdir(os.path.dirname(self.Path)):
+            os.makedirs(os.path.dirname(self.Path))
+        self._data_file = i_open(self.Path, 'ab')
+        self._index_file = i_open(self.IndexPath, 'ab')
+        # Drop anything that was written after the last complete index record, for example if the server lost power
+        # part way through an append.
+        index_size = self._index_file.seek(0, os.SEEK_END)
+        self._frame_count = index_size // INDEX_RECORD.size
+        self._size = 0
+        if self._frame_count > 0:
+            offset, length = read_index_record(self.IndexPath, self._frame_count - 1)
+            self._size = offset + length
+        self._index_file.truncate(self._frame_count * INDEX_RECORD.size)
+        self._data_file.truncate(self._size)
+        self._data_file.seek(self._size)
+        self._index_file.seek(self._frame_count * INDEX_RECORD.size)
+
+    def _write_frame(self, image):
+        if self._data_file is None:
+            self._open()
+        # the frame must be on disk before the index points at it
+        self._data_file.write(image)
+        self._data_file.flush()
+        os.fsync(self._data_file.fileno())
+        self._index_file.write(INDEX_RECORD.pack(self._size, len(image)))
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+        self._size += len(image)
+        self._frame_count += 1
+
+
+def get_index_path(path):
+    return "{0}.index".format(path)
+
+
+def get_frame_count(path):
+    index_path = get_index_path(path)
+    if not os.path.isfile(index_path):
+        return 0
+    return os.path.getsize(index_path) // INDEX_RECORD.size
+
+
+def read_index_record(index_path, frame_index):
+    with i_open(index_path, 'rb') as index_file:
+        index_file.seek(frame_index * INDEX_RECORD.size)
+        return INDEX_RECORD.unpack(index_file.read(INDEX_RECORD.size))
+
+
+def read_frame(path, frame_index):
+    offset, length = read_index_record(get_index_path(path), frame_index)
+    with i_open(path, 'rb') as data_file:
+        data_file.seek(offset)
+        return data_file.read(length)
+
+
+def remove(path):
+    for remove_path in (path, get_index_path(path)):
+        if os.path.isfile(remove_path):
+            os.remove(remove_path)
@@ -0,0 +1,111 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+
+
+import errno
+import os
+import shutil
+import threading
+import uuid
+from io import open as i_open
+
+
+class SnapshotWriter(object):
+    # Writes every snapshot exactly once, directly to its final sequential file name.  The image is streamed into a
+    # temporary file in the same directory, synced to disk, then renamed, so a failed or interrupted capture never
+    # leaves a partial frame behind and the snapshot number can be reused by the next capture.
+    def __init__(self):
+        self._lock = threading.Lock()
+        # directories are only created the first time they are used by this writer, which is once per timelapse
+        self._directories = set()
+
+    def make_directory(self, directory):
+        with self._lock:
+            if directory in self._directories:
+                return
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            self._directories.add(directory)
+
+    def write(self, path, chunks):
+        """Writes each chunk to the file at path and returns the number of bytes written."""
+        self.make_directory(os.path.dirname(path))
+        temp_path = _get_temp_path(path)
+        bytes_written = 0
+        try:
+            with i_open(temp_path, 'wb') as snapshot_file:
+                for chunk in chunks:
+                    if chunk:
+                        snapshot_file.write(chunk)
+                        bytes_written += len(chunk)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            replace_file(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return bytes_written
+
+    def link(self, source_path, link_path):
+        """Makes link_path refer to the same image as source_path.  A hard link is used when the file system
+        supports it, else the file is copied.  Returns True if a hard link was created."""
+        self.make_directory(os.path.dirname(link_path))
+        temp_path = _get_temp_path(link_path)
+        linked = False
+        try:
+            if hasattr(os, 'link'):
+                try:
+                    os.link(source_path, temp_path)
+                    linked = True
+                except OSError:
+                    # FAT formatted sd cards, for example, don't support hard links
+                    pass
+            if not linked:
+                shutil.copyfile(source_path, temp_path)
+            replace_file(temp_path, link_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return linked
+
+
+def replace_file(source_path, destination_path):
+    try:
+        os.rename(source_path, destination_path)
+    except OSError:
+        # windows won't rename over an existing file
+        if not os.path.exists(destination_path):
+            raise
+        os.remove(destination_path)
+        os.rename(source_path, destination_path)
+
+
+def _get_temp_path(path):
+    # in the same directory as path so that the final rename never has to copy the file
+    return "{0}.{1}.tmp".format(path, uuid.uuid4().hex)
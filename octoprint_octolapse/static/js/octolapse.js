@@ -423,11 +423,28 @@ $(function () {
         self.show_trigger_state_changes = ko.observable(false);
         self.auto_reload_latest_snapshot = ko.observable(false);
         self.auto_reload_frames = ko.observable(5);
+        self.thumbnail_width = ko.observable(300);
+        self.thumbnail_quality = ko.observable(75);
         self.is_admin = ko.observable(false);
         self.enabled = ko.observable(false);
         self.navbar_enabled = ko.observable(false);
         self.show_navbar_when_not_printing = ko.observable(false);
         self.show_real_snapshot_time = ko.observable(false);
+        self.snapshot_worker_count = ko.observable(1);
+        self.snapshot_queue_size = ko.observable(5);
+        self.post_processing_worker_count = ko.observable(1);
+        self.post_processing_queue_size = ko.observable(20);
+        self.use_snapshot_container = ko.observable(false);
+        self.render_worker_count = ko.observable(1);
+        self.render_segment_count = ko.observable(1);
+        self.render_nice_level = ko.observable(10);
+        self.render_io_class = ko.observable("idle");
+        self.render_cpu_affinity = ko.observable("");
+        self.render_memory_limit = ko.observable(0);
+        self.render_time_limit = ko.observable(0);
+        self.pause_rendering_while_printing = ko.observable(true);
+        self.callback_worker_count = ko.observable(1);
+        self.state_message_interval = ko.observable(1.0);
 
         self.version = ko.observable("unknown");
         // Create a guid to uniquely identify this client.
@@ -558,6 +575,16 @@ $(function () {
                 self.auto_reload_frames(settings.auto_reload_frames());
             else
                 self.auto_reload_frames(settings.auto_reload_frames);
+
+            if (ko.isObservable(settings.thumbnail_width))
+                self.thumbnail_width(settings.thumbnail_width());
+            else
+                self.thumbnail_width(settings.thumbnail_width);
+
+            if (ko.isObservable(settings.thumbnail_quality))
+                self.thumbnail_quality(settings.thumbnail_quality());
+            else
+                self.thumbnail_quality(settings.thumbnail_quality);
             // navbar_enabled
             if (ko.isObservable(settings.show_navbar_icon))
                 self.navbar_enabled(settings.show_navbar_icon());
@@ -595,6 +622,81 @@ $(function () {
             else
                 self.show_real_snapshot_time(settings.show_real_snapshot_time)
 
+            if (ko.isObservable(settings.snapshot_worker_count))
+                self.snapshot_worker_count(settings.snapshot_worker_count());
+            else
+                self.snapshot_worker_count(settings.snapshot_worker_count);
+
+            if (ko.isObservable(settings.snapshot_queue_size))
+                self.snapshot_queue_size(settings.snapshot_queue_size());
+            else
+                self.snapshot_queue_size(settings.snapshot_queue_size);
+
+            if (ko.isObservable(settings.post_processing_worker_count))
+                self.post_processing_worker_count(settings.post_processing_worker_count());
+            else
+                self.post_processing_worker_count(settings.post_processing_worker_count);
+
+            if (ko.isObservable(settings.post_processing_queue_size))
+                self.post_processing_queue_size(settings.post_processing_queue_size());
+            else
+                self.post_processing_queue_size(settings.post_processing_queue_size);
+
+            if (ko.isObservable(settings.use_snapshot_container))
+                self.use_snapshot_container(settings.use_snapshot_container());
+            else
+                self.use_snapshot_container(settings.use_snapshot_container);
+
+            if (ko.isObservable(settings.render_worker_count))
+                self.render_worker_count(settings.render_worker_count());
+            else
+                self.render_worker_count(settings.render_worker_count);
+
+            if (ko.isObservable(settings.render_segment_count))
+                self.render_segment_count(settings.render_segment_count());
+            else
+                self.render_segment_count(settings.render_segment_count);
+
+            if (ko.isObservable(settings.render_nice_level))
+                self.render_nice_level(settings.render_nice_level());
+            else
+                self.render_nice_level(settings.render_nice_level);
+
+            if (ko.isObservable(settings.render_io_class))
+                self.render_io_class(settings.render_io_class());
+            else
+                self.render_io_class(settings.render_io_class);
+
+            if (ko.isObservable(settings.render_cpu_affinity))
+                self.render_cpu_affinity(settings.render_cpu_affinity());
+            else
+                self.render_cpu_affinity(settings.render_cpu_affinity);
+
+            if (ko.isObservable(settings.render_memory_limit))
+                self.render_memory_limit(settings.render_memory_limit());
+            else
+                self.render_memory_limit(settings.render_memory_limit);
+
+            if (ko.isObservable(settings.render_time_limit))
+                self.render_time_limit(settings.render_time_limit());
+            else
+                self.render_time_limit(settings.render_time_limit);
+
+            if (ko.isObservable(settings.pause_rendering_while_printing))
+                self.pause_rendering_while_printing(settings.pause_rendering_while_printing());
+            else
+                self.pause_rendering_while_printing(settings.pause_rendering_while_printing);
+
+            if (ko.isObservable(settings.callback_worker_count))
+                self.callback_worker_count(settings.callback_worker_count());
+            else
+                self.callback_worker_count(settings.callback_worker_count);
+
+            if (ko.isObservable(settings.state_message_interval))
+                self.state_message_interval(settings.state_message_interval());
+            else
+                self.state_message_interval(settings.state_message_interval);
+
 
         };
         // Handle Plugin Messages from Server
@@ -696,6 +798,14 @@ $(function () {
                         self.updateState(data);
                         Octolapse.Status.snapshot_error(!data.success);
                         Octolapse.Status.snapshot_error_message(data.error);
+                    }
+                    break;
+                case "latest-snapshot-changed":
+                    {
+                        //console.log('octolapse.js - latest-snapshot-changed');
+                        // the messages can arrive out of order, so never go back to an older version
+                        Octolapse.Status.snapshot_version(
+                            Math.max(data.snapshot_version, Octolapse.Status.snapshot_version()));
                         if (!Octolapse.HasTakenFirstSnapshot) {
                             Octolapse.HasTakenFirstSnapshot = true;
                             Octolapse.Status.erasePreviousSnapshotImages('octolapse_snapshot_image_container',true);
@@ -750,6 +860,18 @@ $(function () {
                         //console.log('octolapse.js - render-complete');
                     }
                     break;
+                case "render-queue-changed":
+                    {
+                        //console.log('octolapse.js - render-queue-changed');
+                        self.updateState(data);
+                    }
+                    break;
+                case "render-progress":
+                    {
+                        //console.log('octolapse.js - render-progress');
+                        Octolapse.Status.updateRenderProgress(data.job_id, data.progress);
+                    }
+                    break;
                 case "render-end":
                     {
                         //console.log('octolapse.js - render-end');
@@ -29,10 +29,14 @@ $(function() {
         self.name = ko.observable(values.name);
         self.description = ko.observable(values.description);
         self.delay = ko.observable(values.delay);
+        self.timeout_ms = ko.observable(values.timeout_ms);
         self.apply_settings_before_print = ko.observable(values.apply_settings_before_print);
         self.address = ko.observable(values.address);
         self.snapshot_request_template = ko.observable(values.snapshot_request_template);
+        self.use_mjpeg_stream = ko.observable(values.use_mjpeg_stream);
+        self.stream_request_template = ko.observable(values.stream_request_template);
         self.snapshot_transpose = ko.observable(values.snapshot_transpose);
+        self.snapshot_transpose_method = ko.observable(values.snapshot_transpose_method);
         self.ignore_ssl_error = ko.observable(values.ignore_ssl_error);
         self.username = ko.observable(values.username);
         self.password = ko.observable(values.password);
@@ -123,6 +127,7 @@ $(function() {
     Octolapse.CameraProfileValidationRules = {
         rules: {
             snapshot_request_template: { octolapseSnapshotTemplate: true },
+            stream_request_template: { octolapseSnapshotTemplate: true },
             brightness_request_template: { octolapseCameraRequestTemplate: true },
             contrast_request_template: { octolapseCameraRequestTemplate: true },
             saturation_request_template: { octolapseCameraRequestTemplate: true },
@@ -63,6 +63,8 @@ $(function() {
         self.gcode_sent_all = ko.observable(values.gcode_sent_all);
         self.gcode_queuing_all = ko.observable(values.gcode_queuing_all);
         self.gcode_received_all = ko.observable(values.gcode_received_all);
+        self.gcode_parse_cache_statistics = ko.observable(values.gcode_parse_cache_statistics);
+        self.gcode_parse_cache_size = ko.observable(values.gcode_parse_cache_size);
 
     };
     Octolapse.DebugProfileValidationRules = {
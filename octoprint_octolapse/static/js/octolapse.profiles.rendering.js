@@ -36,6 +36,7 @@ $(function() {
         self.min_fps = ko.observable(values.min_fps);
         self.output_format = ko.observable(values.output_format);
         self.sync_with_timelapse = ko.observable(values.sync_with_timelapse);
+        self.render_during_print = ko.observable(values.render_during_print);
         self.bitrate = ko.observable(values.bitrate);
         self.flip_h = ko.observable(values.flip_h);
         self.flip_v = ko.observable(values.flip_v);
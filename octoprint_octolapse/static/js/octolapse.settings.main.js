@@ -36,6 +36,8 @@ $(function () {
         self.is_octolapse_enabled = ko.observable();
         self.auto_reload_latest_snapshot = ko.observable();
         self.auto_reload_frames = ko.observable();
+        self.thumbnail_width = ko.observable();
+        self.thumbnail_quality = ko.observable();
         self.show_navbar_icon = ko.observable();
         self.show_navbar_when_not_printing = ko.observable();
         self.show_real_snapshot_time = ko.observable();
@@ -43,6 +45,21 @@ $(function () {
         self.show_position_changes = ko.observable();
         self.show_extruder_state_changes = ko.observable();
         self.show_trigger_state_changes = ko.observable();
+        self.snapshot_worker_count = ko.observable();
+        self.snapshot_queue_size = ko.observable();
+        self.post_processing_worker_count = ko.observable();
+        self.post_processing_queue_size = ko.observable();
+        self.use_snapshot_container = ko.observable();
+        self.render_worker_count = ko.observable();
+        self.render_segment_count = ko.observable();
+        self.render_nice_level = ko.observable();
+        self.render_io_class = ko.observable();
+        self.render_cpu_affinity = ko.observable();
+        self.render_memory_limit = ko.observable();
+        self.render_time_limit = ko.observable();
+        self.pause_rendering_while_printing = ko.observable();
+        self.callback_worker_count = ko.observable();
+        self.state_message_interval = ko.observable();
 
 
         // Informational Values
@@ -90,6 +107,8 @@ $(function () {
             self.is_octolapse_enabled(settings.is_octolapse_enabled);
             self.auto_reload_latest_snapshot(settings.auto_reload_latest_snapshot);
             self.auto_reload_frames(settings.auto_reload_frames);
+            self.thumbnail_width(settings.thumbnail_width);
+            self.thumbnail_quality(settings.thumbnail_quality);
             self.show_navbar_icon(settings.show_navbar_icon);
             self.show_navbar_when_not_printing(settings.show_navbar_when_not_printing);
             self.show_position_state_changes(settings.show_position_state_changes);
@@ -97,6 +116,21 @@ $(function () {
             self.show_extruder_state_changes(settings.show_extruder_state_changes);
             self.show_trigger_state_changes(settings.show_trigger_state_changes);
             self.show_real_snapshot_time(settings.show_real_snapshot_time);
+            self.snapshot_worker_count(settings.snapshot_worker_count);
+            self.snapshot_queue_size(settings.snapshot_queue_size);
+            self.post_processing_worker_count(settings.post_processing_worker_count);
+            self.post_processing_queue_size(settings.post_processing_queue_size);
+            self.use_snapshot_container(settings.use_snapshot_container);
+            self.render_worker_count(settings.render_worker_count);
+            self.render_segment_count(settings.render_segment_count);
+            self.render_nice_level(settings.render_nice_level);
+            self.render_io_class(settings.render_io_class);
+            self.render_cpu_affinity(settings.render_cpu_affinity);
+            self.render_memory_limit(settings.render_memory_limit);
+            self.render_time_limit(settings.render_time_limit);
+            self.pause_rendering_while_printing(settings.pause_rendering_while_printing);
+            self.callback_worker_count(settings.callback_worker_count);
+            self.state_message_interval(settings.state_message_interval);
             //self.platform(settings.platform());
 
 
@@ -133,6 +167,8 @@ $(function () {
             self.is_octolapse_enabled(Octolapse.Globals.enabled());
             self.auto_reload_latest_snapshot(Octolapse.Globals.auto_reload_latest_snapshot());
             self.auto_reload_frames(Octolapse.Globals.auto_reload_frames());
+            self.thumbnail_width(Octolapse.Globals.thumbnail_width());
+            self.thumbnail_quality(Octolapse.Globals.thumbnail_quality());
             self.show_navbar_icon(Octolapse.Globals.navbar_enabled());
             self.show_navbar_when_not_printing(Octolapse.Globals.show_navbar_when_not_printing());
             self.show_position_state_changes(Octolapse.Globals.show_position_state_changes());
@@ -140,6 +176,21 @@ $(function () {
             self.show_extruder_state_changes(Octolapse.Globals.show_extruder_state_changes());
             self.show_trigger_state_changes(Octolapse.Globals.show_trigger_state_changes());
             self.show_real_snapshot_time(Octolapse.Globals.show_real_snapshot_time());
+            self.snapshot_worker_count(Octolapse.Globals.snapshot_worker_count());
+            self.snapshot_queue_size(Octolapse.Globals.snapshot_queue_size());
+            self.post_processing_worker_count(Octolapse.Globals.post_processing_worker_count());
+            self.post_processing_queue_size(Octolapse.Globals.post_processing_queue_size());
+            self.use_snapshot_container(Octolapse.Globals.use_snapshot_container());
+            self.render_worker_count(Octolapse.Globals.render_worker_count());
+            self.render_segment_count(Octolapse.Globals.render_segment_count());
+            self.render_nice_level(Octolapse.Globals.render_nice_level());
+            self.render_io_class(Octolapse.Globals.render_io_class());
+            self.render_cpu_affinity(Octolapse.Globals.render_cpu_affinity());
+            self.render_memory_limit(Octolapse.Globals.render_memory_limit());
+            self.render_time_limit(Octolapse.Globals.render_time_limit());
+            self.pause_rendering_while_printing(Octolapse.Globals.pause_rendering_while_printing());
+            self.callback_worker_count(Octolapse.Globals.callback_worker_count());
+            self.state_message_interval(Octolapse.Globals.state_message_interval());
             var dialog = this;
             dialog.$editDialog = $("#octolapse_edit_settings_main_dialog");
             dialog.$editForm = $("#octolapse_edit_main_settings_form");
@@ -224,12 +275,29 @@ $(function () {
                     self.is_octolapse_enabled(true);
                     self.auto_reload_latest_snapshot(true);
                     self.auto_reload_frames(5);
+                    self.thumbnail_width(300);
+                    self.thumbnail_quality(75);
                     self.show_navbar_icon(true);
                     self.show_navbar_when_not_printing(false);
                     self.show_position_state_changes(false);
                     self.show_position_changes(false);
                     self.show_extruder_state_changes(false);
                     self.show_trigger_state_changes(false);
+                    self.snapshot_worker_count(1);
+                    self.snapshot_queue_size(5);
+                    self.post_processing_worker_count(1);
+                    self.post_processing_queue_size(20);
+                    self.use_snapshot_container(false);
+                    self.render_worker_count(1);
+                    self.render_segment_count(1);
+                    self.render_nice_level(10);
+                    self.render_io_class("idle");
+                    self.render_cpu_affinity("");
+                    self.render_memory_limit(0);
+                    self.render_time_limit(0);
+                    self.pause_rendering_while_printing(true);
+                    self.callback_worker_count(1);
+                    self.state_message_interval(1.0);
 
                 });
 
@@ -244,6 +312,8 @@ $(function () {
                             "is_octolapse_enabled": self.is_octolapse_enabled()
                             , "auto_reload_latest_snapshot": self.auto_reload_latest_snapshot()
                             , "auto_reload_frames": self.auto_reload_frames()
+                            , "thumbnail_width": self.thumbnail_width()
+                            , "thumbnail_quality": self.thumbnail_quality()
                             , "show_navbar_icon": self.show_navbar_icon()
                             , "show_navbar_when_not_printing": self.show_navbar_when_not_printing()
                             , "show_position_state_changes": self.show_position_state_changes()
@@ -251,6 +321,21 @@ $(function () {
                             , "show_extruder_state_changes": self.show_extruder_state_changes()
                             , "show_trigger_state_changes": self.show_trigger_state_changes()
                             , "show_real_snapshot_time": self.show_real_snapshot_time()
+                            , "snapshot_worker_count": self.snapshot_worker_count()
+                            , "snapshot_queue_size": self.snapshot_queue_size()
+                            , "post_processing_worker_count": self.post_processing_worker_count()
+                            , "post_processing_queue_size": self.post_processing_queue_size()
+                            , "use_snapshot_container": self.use_snapshot_container()
+                            , "render_worker_count": self.render_worker_count()
+                            , "render_segment_count": self.render_segment_count()
+                            , "render_nice_level": self.render_nice_level()
+                            , "render_io_class": self.render_io_class()
+                            , "render_cpu_affinity": self.render_cpu_affinity()
+                            , "render_memory_limit": self.render_memory_limit()
+                            , "render_time_limit": self.render_time_limit()
+                            , "pause_rendering_while_printing": self.pause_rendering_while_printing()
+                            , "callback_worker_count": self.callback_worker_count()
+                            , "state_message_interval": self.state_message_interval()
                             , "client_id": Octolapse.Globals.client_id
                         };
                         //console.log("Saving main settings.")
@@ -35,9 +35,12 @@ $(function () {
             self.current_snapshot_time = ko.observable(0);
             self.total_snapshot_time = ko.observable(0);
             self.snapshot_count = ko.observable(0);
+            self.snapshot_version = ko.observable(0);
             self.snapshot_error = ko.observable(false);
             self.snapshot_error_message = ko.observable("");
             self.waiting_to_render = ko.observable();
+            self.render_jobs = ko.observableArray([]);
+            self.is_rendering_paused = ko.observable(false);
             self.current_printer_profile_guid = ko.observable();
             self.current_stabilization_profile_guid = ko.observable();
             self.current_snapshot_profile_guid = ko.observable();
@@ -188,7 +191,7 @@ $(function () {
                     }
                 }
                 self.updateSnapshotAnimation('octolapse_snapshot_thumbnail_container', getLatestSnapshotThumbnailUrl()
-                    + "&time=" + new Date().getTime());
+                    + "&version=" + self.snapshot_version());
 
             };
 
@@ -334,7 +337,7 @@ $(function () {
                         return
                     }
                 }
-                self.updateSnapshotAnimation('octolapse_snapshot_image_container', getLatestSnapshotUrl() + "&time=" + new Date().getTime());
+                self.updateSnapshotAnimation('octolapse_snapshot_image_container', getLatestSnapshotUrl() + "&version=" + self.snapshot_version());
 
             };
 
@@ -401,11 +404,14 @@ $(function () {
             self.update = function (settings) {
                 self.is_timelapse_active(settings.is_timelapse_active);
                 self.snapshot_count(settings.snapshot_count);
+                self.snapshot_version(settings.snapshot_version);
                 self.is_taking_snapshot(settings.is_taking_snapshot);
                 self.is_rendering(settings.is_rendering);
                 self.total_snapshot_time(settings.total_snapshot_time);
                 self.current_snapshot_time(settings.current_snapshot_time);
                 self.waiting_to_render(settings.waiting_to_render);
+                self.render_jobs(settings.render_jobs);
+                self.is_rendering_paused(settings.is_rendering_paused);
                 //console.log("Updating Profiles");
                 self.profiles().printers(settings.profiles.printers);
                 self.profiles().stabilizations(settings.profiles.stabilizations);
@@ -450,6 +456,70 @@ $(function () {
                 }
             };
 
+            self.moveRenderJob = function (job, offset) {
+                if (Octolapse.Globals.is_admin()) {
+                    //console.log("octolapse.status.js - ButtonClick: moveRenderJob");
+                    var data = {
+                        "job_id": job.job_id,
+                        "index": self.render_jobs.indexOf(job) + offset
+                    };
+                    $.ajax({
+                        url: "./plugin/octolapse/moveRenderJob",
+                        type: "POST",
+                        data: JSON.stringify(data),
+                        contentType: "application/json",
+                        dataType: "json",
+                        error: function (XMLHttpRequest, textStatus, errorThrown) {
+                            alert("Unable to move the render job.  Status: " + textStatus + ".  Error: " + errorThrown);
+                        }
+                    });
+                }
+            };
+
+            self.updateRenderProgress = function (job_id, progress) {
+                var jobs = self.render_jobs();
+                for (var index = 0; index < jobs.length; index++) {
+                    if (jobs[index].job_id === job_id) {
+                        self.render_jobs.replace(jobs[index], $.extend({}, jobs[index], {"progress": progress}));
+                        return;
+                    }
+                }
+            };
+
+            self.getRenderJobStatus = function (job) {
+                if (self.is_rendering_paused())
+                    return "Paused";
+                if (!job.is_rendering)
+                    return "Queued";
+                if (!job.progress)
+                    return "Rendering";
+                var status = "Rendering " + Math.floor(job.progress.percent_complete) + "%";
+                if (job.progress.seconds_remaining !== null) {
+                    var date = new Date(null);
+                    date.setSeconds(Math.ceil(job.progress.seconds_remaining));
+                    status += ", " + date.toISOString().substr(11, 8) + " left";
+                }
+                return status;
+            };
+
+            self.cancelRenderJob = function (job) {
+                if (Octolapse.Globals.is_admin()) {
+                    //console.log("octolapse.status.js - ButtonClick: cancelRenderJob");
+                    if (confirm("Do you want to cancel rendering the timelapse for " + job.print_name + "?")) {
+                        $.ajax({
+                            url: "./plugin/octolapse/cancelRenderJob",
+                            type: "POST",
+                            data: JSON.stringify({"job_id": job.job_id}),
+                            contentType: "application/json",
+                            dataType: "json",
+                            error: function (XMLHttpRequest, textStatus, errorThrown) {
+                                alert("Unable to cancel the render job.  Status: " + textStatus + ".  Error: " + errorThrown);
+                            }
+                        });
+                    }
+                }
+            };
+
             self.snapshotTime = function () {
                 var date = new Date(null);
                 date.setSeconds(this.total_snapshot_time());
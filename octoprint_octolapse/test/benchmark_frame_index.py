@@ -0,0 +1,81 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import os
+import shutil
+import sys
+import time
+from tempfile import mkdtemp
+
+import octoprint_octolapse.frame_index as frame_index
+
+FILE_NAME_TEMPLATE = "print%06d.jpg"
+
+
+def count_by_probing(directory):
+    # how the render job used to count frames: one stat per snapshot number until one is missing
+    image_count = 0
+    while os.path.isfile(os.path.join(directory, FILE_NAME_TEMPLATE % image_count)):
+        image_count += 1
+    return image_count
+
+
+def count_by_scanning(directory):
+    return frame_index.create_frame_index(directory, FILE_NAME_TEMPLATE).get_frame_count()
+
+
+def drop_caches():
+    # on linux, running as root, the file system caches can be dropped so that every lookup goes to the disk
+    try:
+        os.system("sync")
+        with open("/proc/sys/vm/drop_caches", "w") as drop_caches_file:
+            drop_caches_file.write("3\n")
+        return True
+    except (IOError, OSError):
+        return False
+
+
+if __name__ == '__main__':
+    # usage: benchmark_frame_index.py [frame count] [work directory]
+    # Pass a work directory on the storage to measure, for example a network share or an sd card.
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    work_directory = mkdtemp(dir=sys.argv[2] if len(sys.argv) > 2 else None)
+    try:
+        for snapshot_number in range(num_frames):
+            with open(os.path.join(work_directory, FILE_NAME_TEMPLATE % snapshot_number), "wb") as snapshot_file:
+                snapshot_file.write(b"\xff\xd8\xff\xd9")
+        print("{0} frames in {1}".format(num_frames, work_directory))
+        for name, count in [("Probing", count_by_probing), ("Scanning", count_by_scanning)]:
+            for cache in ["cold", "warm"]:
+                if cache == "cold" and not drop_caches():
+                    continue
+                start_time = time.time()
+                image_count = count(work_directory)
+                print("{0}, {1} cache: {2} frames in {3:.3f}s".format(
+                    name, cache, image_count, time.time() - start_time))
+                assert image_count == num_frames
+        # a missing snapshot cuts the probed count short, but the scan still finds every other frame
+        os.remove(os.path.join(work_directory, FILE_NAME_TEMPLATE % (num_frames // 2)))
+        print("With snapshot {0} missing: probing found {1} frames, scanning found {2}".format(
+            num_frames // 2, count_by_probing(work_directory), count_by_scanning(work_directory)))
+    finally:
+        shutil.rmtree(work_directory)
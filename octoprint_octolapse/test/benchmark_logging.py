@@ -0,0 +1,68 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import time
+from tempfile import NamedTemporaryFile
+
+from octoprint_octolapse.settings import DebugProfile
+
+POSITION_CHANGE_TEMPLATE = (
+    "Position Change - {0} - {1} Move From(X:{2},Y:{3},Z:{4},E:{5}) - To(X:{6},Y:{7},Z:{8},E:{9}) "
+)
+POSITION_CHANGE_ARGS = (
+    "G1 X101.226 Y94.503 E0.03149", "Absolute", 100.5, 94.25, 0.2, 12.5, 101.226, 94.503, 0.2, 12.53149
+)
+
+
+def benchmark_eager(debug_profile, iterations):
+    start_time = time.time()
+    for i in range(0, iterations):
+        debug_profile.log_position_change(POSITION_CHANGE_TEMPLATE.format(*POSITION_CHANGE_ARGS))
+    return time.time() - start_time
+
+
+def benchmark_deferred(debug_profile, iterations):
+    start_time = time.time()
+    for i in range(0, iterations):
+        debug_profile.log_position_change(POSITION_CHANGE_TEMPLATE, *POSITION_CHANGE_ARGS)
+    return time.time() - start_time
+
+
+def benchmark_deferred_callable(debug_profile, iterations):
+    start_time = time.time()
+    for i in range(0, iterations):
+        debug_profile.log_position_change(lambda: POSITION_CHANGE_TEMPLATE.format(*POSITION_CHANGE_ARGS))
+    return time.time() - start_time
+
+
+if __name__ == '__main__':
+    num_iterations = 200000
+    # logging is disabled by default, which is how we run in production
+    profile = DebugProfile(NamedTemporaryFile().name)
+    for name, benchmark in [
+        ("eager", benchmark_eager),
+        ("deferred", benchmark_deferred),
+        ("deferred callable", benchmark_deferred_callable)
+    ]:
+        seconds = benchmark(profile, num_iterations)
+        print("{0}: {1} disabled log calls in {2:.3f} seconds, {3:.3f} microseconds per call.".format(
+            name, num_iterations, seconds, seconds / num_iterations * 1000000))
@@ -0,0 +1,84 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import time
+
+from octoprint_octolapse.gcode_parser import Commands
+
+# a rough mix of what a slicer produces, mostly extrusion and travel moves
+GCODE_LINES = [
+    "G1 X101.226 Y94.503 E0.03149",
+    "G1 X101.695 Y94.155 E0.02027",
+    "G1 X102.234 Y93.87 E0.02111",
+    "G0 F7200 X110.5 Y120.25",
+    "G1 E-1.5 F2400",
+    "G1 Z0.6 F9000",
+    "G1 E1.5 F2400",
+    "G1 F1800",
+    "M106 S255",
+    "M73 P12 R34",
+    "M204 S1000",
+    ";LAYER:3",
+    "G92 E0",
+    "M117 Printing...",
+    "g  0 x  10 0 ( y2 00 .0 ) y2 00 .0z (inline comment) 3.0 001 e1. 1 f72 00 .000; this is a comment",
+]
+
+
+# commands that Octolapse doesn't track
+UNTRACKED_GCODE_LINES = [
+    "M73 P12 R34",
+    "M204 S1000",
+    "M205 X8.00 Y8.00",
+    "M900 K0.05",
+    "T0",
+    "M117 Printing...",
+]
+
+
+def benchmark_parse(iterations=20000, gcode_lines=None):
+    if gcode_lines is None:
+        gcode_lines = GCODE_LINES
+
+    start_time = time.time()
+    for i in range(0, iterations):
+        for gcode in gcode_lines:
+            Commands.parse(gcode)
+    total_time = time.time() - start_time
+
+    num_lines = iterations * len(gcode_lines)
+    return num_lines, total_time
+
+
+if __name__ == '__main__':
+    cache_size = Commands.ParseCache.MaxSize
+    for name, test_lines, size in [
+        ("mixed (no cache)", GCODE_LINES, 0),
+        ("mixed", GCODE_LINES, cache_size),
+        ("untracked", UNTRACKED_GCODE_LINES, cache_size)
+    ]:
+        Commands.reset_skipped_command_counts()
+        Commands.ParseCache.clear()
+        Commands.ParseCache.resize(size)
+        lines, seconds = benchmark_parse(gcode_lines=test_lines)
+        print("Parsed {0} {1} lines in {2:.3f} seconds, {3:.0f} lines/sec, {4} skipped.".format(
+            lines, name, seconds, lines / seconds, sum(Commands.get_skipped_command_counts().values())))
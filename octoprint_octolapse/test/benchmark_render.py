@@ -0,0 +1,97 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import os
+import shutil
+import sys
+import time
+from tempfile import mkdtemp, NamedTemporaryFile
+
+from octoprint_octolapse.render import Render, TimelapseRenderJob
+from octoprint_octolapse.settings import OctolapseSettings, Rendering
+from octoprint_octolapse.snapshot_writer import SnapshotWriter
+
+SNAPSHOT_TEMPLATE = "print%06d.jpg"
+
+
+def create_snapshots(directory, frame, frame_count):
+    writer = SnapshotWriter()
+    for snapshot_number in range(frame_count):
+        writer.write(os.path.join(directory, SNAPSHOT_TEMPLATE % snapshot_number), [frame])
+
+
+def copy_pre_post_roll(directory, frame_count, pre_roll_frames, post_roll_frames):
+    # the pre and post roll as they were applied before ffmpeg added them: every snapshot is renamed to make room for
+    # the pre roll, then the first and last snapshots are copied once per roll frame
+    template = os.path.join(directory, SNAPSHOT_TEMPLATE)
+    image_count = 0
+    while os.path.isfile(template % image_count):
+        image_count += 1
+    assert image_count == frame_count
+    for image_number in range(image_count - 1, -1, -1):
+        shutil.move(template % image_number, template % (image_number + pre_roll_frames))
+    for image_number in range(pre_roll_frames):
+        shutil.copy(template % pre_roll_frames, template % image_number)
+    last_image_path = template % (image_count + pre_roll_frames - 1)
+    for image_number in range(post_roll_frames):
+        shutil.copy(last_image_path, template % (image_count + pre_roll_frames + image_number))
+
+
+def create_render_job(directory, rendering, debug):
+    output_tokens = Render._get_output_tokens(directory, "COMPLETED", "print", time.time(), time.time())
+    return TimelapseRenderJob(
+        "benchmark", rendering, debug, "print", directory + os.sep, SNAPSHOT_TEMPLATE, output_tokens, directory,
+        "ffmpeg", 1, 0, None, None, False, False)
+
+
+if __name__ == '__main__':
+    # usage: benchmark_render.py [work directory]
+    work_directory = mkdtemp(dir=sys.argv[1] if len(sys.argv) > 1 else None)
+    test_debug = OctolapseSettings(NamedTemporaryFile().name).current_debug_profile()
+    test_rendering = Rendering()
+    test_rendering.fps = 30
+    test_rendering.pre_roll_seconds = 2
+    test_rendering.post_roll_seconds = 2
+    num_roll_frames = test_rendering.fps * 2
+    # random bytes are not needed, the content doesn't matter for storage
+    test_frame = b"\xff\xd8" + b"\x00" * 65536 + b"\xff\xd9"
+    try:
+        print("Pre-render time with {0} pre and post roll frames in {1}".format(num_roll_frames, work_directory))
+        for num_frames in [100, 1000, 5000, 20000]:
+            snapshot_directory = os.path.join(work_directory, "snapshots")
+            os.makedirs(snapshot_directory)
+            create_snapshots(snapshot_directory, test_frame, num_frames)
+            start_time = time.time()
+            copy_pre_post_roll(snapshot_directory, num_frames, num_roll_frames, num_roll_frames)
+            copy_time = time.time() - start_time
+            shutil.rmtree(snapshot_directory)
+
+            os.makedirs(snapshot_directory)
+            create_snapshots(snapshot_directory, test_frame, num_frames)
+            render_job = create_render_job(snapshot_directory, test_rendering, test_debug)
+            start_time = time.time()
+            assert render_job._pre_render()
+            filter_time = time.time() - start_time
+            shutil.rmtree(snapshot_directory)
+            print("{0} frames: copied roll {1:.3f}s, filter roll {2:.3f}s".format(num_frames, copy_time, filter_time))
+    finally:
+        shutil.rmtree(work_directory)
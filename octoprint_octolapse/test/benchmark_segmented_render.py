@@ -0,0 +1,87 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from tempfile import mkdtemp, NamedTemporaryFile
+
+from octoprint_octolapse.render import Render, TimelapseRenderJob
+from octoprint_octolapse.render_scheduler import get_cpu_count
+from octoprint_octolapse.settings import OctolapseSettings, Rendering
+
+SNAPSHOT_TEMPLATE = "print%06d.jpg"
+
+
+def create_snapshots(ffmpeg, directory, frame_count):
+    # ffmpeg's test pattern makes jpegs with realistic content without needing an image library
+    subprocess.check_call(shlex.split(ffmpeg) + [
+        "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=size=1280x720:rate=30", "-frames:v", str(frame_count),
+        "-q:v", "3", os.path.join(directory, SNAPSHOT_TEMPLATE)])
+
+
+def render(ffmpeg, directory, rendering, debug, segment_count):
+    output_tokens = Render._get_output_tokens(directory, "COMPLETED", "print", time.time(), time.time())
+    results = []
+    render_job = TimelapseRenderJob(
+        "benchmark", rendering, debug, "print", directory + os.sep, os.path.join("snapshots", SNAPSHOT_TEMPLATE),
+        output_tokens, directory, ffmpeg, get_cpu_count(), 0, lambda *args: None,
+        lambda job_id, payload: results.append(payload), False, False, segment_count=segment_count)
+    start_time = time.time()
+    render_job.process()
+    render_time = time.time() - start_time
+    assert not results[0].HasError, results[0].ErrorMessage
+    return render_time
+
+
+if __name__ == '__main__':
+    # usage: benchmark_segmented_render.py [ffmpeg path] [work directory]
+    ffmpeg_path = sys.argv[1] if len(sys.argv) > 1 else "ffmpeg"
+    work_directory = mkdtemp(dir=sys.argv[2] if len(sys.argv) > 2 else None)
+    test_debug = OctolapseSettings(NamedTemporaryFile().name).current_debug_profile()
+    test_rendering = Rendering()
+    test_rendering.fps = 30
+    test_rendering.output_format = "mp4"
+    test_rendering.output_template = "timelapse"
+    test_rendering.sync_with_timelapse = False
+    test_rendering.watermark = True
+    segment_counts = sorted(set([1, 2, 4, get_cpu_count()]))
+    try:
+        print("Render time by frame count and segment count on {0} cpus in {1}".format(
+            get_cpu_count(), work_directory))
+        print("frames  " + "".join("{0:>10}".format("{0} seg".format(count)) for count in segment_counts))
+        for num_frames in [1000, 5000, 20000, 40000]:
+            snapshot_directory = os.path.join(work_directory, "snapshots")
+            os.makedirs(snapshot_directory)
+            create_snapshots(ffmpeg_path, snapshot_directory, num_frames)
+            render_times = [
+                render(ffmpeg_path, work_directory, test_rendering, test_debug, segment_count)
+                for segment_count in segment_counts
+            ]
+            shutil.rmtree(snapshot_directory)
+            print("{0:<8}".format(num_frames) + "".join("{0:>9.1f}s".format(seconds) for seconds in render_times))
+    finally:
+        shutil.rmtree(work_directory)
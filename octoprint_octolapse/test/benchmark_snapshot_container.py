@@ -0,0 +1,101 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import os
+import random
+import shutil
+import sys
+import time
+from tempfile import mkdtemp
+
+import octoprint_octolapse.snapshot_container as snapshot_container
+from octoprint_octolapse.snapshot_container import SnapshotContainer
+from octoprint_octolapse.snapshot_writer import SnapshotWriter
+
+
+def create_frame(size):
+    # random bytes between jpeg markers, the content doesn't matter for storage
+    random.seed(0)
+    return b"\xff\xd8" + bytearray(random.getrandbits(8) for index in range(size - 4)) + b"\xff\xd9"
+
+
+def benchmark_loose_files(directory, frame, frame_count):
+    # what a timelapse does today: a file per frame, probed, then deleted
+    template = os.path.join(directory, "print%06d.jpg")
+    writer = SnapshotWriter()
+    timings = []
+    start_time = time.time()
+    for snapshot_number in range(frame_count):
+        writer.write(template % snapshot_number, [frame])
+    timings.append(time.time() - start_time)
+
+    start_time = time.time()
+    image_count = 0
+    while os.path.isfile(template % image_count):
+        image_count += 1
+    timings.append(time.time() - start_time)
+
+    start_time = time.time()
+    shutil.rmtree(directory)
+    timings.append(time.time() - start_time)
+    assert image_count == frame_count
+    return timings
+
+
+def benchmark_container(directory, frame, frame_count):
+    path = os.path.join(directory, "print.mjpeg")
+    container = SnapshotContainer(path)
+    timings = []
+    start_time = time.time()
+    for snapshot_number in range(frame_count):
+        container.append(snapshot_number, frame)
+    container.close()
+    timings.append(time.time() - start_time)
+
+    start_time = time.time()
+    image_count = snapshot_container.get_frame_count(path)
+    timings.append(time.time() - start_time)
+
+    start_time = time.time()
+    snapshot_container.remove(path)
+    timings.append(time.time() - start_time)
+    assert image_count == frame_count
+    return timings
+
+
+if __name__ == '__main__':
+    # usage: benchmark_snapshot_container.py [frame count] [frame size in bytes] [work directory]
+    num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    frame_size = int(sys.argv[2]) if len(sys.argv) > 2 else 8192
+    work_directory = mkdtemp(dir=sys.argv[3] if len(sys.argv) > 3 else None)
+    test_frame = bytes(create_frame(frame_size))
+    try:
+        print("{0} frames of {1} bytes in {2}".format(num_frames, frame_size, work_directory))
+        for name, benchmark in [("Loose files", benchmark_loose_files), ("Container", benchmark_container)]:
+            storage_directory = os.path.join(work_directory, name.replace(" ", "_"))
+            os.makedirs(storage_directory)
+            capture, count, clean = benchmark(storage_directory, test_frame, num_frames)
+            print(
+                "{0}: capture {1:.2f} ms per frame, count {2:.3f}s, clean {3:.3f}s".format(
+                    name, capture / num_frames * 1000, count, clean))
+    finally:
+        shutil.rmtree(work_directory)
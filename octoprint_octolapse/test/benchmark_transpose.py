@@ -0,0 +1,85 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+import os
+import random
+import shutil
+from tempfile import mkdtemp
+
+from PIL import Image
+
+import octoprint_octolapse.image_transpose as image_transpose
+
+
+def create_test_snapshot(path, width=1920, height=1080):
+    # a noisy gradient, which compresses about as well as a real webcam frame
+    random.seed(0)
+    img = Image.new("RGB", (width, height))
+    img.putdata([
+        ((x * 255) // width, (y * 255) // height, random.randint(0, 255))
+        for y in range(height) for x in range(width)
+    ])
+    img.save(path, "JPEG", quality=90)
+
+
+def get_cpu_seconds():
+    # include child processes, since jpegtran runs in one
+    times = os.times()
+    return times[0] + times[1] + times[2] + times[3]
+
+
+def benchmark_method(source_path, work_directory, transpose, method, iterations):
+    paths = []
+    for index in range(iterations):
+        path = os.path.join(work_directory, "{0}-{1}.jpg".format(method, index))
+        shutil.copy(source_path, path)
+        paths.append(path)
+    applied_methods = set()
+    start_time = get_cpu_seconds()
+    for path in paths:
+        applied_methods.add(image_transpose.transpose_snapshot(path, transpose, method))
+    cpu_seconds = get_cpu_seconds() - start_time
+    return cpu_seconds, os.path.getsize(paths[0]), applied_methods
+
+
+if __name__ == '__main__':
+    num_iterations = 20
+    work_directory = mkdtemp()
+    try:
+        source_path = os.path.join(work_directory, "source.jpg")
+        create_test_snapshot(source_path)
+        source_size = os.path.getsize(source_path)
+        print("Source snapshot: 1920x1080, {0} bytes.  jpegtran: {1}".format(
+            source_size, image_transpose.get_jpegtran_path() or "not installed"))
+        for transpose in ['rotate_180', 'rotate_90']:
+            for method in [
+                image_transpose.TRANSPOSE_METHOD_REENCODE,
+                image_transpose.TRANSPOSE_METHOD_LOSSLESS,
+                image_transpose.TRANSPOSE_METHOD_EXIF
+            ]:
+                seconds, size, applied = benchmark_method(
+                    source_path, work_directory, transpose, method, num_iterations)
+                print("{0} {1} (applied as {2}): {3:.2f} ms of cpu per frame, {4} bytes ({5:+.1%}).".format(
+                    transpose, method, ", ".join(sorted(applied)), seconds / num_iterations * 1000, size,
+                    float(size - source_size) / source_size))
+    finally:
+        shutil.rmtree(work_directory)
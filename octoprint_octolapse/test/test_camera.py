@@ -0,0 +1,66 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import unittest
+
+from octoprint_octolapse.camera import CameraSessionPool
+from octoprint_octolapse.settings import Camera
+
+
+class TestCameraSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.Pool = CameraSessionPool()
+        self.Camera = Camera()
+
+    def tearDown(self):
+        self.Pool.close()
+        del self.Pool
+
+    def test_session_reused(self):
+        """Make sure the same camera profile keeps its session between requests."""
+        session = self.Pool.get_session(self.Camera)
+        self.assertIs(self.Pool.get_session(self.Camera), session)
+        self.assertTrue(session.verify)
+        self.assertIsNone(session.auth)
+
+    def test_session_rebuilt_on_change(self):
+        """Make sure changing the connection settings of a profile replaces its session."""
+        session = self.Pool.get_session(self.Camera)
+        self.Camera.update({"username": "user", "password": "pass", "ignore_ssl_error": True})
+        new_session = self.Pool.get_session(self.Camera)
+        self.assertIsNot(new_session, session)
+        self.assertFalse(new_session.verify)
+        self.assertEqual(new_session.auth.username, "user")
+        self.assertEqual(new_session.auth.password, "pass")
+        # settings that don't affect the connection keep the session
+        self.Camera.update({"delay": 500})
+        self.assertIs(self.Pool.get_session(self.Camera), new_session)
+
+    def test_remove(self):
+        """Make sure removing a profile or closing the pool discards its session."""
+        session = self.Pool.get_session(self.Camera)
+        self.Pool.remove(self.Camera.guid)
+        self.assertIsNot(self.Pool.get_session(self.Camera), session)
+        session = self.Pool.get_session(self.Camera)
+        self.Pool.close()
+        self.assertIsNot(self.Pool.get_session(self.Camera), session)
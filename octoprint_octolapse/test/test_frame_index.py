@@ -0,0 +1,143 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import shutil
+import unittest
+from tempfile import mkdtemp
+
+import octoprint_octolapse.frame_index as frame_index
+
+FILE_NAME_TEMPLATE = "print%06d.jpg"
+
+
+class TestFrameIndex(unittest.TestCase):
+    def setUp(self):
+        self.Directory = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def create_files(self, file_names):
+        for file_name in file_names:
+            with open(os.path.join(self.Directory, file_name), "w") as snapshot_file:
+                snapshot_file.write(file_name)
+
+    def test_sequential(self):
+        """Make sure the frames are ordered by snapshot number, ignoring other files."""
+        self.create_files(
+            [FILE_NAME_TEMPLATE % snapshot_number for snapshot_number in [10, 2, 0, 1, 9, 3, 4, 5, 6, 7, 8]])
+        self.create_files(["print.jpg", "print000011.jpg.1234.tmp", "printa00012.jpg", "other000013.jpg"])
+        index = frame_index.create_frame_index(self.Directory, FILE_NAME_TEMPLATE)
+        self.assertTrue(index.is_sequential())
+        self.assertEqual(index.get_frame_count(), 11)
+        self.assertEqual(
+            index.get_paths(),
+            [os.path.join(self.Directory, FILE_NAME_TEMPLATE % snapshot_number) for snapshot_number in range(11)])
+        self.assertEqual(index.Duplicates, [])
+
+    def test_gaps(self):
+        """Make sure frames after a missing snapshot are kept, and the missing snapshots are reported."""
+        self.create_files([FILE_NAME_TEMPLATE % snapshot_number for snapshot_number in [2, 3, 5, 8, 9]])
+        index = frame_index.create_frame_index(self.Directory, FILE_NAME_TEMPLATE)
+        self.assertFalse(index.is_sequential())
+        self.assertEqual([snapshot_number for snapshot_number, path in index.Frames], [2, 3, 5, 8, 9])
+        self.assertEqual(index.Gaps, [0, 1, 4, 6, 7])
+        self.assertEqual(index.get_gap_ranges(), [(0, 1), (4, 4), (6, 7)])
+
+    def test_duplicates(self):
+        """Make sure a snapshot number in two file names is rendered once, from the file it was saved as."""
+        self.create_files(["print000000.jpg", "print0.jpg", "print000001.jpg", "print0000001.jpg"])
+        index = frame_index.create_frame_index(self.Directory, FILE_NAME_TEMPLATE)
+        self.assertEqual(
+            index.get_paths(),
+            [os.path.join(self.Directory, "print000000.jpg"), os.path.join(self.Directory, "print000001.jpg")])
+        self.assertEqual(index.Duplicates, ["print0.jpg", "print0000001.jpg"])
+
+    def test_missing_directory(self):
+        """Make sure a capture directory that was never created has no frames."""
+        index = frame_index.create_frame_index(os.path.join(self.Directory, "missing"), FILE_NAME_TEMPLATE)
+        self.assertEqual(index.get_frame_count(), 0)
+
+    def test_write_concat_list(self):
+        """Make sure the concat script lists every frame in order with its duration."""
+        self.create_files([FILE_NAME_TEMPLATE % 0, FILE_NAME_TEMPLATE % 2])
+        index = frame_index.create_frame_index(self.Directory, FILE_NAME_TEMPLATE)
+        concat_path = os.path.join(self.Directory, "frames.txt")
+        index.write_concat_list(concat_path, 4)
+        with open(concat_path, "r") as concat_file:
+            self.assertEqual(
+                concat_file.read(),
+                "ffconcat version 1.0\n"
+                "file '{0}'\nduration 0.250000\n"
+                "file '{1}'\nduration 0.250000\n"
+                "file '{1}'\n".format(
+                    os.path.join(self.Directory, FILE_NAME_TEMPLATE % 0),
+                    os.path.join(self.Directory, FILE_NAME_TEMPLATE % 2)))
+
+    def test_write_concat_list_roll(self):
+        """Make sure the first and last frames are shown for longer to add the pre and post roll."""
+        self.create_files([FILE_NAME_TEMPLATE % 0, FILE_NAME_TEMPLATE % 1, FILE_NAME_TEMPLATE % 2])
+        index = frame_index.create_frame_index(self.Directory, FILE_NAME_TEMPLATE)
+        concat_path = os.path.join(self.Directory, "frames.txt")
+        index.write_concat_list(concat_path, 4, pre_roll_frames=4, post_roll_frames=2)
+        with open(concat_path, "r") as concat_file:
+            self.assertEqual(
+                concat_file.read(),
+                "ffconcat version 1.0\n"
+                "file '{0}'\nduration 1.250000\n"
+                "file '{1}'\nduration 0.250000\n"
+                "file '{2}'\nduration 0.750000\n"
+                "file '{2}'\n".format(*[
+                    os.path.join(self.Directory, FILE_NAME_TEMPLATE % snapshot_number)
+                    for snapshot_number in range(3)]))
+
+    def test_segments(self):
+        """Make sure the frames are split into nearly equal segments that cover every frame once."""
+        self.create_files([FILE_NAME_TEMPLATE % snapshot_number for snapshot_number in range(10)])
+        index = frame_index.create_frame_index(self.Directory, FILE_NAME_TEMPLATE)
+        self.assertEqual(index.get_segments(1), [(0, 10)])
+        self.assertEqual(index.get_segments(3), [(0, 3), (3, 6), (6, 10)])
+        self.assertEqual(len(index.get_segments(20)), 10)
+
+        concat_path = os.path.join(self.Directory, "frames.txt")
+        index.write_concat_list(concat_path, 1, 3, 5)
+        with open(concat_path, "r") as concat_file:
+            self.assertEqual(
+                concat_file.read(),
+                "ffconcat version 1.0\n"
+                "file '{0}'\nduration 1.000000\n"
+                "file '{1}'\nduration 1.000000\n"
+                "file '{1}'\n".format(
+                    os.path.join(self.Directory, FILE_NAME_TEMPLATE % 3),
+                    os.path.join(self.Directory, FILE_NAME_TEMPLATE % 4)))
+
+        frame_index.write_file_list(concat_path, ["/segments/segment0.mp4", "/segments/segment1.mp4"])
+        with open(concat_path, "r") as concat_file:
+            self.assertEqual(
+                concat_file.read(),
+                "ffconcat version 1.0\nfile '/segments/segment0.mp4'\nfile '/segments/segment1.mp4'\n")
+
+    def test_escape_concat_path(self):
+        """Make sure single quotes in a path can't end the quoted file name."""
+        self.assertEqual(frame_index._escape_concat_path("/prints/it's/print.jpg"), "/prints/it'\\''s/print.jpg")
@@ -0,0 +1,156 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import shutil
+import stat
+import struct
+import sys
+import unittest
+from tempfile import mkdtemp, NamedTemporaryFile
+
+import octoprint_octolapse.image_transpose as image_transpose
+
+# enough of a jpeg for the exif code: start of image, a JFIF header, a quantization table and end of image
+JFIF_SEGMENT = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+IMAGE_DATA = b"\xff\xdb\x00\x04\x00\x00\xff\xd9"
+
+# stands in for jpegtran -perfect with an image whose size isn't a multiple of the block size, counting its runs
+FAKE_JPEGTRAN = """#!{0}
+import os
+import sys
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs.txt"), "a") as runs_file:
+    runs_file.write("run\\n")
+sys.exit(1)
+"""
+
+
+def create_frame_header(width, height):
+    # a baseline frame header with three components, the first sampled 2x2 (4:2:0)
+    return b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, height, width, 3) + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+
+
+class TestImageTranspose(unittest.TestCase):
+    def setUp(self):
+        self.Path = NamedTemporaryFile(suffix=".jpg", delete=False).name
+
+    def tearDown(self):
+        if os.path.exists(self.Path):
+            os.remove(self.Path)
+
+    def write_jpeg(self, data):
+        with open(self.Path, 'wb') as jpeg_file:
+            jpeg_file.write(data)
+
+    def test_add_orientation(self):
+        """Make sure an exif segment is added after the JFIF header of a jpeg without one."""
+        self.write_jpeg(b"\xff\xd8" + JFIF_SEGMENT + IMAGE_DATA)
+        self.assertEqual(image_transpose.get_exif_orientation(self.Path), 1)
+        self.assertTrue(image_transpose.set_exif_orientation(self.Path, 6))
+        self.assertEqual(image_transpose.get_exif_orientation(self.Path), 6)
+        with open(self.Path, 'rb') as jpeg_file:
+            data = jpeg_file.read()
+        self.assertTrue(data.startswith(b"\xff\xd8" + JFIF_SEGMENT + b"\xff\xe1"))
+        self.assertTrue(data.endswith(IMAGE_DATA))
+
+    def test_replace_orientation(self):
+        """Make sure an existing orientation tag is replaced in place, in either byte order."""
+        for byte_order, mark in [("<", b"II\x2a\x00"), (">", b"MM\x00\x2a")]:
+            tiff = (
+                mark + struct.pack(byte_order + "I", 8) + struct.pack(byte_order + "H", 2) +
+                struct.pack(byte_order + "HHI", 0x010f, 2, 4) + b"cam\x00" +
+                struct.pack(byte_order + "HHIHH", 0x0112, 3, 1, 1, 0) + struct.pack(byte_order + "I", 0)
+            )
+            exif = b"Exif\x00\x00" + tiff
+            data = b"\xff\xd8\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif + IMAGE_DATA
+            transposed = image_transpose.set_jpeg_orientation(data, 3)
+            self.assertEqual(len(transposed), len(data))
+            self.write_jpeg(transposed)
+            self.assertEqual(image_transpose.get_exif_orientation(self.Path), 3)
+
+    def test_exif_without_orientation(self):
+        """Make sure an exif directory without an orientation tag is left for the re-encode fallback."""
+        tiff = b"MM\x00\x2a" + struct.pack(">IH", 8, 0) + struct.pack(">I", 0)
+        exif = b"Exif\x00\x00" + tiff
+        data = b"\xff\xd8\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif + IMAGE_DATA
+        self.assertIsNone(image_transpose.set_jpeg_orientation(data, 3))
+
+    def test_not_a_jpeg(self):
+        """Make sure data that isn't a jpeg is never tagged."""
+        self.assertIsNone(image_transpose.set_jpeg_orientation(b"\x89PNG\r\n", 3))
+
+    def test_orientations(self):
+        """Make sure every transpose has an orientation, a jpegtran operation and a PIL method."""
+        for transpose in image_transpose.PIL_TRANSPOSE_METHODS:
+            self.assertIn(transpose, image_transpose.EXIF_ORIENTATIONS)
+            self.assertIn(transpose, image_transpose.JPEGTRAN_ARGUMENTS)
+        self.assertIsNone(image_transpose.transpose_snapshot(self.Path, ""))
+
+    def test_transpose_snapshot_data(self):
+        """Make sure a snapshot held in memory can be tagged with its orientation."""
+        data = b"\xff\xd8" + JFIF_SEGMENT + IMAGE_DATA
+        self.assertEqual(image_transpose.transpose_snapshot_data(data, ""), (data, None))
+        transposed, method = image_transpose.transpose_snapshot_data(
+            data, "rotate_270", image_transpose.TRANSPOSE_METHOD_EXIF)
+        self.assertEqual(method, image_transpose.TRANSPOSE_METHOD_EXIF)
+        self.assertEqual(image_transpose.get_jpeg_orientation(transposed), 6)
+
+    def test_get_jpeg_size(self):
+        """Make sure the size is read from the frame header, after any application segments."""
+        data = b"\xff\xd8" + JFIF_SEGMENT + create_frame_header(1920, 1080) + IMAGE_DATA
+        self.assertEqual(image_transpose.get_jpeg_size(data), (1920, 1080))
+        self.assertIsNone(image_transpose.get_jpeg_size(b"\xff\xd8" + JFIF_SEGMENT + IMAGE_DATA))
+        self.assertIsNone(image_transpose.get_jpeg_size(b"\x89PNG\r\n"))
+
+    @unittest.skipIf(sys.platform == "win32", "The stand in jpegtran is a script.")
+    def test_jpegtran_failure(self):
+        """Make sure jpegtran isn't run again for a size and transpose it has already failed to transpose."""
+        directory = mkdtemp()
+        try:
+            jpegtran_path = os.path.join(directory, "jpegtran")
+            with open(jpegtran_path, "w") as jpegtran_file:
+                jpegtran_file.write(FAKE_JPEGTRAN.format(sys.executable))
+            os.chmod(jpegtran_path, os.stat(jpegtran_path).st_mode | stat.S_IEXEC)
+            runs_path = os.path.join(directory, "runs.txt")
+
+            def get_runs():
+                with open(runs_path, "r") as runs_file:
+                    return len(runs_file.readlines())
+
+            image_transpose._jpegtran_failures.clear()
+            self.write_jpeg(b"\xff\xd8" + JFIF_SEGMENT + create_frame_header(1918, 1078) + IMAGE_DATA)
+            self.assertFalse(image_transpose.transpose_jpegtran(self.Path, "rotate_90", jpegtran_path))
+            self.assertFalse(image_transpose.transpose_jpegtran(self.Path, "rotate_90", jpegtran_path))
+            self.assertEqual(get_runs(), 1)
+            data = b"\xff\xd8" + JFIF_SEGMENT + create_frame_header(1918, 1078) + IMAGE_DATA
+            self.assertIsNone(image_transpose.transpose_jpegtran_data(data, "rotate_90", jpegtran_path))
+            self.assertEqual(get_runs(), 1)
+            # another transpose, or another size, is tried
+            self.assertIsNone(image_transpose.transpose_jpegtran_data(data, "rotate_180", jpegtran_path))
+            self.assertEqual(get_runs(), 2)
+            data = b"\xff\xd8" + JFIF_SEGMENT + create_frame_header(1920, 1088) + IMAGE_DATA
+            self.assertIsNone(image_transpose.transpose_jpegtran_data(data, "rotate_90", jpegtran_path))
+            self.assertEqual(get_runs(), 3)
+        finally:
+            image_transpose._jpegtran_failures.clear()
+            shutil.rmtree(directory)
@@ -0,0 +1,157 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import threading
+import time
+import unittest
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+import octoprint_octolapse.camera as camera
+from octoprint_octolapse.mjpeg_stream import MjpegFrameParser, MjpegStreamGrabber
+from octoprint_octolapse.settings import Camera
+
+
+def create_frame(number):
+    # enough of a jpeg for the parser: start of image, a payload and end of image
+    return b"\xff\xd8" + "frame {0}".format(number).encode("ascii") + b"\xff\xd9"
+
+
+def create_part(frame, include_content_length=True):
+    headers = b"--boundarydonotcross\r\nContent-Type: image/jpeg\r\n"
+    if include_content_length:
+        headers += "Content-Length: {0}\r\n".format(len(frame)).encode("ascii")
+    return headers + b"\r\n" + frame + b"\r\n"
+
+
+class MjpegStreamServer(ThreadingMixIn, HTTPServer):
+    # A stand-in for mjpg-streamer that sends a numbered frame every FrameIntervalSeconds.
+    daemon_threads = True
+    FrameIntervalSeconds = 0.02
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), MjpegStreamHandler)
+        self.Stopped = threading.Event()
+
+
+class MjpegStreamHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace;boundary=boundarydonotcross")
+        self.end_headers()
+        frame_number = 0
+        try:
+            while not self.server.Stopped.is_set():
+                self.wfile.write(create_part(create_frame(frame_number)))
+                self.wfile.flush()
+                frame_number += 1
+                time.sleep(self.server.FrameIntervalSeconds)
+        except IOError:
+            # the client disconnected
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestMjpegFrameParser(unittest.TestCase):
+    def test_get_boundary(self):
+        """Make sure the boundary is read from the content type, with or without quotes and dashes."""
+        self.assertEqual(MjpegFrameParser.get_boundary(
+            "multipart/x-mixed-replace;boundary=boundarydonotcross"), b"--boundarydonotcross")
+        self.assertEqual(MjpegFrameParser.get_boundary(
+            'multipart/x-mixed-replace; boundary="--myboundary"'), b"--myboundary")
+        self.assertIsNone(MjpegFrameParser.get_boundary("image/jpeg"))
+        self.assertIsNone(MjpegFrameParser.get_boundary(None))
+
+    def test_content_length_split_across_chunks(self):
+        """Make sure parts with a Content-Length are found when the data arrives one byte at a time."""
+        stream = b"".join(create_part(create_frame(number)) for number in range(3))
+        parser = MjpegFrameParser("multipart/x-mixed-replace;boundary=boundarydonotcross")
+        frames = []
+        for index in range(len(stream)):
+            frames.extend(parser.feed(stream[index:index + 1]))
+        self.assertEqual(frames, [create_frame(number) for number in range(3)])
+
+    def test_boundary_search(self):
+        """Make sure parts without a Content-Length are read up to the next boundary."""
+        stream = b"".join(create_part(create_frame(number), False) for number in range(3))
+        parser = MjpegFrameParser("multipart/x-mixed-replace;boundary=boundarydonotcross")
+        # the last frame can't be completed until the next boundary arrives
+        self.assertEqual(parser.feed(stream), [create_frame(0), create_frame(1)])
+        self.assertEqual(parser.feed(b"--boundarydonotcross\r\n"), [create_frame(2)])
+
+    def test_missing_content_type(self):
+        """Make sure the boundary is taken from the stream when there is no content type."""
+        stream = b"".join(create_part(create_frame(number)) for number in range(2))
+        parser = MjpegFrameParser()
+        self.assertEqual(parser.feed(stream), [create_frame(0), create_frame(1)])
+        self.assertEqual(parser.Boundary, b"--boundarydonotcross")
+
+    def test_ignores_non_jpeg_parts(self):
+        """Make sure a part that isn't a jpeg is skipped."""
+        stream = create_part(b"not a jpeg") + create_part(create_frame(1))
+        parser = MjpegFrameParser("multipart/x-mixed-replace;boundary=boundarydonotcross")
+        self.assertEqual(parser.feed(stream), [create_frame(1)])
+
+
+class TestMjpegStreamGrabber(unittest.TestCase):
+    def setUp(self):
+        self.Server = MjpegStreamServer()
+        self.ServerThread = threading.Thread(target=self.Server.serve_forever)
+        self.ServerThread.daemon = True
+        self.ServerThread.start()
+        self.Camera = Camera()
+        self.Camera.address = "http://127.0.0.1:{0}/".format(self.Server.server_address[1])
+        url = camera.format_request_template(self.Camera.address, self.Camera.stream_request_template, "")
+        self.Errors = []
+        self.Grabber = MjpegStreamGrabber(self.Camera, url, buffer_size=5, on_error=self.Errors.append)
+
+    def tearDown(self):
+        self.Grabber.stop(5)
+        camera.session_pool.remove(self.Camera.guid)
+        self.Server.Stopped.set()
+        self.Server.shutdown()
+        self.Server.server_close()
+
+    def test_frame_after_timestamp(self):
+        """Make sure a snapshot is the first frame received after the requested time."""
+        self.Grabber.start()
+        self.assertIsNotNone(self.Grabber.get_frame_after(0, 5))
+        park_time = time.time()
+        receive_time, frame = self.Grabber.get_frame_after(park_time, 5)
+        self.assertGreaterEqual(receive_time, park_time)
+        self.assertTrue(frame.startswith(b"\xff\xd8"))
+        statistics = self.Grabber.get_statistics()
+        self.assertTrue(statistics["running"])
+        self.assertEqual(statistics["connections"], 1)
+        self.assertLessEqual(statistics["buffered_frames"], 5)
+        self.assertEqual(self.Errors, [])
+
+    def test_stop(self):
+        """Make sure stopping the grabber ends any wait for a frame."""
+        self.Grabber.start()
+        self.assertIsNotNone(self.Grabber.get_frame_after(0, 5))
+        self.Grabber.stop(5)
+        self.assertFalse(self.Grabber.is_running())
+        self.assertIsNone(self.Grabber.get_frame_after(time.time() + 60, 5))
@@ -23,7 +23,7 @@
 import time
 import unittest
 
-from octoprint_octolapse.gcode_parser import Commands
+from octoprint_octolapse.gcode_parser import Commands, CommandParameter
 
 
 class TestParsing(unittest.TestCase):
@@ -52,6 +52,79 @@ class TestParsing(unittest.TestCase):
         self.assertEqual(cmd, "G9999")
         self.assertIsNone(parameters)
 
+    def test_line_numbers(self):
+        gcode = "N10 G1 X100 Y200.0; Here is a comment"
+        cmd, parameters = Commands.parse(gcode)
+        self.assertEqual(cmd, "G1")
+        self.assertEqual(parameters["X"], 100)
+        self.assertEqual(parameters["Y"], 200.0)
+
+        # line number and checksum, funky spaces
+        gcode = "n 1 0 g  28 x*57"
+        cmd, parameters = Commands.parse(gcode)
+        self.assertEqual(cmd, "G28")
+        self.assertIsNone(parameters["X"])
+        self.assertNotIn("Y", parameters)
+
+        # line number without a command
+        gcode = "N10"
+        cmd, parameters = Commands.parse(gcode)
+        self.assertIsNone(cmd)
+        self.assertIsNone(parameters)
+
+    def test_skipped_commands(self):
+        Commands.reset_skipped_command_counts()
+        self.assertEqual(Commands.parse("M73 P12 R34"), ("M73", None))
+        self.assertEqual(Commands.parse("m073; progress"), ("M73", None))
+        self.assertEqual(Commands.parse("T0"), (None, None))
+        self.assertEqual(Commands.parse("M117 Printing..."), ("M117", None))
+
+        # tracked commands are not counted
+        cmd, parameters = Commands.parse("G1 X10")
+        self.assertEqual(cmd, "G1")
+        self.assertEqual(parameters["X"], 10)
+
+        self.assertDictEqual(Commands.get_skipped_command_counts(), {"M73": 2, "T0": 1, "M117": 1})
+        Commands.reset_skipped_command_counts()
+        self.assertDictEqual(Commands.get_skipped_command_counts(), {})
+
+    def test_parse_cache(self):
+        cache = Commands.ParseCache
+        original_size = cache.MaxSize
+        try:
+            cache.clear()
+            cache.resize(2)
+
+            cmd, parameters = Commands.parse("G1 X10 E1.5")
+            self.assertEqual(cmd, "G1")
+            # the cached parameters must not change when the returned parameters are modified
+            parameters.pop("E")
+            cmd, parameters = Commands.parse("G1 X10 E1.5")
+            self.assertDictEqual(parameters, {"X": 10, "E": 1.5})
+
+            Commands.parse("G1 X20")
+            Commands.parse("G1 X30")
+            statistics = cache.get_statistics()
+            self.assertEqual(statistics["hits"], 1)
+            self.assertEqual(statistics["misses"], 3)
+            self.assertEqual(statistics["evictions"], 1)
+            self.assertEqual(statistics["size"], 2)
+
+            # untracked commands are never cached, or counted as misses
+            Commands.parse("M73 P12")
+            Commands.parse("; a comment")
+            self.assertEqual(cache.get_statistics()["size"], 2)
+            self.assertEqual(cache.get_statistics()["misses"], 3)
+
+            # a size of 0 disables the cache
+            cache.resize(0)
+            cmd, parameters = Commands.parse("G1 X10")
+            self.assertEqual(parameters["X"], 10)
+            self.assertEqual(cache.get_statistics()["size"], 0)
+        finally:
+            cache.clear()
+            cache.resize(original_size)
+
     def test_comments(self):
         """Try to parse the G0 Command, parameters and comment"""
 
@@ -342,6 +415,19 @@ class TestParsing(unittest.TestCase):
         self.assertNotIn("E", parameters)
         self.assertEqual(parameters["F"], 1000)
 
+    def test_parse_float(self):
+        # slices, signs and embedded whitespace
+        self.assertEqual(CommandParameter.parse_float("-1.5Y2"), (-1.5, "Y2"))
+        self.assertEqual(CommandParameter.parse_float(" + 1 0 0 . 5 "), (100.5, ""))
+        self.assertEqual(CommandParameter.parse_float("Y2"), (None, "Y2"))
+
+        # a missing positive value is not an error
+        self.assertEqual(CommandParameter.parse_float_positive(""), (None, ""))
+        cmd, parameters = Commands.parse("G1 X1 F")
+        self.assertEqual(cmd, "G1")
+        self.assertEqual(parameters["X"], 1)
+        self.assertIsNone(parameters["F"])
+
     def test_g20(self):
         # no parameters
         gcode = "G20"
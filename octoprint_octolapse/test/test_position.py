@@ -27,13 +27,15 @@ from tempfile import NamedTemporaryFile
 from octoprint_octolapse.gcode_parser import Commands
 from octoprint_octolapse.position import Pos
 from octoprint_octolapse.position import Position
-from octoprint_octolapse.settings import OctolapseSettings
+from octoprint_octolapse.settings import OctolapseSettings, Printer
 
 
 class TestPosition(unittest.TestCase):
     def setUp(self):
         self.Commands = Commands()
         self.Settings = OctolapseSettings(NamedTemporaryFile().name)
+        # new settings have no printer profiles, the first one added becomes the current printer
+        self.Settings.add_update_profile("Printer", Printer(name="Test Printer").to_dict())
         # in the general test case we want auto_detect_position to be false
         # else we'll have to simulate a position update (m114 return) after
         # a home (g28) command
@@ -176,6 +178,34 @@ class TestPosition(unittest.TestCase):
         self.assertEqual(len(position.Positions), 0)
         self.assertIsNone(position.SavedPosition)
 
+    def test_CommandHandlers(self):
+        """Make sure every command handler is for a command the parser knows about."""
+        for cmd in Position.CommandHandlers.keys():
+            self.assertIn(cmd, Commands.CommandsDictionary)
+        # units are checked before dispatching, so every command requiring metric units needs a handler
+        for cmd in Commands.CommandsRequireMetric:
+            self.assertIn(cmd, Position.CommandHandlers)
+
+    def test_ResolvedProfiles(self):
+        """Make sure the resolved profiles are only resolved again after the settings change."""
+        position = Position(self.Settings, self.OctoprintPrinterProfile, False)
+        resolved_profiles = position.ResolvedProfiles
+        self.assertIs(resolved_profiles.Debug, self.Settings.current_debug_profile())
+        position.update("M83", "M83", {})
+        self.assertIs(position.ResolvedProfiles, resolved_profiles)
+
+        # the current debug profile can't be removed, so nothing changed
+        self.assertFalse(self.Settings.remove_profile("Debug", resolved_profiles.Debug.guid))
+        position.update("M83", "M83", {})
+        self.assertIs(position.ResolvedProfiles, resolved_profiles)
+
+        # select a new debug profile, the next update should pick it up
+        debug_profile = self.Settings.add_update_profile("Debug", {"guid": "", "name": "Test Debug"})
+        self.Settings.set_current_profile("Debug", debug_profile.guid)
+        position.update("M82", "M82", {})
+        self.assertIsNot(position.ResolvedProfiles, resolved_profiles)
+        self.assertIs(position.ResolvedProfiles.Debug, debug_profile)
+
     def test_Home(self):
         """Test the home command.  Make sure the position is set to 0,0,0 after the home."""
         position = Position(self.Settings, self.OctoprintPrinterProfile, False)
@@ -0,0 +1,106 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import threading
+import time
+import unittest
+
+from octoprint_octolapse.publisher import StatePublisher
+
+
+class TestStatePublisher(unittest.TestCase):
+    def setUp(self):
+        self.Messages = []
+        self.Published = threading.Event()
+        self.Version = 0
+
+    def get_message(self):
+        return self.Version
+
+    def on_publish(self, message):
+        self.Messages.append(message)
+        self.Published.set()
+
+    def test_coalesce(self):
+        """Make sure many changes within the interval are published as a single, up to date message."""
+        publisher = StatePublisher("TestPublisher", self.get_message, self.on_publish, interval_seconds=0.2)
+        publisher.start()
+        try:
+            # the first change is published right away
+            self.Version = 1
+            publisher.mark_dirty()
+            self.assertTrue(self.Published.wait(5))
+            self.Published.clear()
+            # changes made during the interval are combined
+            for version in range(2, 100):
+                self.Version = version
+                publisher.mark_dirty()
+            self.assertTrue(self.Published.wait(5))
+            time.sleep(0.3)
+            self.assertEqual(self.Messages, [1, 99])
+            statistics = publisher.get_statistics()
+            self.assertEqual(statistics["published"], 2)
+            self.assertTrue(statistics["running"])
+            self.assertIsNotNone(statistics["max_latency"])
+        finally:
+            publisher.stop(5)
+        self.assertFalse(publisher.get_statistics()["running"])
+
+    def test_nothing_to_publish(self):
+        """Make sure nothing is sent when the message is None."""
+        publisher = StatePublisher("TestPublisher", lambda: None, self.on_publish, interval_seconds=0.01)
+        publisher.start()
+        try:
+            publisher.mark_dirty()
+            self.assertFalse(self.Published.wait(0.1))
+            self.assertEqual(publisher.get_statistics()["published"], 0)
+        finally:
+            publisher.stop(5)
+
+    def test_restart_while_publishing(self):
+        """Make sure a thread that was still publishing when it was stopped exits instead of running beside the new
+        thread."""
+        release = threading.Event()
+
+        def on_publish(message):
+            self.on_publish(message)
+            release.wait(5)
+
+        publisher = StatePublisher("TestPublisher", self.get_message, on_publish, interval_seconds=0.01)
+        publisher.start()
+        try:
+            publisher.mark_dirty()
+            self.assertTrue(self.Published.wait(5))
+            old_thread = publisher._thread
+            # the old thread is still publishing when stop gives up waiting for it
+            publisher.stop(0.01)
+            self.assertTrue(old_thread.is_alive())
+            publisher.start()
+            release.set()
+            publisher.mark_dirty()
+            old_thread.join(5)
+            self.assertFalse(old_thread.is_alive())
+            self.assertTrue(publisher.get_statistics()["running"])
+        finally:
+            release.set()
+            publisher.stop(5)
@@ -0,0 +1,273 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import shutil
+import sys
+import unittest
+from tempfile import mkdtemp, NamedTemporaryFile
+
+from octoprint_octolapse.render import Render, StreamingRender, TimelapseRenderJob, get_ffmpeg_filters
+from octoprint_octolapse.settings import OctolapseSettings, Rendering
+
+# the start of every stand in ffmpeg, which lists its FILTERS when asked the way that ffmpeg -filters does
+FAKE_FFMPEG_FILTERS = """
+import sys
+if '-filters' in sys.argv:
+    sys.stdout.write('Filters:\\n  T.. = Timeline support\\n')
+    for name in FILTERS:
+        sys.stdout.write(' T.. {0:<16} V->V       A filter.\\n'.format(name))
+    sys.exit(0)
+"""
+
+# stands in for ffmpeg by saving everything it receives on stdin to the output file, which is the last argument
+FAKE_FFMPEG = """
+data = sys.stdin.read() if sys.version_info[0] < 3 else sys.stdin.buffer.read()
+with open(sys.argv[-1], 'wb') as output_file:
+    output_file.write(data)
+"""
+
+# stands in for ffmpeg when rendering from a concat script.  A segment is rendered by joining its frames between the
+# ROLL markers, which are added when the first or last frame is shown for longer than the others.  Segments are joined
+# by copying them.
+FAKE_SEGMENT_FFMPEG = """
+args = sys.argv[1:]
+paths = []
+durations = []
+with open(args[args.index('-i') + 1], 'r') as list_file:
+    for line in list_file.read().splitlines():
+        if line.startswith("file '"):
+            paths.append(line[len("file '"):-1])
+        elif line.startswith("duration "):
+            durations.append(float(line[len("duration "):]))
+data = b''
+if 'copy' in args:
+    for path in paths:
+        with open(path, 'rb') as segment_file:
+            data += segment_file.read()
+else:
+    # the last frame is listed twice, so that it is shown for its duration
+    for path in paths[:-1]:
+        with open(path, 'rb') as frame_file:
+            data += frame_file.read()
+    data = (
+        (b'PREROLL' if durations[0] > min(durations) else b'') + data +
+        (b'POSTROLL' if durations[-1] > min(durations) else b''))
+    sys.stdout.write('frame={0}\\nout_time=00:00:01.000000\\nprogress=end\\n'.format(len(paths) - 1))
+with open(args[-1], 'wb') as output_file:
+    output_file.write(data)
+"""
+
+
+
+def write_fake_ffmpeg(directory, script, filters=("loop", "tpad")):
+    """Saves a stand in ffmpeg that supports the given filters, and returns the command that runs it."""
+    fake_ffmpeg_path = os.path.join(directory, "ffmpeg.py")
+    with open(fake_ffmpeg_path, "w") as fake_ffmpeg_file:
+        fake_ffmpeg_file.write("FILTERS = {0!r}\n".format(list(filters)) + FAKE_FFMPEG_FILTERS + script)
+    return "{0} {1}".format(sys.executable, fake_ffmpeg_path)
+
+
+@unittest.skipIf(sys.platform == "win32", "The stand in ffmpeg command isn't quoted for windows.")
+class TestStreamingRender(unittest.TestCase):
+    def setUp(self):
+        self.Directory = mkdtemp()
+        self.Debug = OctolapseSettings(NamedTemporaryFile().name).current_debug_profile()
+        self.FfmpegPath = write_fake_ffmpeg(self.Directory, FAKE_FFMPEG)
+        self.OutputPath = os.path.join(self.Directory, "render", "timelapse.mp4")
+        self.Rendering = Rendering()
+        self.Rendering.render_during_print = True
+        self.Rendering.fps_calculation_type = 'static'
+        self.Rendering.fps = 2
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    @staticmethod
+    def create_frame(snapshot_number):
+        return b"\xff\xd8frame" + str(snapshot_number).encode() + b"\xff\xd9"
+
+    def test_can_render(self):
+        """Make sure timelapses whose frame rate depends on the final frame count are rendered after the print."""
+        self.assertTrue(StreamingRender.can_render(self.Rendering, self.FfmpegPath))
+        self.assertFalse(StreamingRender.can_render(self.Rendering, None))
+        self.Rendering.fps_calculation_type = 'duration'
+        self.assertFalse(StreamingRender.can_render(self.Rendering, self.FfmpegPath))
+
+    def test_can_render_without_tpad(self):
+        """Make sure a post roll is only rendered during the print by an ffmpeg with the tpad filter."""
+        ffmpeg_path = write_fake_ffmpeg(self.Directory, FAKE_FFMPEG, filters=["loop"])
+        self.Rendering.pre_roll_seconds = 1
+        self.Rendering.post_roll_seconds = 0
+        self.assertTrue(StreamingRender.can_render(self.Rendering, ffmpeg_path))
+        self.Rendering.post_roll_seconds = 1
+        self.assertFalse(StreamingRender.can_render(self.Rendering, ffmpeg_path))
+
+    def test_render(self):
+        """Make sure every frame is sent in snapshot number order, leaving the pre and post roll to ffmpeg."""
+        self.Rendering.pre_roll_seconds = 1
+        self.Rendering.post_roll_seconds = 0.5
+        streaming_render = StreamingRender(self.Rendering, self.Debug, self.FfmpegPath, 1, self.OutputPath)
+        streaming_render.append(1, self.create_frame(1))
+        streaming_render.append(0, self.create_frame(0))
+        streaming_render.append(2, self.create_frame(2))
+        self.assertTrue(streaming_render.finish())
+        self.assertEqual(streaming_render.FrameCount, 3)
+        with open(self.OutputPath, "rb") as output_file:
+            self.assertEqual(
+                output_file.read(), self.create_frame(0) + self.create_frame(1) + self.create_frame(2))
+
+    def test_missing_frame(self):
+        """Make sure the render fails, so that it is done again after the print, if a snapshot never arrives."""
+        streaming_render = StreamingRender(self.Rendering, self.Debug, self.FfmpegPath, 1, self.OutputPath)
+        streaming_render.append(0, self.create_frame(0))
+        streaming_render.append(2, self.create_frame(2))
+        self.assertFalse(streaming_render.finish())
+        self.assertFalse(os.path.exists(self.OutputPath))
+
+
+class TestTimelapseRenderJob(unittest.TestCase):
+    def test_create_filter_string_roll(self):
+        """Make sure the pre and post roll are added by cloning the first and last frames."""
+        self.assertEqual(
+            TimelapseRenderJob._create_filter_string(pre_roll_frames=30, post_roll_frames=15),
+            "[in] format=yuv420p,tpad=start=30:start_mode=clone:stop=15:stop_mode=clone [out]")
+        self.assertEqual(
+            TimelapseRenderJob._create_filter_string(pre_roll_frames=30),
+            "[in] format=yuv420p,tpad=start=30:start_mode=clone [out]")
+        self.assertEqual(
+            TimelapseRenderJob._create_filter_string(post_roll_frames=15, hflip=True),
+            "[in] format=yuv420p,tpad=stop=15:stop_mode=clone,hflip [out]")
+        self.assertEqual(TimelapseRenderJob._create_filter_string(), "[in] format=yuv420p [out]")
+
+    def test_create_filter_string_roll_without_tpad(self):
+        """Make sure the loop filter adds the pre and post roll for versions of ffmpeg without tpad."""
+        self.assertEqual(
+            TimelapseRenderJob._create_filter_string(
+                pre_roll_frames=30, post_roll_frames=15, use_tpad=False, frame_count=100),
+            "[in] format=yuv420p,loop=loop=15:size=1:start=99,loop=loop=30:size=1:start=0 [out]")
+        self.assertEqual(
+            TimelapseRenderJob._create_filter_string(pre_roll_frames=30, use_tpad=False),
+            "[in] format=yuv420p,loop=loop=30:size=1:start=0 [out]")
+        self.assertRaises(
+            ValueError, TimelapseRenderJob._create_filter_string, post_roll_frames=15, use_tpad=False)
+
+    def test_get_ffmpeg_filters(self):
+        """Make sure the filters are read from ffmpeg, and that an ffmpeg which can't be run has none."""
+        directory = mkdtemp()
+        try:
+            ffmpeg_path = write_fake_ffmpeg(directory, FAKE_FFMPEG, filters=["loop", "hflip"])
+            self.assertEqual(get_ffmpeg_filters(ffmpeg_path), {"loop", "hflip"})
+            self.assertEqual(get_ffmpeg_filters(os.path.join(directory, "missing_ffmpeg")), set())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_create_ffmpeg_command_string_roll(self):
+        """Make sure the pre and post roll reach the ffmpeg filter chain."""
+        command_str = TimelapseRenderJob._create_ffmpeg_command_string(
+            "ffmpeg", 30, "8000K", 1, "/snapshots/print%06d.jpg", "/timelapse/print.mp4", "mp4",
+            pre_roll_frames=60, post_roll_frames=30)
+        self.assertIn("tpad=start=60:start_mode=clone:stop=30:stop_mode=clone", command_str)
+
+    def test_create_ffmpeg_command_string_progress(self):
+        """Make sure ffmpeg is only asked for its progress when there is somewhere to write it."""
+        command_str = TimelapseRenderJob._create_ffmpeg_command_string(
+            "ffmpeg", 30, "8000K", 1, "/snapshots/print%06d.jpg", "/timelapse/print.mp4", "mp4",
+            progress_url="pipe:1")
+        self.assertIn("-progress pipe:1", command_str)
+        command_str = TimelapseRenderJob._create_ffmpeg_command_string(
+            "ffmpeg", 30, "8000K", 1, "/snapshots/print%06d.jpg", "/timelapse/print.mp4", "mp4")
+        self.assertNotIn("-progress", command_str)
+
+
+
+@unittest.skipIf(sys.platform == "win32", "The stand in ffmpeg command isn't quoted for windows.")
+class TestSegmentedRender(unittest.TestCase):
+    def setUp(self):
+        self.Directory = mkdtemp()
+        self.Debug = OctolapseSettings(NamedTemporaryFile().name).current_debug_profile()
+        self.FfmpegPath = write_fake_ffmpeg(self.Directory, FAKE_SEGMENT_FFMPEG)
+        self.Rendering = Rendering()
+        self.Rendering.fps_calculation_type = 'static'
+        self.Rendering.fps = 2
+        self.Rendering.pre_roll_seconds = 1
+        self.Rendering.post_roll_seconds = 1
+        self.Rendering.sync_with_timelapse = False
+        self.Rendering.output_template = "timelapse"
+        self.Results = []
+        self.Progress = []
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def on_complete(self, job_id, payload):
+        self.Results.append(payload)
+
+    def create_job(self, frame_count, segment_count):
+        snapshot_directory = os.path.join(self.Directory, "print")
+        os.makedirs(snapshot_directory)
+        for snapshot_number in range(frame_count):
+            with open(os.path.join(snapshot_directory, "print%06d.jpg" % snapshot_number), "wb") as snapshot_file:
+                snapshot_file.write("frame{0},".format(snapshot_number).encode())
+        output_tokens = Render._get_output_tokens(self.Directory, "COMPLETED", "print", 0, 0)
+        job = TimelapseRenderJob(
+            "job", self.Rendering, self.Debug, "print", self.Directory + os.sep, "print/print%06d.jpg", output_tokens,
+            self.Directory, self.FfmpegPath, 4, 0, lambda *args: None, self.on_complete, False, False,
+            on_progress=lambda job_id, progress: self.Progress.append(progress), segment_count=segment_count)
+        job.MinFramesPerSegment = 2
+        return job
+
+    def test_segments(self):
+        """Make sure the segments are joined in order, with the pre roll at the start and the post roll at the end."""
+        job = self.create_job(7, 3)
+        job.process()
+        self.assertFalse(self.Results[0].HasError, self.Results[0].ErrorMessage)
+        self.assertEqual(job._get_segment_count(), 3)
+        with open(os.path.join(self.Directory, "timelapse", "timelapse.mp4"), "rb") as output_file:
+            self.assertEqual(
+                output_file.read(),
+                b"PREROLL" + "".join("frame{0},".format(frame) for frame in range(7)).encode() + b"POSTROLL")
+        # the segment videos are removed
+        self.assertEqual(sorted(os.listdir(self.Directory)), ["ffmpeg.py", "print", "timelapse"])
+        self.assertTrue(self.Progress[-1]['is_finished'])
+        self.assertEqual(self.Progress[-1]['frame'], 7)
+
+    def test_no_segments(self):
+        """Make sure the pre and post roll come from the concat script when the snapshots are rendered at once."""
+        job = self.create_job(3, 1)
+        job.process()
+        self.assertFalse(self.Results[0].HasError, self.Results[0].ErrorMessage)
+        with open(os.path.join(self.Directory, "timelapse", "timelapse.mp4"), "rb") as output_file:
+            self.assertEqual(output_file.read(), b"PREROLL" + b"frame0,frame1,frame2," + b"POSTROLL")
+
+    def test_too_short(self):
+        """Make sure a timelapse isn't split into segments with fewer than the minimum number of frames."""
+        job = self.create_job(5, 4)
+        job.process()
+        self.assertEqual(job._get_segment_count(), 2)
+
+    def test_create_concat_command_string(self):
+        """Make sure the segments are joined by copying their streams."""
+        self.assertEqual(
+            TimelapseRenderJob._create_concat_command_string("ffmpeg", "/segments/segments.txt", "/out/a.mp4", "mp4"),
+            'ffmpeg -loglevel error -f concat -safe 0 -i "/segments/segments.txt" -c copy -y -f mp4 "/out/a.mp4"')
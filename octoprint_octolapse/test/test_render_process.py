@@ -0,0 +1,113 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import sys
+import time
+import unittest
+from distutils.spawn import find_executable
+from tempfile import TemporaryFile
+
+from octoprint_octolapse.render_process import (IoClassIdle, RenderProcess, RenderProcessOptions,
+                                                parse_cpu_affinity)
+
+
+def create_command_string(script):
+    # a python script stands in for ffmpeg
+    return '"{0}" -c "{1}"'.format(sys.executable, script)
+
+
+class TestRenderProcess(unittest.TestCase):
+    def run_script(self, script, options):
+        output_file = TemporaryFile()
+        try:
+            process = RenderProcess(create_command_string(script), options, output_file=output_file)
+            process.start()
+            self.assertEqual(process.wait(), 0)
+            output_file.seek(0)
+            return output_file.read().decode('utf-8').strip()
+        finally:
+            output_file.close()
+
+    def test_parse_cpu_affinity(self):
+        """Make sure cpu lists and ranges are parsed, and invalid lists are rejected."""
+        self.assertEqual(parse_cpu_affinity(""), [])
+        self.assertEqual(parse_cpu_affinity(None), [])
+        self.assertEqual(parse_cpu_affinity("3, 1"), [1, 3])
+        self.assertEqual(parse_cpu_affinity("1-3,2"), [1, 2, 3])
+        self.assertRaises(ValueError, parse_cpu_affinity, "3-1")
+        self.assertRaises(ValueError, parse_cpu_affinity, "a")
+
+    @unittest.skipIf(find_executable("nice") is None or find_executable("prlimit") is None,
+                     "nice and prlimit aren't installed")
+    def test_limits(self):
+        """Make sure ffmpeg is started with the nice level and memory limit."""
+        self.assertEqual(self.run_script("import os; print(os.nice(0))", RenderProcessOptions()), str(os.nice(0)))
+        script = "import os, resource; print('%d %d' % (os.nice(0), resource.getrlimit(resource.RLIMIT_AS)[0]))"
+        options = RenderProcessOptions(nice_level=5, memory_limit_mb=2048)
+        expected_output = "{0} {1}".format(min(19, os.nice(0) + 5), 2048 * 1024 * 1024)
+        self.assertEqual(self.run_script(script, options), expected_output)
+
+    @unittest.skipIf(any(find_executable(wrapper) is None for wrapper in ["nice", "ionice", "taskset", "prlimit"]),
+                     "nice, ionice, taskset and prlimit aren't installed")
+    def test_wrapper_args(self):
+        """Make sure ffmpeg is run with nice, ionice, taskset and prlimit for the process options."""
+        options = RenderProcessOptions(io_class=IoClassIdle, cpu_affinity="0")
+        process = RenderProcess("ffmpeg -i input.mp4", options)
+        self.assertEqual(
+            process.Args,
+            [find_executable("ionice"), "-c", "3", find_executable("taskset"), "-c", "0", "ffmpeg", "-i", "input.mp4"])
+        options = RenderProcessOptions(nice_level=10, memory_limit_mb=512)
+        process = RenderProcess("ffmpeg -i input.mp4", options)
+        self.assertEqual(
+            process.Args,
+            [find_executable("nice"), "-n", "10", find_executable("prlimit"), "--as=536870912", "--", "ffmpeg", "-i",
+             "input.mp4"])
+        # an invalid cpu list is ignored rather than failing the render
+        process = RenderProcess("ffmpeg -i input.mp4", RenderProcessOptions(cpu_affinity="x"))
+        self.assertEqual(process.Args, ["ffmpeg", "-i", "input.mp4"])
+
+    def test_time_limit(self):
+        """Make sure ffmpeg is stopped when it runs longer than the time limit."""
+        process = RenderProcess(
+            create_command_string("import time; time.sleep(10)"), RenderProcessOptions(time_limit_minutes=0.01))
+        start_time = time.time()
+        process.start()
+        self.assertNotEqual(process.wait(), 0)
+        self.assertTrue(process.TimedOut)
+        self.assertLess(time.time() - start_time, 5)
+
+    @unittest.skipIf(not RenderProcess.can_pause(), "ffmpeg can't be paused on this platform")
+    def test_pause(self):
+        """Make sure a paused process doesn't run, and that the time it was paused doesn't count toward the limit."""
+        process = RenderProcess(
+            create_command_string("import time; time.sleep(0.5)"), RenderProcessOptions(time_limit_minutes=0.02))
+        # pausing before the process starts stops it as soon as it starts
+        process.pause()
+        process.start()
+        time.sleep(1.5)
+        self.assertIsNone(process.poll())
+        self.assertLess(process.get_running_seconds(), 0.5)
+        process.resume()
+        self.assertEqual(process.wait(), 0)
+        self.assertFalse(process.TimedOut)
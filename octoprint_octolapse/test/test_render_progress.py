@@ -0,0 +1,156 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import csv
+import os
+import shutil
+import unittest
+from io import BytesIO
+from tempfile import mkdtemp
+
+from octoprint_octolapse.render_progress import (CombinedRenderProgress, RenderProgress, RenderStatisticsColumns,
+                                                 append_render_statistics, parse_ffmpeg_time)
+
+
+def create_progress_block(frame, fps, out_time, speed, progress="continue"):
+    # the values ffmpeg writes with -progress, in the same order
+    return (
+        "frame={0}\nfps={1}\nstream_0_0_q=2.0\nbitrate=N/A\ntotal_size=N/A\nout_time_us=N/A\nout_time_ms=N/A\n"
+        "out_time={2}\ndup_frames=0\ndrop_frames=0\nspeed={3}\nprogress={4}\n"
+    ).format(frame, fps, out_time, speed, progress).encode('utf-8')
+
+
+class TestRenderProgress(unittest.TestCase):
+    def setUp(self):
+        self.Notifications = []
+        self.RunningSeconds = 0
+
+    def get_running_seconds(self):
+        return self.RunningSeconds
+
+    def test_parse_ffmpeg_time(self):
+        """Make sure ffmpeg's times are converted to seconds."""
+        self.assertEqual(parse_ffmpeg_time("00:01:02.500000"), 62.5)
+        self.assertEqual(parse_ffmpeg_time("01:00:00.000000"), 3600)
+        self.assertEqual(parse_ffmpeg_time("-00:00:01.000000"), -1)
+        self.assertIsNone(parse_ffmpeg_time("N/A"))
+
+    def test_progress(self):
+        """Make sure the progress, time remaining and throughput are calculated from ffmpeg's output."""
+        progress = RenderProgress(
+            20, on_progress=self.Notifications.append, interval_seconds=0,
+            get_running_seconds=self.get_running_seconds)
+        self.assertIsNone(progress.get_seconds_remaining())
+        # the first block ffmpeg writes has no output yet
+        for line in BytesIO(create_progress_block(0, "0.00", "-577014:32:22.775808", "N/A")):
+            progress.parse_line(line)
+        self.assertEqual(progress.OutTimeSeconds, 0)
+        self.assertIsNone(progress.Speed)
+        self.assertIsNone(progress.get_seconds_remaining())
+
+        self.RunningSeconds = 10
+        for line in BytesIO(create_progress_block(125, "12.5", "00:00:05.000000", "0.5x")):
+            progress.parse_line(line)
+        self.assertEqual(len(self.Notifications), 2)
+        notification = self.Notifications[-1]
+        self.assertEqual(notification['frame'], 125)
+        self.assertEqual(notification['speed'], 0.5)
+        self.assertEqual(notification['percent_complete'], 25)
+        self.assertEqual(notification['seconds_remaining'], 30)
+        self.assertEqual(notification['frames_per_second'], 12.5)
+        self.assertFalse(notification['is_finished'])
+
+    def test_read(self):
+        """Make sure the stream is read to the end, only the last block is sent within the interval, and the running
+        time stops when ffmpeg finishes."""
+        progress = RenderProgress(
+            4, on_progress=self.Notifications.append, interval_seconds=60,
+            get_running_seconds=self.get_running_seconds)
+        self.RunningSeconds = 2
+        progress.read(BytesIO(
+            create_progress_block(50, "25.0", "00:00:02.000000", "1x") +
+            create_progress_block(75, "25.0", "00:00:03.000000", "1x") +
+            create_progress_block(100, "25.0", "00:00:04.000000", "1x", progress="end")
+        ))
+        self.assertEqual([notification['frame'] for notification in self.Notifications], [50, 100])
+        self.assertTrue(progress.IsFinished)
+        self.assertEqual(progress.get_percent_complete(), 100)
+        self.assertEqual(progress.get_seconds_remaining(), 0)
+        self.RunningSeconds = 5
+        self.assertEqual(progress.get_elapsed_seconds(), 2)
+        self.assertEqual(progress.get_frames_per_second(), 50)
+
+    def test_append_render_statistics(self):
+        """Make sure each render is appended to the statistics file below a single header."""
+        directory = mkdtemp()
+        try:
+            path = os.path.join(directory, "render_statistics.csv")
+            for job_number in range(2):
+                statistics = dict((column, "") for column in RenderStatisticsColumns)
+                statistics.update({"job_id": "job{0}".format(job_number), "frames_per_second": "12.50"})
+                append_render_statistics(path, statistics)
+            with open(path, "r") as statistics_file:
+                rows = list(csv.DictReader(statistics_file))
+            self.assertEqual([row["job_id"] for row in rows], ["job0", "job1"])
+            self.assertEqual(rows[1]["frames_per_second"], "12.50")
+        finally:
+            shutil.rmtree(directory)
+
+    def test_combined_progress(self):
+        """Make sure the progress of segments rendered at the same time is added up."""
+        combined = CombinedRenderProgress(
+            20, on_progress=self.Notifications.append, interval_seconds=0,
+            get_running_seconds=self.get_running_seconds)
+        first_segment = combined.add_segment(10)
+        second_segment = combined.add_segment(10)
+        self.RunningSeconds = 5
+        for line in BytesIO(create_progress_block(50, "10.0", "00:00:02.000000", "0.4x")):
+            first_segment.parse_line(line)
+        for line in BytesIO(create_progress_block(75, "15.0", "00:00:03.000000", "0.6x")):
+            second_segment.parse_line(line)
+        self.assertEqual(combined.Frame, 125)
+        self.assertEqual(combined.Fps, 25)
+        self.assertEqual(combined.Speed, 1)
+        self.assertEqual(combined.get_percent_complete(), 25)
+        self.assertFalse(combined.IsFinished)
+        for line in BytesIO(create_progress_block(100, "10.0", "00:00:10.000000", "1x", progress="end")):
+            first_segment.parse_line(line)
+        self.assertFalse(combined.IsFinished)
+        for line in BytesIO(create_progress_block(100, "10.0", "00:00:10.000000", "1x", progress="end")):
+            second_segment.parse_line(line)
+        self.assertTrue(combined.IsFinished)
+        self.assertEqual(self.Notifications[-1]['frame'], 200)
+        self.assertEqual(self.Notifications[-1]['percent_complete'], 100)
+
+    def test_combined_progress_running_seconds(self):
+        """Make sure the combined render has been running as long as its longest running segment, leaving out the
+        time the segments were paused."""
+        combined = CombinedRenderProgress(20, interval_seconds=0)
+        self.assertEqual(combined.get_elapsed_seconds(), 0)
+        first_segment = combined.add_segment(10, get_running_seconds=lambda: 4.0)
+        combined.add_segment(10, get_running_seconds=self.get_running_seconds)
+        self.RunningSeconds = 5
+        self.assertEqual(combined.get_elapsed_seconds(), 5)
+        for line in BytesIO(create_progress_block(100, "25.0", "00:00:10.000000", "2.5x", progress="end")):
+            first_segment.parse_line(line)
+        self.assertEqual(combined.get_frames_per_second(), 20)
@@ -0,0 +1,262 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import json
+import os
+import shutil
+import threading
+import unittest
+from tempfile import mkdtemp
+
+import octoprint_octolapse.render_scheduler as render_scheduler
+from octoprint_octolapse.render_scheduler import RenderJobInfo, RenderScheduler
+
+
+class FakeRenderJob(object):
+    # renders until it is finished or cancelled
+    def __init__(self, job_info, thread_count):
+        self.JobInfo = job_info
+        self.ThreadCount = thread_count
+        self.Started = threading.Event()
+        self.Finished = threading.Event()
+        self.Cancelled = False
+        self.Stopped = False
+        self.IsPaused = False
+
+    def process(self):
+        self.Started.set()
+        self.Finished.wait(10)
+
+    def cancel(self):
+        self.Cancelled = True
+        self.Finished.set()
+
+    def stop(self):
+        self.Stopped = True
+        self.Finished.set()
+
+    def pause(self):
+        self.IsPaused = True
+
+    def resume(self):
+        self.IsPaused = False
+
+
+class TestRenderScheduler(unittest.TestCase):
+    def setUp(self):
+        self.Directory = mkdtemp()
+        self.QueuePath = os.path.join(self.Directory, "render_queue.json")
+        self.Jobs = {}
+        self.Changed = threading.Event()
+        self.Errors = []
+        self.Schedulers = []
+
+    def tearDown(self):
+        # wait for the render threads, so that they can't save the queue while it is being removed
+        for scheduler in self.Schedulers:
+            scheduler.stop(5)
+        shutil.rmtree(self.Directory)
+
+    def create_job(self, job_info, thread_count, streaming_render):
+        job = FakeRenderJob(job_info, thread_count)
+        self.Jobs[job_info.PrintName] = job
+        return job
+
+    def create_scheduler(self, worker_count, create_job=None):
+        scheduler = RenderScheduler(
+            self.QueuePath, worker_count, create_job or self.create_job, on_change=self.Changed.set,
+            on_error=self.Errors.append)
+        self.Schedulers.append(scheduler)
+        return scheduler
+
+    @staticmethod
+    def create_job_info(print_name, priority=0):
+        job_info = RenderJobInfo()
+        job_info.PrintName = print_name
+        job_info.Priority = priority
+        job_info.Rendering = {'name': 'Default'}
+        return job_info
+
+    def wait_for_start(self, print_name):
+        for attempt in range(100):
+            if print_name in self.Jobs:
+                break
+            threading.Event().wait(0.05)
+        self.assertTrue(self.Jobs[print_name].Started.wait(5))
+
+    def finish(self, scheduler, print_name):
+        job_id = self.Jobs[print_name].JobInfo.JobId
+        self.Jobs[print_name].Finished.set()
+        for attempt in range(100):
+            if job_id not in [job['job_id'] for job in scheduler.to_list()]:
+                return
+            threading.Event().wait(0.05)
+        self.fail("{0} didn't finish.".format(print_name))
+
+    @staticmethod
+    def get_print_names(scheduler):
+        return [job['print_name'] for job in scheduler.to_list()]
+
+    def test_priority(self):
+        """Make sure queued jobs start in order of priority, then in the order they were added."""
+        scheduler = self.create_scheduler(1)
+        scheduler.add(self.create_job_info("first"))
+        self.wait_for_start("first")
+        scheduler.add(self.create_job_info("failed"))
+        scheduler.add(self.create_job_info("completed", priority=1))
+        self.assertEqual(self.get_print_names(scheduler), ["first", "completed", "failed"])
+        self.assertTrue(scheduler.is_rendering())
+        self.finish(scheduler, "first")
+        self.wait_for_start("completed")
+        self.assertNotIn("failed", self.Jobs)
+        self.finish(scheduler, "completed")
+        self.wait_for_start("failed")
+        self.finish(scheduler, "failed")
+        self.assertFalse(scheduler.is_rendering())
+        self.assertEqual(self.Errors, [])
+
+    def test_worker_count(self):
+        """Make sure no more than the configured number of jobs render at once, sharing the cpus."""
+        scheduler = self.create_scheduler(2)
+        for print_name in ["a", "b", "c"]:
+            scheduler.add(self.create_job_info(print_name))
+        self.wait_for_start("a")
+        self.wait_for_start("b")
+        self.assertNotIn("c", self.Jobs)
+        self.assertEqual([job['is_rendering'] for job in scheduler.to_list()], [True, True, False])
+        self.assertEqual(self.Jobs["a"].ThreadCount, max(1, render_scheduler.get_cpu_count() // 2))
+        scheduler.configure(3)
+        self.wait_for_start("c")
+
+    def test_move(self):
+        """Make sure queued jobs can be reordered, but can't be moved ahead of a rendering job."""
+        scheduler = self.create_scheduler(1)
+        for print_name in ["a", "b", "c", "d"]:
+            scheduler.add(self.create_job_info(print_name))
+        self.wait_for_start("a")
+        job_ids = dict((job['print_name'], job['job_id']) for job in scheduler.to_list())
+        self.assertTrue(scheduler.move(job_ids["d"], 1))
+        self.assertEqual(self.get_print_names(scheduler), ["a", "d", "b", "c"])
+        self.assertTrue(scheduler.move(job_ids["b"], 0))
+        self.assertEqual(self.get_print_names(scheduler), ["a", "b", "d", "c"])
+        self.assertTrue(scheduler.move(job_ids["b"], 10))
+        self.assertEqual(self.get_print_names(scheduler), ["a", "d", "c", "b"])
+        self.assertFalse(scheduler.move(job_ids["a"], 2))
+        self.assertFalse(scheduler.move("unknown", 2))
+
+    def test_cancel(self):
+        """Make sure a queued job is removed and a rendering job is stopped when they are cancelled."""
+        scheduler = self.create_scheduler(1)
+        scheduler.add(self.create_job_info("a"))
+        scheduler.add(self.create_job_info("b"))
+        self.wait_for_start("a")
+        job_ids = dict((job['print_name'], job['job_id']) for job in scheduler.to_list())
+        self.assertTrue(scheduler.cancel(job_ids["b"]))
+        self.assertEqual(self.get_print_names(scheduler), ["a"])
+        self.assertTrue(scheduler.cancel(job_ids["a"]))
+        self.assertTrue(self.Jobs["a"].Cancelled)
+        self.finish(scheduler, "a")
+        self.assertNotIn("b", self.Jobs)
+        self.assertFalse(scheduler.cancel(job_ids["b"]))
+
+    def test_cancel_while_starting(self):
+        """Make sure a job that is cancelled before its render job is created is still cancelled."""
+        creating = threading.Event()
+        created = threading.Event()
+
+        def create_job(job_info, thread_count, streaming_render):
+            creating.set()
+            created.wait(5)
+            return self.create_job(job_info, thread_count, streaming_render)
+
+        scheduler = self.create_scheduler(1, create_job)
+        scheduler.add(self.create_job_info("a"))
+        self.assertTrue(creating.wait(5))
+        self.assertTrue(scheduler.cancel(scheduler.to_list()[0]['job_id']))
+        created.set()
+        self.wait_for_start("a")
+        self.assertTrue(self.Jobs["a"].Cancelled)
+        self.finish(scheduler, "a")
+        self.assertEqual(self.Errors, [])
+
+    def test_resume(self):
+        """Make sure jobs that were rendering or queued are saved, and are rendered again after a restart."""
+        scheduler = self.create_scheduler(1)
+        scheduler.add(self.create_job_info("a"))
+        scheduler.add(self.create_job_info("b"))
+        self.wait_for_start("a")
+        with open(self.QueuePath, "r") as queue_file:
+            saved_jobs = json.load(queue_file)
+        self.assertEqual([job['print_name'] for job in saved_jobs], ["a", "b"])
+        self.assertEqual(saved_jobs[0]['rendering'], {'name': 'Default'})
+
+        # a new scheduler, as if OctoPrint had restarted
+        self.Jobs = {}
+        resumed_scheduler = self.create_scheduler(1)
+        resumed_scheduler.load()
+        self.wait_for_start("a")
+        self.assertEqual(self.Jobs["a"].JobInfo.to_dict(), dict(saved_jobs[0], is_rendering=True))
+        self.assertEqual(self.get_print_names(resumed_scheduler), ["a", "b"])
+        self.finish(resumed_scheduler, "a")
+        self.wait_for_start("b")
+        self.finish(resumed_scheduler, "b")
+        with open(self.QueuePath, "r") as queue_file:
+            self.assertEqual(json.load(queue_file), [])
+
+    def test_pause(self):
+        """Make sure pausing pauses the rendering jobs and holds the queued jobs until rendering resumes."""
+        scheduler = self.create_scheduler(1)
+        scheduler.add(self.create_job_info("a"))
+        scheduler.add(self.create_job_info("b"))
+        self.wait_for_start("a")
+        scheduler.pause()
+        self.assertTrue(self.Jobs["a"].IsPaused)
+        self.finish(scheduler, "a")
+        threading.Event().wait(0.2)
+        self.assertNotIn("b", self.Jobs)
+        scheduler.resume()
+        self.wait_for_start("b")
+        self.assertFalse(self.Jobs["b"].IsPaused)
+        self.finish(scheduler, "b")
+        self.assertEqual(self.Errors, [])
+
+    def test_stop(self):
+        """Make sure stopping ends the rendering jobs, but keeps every job in the saved queue."""
+        scheduler = self.create_scheduler(1)
+        scheduler.add(self.create_job_info("a"))
+        scheduler.add(self.create_job_info("b"))
+        self.wait_for_start("a")
+        self.assertTrue(scheduler.stop(5))
+        self.assertTrue(self.Jobs["a"].Stopped)
+        self.assertFalse(self.Jobs["a"].Cancelled)
+        self.assertNotIn("b", self.Jobs)
+        with open(self.QueuePath, "r") as queue_file:
+            self.assertEqual([job['print_name'] for job in json.load(queue_file)], ["a", "b"])
+        self.assertEqual(self.Errors, [])
+
+    def test_load_missing_queue(self):
+        """Make sure there is nothing to render when no queue was saved."""
+        scheduler = self.create_scheduler(1)
+        scheduler.load()
+        self.assertEqual(scheduler.to_list(), [])
+        self.assertEqual(self.Errors, [])
@@ -0,0 +1,161 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import shutil
+import unittest
+from tempfile import gettempdir, mkdtemp, NamedTemporaryFile
+
+from PIL import Image
+
+from octoprint_octolapse.settings import OctolapseSettings
+from octoprint_octolapse.snapshot import (
+    CaptureSnapshot, LatestSnapshot, LatestSnapshotCache, SnapshotInfo, SnapshotJob, SnapshotStatistics,
+    create_thumbnail
+)
+from octoprint_octolapse.snapshot_container import SnapshotContainer
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_SnapshotStatistics(self):
+        """Make sure the timing of each stage is tracked separately."""
+        statistics = SnapshotStatistics()
+        statistics.add("capture", 0.5)
+        statistics.add("capture", 1.5)
+        statistics.add("post_processing", 2.0)
+        stages = statistics.get_statistics()
+        self.assertEqual(stages["capture"]["count"], 2)
+        self.assertAlmostEqual(stages["capture"]["average"], 1.0)
+        self.assertAlmostEqual(stages["capture"]["max"], 1.5)
+        self.assertAlmostEqual(stages["capture"]["last"], 1.5)
+        self.assertEqual(stages["post_processing"]["count"], 1)
+        self.assertNotIn("post_processing_wait", stages)
+
+    def test_LatestSnapshot(self):
+        """Make sure an older snapshot that finishes post processing late doesn't replace the latest snapshot."""
+        saved = []
+        latest_snapshot = LatestSnapshot()
+        self.assertTrue(latest_snapshot.update(0, lambda: saved.append(0)))
+        self.assertTrue(latest_snapshot.update(2, lambda: saved.append(2)))
+        self.assertFalse(latest_snapshot.update(1, lambda: saved.append(1)))
+        self.assertEqual(saved, [0, 2])
+        self.assertEqual(latest_snapshot.SnapshotNumber, 2)
+
+    def test_LatestSnapshotCache(self):
+        """Make sure the cached images get a new etag each time a newer snapshot is saved."""
+        cache = LatestSnapshotCache()
+        self.assertEqual(cache.get_image(False), (None, None))
+        latest_snapshot = LatestSnapshot(cache)
+        latest_snapshot.update(0, lambda: (b"image 0", b"thumbnail 0"))
+        first_etag, image = cache.get_image(False)
+        self.assertEqual(image, b"image 0")
+        self.assertEqual(cache.get_image(True), (first_etag, b"thumbnail 0"))
+        latest_snapshot.update(2, lambda: (b"image 2", b"thumbnail 2"))
+        latest_snapshot.update(1, lambda: (b"image 1", b"thumbnail 1"))
+        second_etag, image = cache.get_image(False)
+        self.assertNotEqual(first_etag, second_etag)
+        self.assertEqual(image, b"image 2")
+        self.assertEqual(cache.Version, 2)
+        # a cache from another process must not share etags
+        self.assertNotEqual(LatestSnapshotCache().get_etag(), LatestSnapshotCache().get_etag())
+
+    def test_LatestSnapshot_on_changed(self):
+        """Make sure the version sent to the browser is the version of the image that is served for it."""
+        cache = LatestSnapshotCache()
+        versions = []
+
+        def on_changed(version):
+            versions.append(version)
+            etag, image = cache.get_image(False)
+            self.assertEqual(etag, "{0}-{1}".format(etag.split("-")[0], version))
+            self.assertEqual(image, "image {0}".format(len(versions)).encode())
+
+        latest_snapshot = LatestSnapshot(cache, on_changed=on_changed)
+        latest_snapshot.update(0, lambda: (b"image 1", b"thumbnail 1"))
+        latest_snapshot.update(1, lambda: (b"image 2", b"thumbnail 2"))
+        # an older snapshot and a snapshot without images don't change the version
+        latest_snapshot.update(0, lambda: (b"image 0", b"thumbnail 0"))
+        latest_snapshot.update(2, lambda: None)
+        self.assertEqual(versions, [1, 2])
+        self.assertEqual(cache.Version, 2)
+
+    def test_LatestSnapshotCache_load(self):
+        """Make sure the latest snapshot saved before a restart is loaded from disk."""
+        path = NamedTemporaryFile(suffix=".jpg", delete=False).name
+        try:
+            with open(path, "wb") as image_file:
+                image_file.write(b"saved image")
+            cache = LatestSnapshotCache()
+            self.assertEqual(cache.get_image(True, path)[1], b"saved image")
+            self.assertEqual(cache.get_image(False), (None, None))
+        finally:
+            os.remove(path)
+
+    def test_create_thumbnail(self):
+        """Make sure thumbnails have the requested width, including snapshots rotated by an exif orientation tag."""
+        source_path = NamedTemporaryFile(suffix=".jpg", delete=False).name
+        thumbnail_path = NamedTemporaryFile(suffix=".jpg", delete=False).name
+        try:
+            Image.new("RGB", (1600, 1200), (128, 64, 32)).save(source_path, "JPEG")
+            thumbnail = create_thumbnail(source_path, thumbnail_path, 300, 75)
+            self.assertEqual(Image.open(thumbnail_path).size, (300, 225))
+            with open(thumbnail_path, "rb") as thumbnail_file:
+                self.assertEqual(thumbnail_file.read(), thumbnail)
+            create_thumbnail(source_path, thumbnail_path, 300, 75, "rotate_90")
+            self.assertEqual(Image.open(thumbnail_path).size, (300, 400))
+            create_thumbnail(source_path, thumbnail_path, 160, 50, "flip_left_right")
+            self.assertEqual(Image.open(thumbnail_path).size, (160, 120))
+        finally:
+            os.remove(source_path)
+            os.remove(thumbnail_path)
+
+    def test_failed_capture_gives_up_number(self):
+        """Make sure a failed capture doesn't hold back the frames of the snapshots after it."""
+
+        class FailedSnapshotJob(SnapshotJob):
+            def _download_snapshot(self, snapshot_path):
+                self.HasError = True
+
+        directory = mkdtemp()
+        try:
+            container = SnapshotContainer(os.path.join(directory, "timelapse.mjpeg"))
+            failed = []
+            job = FailedSnapshotJob(
+                OctolapseSettings(NamedTemporaryFile().name), directory, 0, SnapshotInfo("test", 0),
+                "http://localhost/snapshot", "guid", 0, 1, on_complete=lambda: None, on_success=lambda: None,
+                on_fail=failed.append, container=container
+            )
+            job.process()
+            self.assertEqual(len(failed), 1)
+            self.assertEqual(container.append(1, b"image 1"), 1)
+            self.assertEqual(container.get_frame_count(), 1)
+            container.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_capture_timeout(self):
+        """Make sure the time allowed for a capture includes the camera delay and the camera timeout."""
+        settings = OctolapseSettings(NamedTemporaryFile().name)
+        settings.current_camera().delay = 500
+        settings.current_camera().timeout_ms = 2000
+        self.assertAlmostEqual(CaptureSnapshot(settings, gettempdir(), 0).get_capture_timeout(), 2.5)
@@ -0,0 +1,94 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import shutil
+import unittest
+from tempfile import mkdtemp
+
+import octoprint_octolapse.snapshot_container as snapshot_container
+from octoprint_octolapse.snapshot_container import SnapshotContainer
+
+
+class TestSnapshotContainer(unittest.TestCase):
+    def setUp(self):
+        self.Directory = mkdtemp()
+        self.Path = os.path.join(self.Directory, "print_1", "print.mjpeg")
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    @staticmethod
+    def create_frame(snapshot_number):
+        return b"\xff\xd8frame" + str(snapshot_number).encode() + b"\xff\xd9"
+
+    def test_append(self):
+        """Make sure frames are stored back to back and can be read with the index."""
+        container = SnapshotContainer(self.Path)
+        for snapshot_number in range(3):
+            self.assertEqual(container.append(snapshot_number, self.create_frame(snapshot_number)), 1)
+        self.assertEqual(container.get_frame_count(), 3)
+        container.close()
+        self.assertEqual(snapshot_container.get_frame_count(self.Path), 3)
+        self.assertEqual(snapshot_container.read_frame(self.Path, 1), self.create_frame(1))
+        with open(self.Path, "rb") as container_file:
+            self.assertEqual(container_file.read(), b"".join(self.create_frame(n) for n in range(3)))
+
+    def test_append_out_of_order(self):
+        """Make sure a frame that finishes post processing early waits for the earlier frames."""
+        container = SnapshotContainer(self.Path)
+        self.assertEqual(container.append(1, self.create_frame(1)), 0)
+        self.assertEqual(container.append(2, None), 0)
+        self.assertEqual(container.get_frame_count(), 0)
+        self.assertEqual(container.append(0, self.create_frame(0)), 2)
+        self.assertEqual(container.append(3, self.create_frame(3)), 1)
+        self.assertRaises(ValueError, container.append, 1, self.create_frame(1))
+        container.close()
+        self.assertEqual(
+            [snapshot_container.read_frame(self.Path, index) for index in range(3)],
+            [self.create_frame(0), self.create_frame(1), self.create_frame(3)])
+
+    def test_recover(self):
+        """Make sure a frame that was only partly written is dropped when the container is reopened."""
+        container = SnapshotContainer(self.Path)
+        container.append(0, self.create_frame(0))
+        container.close()
+        with open(self.Path, "ab") as container_file:
+            container_file.write(b"\xff\xd8partial")
+        with open(snapshot_container.get_index_path(self.Path), "ab") as index_file:
+            index_file.write(b"\x00\x01")
+        container = SnapshotContainer(self.Path)
+        container.append(0, self.create_frame(1))
+        self.assertEqual(container.get_frame_count(), 2)
+        container.close()
+        self.assertEqual(os.path.getsize(self.Path), len(self.create_frame(0)) + len(self.create_frame(1)))
+        self.assertEqual(snapshot_container.read_frame(self.Path, 1), self.create_frame(1))
+
+    def test_remove(self):
+        """Make sure removing the container removes its index too."""
+        container = SnapshotContainer(self.Path)
+        container.append(0, self.create_frame(0))
+        container.close()
+        snapshot_container.remove(self.Path)
+        self.assertEqual(os.listdir(os.path.dirname(self.Path)), [])
+        self.assertEqual(snapshot_container.get_frame_count(self.Path), 0)
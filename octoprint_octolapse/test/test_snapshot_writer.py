@@ -0,0 +1,74 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import os
+import shutil
+import unittest
+from tempfile import mkdtemp
+
+from octoprint_octolapse.snapshot_writer import SnapshotWriter
+
+
+class TestSnapshotWriter(unittest.TestCase):
+    def setUp(self):
+        self.Directory = mkdtemp()
+        self.Writer = SnapshotWriter()
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def test_write(self):
+        """Make sure the snapshot is written to its final path, creating the directory, without leaving a temp
+        file behind."""
+        path = os.path.join(self.Directory, "print_1", "print00001.jpg")
+        self.assertEqual(self.Writer.write(path, [b"\xff\xd8", b"", b"image\xff\xd9"]), 9)
+        with open(path, "rb") as snapshot_file:
+            self.assertEqual(snapshot_file.read(), b"\xff\xd8image\xff\xd9")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["print00001.jpg"])
+
+    def test_write_failed(self):
+        """Make sure a capture that fails part way doesn't leave a partial snapshot."""
+        path = os.path.join(self.Directory, "print00001.jpg")
+
+        def chunks():
+            yield b"\xff\xd8"
+            raise IOError("The connection was reset.")
+
+        self.assertRaises(IOError, self.Writer.write, path, chunks())
+        self.assertEqual(os.listdir(self.Directory), [])
+
+    def test_link(self):
+        """Make sure the latest snapshot is replaced by a link to the newest snapshot."""
+        latest_path = os.path.join(self.Directory, "latest", "latest_snapshot.jpeg")
+        for snapshot_number in range(2):
+            path = os.path.join(self.Directory, "print{0:05d}.jpg".format(snapshot_number))
+            self.Writer.write(path, [b"image", str(snapshot_number).encode()])
+            linked = self.Writer.link(path, latest_path)
+            with open(latest_path, "rb") as latest_file:
+                self.assertEqual(latest_file.read(), "image{0}".format(snapshot_number).encode())
+            if linked:
+                self.assertTrue(os.path.samefile(path, latest_path))
+        self.assertEqual(os.listdir(os.path.dirname(latest_path)), ["latest_snapshot.jpeg"])
+        # the previous snapshot must not change when the latest snapshot is replaced
+        with open(os.path.join(self.Directory, "print00000.jpg"), "rb") as snapshot_file:
+            self.assertEqual(snapshot_file.read(), b"image0")
@@ -0,0 +1,89 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+import threading
+import unittest
+
+from octoprint_octolapse.worker_pool import WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.Errors = []
+        self.Pool = WorkerPool("TestPool", 2, 2, on_error=self.Errors.append)
+
+    def tearDown(self):
+        self.Pool.shutdown()
+        del self.Pool
+
+    def test_submit_and_drain(self):
+        """Make sure every submitted task runs and that drain waits for all of them."""
+        results = []
+        for index in range(10):
+            self.assertTrue(self.Pool.submit(results.append, [index]))
+        self.assertTrue(self.Pool.drain(5))
+        self.assertEqual(sorted(results), list(range(10)))
+        self.assertEqual(self.Pool.pending(), 0)
+        statistics = self.Pool.get_statistics()
+        self.assertEqual(statistics["submitted"], 10)
+        self.assertEqual(statistics["completed"], 10)
+        self.assertLessEqual(statistics["workers"], 2)
+
+    def test_back_pressure(self):
+        """Make sure a full queue rejects new tasks once the timeout expires."""
+        release = threading.Event()
+        # two running tasks and two queued tasks fill the pool
+        for _ in range(4):
+            self.assertTrue(self.Pool.submit(release.wait, [5]))
+        self.assertFalse(self.Pool.submit(release.wait, [5], timeout=0.01))
+        self.assertFalse(self.Pool.drain(0.01))
+        self.assertEqual(self.Pool.get_statistics()["rejected"], 1)
+        release.set()
+        self.assertTrue(self.Pool.drain(5))
+
+    def test_errors(self):
+        """Make sure a failing task is reported and does not stop the workers."""
+        results = []
+
+        def fail():
+            raise ValueError("Test")
+
+        self.Pool.submit(fail)
+        self.Pool.submit(results.append, [1])
+        self.assertTrue(self.Pool.drain(5))
+        self.assertEqual(len(self.Errors), 1)
+        self.assertIsInstance(self.Errors[0], ValueError)
+        self.assertEqual(results, [1])
+        self.assertEqual(self.Pool.get_statistics()["failed"], 1)
+
+    def test_configure(self):
+        """Make sure configure finishes queued tasks and applies the new limits."""
+        results = []
+        self.Pool.submit(results.append, [1])
+        self.Pool.configure(1, 0)
+        self.assertEqual(results, [1])
+        self.assertEqual(self.Pool.NumWorkers, 1)
+        self.assertEqual(self.Pool.MaxQueueSize, 0)
+        self.Pool.submit(results.append, [2])
+        self.assertTrue(self.Pool.drain(5))
+        self.assertEqual(results, [1, 2])
@@ -21,19 +21,25 @@
 # following email address: FormerLurker@pm.me
 ##################################################################################
 
+import os
 import time
 import threading
 import uuid
 
-from Queue import Queue
+import octoprint_octolapse.mjpeg_stream as mjpeg_stream
 import octoprint_octolapse.utility as utility
 from octoprint_octolapse.gcode_parser import Commands
 from octoprint_octolapse.gcode import SnapshotGcodeGenerator, SnapshotGcode
 from octoprint_octolapse.position import Position
-from octoprint_octolapse.render import Render, RenderingCallbackArgs
+from octoprint_octolapse.publisher import StatePublisher
+from octoprint_octolapse.render import Render, RenderingCallbackArgs, StreamingRender
+from octoprint_octolapse.render_process import RenderProcessOptions
+from octoprint_octolapse.render_progress import append_render_statistics
+from octoprint_octolapse.render_scheduler import RenderJobInfo, RenderScheduler, get_cpu_count
 from octoprint_octolapse.settings import (Printer, Rendering, Snapshot, OctolapseSettings)
 from octoprint_octolapse.snapshot import CaptureSnapshot
 from octoprint_octolapse.trigger import Triggers
+from octoprint_octolapse.worker_pool import WorkerPool
 
 
 class Timelapse(object):
@@ -45,10 +51,12 @@ class Timelapse(object):
             on_render_start=None, on_render_end=None,
             on_timelapse_stopping=None, on_timelapse_stopped=None,
             on_state_changed=None, on_timelapse_start=None, on_timelapse_end = None,
-            on_snapshot_position_error=None, on_position_error=None):
+            on_snapshot_position_error=None, on_position_error=None, on_render_queue_changed=None,
+            on_render_progress=None, on_latest_snapshot_changed=None):
         # config variables - These don't change even after a reset
         self.DataFolder = data_folder
         self.Settings = settings  # type: OctolapseSettings
+        self.ResolvedProfiles = self.Settings.resolved_profiles()
         self.OctoprintPrinter = octoprint_printer
         self.DefaultTimelapseDirectory = timelapse_folder
         self.OnPrintStartCallback = on_print_started
@@ -64,11 +72,12 @@ class Timelapse(object):
         self.OnTimelapseEndCallback = on_timelapse_end
         self.OnSnapshotPositionErrorCallback = on_snapshot_position_error
         self.OnPositionErrorCallback = on_position_error
+        self.OnRenderQueueChangedCallback = on_render_queue_changed
+        self.OnRenderProgressCallback = on_render_progress
+        self.OnLatestSnapshotChangedCallback = on_latest_snapshot_changed
         self.Commands = Commands()  # used to parse and generate gcode
         self.Triggers = None
         self.PrintEndStatus = "Unknown"
-        self.LastStateChangeMessageTime = None
-        self.StateChangeMessageThread = None
         # Settings that may be different after StartTimelapse is called
 
         self.OctoprintPrinterProfile = None
@@ -84,6 +93,9 @@ class Timelapse(object):
         self.IsTestMode = False
         # State Tracking that should only be reset when starting a timelapse
         self.SnapshotCount = 0
+        # The number of the next snapshot job.  Numbers are reserved when the job is created, so a capture that
+        # finishes after the snapshot timeout can't share its number with the next capture.
+        self._next_snapshot_number = 0
 
         self.HasBeenStopped = False
         self.TimelapseStopRequested = False
@@ -101,8 +113,16 @@ class Timelapse(object):
 
         # get snapshot async private variables
         self._snapshot_success = False
-        # It shouldn't take more than 5 seconds to take a snapshot!
+        # How long to wait for a snapshot.  When a timelapse starts this is set to the camera delay plus the camera
+        # timeout, plus a margin for the snapshot job to start.
         self._snapshot_timeout = 5.0
+        self._snapshot_timeout_margin = 1.0
+        # worker pool limits and how long end_timelapse waits for queued callbacks to be delivered
+        self._task_queue_size = 5
+        self._callback_queue_size = 50
+        self._callback_drain_timeout = 5.0
+        # how long a shutdown waits for the rendering jobs to stop
+        self._render_stop_timeout = 10.0
         self._snapshot_signal = threading.Event()
         self._snapshot_signal.set()
         self._most_recent_snapshot_payload = None
@@ -110,9 +130,44 @@ class Timelapse(object):
         self.CurrentProfiles = {}
         self.CurrentFileLine = 0
 
-        # snapshot thread queue
-        self._snapshot_task_queue = Queue(maxsize=1)
-        self._rendering_task_queue = Queue(maxsize=1)
+        # Long lived workers for snapshot capture, snapshot post processing, timelapse tasks (acquiring positions and
+        # snapshots while the print is on hold), queueing renders and callback delivery.  The worker counts are taken
+        # from the main settings when a timelapse starts.
+        self._snapshot_pool = WorkerPool(
+            "OctolapseSnapshot", settings.snapshot_worker_count, settings.snapshot_queue_size,
+            on_error=self._on_worker_error
+        )
+        self._post_processing_pool = WorkerPool(
+            "OctolapseSnapshotPostProcessing", settings.post_processing_worker_count,
+            settings.post_processing_queue_size, on_error=self._on_worker_error
+        )
+        self._task_pool = WorkerPool(
+            "OctolapseTask", 1, self._task_queue_size, on_error=self._on_worker_error
+        )
+        # Waits for the snapshots of a finished print before queueing its render.  This can take a while, so it must
+        # not hold up the task pool, which the next print needs while it is on hold.
+        self._render_queue_pool = WorkerPool(
+            "OctolapseRenderQueue", 1, self._task_queue_size, on_error=self._on_worker_error
+        )
+        self._callback_pool = WorkerPool(
+            "OctolapseCallback", settings.callback_worker_count, self._callback_queue_size,
+            on_error=self._on_worker_error
+        )
+        # Publishes position, extruder and trigger state changes from a single thread, coalescing changes so that
+        # at most one message is sent per interval.
+        self._state_publisher = StatePublisher(
+            "OctolapseStatePublisher", self._get_state_changed_message, self._on_state_changed,
+            interval_seconds=settings.state_message_interval, on_error=self._on_worker_error
+        )
+        # Renders the timelapses of finished prints.  The queue is saved in the data folder, and is loaded again by
+        # resume_rendering after OctoPrint restarts.
+        self._render_scheduler = RenderScheduler(
+            os.path.join(data_folder, "render_queue.json"), settings.render_worker_count, self._create_render_job,
+            on_change=self._on_render_queue_changed, on_error=self._on_worker_error
+        )
+        # renders are paused while printing, so that ffmpeg can't slow down the serial thread
+        self._is_printing = False
+        self._pause_rendering_while_printing = settings.pause_rendering_while_printing
         self._reset()
 
     def start_timelapse(
@@ -121,26 +176,58 @@ class Timelapse(object):
         self._reset()
         # in case the settings have been destroyed and recreated
         self.Settings = settings
+        # resolve the current profiles once.  They are only resolved again if the settings change.
+        self.ResolvedProfiles = self.Settings.resolved_profiles()
         # time tracking - how much time did we add to the print?
         self.SnapshotCount = 0
+        self._next_snapshot_number = 0
         self.SecondsAddedByOctolapse = 0
         self.RequiresLocationDetectionAfterHome = False
+        # apply any changes to the worker counts.  Anything still queued from the last timelapse completes first.
+        self._snapshot_pool.configure(self.Settings.snapshot_worker_count, self.Settings.snapshot_queue_size)
+        self._post_processing_pool.configure(
+            self.Settings.post_processing_worker_count, self.Settings.post_processing_queue_size)
+        self._callback_pool.configure(self.Settings.callback_worker_count, self._callback_queue_size)
+        self._render_scheduler.configure(self.Settings.render_worker_count)
+        self._state_publisher.IntervalSeconds = self.Settings.state_message_interval
+        self._state_publisher.reset_statistics()
+        self._state_publisher.start()
         self.OctoprintPrinterProfile = octoprint_printer_profile
         self.FfMpegPath = ffmpeg_path
         self.PrintStartTime = time.time()
-        self.Snapshot = Snapshot(self.Settings.current_snapshot())
+        self.Snapshot = Snapshot(self.ResolvedProfiles.Snapshot)
         self.Gcode = SnapshotGcodeGenerator(
             self.Settings, octoprint_printer_profile)
-        self.Printer = Printer(self.Settings.current_printer())
+        self.Printer = Printer(self.ResolvedProfiles.Printer)
         self.Rendering = Rendering(self.Settings.current_rendering())
+        if self.CaptureSnapshot is not None:
+            self.CaptureSnapshot.stop_stream()
+            self.CaptureSnapshot.close_container()
+            if self.CaptureSnapshot.StreamingRender is not None:
+                # the previous timelapse was never rendered
+                self.CaptureSnapshot.StreamingRender.cancel()
+        streaming_render = None
+        if self.Rendering.enabled and StreamingRender.can_render(self.Rendering, self.FfMpegPath):
+            streaming_render = StreamingRender(
+                self.Rendering, self.Settings.current_debug_profile(), self.FfMpegPath, 1,
+                "{0}render_{1}.{2}".format(
+                    utility.get_snapshot_temp_directory(self.DataFolder), uuid.uuid4(), self.Rendering.output_format),
+                process_options=RenderProcessOptions.from_settings(self.Settings)
+            )
         self.CaptureSnapshot = CaptureSnapshot(
-            self.Settings, self.DataFolder, print_start_time=self.PrintStartTime)
+            self.Settings, self.DataFolder, print_start_time=self.PrintStartTime,
+            post_processing_pool=self._post_processing_pool, streaming_render=streaming_render,
+            on_latest_snapshot_changed=self._on_latest_snapshot_changed)
+        self._snapshot_timeout = self.CaptureSnapshot.get_capture_timeout() + self._snapshot_timeout_margin
         self.Position = Position(
             self.Settings, octoprint_printer_profile, g90_influences_extruder)
         self.State = TimelapseState.WaitingForTrigger
-        self.IsTestMode = self.Settings.current_debug_profile().is_test_mode
+        self.IsTestMode = self.ResolvedProfiles.IsTestMode
         self.Triggers = Triggers(self.Settings)
         self.Triggers.create()
+        Commands.reset_skipped_command_counts()
+        Commands.ParseCache.clear()
+        Commands.ParseCache.resize(self.ResolvedProfiles.Debug.gcode_parse_cache_size)
 
         # take a snapshot of the current settings for use in the Octolapse Tab
         self.CurrentProfiles = self.Settings.get_profiles_dict()
@@ -189,7 +276,7 @@ class Timelapse(object):
         return self._position_payload
 
     def _on_snapshot_success(self, *args, **kwargs):
-        # Increment the number of snapshots received
+        # Increment the number of snapshots received.  The snapshot numbers were already reserved by the jobs.
         self.SnapshotCount += 1
         self._snapshot_success = True
         self._snapshot_signal.set()
@@ -220,19 +307,21 @@ class Timelapse(object):
             self.Settings.current_debug_profile().log_snapshot_download("Taking a snapshot.")
 
             snapshot_guid = str(uuid.uuid4())
+            printer_file_name = utility.get_currently_printing_filename(self.OctoprintPrinter)
+            snapshot_number = self._next_snapshot_number
+            self._next_snapshot_number += 1
             snapshot_job = self.CaptureSnapshot.create_snapshot_job(
-                utility.get_currently_printing_filename(self.OctoprintPrinter),
-                self.SnapshotCount,
+                printer_file_name,
+                snapshot_number,
                 snapshot_guid,
-                self._snapshot_task_queue,
                 on_success=self._on_snapshot_success,
                 on_fail=self._on_snapshot_fail,
                 on_complete=self._on_snapshot_complete
             )
-            self._snapshot_task_queue.put(snapshot_guid)
-            snapshot_thread = threading.Thread(target=snapshot_job)
-            snapshot_thread.daemon = True
-            snapshot_thread.start()
+            # wait for room in the snapshot queue, but not for longer than the snapshot itself may take
+            if not self._snapshot_pool.submit(snapshot_job, timeout=self._snapshot_timeout):
+                self.CaptureSnapshot.skip_snapshot(printer_file_name, snapshot_number)
+                self._on_snapshot_fail("The snapshot queue is full.")
 
         event_is_set = self._snapshot_signal.wait(self._snapshot_timeout)
         if not event_is_set:
@@ -389,11 +478,7 @@ class Timelapse(object):
     def stop_snapshots(self, message=None, error=False):
         self.State = TimelapseState.WaitingToRender
         if self.TimelapseStoppedCallback is not None:
-            timelapse_stopped_callback_thread = threading.Thread(
-                target=self.TimelapseStoppedCallback, args=[message, error]
-            )
-            timelapse_stopped_callback_thread.daemon = True
-            timelapse_stopped_callback_thread.start()
+            self._callback_pool.submit(self.TimelapseStoppedCallback, [message, error])
         return True
 
     def on_print_failed(self):
@@ -419,6 +504,11 @@ class Timelapse(object):
     def end_timelapse(self, print_status):
         self.PrintEndStatus = print_status
         try:
+            self._log_gcode_parse_statistics()
+            self._log_diagnostics()
+            if self.CaptureSnapshot is not None:
+                # no more snapshots will be taken, so close the camera stream if there is one
+                self.CaptureSnapshot.stop_stream()
             if self.PrintStartTime is None:
                 self._reset()
             elif self.PrintStartTime is not None and self.State in [
@@ -444,11 +534,7 @@ class Timelapse(object):
                             "The render_start function returned false"
                         )
 
-                        render_end_callback_thread = threading.Thread(
-                            target=self.OnRenderEndCallback, args=[payload]
-                        )
-                        render_end_callback_thread.daemon = True
-                        render_end_callback_thread.start()
+                        self._callback_pool.submit(self.OnRenderEndCallback, [payload])
                 self._reset()
             if self.State != TimelapseState.Idle:
                 self.State = TimelapseState.WaitingToEndTimelapse
@@ -456,9 +542,72 @@ class Timelapse(object):
         except Exception as e:
             self.Settings.current_debug_profile().log_exception(e)
 
+        # deliver any queued callbacks before announcing the end of the timelapse
+        if not self._callback_pool.drain(self._callback_drain_timeout):
+            self.Settings.current_debug_profile().log_warning(
+                "Timed out while waiting for {0} callbacks to complete.", self._callback_pool.pending())
+        # there are no more state changes to publish, the end of the timelapse callback sends the final state
+        self._state_publisher.stop(self._callback_drain_timeout)
+
         if self.OnTimelapseEndCallback is not None:
             self.OnTimelapseEndCallback()
 
+    def _log_gcode_parse_statistics(self):
+        skipped_counts = Commands.get_skipped_command_counts()
+        if len(skipped_counts) > 0:
+            self.Settings.current_debug_profile().log_info(
+                "The gcode parser skipped {0} untracked commands: {1}".format(
+                    sum(skipped_counts.values()),
+                    ", ".join(
+                        "{0}={1}".format(key, value) for key, value in sorted(
+                            skipped_counts.items(), key=lambda item: item[1], reverse=True)
+                    )
+                )
+            )
+        self.Settings.current_debug_profile().log_gcode_parse_cache_statistics(
+            "GCode parse cache statistics - size:{size}/{max_size}, hits:{hits}, misses:{misses}, "
+            "evictions:{evictions}, hit ratio:{hit_ratio:.1%}".format(**Commands.ParseCache.get_statistics())
+        )
+
+    def get_diagnostics(self):
+        return {
+            "thread_count": threading.active_count(),
+            "snapshot_pool": self._snapshot_pool.get_statistics(),
+            "post_processing_pool": self._post_processing_pool.get_statistics(),
+            "snapshot_stages": {} if self.CaptureSnapshot is None else self.CaptureSnapshot.Statistics.get_statistics(),
+            "task_pool": self._task_pool.get_statistics(),
+            "render_queue_pool": self._render_queue_pool.get_statistics(),
+            "callback_pool": self._callback_pool.get_statistics(),
+            "state_publisher": self._state_publisher.get_statistics(),
+            "camera_streams": mjpeg_stream.grabber_pool.get_statistics()
+        }
+
+    def _log_diagnostics(self):
+        self.Settings.current_debug_profile().log_info(
+            lambda: "Timelapse diagnostics - threads:{thread_count}, pools:{pools}, snapshot stages:{stages}, "
+                    "state messages:{publisher}".format(
+                pools=", ".join(
+                    "{name}(workers:{workers}/{max_workers}, pending:{pending}, completed:{completed}, "
+                    "failed:{failed}, rejected:{rejected})".format(**statistics)
+                    for statistics in [
+                        self._snapshot_pool.get_statistics(),
+                        self._post_processing_pool.get_statistics(),
+                        self._task_pool.get_statistics(),
+                        self._render_queue_pool.get_statistics(),
+                        self._callback_pool.get_statistics()
+                    ]
+                ),
+                stages="none" if self.CaptureSnapshot is None else ", ".join(
+                    "{0}(count:{count}, avg:{average:.3f}s, max:{max:.3f}s)".format(stage, **statistics)
+                    for stage, statistics in sorted(self.CaptureSnapshot.Statistics.get_statistics().items())
+                ),
+                publisher="{published} sent, latency avg:{average_latency}s, max:{max_latency}s".format(
+                    **self._state_publisher.get_statistics()
+                ),
+                thread_count=threading.active_count()
+            )
+        )
+
     def on_print_paused(self):
         try:
             if self.State == TimelapseState.Idle:
@@ -490,7 +639,47 @@ class Timelapse(object):
         return True
 
     def get_is_rendering(self):
-        return self._rendering_task_queue.qsize() > 0
+        return self._render_scheduler.is_rendering()
+
+    def resume_rendering(self):
+        """Queues any render jobs that were queued or rendering when OctoPrint stopped."""
+        self._render_scheduler.load()
+
+    def shutdown(self):
+        """Stops the state publisher and the rendering jobs when OctoPrint shuts down.  The rendering jobs are
+        rendered again by resume_rendering."""
+        self._state_publisher.stop(self._callback_drain_timeout)
+        if not self._render_scheduler.stop(self._render_stop_timeout):
+            self.Settings.current_debug_profile().log_warning(
+                "Timed out while waiting for the rendering jobs to stop.")
+
+    def configure_rendering(self, worker_count, pause_while_printing):
+        self._render_scheduler.configure(worker_count)
+        self._pause_rendering_while_printing = pause_while_printing
+        self._update_render_pause()
+
+    def set_is_printing(self, is_printing):
+        """Pauses the render jobs while the printer is printing, if enabled, and resumes them when it is idle."""
+        self._is_printing = is_printing
+        self._update_render_pause()
+
+    def is_rendering_paused(self):
+        return self._render_scheduler.IsPaused
+
+    def _update_render_pause(self):
+        if self._is_printing and self._pause_rendering_while_printing:
+            self._render_scheduler.pause()
+        else:
+            self._render_scheduler.resume()
+
+    def get_render_jobs(self):
+        return self._render_scheduler.to_list()
+
+    def move_render_job(self, job_id, index):
+        return self._render_scheduler.move(job_id, index)
+
+    def cancel_render_job(self, job_id):
+        return self._render_scheduler.cancel(job_id)
 
     def on_print_start(self, tags):
         self.OnPrintStartCallback(tags)
@@ -514,11 +703,12 @@ class Timelapse(object):
         is_snapshot_gcode_command = self._is_snapshot_command(command_string)
 
         try:
-            self.Settings.current_debug_profile().log_gcode_queuing(
-                "Queuing Command: Command Type:{0}, gcode:{1}, cmd: {2}, tags: {3}".format(
+            self._refresh_resolved_profiles()
+            if self.ResolvedProfiles.LogGcodeQueuing:
+                self.ResolvedProfiles.Debug.log_gcode_queuing(
+                    "Queuing Command: Command Type:{0}, gcode:{1}, cmd: {2}, tags: {3}",
                     cmd_type, gcode, command_string, tags
                 )
-            )
 
             try:
                 cmd, parameters = Commands.parse(command_string)
@@ -551,9 +741,7 @@ class Timelapse(object):
                     self.State = TimelapseState.AcquiringLocation
 
                     if self.OctoprintPrinter.set_job_on_hold(True):
-                        thread = threading.Thread(target=self.acquire_position, args=[command_string, cmd, parameters])
-                        thread.daemon = True
-                        thread.start()
+                        self._task_pool.submit(self.acquire_position, [command_string, cmd, parameters])
                         return None,
                 elif (self.State == TimelapseState.WaitingForTrigger
                       and self.OctoprintPrinter.is_printing()
@@ -571,12 +759,10 @@ class Timelapse(object):
 
                         # get the job lock
                         if self.OctoprintPrinter.set_job_on_hold(True):
-                            # take the snapshot on a new thread
-                            thread = threading.Thread(
-                                target=self.acquire_snapshot, args=[command_string, cmd, parameters, _first_triggering]
+                            # take the snapshot on the task worker
+                            self._task_pool.submit(
+                                self.acquire_snapshot, [command_string, cmd, parameters, _first_triggering]
                             )
-                            thread.daemon = True
-                            thread.start()
                             # suppress the current command, we'll send it later
                             return None,
 
@@ -687,12 +873,12 @@ class Timelapse(object):
             first_trigger = self.Triggers.get_first_triggering(0, Triggers.TRIGGER_TYPE_IN_PATH)
 
             if first_trigger:
-                self.Settings.current_debug_profile().log_triggering("An in-path snapshot is triggering")
+                self.ResolvedProfiles.Debug.log_triggering("An in-path snapshot is triggering")
                 return first_trigger
 
             first_trigger = self.Triggers.get_first_triggering(1, Triggers.TRIGGER_TYPE_DEFAULT)
             if first_trigger:  # We're triggering
-                self.Settings.current_debug_profile().log_triggering("A snapshot is triggering")
+                self.ResolvedProfiles.Debug.log_triggering("A snapshot is triggering")
                 return first_trigger
         except Exception as e:
             self.Settings.current_debug_profile().log_exception(e)
@@ -745,9 +931,7 @@ class Timelapse(object):
             self.Settings.current_debug_profile().log_snapshot_download(
                 "About to take a snapshot.  Triggering Command: {0}".format(cmd))
             if self.OnSnapshotStartCallback is not None:
-                snapshot_callback_thread = threading.Thread(target=self.OnSnapshotStartCallback)
-                snapshot_callback_thread.daemon = True
-                snapshot_callback_thread.start()
+                self._callback_pool.submit(self.OnSnapshotStartCallback)
 
             # Capture and undo the last position update, we're not going to be using it!
             triggering_command_position, triggering_extruder_position = self.Position.undo_update()
@@ -771,17 +955,24 @@ class Timelapse(object):
                 self._on_trigger_snapshot_complete(self._most_recent_snapshot_payload.copy())
 
     def on_gcode_sent(self, cmd, cmd_type, gcode, tags):
-        self.Settings.current_debug_profile().log_gcode_sent(
-            "Sent to printer: Command Type:{0}, gcode:{1}, cmd: {2}, tags: {3}".format(cmd_type, gcode, cmd, tags))
+        self._refresh_resolved_profiles()
+        if self.ResolvedProfiles.LogGcodeSent:
+            self.ResolvedProfiles.Debug.log_gcode_sent(
+                "Sent to printer: Command Type:{0}, gcode:{1}, cmd: {2}, tags: {3}", cmd_type, gcode, cmd, tags)
 
     def on_gcode_received(self, comm, line, *args, **kwargs):
-        self.Settings.current_debug_profile().log_gcode_received(
-            "Received from printer: line:{0}".format(line)
-        )
+        self._refresh_resolved_profiles()
+        if self.ResolvedProfiles.LogGcodeReceived:
+            self.ResolvedProfiles.Debug.log_gcode_received("Received from printer: line:{0}", line)
         return line
 
     # internal functions
     ####################
+    def _refresh_resolved_profiles(self):
+        # only resolve the profiles again if the settings have changed
+        if self.ResolvedProfiles.SettingsVersion != self.Settings.settings_version:
+            self.ResolvedProfiles = self.Settings.resolved_profiles()
+
     def _get_command_for_octoprint(self, command_string, cmd, parameters):
         if command_string is None or command_string == (None,):
             return command_string
@@ -795,83 +986,53 @@ class Timelapse(object):
         return None
 
     def _send_state_changed_message(self):
-        """Notifies any callbacks about any changes contained in the dictionaries.
-        If you send a dict here the client will get a message, so check the
-        settings to see if they are subscribed to notifications before populating the dictinaries!"""
-
-        delay_seconds = 0
-        # if another thread is trying to send the message, stop it
-        if self.StateChangeMessageThread is not None and self.StateChangeMessageThread.isAlive():
-            self.StateChangeMessageThread.cancel()
-
-        if self.LastStateChangeMessageTime is not None:
-            # do not send more than 1 per second
-            time_since_last_update = time.time() - self.LastStateChangeMessageTime
-            if time_since_last_update < 1:
-                delay_seconds = 1-time_since_last_update
-                if delay_seconds < 0:
-                    delay_seconds = 0
+        """Notifies the state publisher that the position, extruder or trigger state may have changed.  This is called
+        for every queued line, so the message itself is built and sent later on the publisher thread."""
+        if self.OnStateChangedCallback is not None:
+            self._state_publisher.mark_dirty()
+
+    def _get_state_changed_message(self):
+        """Returns the changes to send to any listener, or None if nothing should be sent.  Check the settings to see
+        if they are subscribed to notifications before populating the dictionaries!"""
+        if self.Position is None or self.Triggers is None:
+            return None
 
-        try:
-            # Notify any callbacks
-            if self.OnStateChangedCallback is not None:
-
-                    def send_change_message():
-                        trigger_change_list = None
-                        position_change_dict = None
-                        position_state_change_dict = None
-                        extruder_change_dict = None
-                        trigger_changes_dict = None
-
-                        # Get the changes
-                        if self.Settings.show_trigger_state_changes:
-                            trigger_change_list = self.Triggers.state_to_list()
-                        if self.Settings.show_position_changes:
-                            position_change_dict = self.Position.to_position_dict()
-                        if self.Settings.show_position_state_changes:
-                            position_state_change_dict = self.Position.to_state_dict()
-                        if self.Settings.show_extruder_state_changes:
-                            extruder_change_dict = self.Position.Extruder.to_dict()
-
-                        # if there are any state changes, send them
-                        if (
-                            position_change_dict is not None
-                            or position_state_change_dict is not None
-                            or extruder_change_dict is not None
-                            or trigger_change_list is not None
-                        ):
-                            if trigger_change_list is not None and len(trigger_change_list) > 0:
-                                trigger_changes_dict = {
-                                    "Name": self.Triggers.Name,
-                                    "Triggers": trigger_change_list
-                                }
-                        change_dict = {
-                            "Extruder": extruder_change_dict,
-                            "Position": position_change_dict,
-                            "PositionState": position_state_change_dict,
-                            "TriggerState": trigger_changes_dict
-                        }
-
-                        if (
-                            change_dict["Extruder"] is not None
-                            or change_dict["Position"] is not None
-                            or change_dict["PositionState"] is not None
-                            or change_dict["TriggerState"] is not None
-                        ):
-                            self.OnStateChangedCallback(change_dict)
-                            self.LastStateChangeMessageTime = time.time()
-
-                    # Send a delayed message
-                    self.StateChangeMessageThread = threading.Timer(
-                        delay_seconds,
-                        send_change_message
-                    )
-                    self.StateChangeMessageThread.daemon = True
-                    self.StateChangeMessageThread.start()
+        trigger_change_list = None
+        position_change_dict = None
+        position_state_change_dict = None
+        extruder_change_dict = None
+        trigger_changes_dict = None
+
+        # Get the changes
+        if self.Settings.show_trigger_state_changes:
+            trigger_change_list = self.Triggers.state_to_list()
+        if self.Settings.show_position_changes:
+            position_change_dict = self.Position.to_position_dict()
+        if self.Settings.show_position_state_changes:
+            position_state_change_dict = self.Position.to_state_dict()
+        if self.Settings.show_extruder_state_changes:
+            extruder_change_dict = self.Position.Extruder.to_dict()
+
+        if trigger_change_list is not None and len(trigger_change_list) > 0:
+            trigger_changes_dict = {
+                "Name": self.Triggers.Name,
+                "Triggers": trigger_change_list
+            }
 
-        except Exception as e:
-            # no need to re-raise, callbacks won't be notified, however.
-            self.Settings.current_debug_profile().log_exception(e)
+        if (
+            extruder_change_dict is None
+            and position_change_dict is None
+            and position_state_change_dict is None
+            and trigger_changes_dict is None
+        ):
+            return None
+
+        return {
+            "Extruder": extruder_change_dict,
+            "Position": position_change_dict,
+            "PositionState": position_state_change_dict,
+            "TriggerState": trigger_changes_dict
+        }
 
     def _is_snapshot_command(self, command_string):
         return command_string == self.Printer.snapshot_command
@@ -890,11 +1051,8 @@ class Timelapse(object):
         message = self.Position.position_error(0)
         self.Settings.current_debug_profile().log_error(message)
         if self.OnPositionErrorCallback is not None:
-            position_error_callback_thread = threading.Thread(
-                target=self.OnPositionErrorCallback, args=[message]
-            )
-            position_error_callback_thread.daemon = True
-            position_error_callback_thread.start()
+            # this is called from the gcode queuing hook, so never hold up the print when messages are backing up
+            self._callback_pool.submit(self.OnPositionErrorCallback, [message], timeout=0)
 
     def _on_trigger_snapshot_complete(self, snapshot_payload):
 
@@ -907,65 +1065,76 @@ class Timelapse(object):
                 "current_snapshot_time": snapshot_payload["total_snapshot_time"]
             }
             if self.OnSnapshotCompleteCallback is not None:
-                snapshot_complete_callback_thread = threading.Thread(
-                    target=self.OnSnapshotCompleteCallback, args=[payload]
-                )
-                snapshot_complete_callback_thread.daemon = True
-                snapshot_complete_callback_thread.start()
+                self._callback_pool.submit(self.OnSnapshotCompleteCallback, [payload])
+
+    def _on_latest_snapshot_changed(self, snapshot_version):
+        if self.OnLatestSnapshotChangedCallback is not None:
+            self._callback_pool.submit(self.OnLatestSnapshotChangedCallback, [snapshot_version])
 
     def _render_timelapse(self, print_end_state):
 
-        def _render_timelapse_async(render_job_id, timelapse_render_job):
+        def _render_timelapse_async(render_job_info, render_streaming_render, capture_snapshot):
 
             try:
-                snapshot_thread = threading.Thread(target=timelapse_render_job, args=[])
-                snapshot_thread.daemon = True
-                num_snapshot_tasks = self._snapshot_task_queue.qsize()
-                if num_snapshot_tasks > 0:
-                    self.Settings.current_debug_profile().log_render_start("Started Rendering Timelapse.")
+                num_snapshot_tasks = self._snapshot_pool.pending() + self._post_processing_pool.pending()
+                if num_snapshot_tasks == 0:
+                    self.Settings.current_debug_profile().log_render_start("Queueing the timelapse for rendering.")
                 else:
                     self.Settings.current_debug_profile().log_render_start(
-                        "Waiting for {0} snapshot threads to complete".format(
-                            self._snapshot_task_queue.qsize()))
-                    self._snapshot_task_queue.join()
+                        "Waiting for {0} snapshot tasks to complete".format(num_snapshot_tasks))
+                    # captures queue their post processing, so the capture pool must be drained first
+                    self._snapshot_pool.drain()
+                    self._post_processing_pool.drain()
                     self.Settings.current_debug_profile().log_render_start(
-                        "All snapshot tasks have completed, rendering timelapse"
+                        "All snapshot tasks have completed, queueing the timelapse for rendering."
                     )
-                # we are rendering, set the state before starting the rendering job.
-                self._rendering_task_queue.put(render_job_id)
-                snapshot_thread.start()
+                # every frame has been added to the snapshot container, if there is one
+                if capture_snapshot is not None:
+                    capture_snapshot.close_container()
+                self._render_scheduler.add(render_job_info, render_streaming_render)
             except Exception as e:
                 self.Settings.current_debug_profile().log_exception(e)
-                self._rendering_task_queue.get()
-                self._rendering_task_queue.task_done()
+                if render_streaming_render is not None:
+                    render_streaming_render.cancel()
 
         # make sure we have a non null TimelapseSettings object.  We may have terminated the timelapse for some reason
         if self.Rendering is not None and self.Rendering.enabled:
-            job_id = "TimelapseRenderJob_{0}".format(str(uuid.uuid4()))
-            job = Render.create_render_job(
-                self.Settings,
-                self.Snapshot,
-                self.Rendering,
-                self.DataFolder,
-                self.DefaultTimelapseDirectory,
-                self.FfMpegPath,
-                1,
-                self._rendering_task_queue,
-                job_id,
-                utility.get_currently_printing_filename(self.OctoprintPrinter),
-                self.PrintStartTime,
-                time.time(),
-                print_end_state,
-                self.SecondsAddedByOctolapse,
-                self._on_render_start,
-                self._on_render_end
+            job_info = RenderJobInfo()
+            job_info.PrintName = utility.get_currently_printing_filename(self.OctoprintPrinter)
+            job_info.PrintStartTime = self.PrintStartTime
+            job_info.PrintEndTime = time.time()
+            job_info.PrintState = print_end_state
+            job_info.SecondsAddedToPrint = self.SecondsAddedByOctolapse
+            job_info.Rendering = self.Rendering.to_dict()
+            job_info.FfMpegPath = self.FfMpegPath
+            job_info.OctoprintTimelapseFolder = self.DefaultTimelapseDirectory
+            job_info.CleanAfterSuccess = self.Snapshot.cleanup_after_render_complete
+            job_info.CleanAfterFail = self.Snapshot.cleanup_after_render_fail
+            # timelapses of completed prints are rendered before those of failed or cancelled prints
+            job_info.Priority = 1 if print_end_state == "COMPLETED" else 0
+            streaming_render = None
+            if self.CaptureSnapshot is not None:
+                # the render job finishes or cancels the render that was started during the print
+                streaming_render = self.CaptureSnapshot.StreamingRender
+                self.CaptureSnapshot.StreamingRender = None
+            # wait for the snapshots to finish on the render queue worker rather than holding up the caller
+            return self._render_queue_pool.submit(
+                _render_timelapse_async, [job_info, streaming_render, self.CaptureSnapshot]
             )
-            rendering_thread = threading.Thread(target=_render_timelapse_async, args=[job_id, job])
-            rendering_thread.daemon = True
-            rendering_thread.start()
-            return True
         return False
 
+    def _create_render_job(self, job_info, thread_count, streaming_render):
+        return Render.create_render_job(
+            self.Settings,
+            job_info,
+            self.DataFolder,
+            thread_count,
+            self._on_render_start,
+            self._on_render_end,
+            streaming_render=streaming_render,
+            on_render_progress=self._on_render_progress
+        )
+
     def _on_render_start(self, *args, **kwargs):
         job_id = args[0]
         self.Settings.current_debug_profile().log_render_start(
@@ -973,11 +1142,7 @@ class Timelapse(object):
         payload = args[1]
         # notify the caller
         if self.OnRenderStartCallback is not None:
-            render_start_complete_callback_thread = threading.Thread(
-                target=self.OnRenderStartCallback, args=[payload]
-            )
-            render_start_complete_callback_thread.daemon = True
-            render_start_complete_callback_thread.start()
+            self._callback_pool.submit(self.OnRenderStartCallback, [payload])
 
     def _on_render_end(self, *args, **kwargs):
         job_id = args[0]
@@ -985,18 +1150,43 @@ class Timelapse(object):
 
         self.Settings.current_debug_profile().log_render_complete("Completed rendering. JobId: {0}".format(job_id))
         assert (isinstance(payload, RenderingCallbackArgs))
-
-        if not payload.HasError and self.Snapshot.cleanup_after_render_fail:
-            self.CaptureSnapshot.clean_snapshots(utility.get_snapshot_temp_directory(self.DataFolder))
-        elif self.Snapshot.cleanup_after_render_complete:
-            self.CaptureSnapshot.clean_snapshots(utility.get_snapshot_temp_directory(self.DataFolder))
+        if payload.RenderSeconds > 0:
+            self._record_render_statistics(job_id, payload)
 
         if self.OnRenderEndCallback is not None:
-            render_end_complete_callback_thread = threading.Thread(
-                target=self.OnRenderEndCallback, args=[payload]
-            )
-            render_end_complete_callback_thread.daemon = True
-            render_end_complete_callback_thread.start()
+            self._callback_pool.submit(self.OnRenderEndCallback, [payload])
+
+    def _on_render_progress(self, job_id, progress):
+        self._render_scheduler.set_progress(job_id, progress)
+        if self.OnRenderProgressCallback is not None:
+            self._callback_pool.submit(self.OnRenderProgressCallback, [job_id, progress])
+
+    def _record_render_statistics(self, job_id, payload):
+        try:
+            append_render_statistics(os.path.join(self.DataFolder, "render_statistics.csv"), {
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "job_id": job_id,
+                "file_name": payload.get_rendering_filename(),
+                "has_error": payload.HasError,
+                "error_type": payload.ErrorType,
+                "cpu_count": get_cpu_count(),
+                "threads": payload.Threads,
+                "frames_rendered": payload.FramesRendered,
+                "render_seconds": "{0:.2f}".format(payload.RenderSeconds),
+                "frames_per_second": "{0:.2f}".format(payload.get_frames_per_second())
+            })
+        except (IOError, OSError) as e:
+            self.Settings.current_debug_profile().log_exception(e)
+
+    def _on_render_queue_changed(self):
+        if self.OnRenderQueueChangedCallback is not None:
+            self._callback_pool.submit(self.OnRenderQueueChangedCallback, [])
+
+    def _on_state_changed(self, change_dict):
+        self.OnStateChangedCallback(change_dict)
+
+    def _on_worker_error(self, e):
+        self.Settings.current_debug_profile().log_exception(e)
 
     def _on_timelapse_start(self):
         if self.OnTimelapseStartCallback is None:
@@ -1010,7 +1200,6 @@ class Timelapse(object):
             self.Triggers.reset()
         self.CommandIndex = -1
 
-        self.LastStateChangeMessageTime = None
         self.PrintStartTime = None
         self.SnapshotGcodes = None
         self.SavedCommand = None
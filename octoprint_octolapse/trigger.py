@@ -36,6 +36,7 @@ class Triggers(object):
         self._triggers = []
         self.reset()
         self.Settings = settings
+        self.ResolvedProfiles = self.Settings.resolved_profiles()
         self.Name = "Unknown"
         self.Printer = None
 
@@ -43,7 +44,7 @@ class Triggers(object):
         try:
             return len(self._triggers)
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
     def reset(self):
         self.Snapshot = None
@@ -52,8 +53,9 @@ class Triggers(object):
     def create(self):
         try:
             self.reset()
-            self.Printer = self.Settings.current_printer()
-            self.Snapshot = self.Settings.current_snapshot()
+            self.ResolvedProfiles = self.Settings.resolved_profiles()
+            self.Printer = self.ResolvedProfiles.Printer
+            self.Snapshot = self.ResolvedProfiles.Snapshot
             self.Name = self.Snapshot.name
             # create the triggers
             # If the gcode trigger is enabled, add it
@@ -67,7 +69,7 @@ class Triggers(object):
             if self.Snapshot.timer_trigger_enabled:
                 self._triggers.append(TimerTrigger(self.Settings))
         except Exception as e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
     def resume(self):
         try:
@@ -75,7 +77,7 @@ class Triggers(object):
                 if type(trigger) == TimerTrigger:
                     trigger.resume()
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
     def pause(self):
         try:
@@ -83,11 +85,14 @@ class Triggers(object):
                 if type(trigger) == TimerTrigger:
                     trigger.pause()
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
     def update(self, position, cmd):
         """Update all triggers and return any that are triggering"""
         try:
+            # only resolve the profiles again if the settings have changed
+            if self.ResolvedProfiles.SettingsVersion != self.Settings.settings_version:
+                self.ResolvedProfiles = self.Settings.resolved_profiles()
             # Loop through all of the active currentTriggers
             for currentTrigger in self._triggers:
                 # determine what type the current trigger is and update appropriately
@@ -100,11 +105,11 @@ class Triggers(object):
 
                 # Make sure there are no position errors (unknown position, out of bounds, etc)
                 if position.has_position_error(0):
-                    self.Settings.current_debug_profile().log_error(
-                        "A trigger has a position error:{0}".format(position.position_error(0)))
+                    self.ResolvedProfiles.Debug.log_error(
+                        "A trigger has a position error:{0}", position.position_error(0))
                 # see if the current trigger is triggering, indicting that a snapshot should be taken
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
         return None
 
@@ -121,7 +126,7 @@ class Triggers(object):
                 ):
                     return currentTrigger
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
         return False
 
@@ -132,7 +137,7 @@ class Triggers(object):
                 if currentTrigger.is_waiting(0):
                     return currentTrigger
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
     def has_changed(self):
         try:
@@ -141,7 +146,7 @@ class Triggers(object):
                 if currentTrigger.has_changed(0):
                     return True
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
             return None
         return False
 
@@ -152,7 +157,7 @@ class Triggers(object):
             for currentTrigger in self._triggers:
                 state_list.append(currentTrigger.to_dict(0))
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
             return None
         return state_list
 
@@ -164,7 +169,7 @@ class Triggers(object):
                 if currentTrigger.has_changed(0):
                     change_list.append(currentTrigger.to_dict(0))
         except Exception, e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
             return None
         return change_list
 
@@ -221,8 +226,9 @@ class Trigger(object):
 
     def __init__(self, octolapse_settings, max_states=5):
         self.Settings = octolapse_settings
-        self.Printer = Printer(self.Settings.current_printer())
-        self.Snapshot = Snapshot(self.Settings.current_snapshot())
+        self.ResolvedProfiles = self.Settings.resolved_profiles()
+        self.Printer = Printer(self.ResolvedProfiles.Printer)
+        self.Snapshot = Snapshot(self.ResolvedProfiles.Snapshot)
 
         self.Type = 'Trigger'
         self._stateHistory = []
@@ -233,6 +239,11 @@ class Trigger(object):
     def name(self):
         return self.Snapshot.name + " Trigger"
 
+    def refresh_resolved_profiles(self):
+        # only resolve the profiles again if the settings have changed
+        if self.ResolvedProfiles.SettingsVersion != self.Settings.settings_version:
+            self.ResolvedProfiles = self.Settings.resolved_profiles()
+
     def add_state(self, state):
         self._stateHistory.insert(0, state)
         while len(self._stateHistory) > self._maxStates:
@@ -305,7 +316,7 @@ class GcodeTrigger(Trigger):
             self.SnapshotCommand = self.Printer.snapshot_command
 
         except ValueError as e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
         self.Type = "gcode"
         self.RequireZHop = self.Snapshot.gcode_trigger_require_zhop
@@ -326,7 +337,7 @@ class GcodeTrigger(Trigger):
         # Logging
         message = "Creating Gcode Trigger - Gcode Command:{0}, RequireZHop:{1}"
         message = message.format(self.Printer.snapshot_command, self.Snapshot.gcode_trigger_require_zhop)
-        self.Settings.current_debug_profile().log_trigger_create(message)
+        self.ResolvedProfiles.Debug.log_trigger_create(message)
 
         message = (
             "Extruder Triggers - OnExtrudingStart:{0}, OnExtruding:{1}, OnPrimed:{2}, "
@@ -344,13 +355,14 @@ class GcodeTrigger(Trigger):
             self.Snapshot.gcode_trigger_on_detracting,
             self.Snapshot.gcode_trigger_on_detracted
         )
-        self.Settings.current_debug_profile().log_trigger_create(message)
+        self.ResolvedProfiles.Debug.log_trigger_create(message)
         # add an initial state
         self.add_state(GcodeTriggerState())
 
     def update(self, position, command_name):
         """If the provided command matches the trigger command, sets IsTriggered to true, else false"""
         try:
+            self.refresh_resolved_profiles()
             # get the last state to use as a starting point for the update
             # if there is no state, this will return the default state
             state = self.get_state(0)
@@ -381,11 +393,11 @@ class GcodeTrigger(Trigger):
                     if position.Extruder.is_triggered(self.ExtruderTriggers, index=0):
                         if self.RequireZHop and not position.is_zhop(0):
                             state.IsWaitingOnZHop = True
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "GcodeTrigger - Waiting on ZHop.")
                         elif not state.IsInPosition and not state.InPathPosition:
                             # Make sure the previous X,Y is in position
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "GcodeTrigger - Waiting on Position.")
                         else:
                             state.IsTriggered = True
@@ -400,11 +412,11 @@ class GcodeTrigger(Trigger):
                             state.IsWaiting = False
                             state.IsWaitingOnZHop = False
                             state.IsWaitingOnExtruder = False
-                            self.Settings.current_debug_profile().log_triggering(
+                            self.ResolvedProfiles.Debug.log_triggering(
                                 "GcodeTrigger - Waiting for extruder to trigger.")
                     else:
                         state.IsWaitingOnExtruder = True
-                        self.Settings.current_debug_profile().log_trigger_wait_state(
+                        self.ResolvedProfiles.Debug.log_trigger_wait_state(
                             "GcodeTrigger - Waiting for extruder to trigger.")
 
             # calculate changes and set the current state
@@ -413,7 +425,7 @@ class GcodeTrigger(Trigger):
             # add the state to the history
             self.add_state(state)
         except Exception as e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
 
 class LayerTriggerState(TriggerState):
@@ -485,7 +497,7 @@ class LayerTrigger(Trigger):
             self.Snapshot.layer_trigger_height,
             self.Snapshot.layer_trigger_require_zhop
         )
-        self.Settings.current_debug_profile().log_trigger_create(message)
+        self.ResolvedProfiles.Debug.log_trigger_create(message)
 
         message = (
             "Extruder Triggers - OnExtrudingStart:{0}, "
@@ -505,12 +517,13 @@ class LayerTrigger(Trigger):
             self.Snapshot.layer_trigger_on_detracting,
             self.Snapshot.layer_trigger_on_detracted
         )
-        self.Settings.current_debug_profile().log_trigger_create(message)
+        self.ResolvedProfiles.Debug.log_trigger_create(message)
         self.add_state(LayerTriggerState())
 
     def update(self, position):
         """Updates the layer monitor position.  x, y and z may be absolute, but e must always be relative"""
         try:
+            self.refresh_resolved_profiles()
             # get the last state to use as a starting point for the update
             # if there is no state, this will return the default state
             state = self.get_state(0)
@@ -549,11 +562,11 @@ class LayerTrigger(Trigger):
                     new_increment = int(math.ceil(position.height(0)/self.HeightIncrement))
 
                     if new_increment <= state.CurrentIncrement:
-                        message = (
-                            "Layer Trigger - Warning - The height increment was expected to increase, but it did not." 
-                            " Height Increment:{0}, Current Increment:{1}, Calculated Inrement:{2}"
-                        ).format(self.HeightIncrement, state.CurrentIncrement, new_increment)
-                        self.Settings.current_debug_profile().log_trigger_height_change(message)
+                        self.ResolvedProfiles.Debug.log_trigger_height_change(
+                            "Layer Trigger - Warning - The height increment was expected to increase, but it did not."
+                            " Height Increment:{0}, Current Increment:{1}, Calculated Inrement:{2}",
+                            self.HeightIncrement, state.CurrentIncrement, new_increment
+                        )
                     else:
                         state.CurrentIncrement = new_increment
                         # if the current increment is below one here, set it to one.  This is not normal, but can happen
@@ -562,10 +575,10 @@ class LayerTrigger(Trigger):
                             state.CurrentIncrement = 1
 
                         state.IsHeightChange = True
-                        message = (
-                            "Layer Trigger - Height Increment:{0}, Current Increment:{1}, Height: {2}"
-                        ).format(self.HeightIncrement, state.CurrentIncrement, position.height(0))
-                        self.Settings.current_debug_profile().log_trigger_height_change(message)
+                        self.ResolvedProfiles.Debug.log_trigger_height_change(
+                            "Layer Trigger - Height Increment:{0}, Current Increment:{1}, Height: {2}",
+                            self.HeightIncrement, state.CurrentIncrement, position.height(0)
+                        )
 
                 # see if we've encountered a layer or height change
                 if self.HeightIncrement is not None and self.HeightIncrement > 0:
@@ -589,26 +602,26 @@ class LayerTrigger(Trigger):
                     if not is_extruder_triggering:
                         state.IsWaitingOnExtruder = True
                         if state.IsHeightChangeWait:
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "LayerTrigger - Height change triggering, waiting on extruder.")
                         elif state.IsLayerChangeWait:
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "LayerTrigger - Layer change triggering, waiting on extruder.")
                     else:
                         if self.RequireZHop and not position.is_zhop(0):
                             state.IsWaitingOnZHop = True
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "LayerTrigger - Triggering - Waiting on ZHop.")
                         elif not state.IsInPosition and not state.InPathPosition:
                             # Make sure the previous X,Y is in position
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "LayerTrigger - Waiting on Position.")
                         else:
                             if state.IsHeightChangeWait:
-                                self.Settings.current_debug_profile().log_triggering(
+                                self.ResolvedProfiles.Debug.log_triggering(
                                     "LayerTrigger - Height change triggering.")
                             elif state.IsLayerChangeWait:
-                                self.Settings.current_debug_profile().log_triggering(
+                                self.ResolvedProfiles.Debug.log_triggering(
                                     "LayerTrigger - Layer change triggering.")
 
                             self.TriggeredCount += 1
@@ -632,7 +645,7 @@ class LayerTrigger(Trigger):
             # add the state to the history
             self.add_state(state)
         except Exception as e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
 
 class TimerTriggerState(TriggerState):
@@ -690,7 +703,7 @@ class TimerTrigger(Trigger):
             self.Snapshot.timer_trigger_seconds,
             self.Snapshot.timer_trigger_require_zhop
         )
-        self.Settings.current_debug_profile().log_trigger_create(message)
+        self.ResolvedProfiles.Debug.log_trigger_create(message)
 
         message = (
             "Extruder Triggers - OnExtrudingStart:{0}, "
@@ -711,7 +724,7 @@ class TimerTrigger(Trigger):
             self.Snapshot.timer_trigger_on_detracted
         )
 
-        self.Settings.current_debug_profile().log_trigger_create(message)
+        self.ResolvedProfiles.Debug.log_trigger_create(message)
         # add initial state
         initial_state = TimerTriggerState()
         self.add_state(initial_state)
@@ -723,7 +736,7 @@ class TimerTrigger(Trigger):
                 return
             state.PauseTime = time.time()
         except Exception as e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
     def resume(self):
         try:
@@ -742,15 +755,16 @@ class TimerTrigger(Trigger):
                     state.PauseTime, current_time,
                     new_last_trigger_time
                 )
-                self.Settings.current_debug_profile().log_timer_trigger_unpaused(message)
+                self.ResolvedProfiles.Debug.log_timer_trigger_unpaused(message)
                 # Keep the proper interval if the print is paused
                 state.TriggerStartTime = new_last_trigger_time
                 state.PauseTime = None
         except Exception as e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
 
     def update(self, position):
         try:
+            self.refresh_resolved_profiles()
             # get the last state to use as a starting point for the update
             # if there is no state, this will return the default state
             state = self.get_state(0)
@@ -783,15 +797,13 @@ class TimerTrigger(Trigger):
                 if state.TriggerStartTime is None:
                     state.TriggerStartTime = current_time
 
-                message = (
-                    "TimerTrigger - {0} second interval, "
-                    "{1} seconds elapsed, {2} seconds to trigger"
-                ).format(
-                    self.IntervalSeconds,
-                    int(current_time - state.TriggerStartTime),
-                    int(self.IntervalSeconds - (current_time - state.TriggerStartTime))
-                )
-                self.Settings.current_debug_profile().log_trigger_time_remaining(message)
+                if self.ResolvedProfiles.LogTriggerTimeRemaining:
+                    self.ResolvedProfiles.Debug.log_trigger_time_remaining(
+                        "TimerTrigger - {0} second interval, {1} seconds elapsed, {2} seconds to trigger",
+                        self.IntervalSeconds,
+                        int(current_time - state.TriggerStartTime),
+                        int(self.IntervalSeconds - (current_time - state.TriggerStartTime))
+                    )
 
                 # how many seconds to trigger
                 seconds_to_trigger = self.IntervalSeconds - \
@@ -805,13 +817,13 @@ class TimerTrigger(Trigger):
                     # see if the exturder is in the right position
                     if position.Extruder.is_triggered(self.ExtruderTriggers, index=0):
                         if self.RequireZHop and not position.is_zhop(0):
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "TimerTrigger - Waiting on ZHop.")
                             state.IsWaitingOnZHop = True
                         elif not state.IsInPosition and not state.InPathPosition:
                             # Make sure the previous X,Y is in position
 
-                            self.Settings.current_debug_profile().log_trigger_wait_state(
+                            self.ResolvedProfiles.Debug.log_trigger_wait_state(
                                 "TimerTrigger - Waiting on Position.")
                         else:
                             # Is Triggering
@@ -831,10 +843,10 @@ class TimerTrigger(Trigger):
                             state.IsWaitingOnZHop = False
                             state.IsWaitingOnExtruder = False
                             # Log trigger
-                            self.Settings.current_debug_profile().log_triggering('TimerTrigger - Triggering.')
+                            self.ResolvedProfiles.Debug.log_triggering('TimerTrigger - Triggering.')
 
                     else:
-                        self.Settings.current_debug_profile().log_trigger_wait_state(
+                        self.ResolvedProfiles.Debug.log_trigger_wait_state(
                             'TimerTrigger - Triggering, waiting for extruder')
                         state.IsWaitingOnExtruder = True
             # calculate changes and set the current state
@@ -842,4 +854,4 @@ class TimerTrigger(Trigger):
             # add the state to the history
             self.add_state(state)
         except Exception as e:
-            self.Settings.current_debug_profile().log_exception(e)
+            self.ResolvedProfiles.Debug.log_exception(e)
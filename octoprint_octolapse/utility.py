@@ -185,6 +185,15 @@ def get_snapshot_filename(print_name, print_start_time, snapshot_number):
     return "{0}{1}.{2}".format(file_template, format_snapshot_number(snapshot_number), "jpg")
 
 
+def get_snapshot_container_filename(print_name, print_start_time):
+    # the container goes in the same directory that the loose snapshots would
+    file_template = get_snapshot_filename_template()
+    file_template = file_template.replace("{FILENAME}", get_string(print_name, ""))
+    file_template = file_template.replace("{PRINTSTARTTIME}", "{0:d}".format(
+        math.trunc(round(print_start_time, 2) * 100)))
+    return "{0}.{1}".format(file_template, "mjpeg")
+
+
 SnapshotNumberFormat = "%06d"
 
 
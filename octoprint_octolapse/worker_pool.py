@@ -0,0 +1,148 @@
+# coding=utf-8
+##################################################################################
+# Octolapse - A plugin for OctoPrint used for making stabilized timelapse videos.
+# Copyright (C) 2017  Brad Hochgesang
+##################################################################################
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see the following:
+# https://github.com/FormerLurker/Octolapse/blob/master/LICENSE
+#
+# You can contact the author either through the git-hub repository, or at the
+# following email address: FormerLurker@pm.me
+##################################################################################
+
+
+import threading
+import time
+from Queue import Queue, Full
+
+import octoprint_octolapse.utility as utility
+
+
+class WorkerPool(object):
+    # A fixed number of long lived worker threads fed by a bounded task queue.  When the queue is full, submit blocks
+    # the caller until a worker frees a slot (back-pressure), or until the optional timeout expires.
+    _StopSignal = object()
+
+    def __init__(self, name, num_workers=1, max_queue_size=0, on_error=None):
+        self.Name = name
+        self.NumWorkers = 1
+        self.MaxQueueSize = 0
+        self.OnErrorCallback = on_error
+        self._lock = threading.Lock()
+        self._workers = []
+        self._tasks = None
+        self.TasksSubmitted = 0
+        self.TasksCompleted = 0
+        self.TasksFailed = 0
+        self.TasksRejected = 0
+        self.configure(num_workers, max_queue_size)
+
+    def configure(self, num_workers, max_queue_size):
+        # Stop the current workers, letting them finish anything already queued, then apply the new limits.
+        # The workers are started again on the next submit.
+        self.shutdown()
+        with self._lock:
+            self.NumWorkers = max(1, utility.get_int(num_workers, 1))
+            self.MaxQueueSize = max(0, utility.get_int(max_queue_size, 0))
+            self._tasks = Queue(maxsize=self.MaxQueueSize)
+
+    def submit(self, target, args=None, kwargs=None, timeout=None):
+        # Returns False if the task could not be queued before the timeout expired.
+        with self._lock:
+            self._start_workers()
+            tasks = self._tasks
+        try:
+            tasks.put((target, args or [], kwargs or {}), True, timeout)
+        except Full:
+            with self._lock:
+                self.TasksRejected += 1
+            return False
+        with self._lock:
+            self.TasksSubmitted += 1
+        return True
+
+    def pending(self):
+        # the number of tasks that are queued or running
+        return self._tasks.unfinished_tasks
+
+    def drain(self, timeout=None):
+        # Wait for every queued and running task to complete.  Returns False if the timeout expired first.
+        # Never call this from one of this pool's own workers.
+        tasks = self._tasks
+        end_time = None if timeout is None else time.time() + timeout
+        with tasks.all_tasks_done:
+            while tasks.unfinished_tasks:
+                if end_time is None:
+                    tasks.all_tasks_done.wait()
+                else:
+                    remaining = end_time - time.time()
+                    if remaining <= 0:
+                        return False
+                    tasks.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, wait=True):
+        # Ask every worker to exit once the tasks queued ahead of the request have completed.
+        with self._lock:
+            workers = self._workers
+            self._workers = []
+            tasks = self._tasks
+        for _ in workers:
+            tasks.put((WorkerPool._StopSignal, None, None))
+        if wait:
+            for worker in workers:
+                if worker is not threading.current_thread():
+                    worker.join()
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                "name": self.Name,
+                "workers": len(self._workers),
+                "max_workers": self.NumWorkers,
+                "max_queue_size": self.MaxQueueSize,
+                "pending": self._tasks.unfinished_tasks,
+                "submitted": self.TasksSubmitted,
+                "completed": self.TasksCompleted,
+                "failed": self.TasksFailed,
+                "rejected": self.TasksRejected
+            }
+
+    def _start_workers(self):
+        # must be called while holding the lock
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < self.NumWorkers:
+            worker = threading.Thread(
+                target=self._work, args=[self._tasks], name="{0}-{1}".format(self.Name, len(self._workers) + 1)
+            )
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self, tasks):
+        while True:
+            target, args, kwargs = tasks.get()
+            try:
+                if target is WorkerPool._StopSignal:
+                    return
+                target(*args, **kwargs)
+                with self._lock:
+                    self.TasksCompleted += 1
+            except Exception as e:
+                with self._lock:
+                    self.TasksFailed += 1
+                if self.OnErrorCallback is not None:
+                    self.OnErrorCallback(e)
+            finally:
+                tasks.task_done()